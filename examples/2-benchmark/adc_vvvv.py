@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+
+'''
+EA-RADC(3) timings with the vvvv integrals incore, outcore and generated from
+the DF tensors on the fly (adc.dfadc.contract_vvvv_df)
+'''
+
+import pyscf
+from pyscf import adc
+from benchmarking_utils import setup_logger, get_cpu_timings
+
+log = setup_logger()
+
+for basis in ('aug-cc-pvdz', 'aug-cc-pvtz'):
+    mol = pyscf.M(atom='N 0 0 -.549; N 0 0 .549', basis=basis, verbose=0)
+    mf = mol.RHF().run()
+
+    cpu0 = get_cpu_timings()
+    myadc = adc.ADC(mf).set(method='adc(3)', method_type='ea',
+                            incore_complete=True)
+    myadc.kernel(nroots=3)
+    cpu0 = log.timer('N2 %s EA-RADC(3) incore vvvv' % basis, *cpu0)
+
+    myadc = adc.ADC(mf).set(method='adc(3)', method_type='ea', max_memory=20)
+    myadc.kernel(nroots=3)
+    cpu0 = log.timer('N2 %s EA-RADC(3) outcore vvvv' % basis, *cpu0)
+
+    myadc = adc.ADC(mf).density_fit(basis + '-ri')
+    myadc.set(method='adc(3)', method_type='ea')
+    myadc.kernel(nroots=3)
+    log.timer('N2 %s EA-RADC(3) DF vvvv' % basis, *cpu0)
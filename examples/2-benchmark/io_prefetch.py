@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+'''
+Throughput of lib.map_with_prefetch for different prefetch depths and number
+of I/O threads when reading blocks of an HDF5 file.
+
+The scratch directory can be given in the command line to compare different
+storages, e.g.
+
+    python io_prefetch.py /scratch/local_ssd
+    python io_prefetch.py /nfs/shared_disk
+'''
+
+import sys
+import tempfile
+import numpy
+from pyscf import lib
+from benchmarking_utils import setup_logger, get_cpu_timings
+
+log = setup_logger()
+
+if len(sys.argv) > 1:
+    tmpdir = sys.argv[1]
+else:
+    tmpdir = lib.param.TMPDIR
+
+nrow, ncol = 4000, 250000   # 8 GB dataset
+blksize = 100
+
+tmpfile = tempfile.NamedTemporaryFile(dir=tmpdir)
+feri = lib.H5TmpFile(tmpfile.name, 'w')
+dat = feri.create_dataset('j3c', (nrow, ncol), 'f8')
+for p0, p1 in lib.prange(0, nrow, blksize):
+    dat[p0:p1] = numpy.random.random((p1-p0, ncol))
+feri.flush()
+nbytes = nrow * ncol * 8
+
+def load(p0, p1):
+    return numpy.asarray(dat[p0:p1])
+
+def consume(buf):
+    # Mimic the computation applied on each block
+    return numpy.dot(buf[:,:4000], buf[:,:4000].T)
+
+p0, p1 = zip(*lib.prange(0, nrow, blksize))
+
+cpu0 = get_cpu_timings()
+for p0_, p1_ in zip(p0, p1):
+    consume(load(p0_, p1_))
+cpu0 = log.timer('no prefetch, %.1f MB/s' %
+                 (nbytes/1e6/(get_cpu_timings()[1]-cpu0[1])), *cpu0)
+
+for depth, nthreads in ((1, 1), (2, 1), (2, 2), (4, 2), (4, 4)):
+    cpu0 = get_cpu_timings()
+    for buf in lib.map_with_prefetch(load, p0, p1, depth=depth, nthreads=nthreads):
+        consume(buf)
+    log.timer('prefetch depth=%d nthreads=%d, %.1f MB/s' %
+              (depth, nthreads, nbytes/1e6/(get_cpu_timings()[1]-cpu0[1])), *cpu0)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+
+'''
+Timings of the natural atomic orbitals (lo.nao), the meta-Lowdin orthogonal
+AOs and the intrinsic atomic orbitals (lo.iao) for water clusters of
+different sizes.
+'''
+
+import numpy
+import pyscf
+from pyscf import lo
+from benchmarking_utils import setup_logger, get_cpu_timings
+
+log = setup_logger()
+
+def water_cluster(n):
+    '''n^3 water molecules on a cubic grid'''
+    atoms = []
+    for x in numpy.ndindex(n, n, n):
+        o = numpy.array(x) * 3.
+        atoms.append(('O', o))
+        atoms.append(('H', o + (0., -.757, .587)))
+        atoms.append(('H', o + (0.,  .757, .587)))
+    return atoms
+
+for n in (3, 4, 5):
+    mol = pyscf.M(atom=water_cluster(n), basis='cc-pvdz', verbose=0)
+    mf = mol.RHF().density_fit().run()
+    log.note('%d atoms, %d AOs', mol.natm, mol.nao)
+
+    cpu0 = get_cpu_timings()
+    lo.orth_ao(mf, 'nao')
+    cpu0 = log.timer('NAO', *cpu0)
+    lo.orth_ao(mol, 'meta_lowdin')
+    cpu0 = log.timer('meta-Lowdin', *cpu0)
+    lo.iao.iao(mol, mf.mo_coeff[:,mf.mo_occ>0])
+    log.timer('IAO', *cpu0)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+
+'''
+Timings of the k-point Hartree-Fock with the full FFTDF exchange matrix and
+with the adaptively compressed exchange (ACE) operator for diamond.
+'''
+
+from pyscf.pbc import gto, scf
+from benchmarking_utils import setup_logger, get_cpu_timings
+
+log = setup_logger()
+
+cell = gto.M(
+    a = '''0      1.7835 1.7835
+           1.7835 0      1.7835
+           1.7835 1.7835 0     ''',
+    atom = 'C 0 0 0; C .89175 .89175 .89175',
+    basis = 'gth-dzvp',
+    pseudo = 'gth-pade',
+    mesh = [19]*3,
+    verbose = 0)
+
+for nk in ([2,1,1], [2,2,1], [2,2,2]):
+    kpts = cell.make_kpts(nk)
+    cpu0 = get_cpu_timings()
+    e_ref = scf.KRHF(cell, kpts).kernel()
+    cpu0 = log.timer('KRHF %s' % nk, *cpu0)
+
+    mf = scf.KRHF(cell, kpts)
+    mf.ace = True
+    e_ace = mf.kernel()
+    log.timer('KRHF %s with ACE, error = %.2g' % (nk, e_ace - e_ref), *cpu0)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+'''
+Throughput of the FFT engines available to pbc.tools.fft/ifft for the mesh
+sizes typically found in PBC calculations. The engine used by PySCF is
+selected by pbc_tools_pbc_fft_engine in the config file.
+
+The performance is reported in GFLOP/s with the conventional operation count
+5 N log2(N) for a complex transform of N points (half of it for real inputs).
+'''
+
+import time
+import numpy
+from pyscf.pbc.tools import pbc
+from benchmarking_utils import setup_logger
+
+log = setup_logger()
+
+nbatch = 8
+ntimes = 3
+meshes = [(25,25,25), (32,32,32), (45,45,45), (64,64,64), (81,81,81)]
+engines = ['BLAS', 'NUMPY', 'NUMPY+BLAS', 'SCIPY']
+if pbc.pyfftw is not None:
+    engines.append('FFTW')
+
+def gflops(fn, a, flop):
+    fn(a)  # warm up the plan cache
+    t0 = time.perf_counter()
+    for i in range(ntimes):
+        fn(a)
+    return flop * ntimes / (time.perf_counter() - t0) * 1e-9
+
+for mesh in meshes:
+    ngrids = numpy.prod(mesh)
+    flop = 5 * ngrids * numpy.log2(ngrids) * nbatch
+    rhoR = numpy.random.random((nbatch,) + mesh)
+    rhoG = rhoR + numpy.random.random((nbatch,) + mesh) * 1j
+    for engine in engines:
+        fftn, ifftn = pbc._FFT_ENGINES[engine]
+        log.note('mesh %s %-10s  fft(real) %6.2f  fft %6.2f  ifft %6.2f GFLOP/s',
+                 mesh, engine, gflops(fftn, rhoR, flop*.5),
+                 gflops(fftn, rhoG, flop), gflops(ifftn, rhoG, flop))
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+'''
+Timings of the point group detection (symm.geom.detect_symm) for fullerenes
+and large metal clusters.  The second call of detect_symm for the same
+geometry is served from the cache.
+'''
+
+import numpy
+from pyscf.symm import geom
+from pyscf.tools import c60struct
+from benchmarking_utils import setup_logger, get_cpu_timings
+
+log = setup_logger()
+
+def fcc_cluster(nshells, a=7.71):
+    '''Spherical cut of the fcc lattice (Au lattice constant in Bohr)'''
+    r = numpy.arange(-nshells, nshells+1)
+    coords = numpy.array(numpy.meshgrid(r, r, r, indexing='ij')).reshape(3,-1).T
+    coords = coords[coords.sum(axis=1) % 2 == 0]
+    coords = coords[numpy.linalg.norm(coords, axis=1) < nshells + 1e-3]
+    return [('Au', c) for c in coords * a/2]
+
+def mackay_icosahedron(nshells, d=5.45):
+    '''Icosahedral cluster of 10*k**2+2 atoms in the k-th shell'''
+    p = (1 + 5**.5) / 2
+    v = numpy.array([(0, a, b) for a in (-1, 1) for b in (-p, p)])
+    v = numpy.vstack((v, v[:,[1,2,0]], v[:,[2,0,1]])) / 2
+    dist = numpy.linalg.norm(v[:,None] - v, axis=2)
+    faces = [(i, j, k) for i in range(12) for j in range(i) for k in range(j)
+             if abs(dist[i,j]-1) < 1e-9 and abs(dist[j,k]-1) < 1e-9 and
+             abs(dist[i,k]-1) < 1e-9]
+    coords = [numpy.zeros(3)]
+    for n in range(1, nshells+1):
+        shell = []
+        for i, j, k in faces:
+            for a in range(n+1):
+                for b in range(n+1-a):
+                    shell.append(a*v[i] + b*v[j] + (n-a-b)*v[k])
+        shell = numpy.array(shell)
+        idx = numpy.unique(numpy.around(shell, 6), axis=0, return_index=True)[1]
+        coords.extend(shell[idx])
+    return [('Au', c * d) for c in coords]
+
+c60 = [('C', c) for c in c60struct.make60(1.46, 1.38)]
+c20 = [('C', c) for c in c60struct.make20(1.55)]
+clusters = [('C20', c20), ('C60', c60),
+            ('Au fcc', fcc_cluster(6)), ('Au fcc', fcc_cluster(10)),
+            ('Au Mackay', mackay_icosahedron(5)),
+            ('Au Mackay', mackay_icosahedron(7))]
+
+for name, atoms in clusters:
+    cpu0 = get_cpu_timings()
+    gpname = geom.detect_symm(atoms)[0]
+    cpu0 = log.timer('%s (%d atoms) %s' % (name, len(atoms), gpname), *cpu0)
+    geom.detect_symm(atoms)
+    log.timer('%s (%d atoms) %s cached' % (name, len(atoms), gpname), *cpu0)
@@ -31,21 +31,10 @@ charges = (numpy.arange(5) + 1.) * -.1
 def force(dm):
     # The interaction between QM atoms and MM particles
     # \sum_K d/dR (1/|r_K-R|) = \sum_K (r_K-R)/|r_K-R|^3
-    qm_coords = mol.atom_coords()
-    qm_charges = mol.atom_charges()
-    dr = qm_coords[:,None,:] - coords
-    r = numpy.linalg.norm(dr, axis=2)
-    g = numpy.einsum('r,R,rRx,rR->Rx', qm_charges, charges, dr, r**-3)
-
-    # The interaction between electron density and MM particles
-    # d/dR <i| (1/|r-R|) |j> = <i| d/dR (1/|r-R|) |j> = <i| -d/dr (1/|r-R|) |j>
-    #   = <d/dr i| (1/|r-R|) |j> + <i| (1/|r-R|) |d/dr j>
-    for i, q in enumerate(charges):
-        with mol.with_rinv_origin(coords[i]):
-            v = mol.intor('int1e_iprinv')
-        f =(numpy.einsum('ij,xji->x', dm, v) +
-            numpy.einsum('ij,xij->x', dm, v.conj())) * -q
-        g[i] += f
+    # and the interaction between electron density and MM particles
+    # d/dR <i| (1/|r-R|) |j> = <i| d/dR (1/|r-R|) |j>
+    mf_grad = mf.nuc_grad_method()
+    g = mf_grad.grad_nuc_mm() + mf_grad.grad_hcore_mm(dm)
 
     # Force = -d/dR
     return -g
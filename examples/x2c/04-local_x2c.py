@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+'''
+Local X2C: the decoupling (X) and renormalization (R) matrices are computed
+for each atom from its one-center Dirac equation and assembled as
+block-diagonal matrices (approx='local1e').  This avoids the diagonalization
+of the Dirac Hamiltonian of the entire (uncontracted) molecule.  X and R
+are computed once for each element and basis.
+
+approx='atom1e' uses the atomic X matrices but computes R for the whole
+molecule.
+'''
+
+import time
+import scipy.linalg
+from pyscf import gto, scf
+
+#
+# Cost of the X2C core Hamiltonian for a gold cluster
+#
+mol = gto.M(
+    verbose = 0,
+    atom = '''
+Au  0.      0.      0.
+Au  2.88    0.      0.
+Au  1.44    2.494   0.
+Au  1.44    0.831   2.351
+Au  4.32    2.494   0.
+Au  4.32    0.831   2.351
+''',
+    basis = 'ano@5s4p3d1f',
+)
+
+s = mol.intor('int1e_ovlp')
+for approx in ('1e', 'atom1e', 'local1e'):
+    mf = scf.RHF(mol).sfx2c1e()
+    mf.with_x2c.approx = approx
+    t0 = time.time()
+    h1 = mf.get_hcore()
+    t1 = time.time()
+    e = scipy.linalg.eigh(h1, s)[0]
+    if approx == '1e':
+        e_ref = e
+    print('approx = %-8s  hcore time = %6.2f s  max error of h1 eigenvalues = %.2e'
+          % (approx, t1-t0, abs(e - e_ref).max()))
+
+#
+# Error in the SCF energy
+#
+mol = gto.M(
+    verbose = 0,
+    atom = '''
+Au  0.      0.      0.
+H   0.      0.      1.52
+''',
+    basis = 'ano@5s4p3d1f',
+)
+for approx in ('1e', 'atom1e', 'local1e'):
+    mf = scf.RHF(mol).sfx2c1e()
+    mf.with_x2c.approx = approx
+    print('approx = %-8s  E = %.10f' % (approx, mf.kernel()))
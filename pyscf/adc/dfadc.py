@@ -14,6 +14,7 @@
 # limitations under the License.
 
 import numpy as np
+from pyscf import lib
 
 def get_ovvv_df(myadc, Lov, Lvv, p, chnk_size):
 
@@ -122,3 +123,55 @@ def get_vVvV_df(myadc, Lvv, LVV, p, chnk_size):
     vvvv = np.ascontiguousarray(vvvv.transpose(0,2,1,3)).reshape(-1, nvir_2, nvir_1, nvir_2)
 
     return vvvv
+
+
+def contract_vvvv_df(myadc, Lvv, LVV, x, max_memory=None):
+
+    r''' Contracts x[n,c,d] with the approximate vvvv integrals
+
+    out[n,a,b] = \sum_{cd} x[n,c,d] (ac|bd),  (ac|bd) = \sum_L Lvv[L,a,c] LVV[L,b,d]
+
+    without constructing the full vvvv block. Depending on the operation count,
+    either the intermediate \sum_c x[n,c,d] Lvv[L,a,c] or the vvvv integrals are
+    generated on the fly for batches of index a. The batch size is determined
+    by max_memory (in MB).'''
+
+    x = np.asarray(x)
+    nvir_1 = x.shape[-2]
+    nvir_2 = x.shape[-1]
+    x = x.reshape(-1,nvir_1,nvir_2)
+    n = x.shape[0]
+    naux = Lvv.shape[0]
+    Lvv = np.asarray(Lvv).reshape(naux,nvir_1,nvir_1)
+    LVV = np.asarray(LVV).reshape(naux,nvir_2,nvir_2)
+
+    if max_memory is None:
+        max_memory = (myadc.max_memory - lib.current_memory()[0]) * 0.5
+    out = np.empty((n,nvir_1,nvir_2))
+
+    cost_direct = n * naux * nvir_1 * nvir_2 * (nvir_1 + nvir_2)
+    cost_vvvv = (naux + n) * nvir_1**2 * nvir_2**2
+
+    if cost_direct < cost_vvvv:
+        x = np.ascontiguousarray(x.transpose(1,0,2)).reshape(nvir_1,-1)
+        LVV = np.ascontiguousarray(LVV.transpose(0,2,1)).reshape(naux*nvir_2,nvir_2)
+        unit = naux * n * nvir_2 * 2 + naux * nvir_1
+        blksize = int(max(1, max_memory*1e6/8/unit))
+        for p0, p1 in lib.prange(0, nvir_1, blksize):
+            La = np.ascontiguousarray(Lvv[:,p0:p1].transpose(1,0,2)).reshape(-1,nvir_1)
+            tmp = lib.dot(La, x).reshape(p1-p0,naux,n,nvir_2)
+            tmp = tmp.transpose(2,0,1,3).reshape(n*(p1-p0),naux*nvir_2)
+            out[:,p0:p1] = lib.dot(tmp, LVV).reshape(n,p1-p0,nvir_2)
+            del tmp
+    else:
+        x = x.reshape(n,nvir_1*nvir_2)
+        LVV = LVV.reshape(naux,nvir_2*nvir_2)
+        unit = nvir_2 * nvir_1 * nvir_2 * 2 + naux * nvir_1
+        blksize = int(max(1, max_memory*1e6/8/unit))
+        for p0, p1 in lib.prange(0, nvir_1, blksize):
+            La = Lvv[:,p0:p1].reshape(naux,-1)
+            vvvv = lib.dot(La.T, LVV).reshape(p1-p0,nvir_1,nvir_2,nvir_2)
+            vvvv = np.ascontiguousarray(vvvv.transpose(0,2,1,3)).reshape(-1,nvir_1*nvir_2)
+            out[:,p0:p1] = lib.dot(x, vvvv.T).reshape(n,p1-p0,nvir_2)
+            del vvvv
+    return out
@@ -50,9 +50,10 @@ def kernel(adc, nroots=1, guess=None, eris=None, verbose=None):
     guess = adc.get_init_guess(nroots, diag, ascending = True)
 
     conv, adc.E, U = lib.linalg_helper.davidson_nosym1(
-        lambda xs : [matvec(x) for x in xs],
+        lambda xs : matvec(list(xs)),
         guess, diag, nroots=nroots, verbose=log, tol=adc.conv_tol,
-        max_cycle=adc.max_cycle, max_space=adc.max_space, tol_residual=adc.tol_residual)
+        max_cycle=adc.max_cycle, max_space=adc.max_space, tol_residual=adc.tol_residual,
+        chkfile=adc.davidson_chkfile, single_prec=adc.davidson_single_prec)
 
     adc.U = np.array(U).T.copy()
 
@@ -456,24 +457,18 @@ def contract_ladder(myadc,t_amp,vvvv):
     nvir = myadc._nvir
 
     t_amp = np.ascontiguousarray(t_amp.reshape(nocc*nocc,nvir*nvir).T)
-    t = np.zeros((nvir,nvir, nocc*nocc))
-    chnk_size = radc_ao2mo.calculate_chunk_size(myadc)
 
-    a = 0
     if isinstance(vvvv, list):
+        t = np.zeros((nvir,nvir, nocc*nocc))
+        a = 0
         for dataset in vvvv:
             k = dataset.shape[0]
             dataset = dataset[:].reshape(-1,nvir*nvir)
             t[a:a+k] = np.dot(dataset,t_amp).reshape(-1,nvir,nocc*nocc)
             a += k
     elif getattr(myadc, 'with_df', None):
-        for p in range(0,nvir,chnk_size):
-            vvvv_p = dfadc.get_vvvv_df(myadc, vvvv, p, chnk_size)
-            k = vvvv_p.shape[0]
-            vvvv_p = vvvv_p.reshape(-1,nvir*nvir)
-            t[a:a+k] = np.dot(vvvv_p,t_amp).reshape(-1,nvir,nocc*nocc)
-            del vvvv_p
-            a += k
+        x = t_amp.T.reshape(nocc*nocc,nvir,nvir)
+        t = dfadc.contract_vvvv_df(myadc, vvvv, vvvv, x).transpose(1,2,0)
     else:
         raise Exception("Unknown vvvv type")
 
@@ -596,6 +591,8 @@ class RADC(lib.StreamObject):
         self.max_cycle = getattr(__config__, 'adc_radc_RADC_max_cycle', 50)
         self.conv_tol = getattr(__config__, 'adc_radc_RADC_conv_tol', 1e-12)
         self.tol_residual = getattr(__config__, 'adc_radc_RADC_tol_res', 1e-6)
+        self.davidson_chkfile = None
+        self.davidson_single_prec = getattr(__config__, 'adc_radc_RADC_davidson_single_prec', False)
         self.scf_energy = mf.e_tot
 
         self.frozen = frozen
@@ -627,7 +624,8 @@ class RADC(lib.StreamObject):
         keys = set(('tol_residual','conv_tol', 'e_corr', 'method', 'mo_coeff',
                     'mol', 'mo_energy', 'max_memory', 'incore_complete',
                     'scf_energy', 'e_tot', 't1', 'frozen', 'chkfile',
-                    'max_space', 't2', 'mo_occ', 'max_cycle'))
+                    'max_space', 't2', 'mo_occ', 'max_cycle',
+                    'davidson_chkfile', 'davidson_single_prec'))
 
         self._keys = set(self.__dict__.keys()).union(keys)
 
@@ -1560,12 +1558,11 @@ def ea_contract_r_vvvv(myadc,r2,vvvv):
     nocc = myadc._nocc
     nvir = myadc._nvir
 
-    r2_vvvv = np.zeros((nocc,nvir,nvir))
     r2 = np.ascontiguousarray(r2.reshape(nocc,-1))
-    chnk_size = radc_ao2mo.calculate_chunk_size(myadc)
 
-    a = 0
     if isinstance(vvvv, list):
+        r2_vvvv = np.zeros((nocc,nvir,nvir))
+        a = 0
         for dataset in vvvv:
             k = dataset.shape[0]
             dataset = dataset[:].reshape(-1,nvir*nvir)
@@ -1573,13 +1570,7 @@ def ea_contract_r_vvvv(myadc,r2,vvvv):
             del dataset
             a += k
     elif getattr(myadc, 'with_df', None):
-        for p in range(0,nvir,chnk_size):
-            vvvv_p = dfadc.get_vvvv_df(myadc, vvvv, p, chnk_size)
-            k = vvvv_p.shape[0]
-            vvvv_p = vvvv_p.reshape(-1,nvir*nvir)
-            r2_vvvv[:,a:a+k] = np.dot(r2,vvvv_p.T).reshape(nocc,-1,nvir)
-            del vvvv_p
-            a += k
+        r2_vvvv = dfadc.contract_vvvv_df(myadc, vvvv, vvvv, r2.reshape(nocc,nvir,nvir))
     else:
         raise Exception("Unknown vvvv type")
 
@@ -1624,7 +1615,10 @@ def ea_adc_matvec(adc, M_ab=None, eris=None):
         M_ab = adc.get_imds()
 
     #Calculate sigma vector
-    def sigma_(r):
+    def sigma_(r, r2_vvvv=None):
+        if isinstance(r, list):
+            return _sigma_batch(r)
+
         cput0 = (logger.process_clock(), logger.perf_counter())
         log = logger.Logger(adc.stdout, adc.verbose)
 
@@ -1682,7 +1676,9 @@ def ea_adc_matvec(adc, M_ab=None, eris=None):
             elif isinstance(eris.vvvv, list):
                 s[s2:f2] += ea_contract_r_vvvv(adc,r2,eris.vvvv)
             else:
-                s[s2:f2] += ea_contract_r_vvvv(adc,r2,eris.Lvv)
+                if r2_vvvv is None:
+                    r2_vvvv = ea_contract_r_vvvv(adc,r2,eris.Lvv)
+                s[s2:f2] += r2_vvvv.reshape(-1)
 
             s[s2:f2] -= 0.5*lib.einsum('jzyi,jzx->ixy',eris_ovvo,r2,optimize = True).reshape(-1)
             s[s2:f2] += 0.5*lib.einsum('jzyi,jxz->ixy',eris_ovvo,r2,optimize = True).reshape(-1)
@@ -1815,6 +1811,16 @@ def ea_adc_matvec(adc, M_ab=None, eris=None):
         cput0 = log.timer_debug1("completed sigma vector calculation", *cput0)
         return s
 
+    def _sigma_batch(rs):
+        if (method in ("adc(2)-x", "adc(3)") and
+            not isinstance(eris.vvvv, (np.ndarray, list))):
+            # DF vvvv term of all trial vectors in one pass over the Lvv blocks
+            r2 = np.asarray([r[s2:f2] for r in rs]).reshape(-1,nvir,nvir)
+            r2_vvvv = dfadc.contract_vvvv_df(adc, eris.Lvv, eris.Lvv, r2)
+            r2_vvvv = r2_vvvv.reshape(len(rs),-1)
+            return [sigma_(r, x) for r, x in zip(rs, r2_vvvv)]
+        return [sigma_(r) for r in rs]
+
     return sigma_
 
 
@@ -1855,6 +1861,9 @@ def ip_adc_matvec(adc, M_ij=None, eris=None):
 
     #Calculate sigma vector
     def sigma_(r):
+        if isinstance(r, list):
+            return [sigma_(x) for x in r]
+
         cput0 = (logger.process_clock(), logger.perf_counter())
         log = logger.Logger(adc.stdout, adc.verbose)
 
@@ -2480,6 +2489,11 @@ class RADCEA(RADC):
         max_space : int
             Space size to hold trial vectors for Davidson iterative
             diagonalization.  Default is 12.
+        davidson_chkfile : str
+            HDF5 file to checkpoint the Davidson iterations. An interrupted
+            calculation is resumed from this file.  Default is None.
+        davidson_single_prec : bool
+            Store the Davidson subspace vectors in single precision.  Default is False.
 
     Kwargs:
         nroots : int
@@ -2508,6 +2522,8 @@ class RADCEA(RADC):
         self.max_cycle = adc.max_cycle
         self.conv_tol  = adc.conv_tol
         self.tol_residual  = adc.tol_residual
+        self.davidson_chkfile = adc.davidson_chkfile
+        self.davidson_single_prec = adc.davidson_single_prec
         self.t1 = adc.t1
         self.t2 = adc.t2
         self.imds = adc.imds
@@ -2594,6 +2610,11 @@ class RADCIP(RADC):
             Number of Davidson iterations.  Default is 50.
         max_space : int
             Space size to hold trial vectors for Davidson iterative diagonalization.  Default is 12.
+        davidson_chkfile : str
+            HDF5 file to checkpoint the Davidson iterations. An interrupted
+            calculation is resumed from this file.  Default is None.
+        davidson_single_prec : bool
+            Store the Davidson subspace vectors in single precision.  Default is False.
 
     Kwargs:
         nroots : int
@@ -2622,6 +2643,8 @@ class RADCIP(RADC):
         self.max_cycle = adc.max_cycle
         self.conv_tol  = adc.conv_tol
         self.tol_residual  = adc.tol_residual
+        self.davidson_chkfile = adc.davidson_chkfile
+        self.davidson_single_prec = adc.davidson_single_prec
         self.t1 = adc.t1
         self.t2 = adc.t2
         self.imds = adc.imds
@@ -57,6 +57,32 @@ class KnownValues(unittest.TestCase):
         e, t_amp1, t_amp2 = myadc.kernel_gs()
         self.assertAlmostEqual(e, -0.3108102956, 6)
 
+    def test_contract_vvvv_df(self):
+        numpy.random.seed(2)
+        naux, nvir = 12, 7
+        Lvv = numpy.random.random((naux,nvir,nvir))
+        Lvv = Lvv + Lvv.transpose(0,2,1)
+        vvvv = numpy.einsum('Lac,Lbd->abcd', Lvv, Lvv)
+        for n in (3, 40):
+            x = numpy.random.random((n,nvir,nvir))
+            ref = numpy.einsum('ncd,abcd->nab', x, vvvv)
+            out = adc.dfadc.contract_vvvv_df(myadc, Lvv, Lvv, x, max_memory=1e-3)
+            self.assertAlmostEqual(abs(out - ref).max(), 0, 11)
+
+    def test_ea_dfadc3_batch(self):
+        myadc = adc.ADC(mf).density_fit(auxbasis='cc-pvdz-ri')
+        myadc.method = "adc(3)"
+        myadc.kernel_gs()
+        eris = myadc.transform_integrals()
+        myadc_ea = adc.radc.RADCEA(myadc)
+        imds = myadc_ea.get_imds(eris)
+        matvec, diag = myadc_ea.gen_matvec(imds, eris)
+        numpy.random.seed(1)
+        xs = [numpy.random.random(diag.size) - .5 for i in range(3)]
+        ref = [matvec(x) for x in xs]
+        out = matvec(xs)
+        self.assertAlmostEqual(abs(numpy.array(out) - numpy.array(ref)).max(), 0, 10)
+
     def test_dfadc3_ip(self):
   
         myadc = adc.ADC(mf).density_fit(auxbasis='cc-pvdz-ri')
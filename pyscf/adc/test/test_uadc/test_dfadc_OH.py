@@ -18,6 +18,7 @@
 
 import unittest
 import numpy
+from pyscf import lib
 from pyscf import gto
 from pyscf import scf
 from pyscf import adc
@@ -85,6 +86,49 @@ class KnownValues(unittest.TestCase):
         self.assertAlmostEqual(p[3], 0.20823964, 6)
 
 
+    def test_ea_dfadc3_vvvv(self):
+        myadc = adc.ADC(mf)
+        myadc.with_df = df.DF(mol, auxbasis='cc-pvdz-ri')
+        myadc.method = "adc(3)"
+        myadc.kernel_gs()
+        eris = myadc.transform_integrals()
+        Lvv, LVV = eris.Lvv, eris.LVV
+        nocc_a, nocc_b = myadc._nocc
+        nvir_a, nvir_b = myadc._nvir
+
+        # DF ladder terms against the vvvv integrals built from Lvv and LVV
+        vvvv = numpy.einsum('Lac,Lbd->abcd', Lvv, Lvv)
+        vVvV = numpy.einsum('Lac,Lbd->abcd', Lvv, LVV)
+        numpy.random.seed(1)
+        t2 = numpy.random.random((nocc_a,nocc_a,nvir_a,nvir_a)) - .5
+        t2 = t2 - t2.transpose(1,0,2,3)
+        t2 = t2 - t2.transpose(0,1,3,2)
+        t2ab = numpy.random.random((nocc_a,nocc_b,nvir_a,nvir_b)) - .5
+        tril = numpy.tril_indices(nvir_a, k=-1)
+        ref = numpy.einsum('ijcd,abcd->ijab', t2, vvvv)[:,:,tril[0],tril[1]]
+        out = adc.uadc.contract_ladder_antisym(myadc, t2, Lvv)
+        self.assertAlmostEqual(abs(out - ref).max(), 0, 10)
+        ref = numpy.einsum('ijcd,abcd->ijab', t2ab, vVvV)
+        out = adc.uadc.contract_ladder(myadc, t2ab, (Lvv, LVV))
+        self.assertAlmostEqual(abs(out - ref).max(), 0, 10)
+
+        # The DF vvvv terms of a batch of trial vectors are computed in one
+        # pass. They must agree with the matvec of the individual vectors.
+        myadc_ea = adc.uadc.UADCEA(myadc)
+        imds = myadc_ea.get_imds(eris)
+        matvec, diag = myadc_ea.gen_matvec(imds, eris)
+        xs = [numpy.random.random(diag.size) - .5 for i in range(3)]
+        ref = [matvec(x) for x in xs]
+        ncall = [0]
+        contract_vvvv_df = adc.dfadc.contract_vvvv_df
+        def count_contract(*args, **kwargs):
+            ncall[0] += 1
+            return contract_vvvv_df(*args, **kwargs)
+        with lib.temporary_env(adc.dfadc, contract_vvvv_df=count_contract):
+            out = matvec(xs)
+        self.assertEqual(ncall[0], 4)
+        self.assertAlmostEqual(abs(numpy.array(out) - numpy.array(ref)).max(), 0, 10)
+
     def test_ip_dfadc3_dif_aux_basis(self):
 
         mf = scf.UHF(mol).density_fit(auxbasis='cc-pvdz-jkfit')
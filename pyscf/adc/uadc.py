@@ -50,7 +50,7 @@ def kernel(adc, nroots=1, guess=None, eris=None, verbose=None):
     guess = adc.get_init_guess(nroots, diag, ascending = True)
 
     conv, adc.E, U = lib.linalg_helper.davidson1(
-        lambda xs : [matvec(x) for x in xs],
+        lambda xs : matvec(list(xs)),
         guess, diag, nroots=nroots, verbose=log, tol=adc.conv_tol,
         max_cycle=adc.max_cycle, max_space=adc.max_space, tol_residual=adc.tol_residual)
 
@@ -678,26 +678,19 @@ def contract_ladder(myadc,t_amp,vvvv_p):
     nvir_b = t_amp.shape[3]
 
     t_amp_t = np.ascontiguousarray(t_amp.reshape(nocc_a*nocc_b,-1).T)
-    t = np.zeros((nvir_a,nvir_b, nocc_a*nocc_b))
-    chnk_size = uadc_ao2mo.calculate_chunk_size(myadc)
 
-    a = 0
     if isinstance(vvvv_p, list):
+        t = np.zeros((nvir_a,nvir_b, nocc_a*nocc_b))
+        a = 0
         for dataset in vvvv_p:
             k = dataset.shape[0]
             dataset = dataset[:].reshape(-1,nvir_a * nvir_b)
             t[a:a+k] = np.dot(dataset,t_amp_t).reshape(-1,nvir_b,nocc_a*nocc_b)
             a += k
     elif getattr(myadc, 'with_df', None):
-        for p in range(0,nvir_a,chnk_size):
-            Lvv = vvvv_p[0]
-            LVV = vvvv_p[1]
-            vvvv = dfadc.get_vVvV_df(myadc, Lvv, LVV, p, chnk_size)
-            k = vvvv.shape[0]
-            vvvv = vvvv.reshape(-1,nvir_a*nvir_b)
-            t[a:a+k] = np.dot(vvvv,t_amp_t).reshape(-1,nvir_b,nocc_a*nocc_b)
-            del vvvv
-            a += k
+        Lvv = vvvv_p[0]
+        LVV = vvvv_p[1]
+        t = dfadc.contract_vvvv_df(myadc, Lvv, LVV, t_amp).transpose(1,2,0)
     else:
         raise Exception("Unknown vvvv type")
 
@@ -717,24 +710,22 @@ def contract_ladder_antisym(myadc,t_amp,vvvv_d):
     t_amp = t_amp[:,:,tril_idx[0],tril_idx[1]]
     t_amp_t = np.ascontiguousarray(t_amp.reshape(nocc*nocc,-1).T)
 
-    t = np.zeros((nvir,nvir, nocc*nocc))
-    chnk_size = uadc_ao2mo.calculate_chunk_size(myadc)
-
-    a = 0
     if isinstance(vvvv_d, list):
+        t = np.zeros((nvir,nvir, nocc*nocc))
+        a = 0
         for dataset in vvvv_d:
             k = dataset.shape[0]
             dataset = dataset[:].reshape(-1,nv_pair)
             t[a:a+k] = np.dot(dataset,t_amp_t).reshape(-1,nvir,nocc*nocc)
             a += k
     elif getattr(myadc, 'with_df', None):
-        for p in range(0,nvir,chnk_size):
-            vvvv = dfadc.get_vvvv_antisym_df(myadc, vvvv_d, p, chnk_size)
-            k = vvvv.shape[0]
-            vvvv = vvvv.reshape(-1,nv_pair)
-            t[a:a+k] = np.dot(vvvv,t_amp_t).reshape(-1,nvir,nocc*nocc)
-            del vvvv
-            a += k
+        # sum_{c>d} t[c,d] ((ac|bd) - (ad|bc)) = sum_{cd} t'[c,d] (ac|bd) with
+        # t' the antisymmetric amplitudes on the full cd space
+        t_full = np.zeros((nocc*nocc,nvir,nvir))
+        t_full[:,tril_idx[0],tril_idx[1]] = t_amp_t.T
+        t_full[:,tril_idx[1],tril_idx[0]] = -t_amp_t.T
+        t = dfadc.contract_vvvv_df(myadc, vvvv_d, vvvv_d, t_full).transpose(1,2,0)
+        del t_full
     else:
         raise Exception("Unknown vvvv type")
 
@@ -2398,23 +2389,20 @@ def ea_contract_r_vvvv_antisym(myadc,r2,vvvv_d):
     r2 = r2[:,tril_idx[0],tril_idx[1]]
     r2 = np.ascontiguousarray(r2.reshape(nocc,-1))
 
-    r2_vvvv = np.zeros((nocc,nvir,nvir))
-    chnk_size = uadc_ao2mo.calculate_chunk_size(myadc)
-    a = 0
     if isinstance(vvvv_d,list):
+        r2_vvvv = np.zeros((nocc,nvir,nvir))
+        a = 0
         for dataset in vvvv_d:
             k = dataset.shape[0]
             dataset = dataset[:].reshape(-1,nv_pair)
             r2_vvvv[:,a:a+k] = np.dot(r2,dataset.T).reshape(nocc,-1,nvir)
             a += k
     elif getattr(myadc, 'with_df', None):
-        for p in range(0,nvir,chnk_size):
-            vvvv = dfadc.get_vvvv_antisym_df(myadc, vvvv_d, p, chnk_size)
-            k = vvvv.shape[0]
-            vvvv = vvvv.reshape(-1,nv_pair)
-            r2_vvvv[:,a:a+k] = np.dot(r2,vvvv.T).reshape(nocc,-1,nvir)
-            del vvvv
-            a += k
+        r2_full = np.zeros((nocc,nvir,nvir))
+        r2_full[:,tril_idx[0],tril_idx[1]] = r2
+        r2_full[:,tril_idx[1],tril_idx[0]] = -r2
+        r2_vvvv = dfadc.contract_vvvv_df(myadc, vvvv_d, vvvv_d, r2_full)
+        del r2_full
     else:
         raise Exception("Unknown vvvv type")
     return r2_vvvv
@@ -2427,11 +2415,10 @@ def ea_contract_r_vvvv(myadc,r2,vvvv_d):
     nvir_2 = r2.shape[2]
 
     r2 = r2.reshape(-1,nvir_1*nvir_2)
-    r2_vvvv = np.zeros((nocc_1,nvir_1,nvir_2))
-    chnk_size = uadc_ao2mo.calculate_chunk_size(myadc)
 
-    a = 0
     if isinstance(vvvv_d, list):
+        r2_vvvv = np.zeros((nocc_1,nvir_1,nvir_2))
+        a = 0
         for dataset in vvvv_d:
             k = dataset.shape[0]
             dataset = dataset[:].reshape(-1,nvir_1*nvir_2)
@@ -2440,13 +2427,8 @@ def ea_contract_r_vvvv(myadc,r2,vvvv_d):
     elif getattr(myadc, 'with_df', None):
         Lvv = vvvv_d[0]
         LVV = vvvv_d[1]
-        for p in range(0,nvir_1,chnk_size):
-            vvvv = dfadc.get_vVvV_df(myadc, Lvv, LVV, p, chnk_size)
-            k = vvvv.shape[0]
-            vvvv = vvvv.reshape(-1,nvir_1*nvir_2)
-            r2_vvvv[:,a:a+k] = np.dot(r2,vvvv.T).reshape(nocc_1,-1,nvir_2)
-            del vvvv
-            a += k
+        r2_vvvv = dfadc.contract_vvvv_df(myadc, Lvv, LVV,
+                                         r2.reshape(nocc_1,nvir_1,nvir_2))
     else:
         raise Exception("Unknown vvvv type")
 
@@ -2525,7 +2507,10 @@ def ea_adc_matvec(adc, M_ab=None, eris=None):
     M_ab_a, M_ab_b = M_ab
 
     #Calculate sigma vector
-    def sigma_(r):
+    def sigma_(r, r2_vvvv=None):
+        if isinstance(r, list):
+            return _sigma_batch(r)
+
         cput0 = (logger.process_clock(), logger.perf_counter())
         log = logger.Logger(adc.stdout, adc.verbose)
 
@@ -2686,7 +2671,10 @@ def ea_adc_matvec(adc, M_ab=None, eris=None):
                 temp_1 = ea_contract_r_vvvv_antisym(adc,r_aaa_u,eris.vvvv_p)
                 temp_1 = temp_1[:,ab_ind_a[0],ab_ind_a[1]]
             else:
-                temp_1 = ea_contract_r_vvvv_antisym(adc,r_aaa_u,eris.Lvv)
+                if r2_vvvv is None:
+                    temp_1 = ea_contract_r_vvvv_antisym(adc,r_aaa_u,eris.Lvv)
+                else:
+                    temp_1 = r2_vvvv[0]
                 temp_1 = temp_1[:,ab_ind_a[0],ab_ind_a[1]]
 
             s[s_aaa:f_aaa] += temp_1.reshape(-1)
@@ -2699,7 +2687,10 @@ def ea_adc_matvec(adc, M_ab=None, eris=None):
                 temp_1 = ea_contract_r_vvvv_antisym(adc,r_bbb_u,eris.VVVV_p)
                 temp_1 = temp_1[:,ab_ind_b[0],ab_ind_b[1]]
             else:
-                temp_1 = ea_contract_r_vvvv_antisym(adc,r_bbb_u,eris.LVV)
+                if r2_vvvv is None:
+                    temp_1 = ea_contract_r_vvvv_antisym(adc,r_bbb_u,eris.LVV)
+                else:
+                    temp_1 = r2_vvvv[1]
                 temp_1 = temp_1[:,ab_ind_b[0],ab_ind_b[1]]
 
             s[s_bbb:f_bbb] += temp_1.reshape(-1)
@@ -2717,10 +2708,15 @@ def ea_adc_matvec(adc, M_ab=None, eris=None):
 
                 s[s_bab:f_bab] += temp_1.reshape(-1)
                 s[s_aba:f_aba] += temp_2.reshape(-1)
-            else:
+            elif r2_vvvv is None:
                 temp_1 = ea_contract_r_vvvv(adc,r_bab,(eris.Lvv,eris.LVV))
                 temp_2 = ea_contract_r_vvvv(adc,r_aba,(eris.LVV,eris.Lvv))
 
+                s[s_bab:f_bab] += temp_1.reshape(-1)
+                s[s_aba:f_aba] += temp_2.reshape(-1)
+            else:
+                temp_1, temp_2 = r2_vvvv[2:]
+
                 s[s_bab:f_bab] += temp_1.reshape(-1)
                 s[s_aba:f_aba] += temp_2.reshape(-1)
 
@@ -3088,6 +3084,36 @@ def ea_adc_matvec(adc, M_ab=None, eris=None):
         del temp_1_2
         del temp_2_3
 
+    def _sigma_batch(rs):
+        if (method not in ("adc(2)-x", "adc(3)") or
+            isinstance(eris.vvvv_p, (np.ndarray, list))):
+            return [sigma_(r) for r in rs]
+
+        # DF vvvv terms of all trial vectors in one pass over the Lvv and LVV
+        # blocks
+        nvec = len(rs)
+        rs = np.asarray(rs)
+        r_aaa = np.zeros((nvec,nocc_a,nvir_a,nvir_a))
+        r_aaa[:,:,ab_ind_a[0],ab_ind_a[1]] = rs[:,s_aaa:f_aaa].reshape(nvec,nocc_a,-1)
+        r_aaa[:,:,ab_ind_a[1],ab_ind_a[0]] = -rs[:,s_aaa:f_aaa].reshape(nvec,nocc_a,-1)
+        r_aaa = dfadc.contract_vvvv_df(adc, eris.Lvv, eris.Lvv, r_aaa)
+        r_aaa = r_aaa.reshape(nvec,nocc_a,nvir_a,nvir_a)
+
+        r_bbb = np.zeros((nvec,nocc_b,nvir_b,nvir_b))
+        r_bbb[:,:,ab_ind_b[0],ab_ind_b[1]] = rs[:,s_bbb:f_bbb].reshape(nvec,nocc_b,-1)
+        r_bbb[:,:,ab_ind_b[1],ab_ind_b[0]] = -rs[:,s_bbb:f_bbb].reshape(nvec,nocc_b,-1)
+        r_bbb = dfadc.contract_vvvv_df(adc, eris.LVV, eris.LVV, r_bbb)
+        r_bbb = r_bbb.reshape(nvec,nocc_b,nvir_b,nvir_b)
+
+        r_bab = rs[:,s_bab:f_bab].reshape(-1,nvir_a,nvir_b)
+        r_bab = dfadc.contract_vvvv_df(adc, eris.Lvv, eris.LVV, r_bab)
+        r_bab = r_bab.reshape(nvec,-1)
+        r_aba = rs[:,s_aba:f_aba].reshape(-1,nvir_b,nvir_a)
+        r_aba = dfadc.contract_vvvv_df(adc, eris.LVV, eris.Lvv, r_aba)
+        r_aba = r_aba.reshape(nvec,-1)
+        return [sigma_(rs[k], (r_aaa[k], r_bbb[k], r_bab[k], r_aba[k]))
+                for k in range(nvec)]
+
     return sigma_
 
 
@@ -3164,6 +3190,9 @@ def ip_adc_matvec(adc, M_ij=None, eris=None):
 
     #Calculate sigma vector
     def sigma_(r):
+        if isinstance(r, list):
+            return [sigma_(x) for x in r]
+
         cput0 = (logger.process_clock(), logger.perf_counter())
         log = logger.Logger(adc.stdout, adc.verbose)
 
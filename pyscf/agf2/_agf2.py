@@ -118,19 +118,22 @@ def build_mats_ragf2_outcore(qeri, e_occ, e_vir, os_factor=1.0, ss_factor=1.0):
     eja = lib.direct_sum('j,a->ja', e_occ, -e_vir)
     eja = eja.ravel()
 
-    for i in mpi_helper.nrange(nocc):
-        xija = qeri[:,i].reshape(nmo, -1)
-        xjia = qeri[:,:,i].reshape(nmo, -1)
+    def islice(irange, vv, vev):
+        for i in irange:
+            xija = qeri[:,i].reshape(nmo, -1)
+            xjia = qeri[:,:,i].reshape(nmo, -1)
 
-        eija = eja + e_occ[i]
+            eija = eja + e_occ[i]
 
-        vv = lib.dot(xija, xija.T, alpha=fpos, beta=1, c=vv)
-        vv = lib.dot(xija, xjia.T, alpha=fneg, beta=1, c=vv)
+            lib.dot(xija, xija.T, alpha=fpos, beta=1, c=vv)
+            lib.dot(xija, xjia.T, alpha=fneg, beta=1, c=vv)
 
-        exija = xija * eija[None]
+            exija = xija * eija[None]
 
-        vev = lib.dot(exija, xija.T, alpha=fpos, beta=1, c=vev)
-        vev = lib.dot(exija, xjia.T, alpha=fneg, beta=1, c=vev)
+            lib.dot(exija, xija.T, alpha=fpos, beta=1, c=vev)
+            lib.dot(exija, xjia.T, alpha=fneg, beta=1, c=vev)
+
+    mpi_helper.nrange_reduce(islice, 0, nocc, vv, vev)
 
     vv = vv.reshape(nmo, nmo)
     vev = vev.reshape(nmo, nmo)
@@ -264,23 +267,26 @@ def build_mats_dfragf2_outcore(qxi, qja, e_occ, e_vir, os_factor=1.0, ss_factor=
     eja = lib.direct_sum('j,a->ja', e_occ, -e_vir)
     eja = eja.ravel()
 
-    buf = (np.zeros((nmo, nocc*nvir)), np.zeros((nmo*nocc, nvir)))
+    def islice(irange, vv, vev):
+        buf = (np.zeros((nmo, nocc*nvir)), np.zeros((nmo*nocc, nvir)))
+
+        for i in irange:
+            qx = qxi.reshape(naux, nmo, nocc)[:,:,i]
+            xija = lib.dot(qx.T, qja, c=buf[0])
+            xjia = lib.dot(qxi.T, qja[:,i*nvir:(i+1)*nvir], c=buf[1])
+            xjia = xjia.reshape(nmo, nocc*nvir)
 
-    for i in mpi_helper.nrange(nocc):
-        qx = qxi.reshape(naux, nmo, nocc)[:,:,i]
-        xija = lib.dot(qx.T, qja, c=buf[0])
-        xjia = lib.dot(qxi.T, qja[:,i*nvir:(i+1)*nvir], c=buf[1])
-        xjia = xjia.reshape(nmo, nocc*nvir)
+            eija = eja + e_occ[i]
 
-        eija = eja + e_occ[i]
+            lib.dot(xija, xija.T, alpha=fpos, beta=1, c=vv)
+            lib.dot(xija, xjia.T, alpha=fneg, beta=1, c=vv)
 
-        vv = lib.dot(xija, xija.T, alpha=fpos, beta=1, c=vv)
-        vv = lib.dot(xija, xjia.T, alpha=fneg, beta=1, c=vv)
+            exija = xija * eija[None]
 
-        exija = xija * eija[None]
+            lib.dot(exija, xija.T, alpha=fpos, beta=1, c=vev)
+            lib.dot(exija, xjia.T, alpha=fneg, beta=1, c=vev)
 
-        vev = lib.dot(exija, xija.T, alpha=fpos, beta=1, c=vev)
-        vev = lib.dot(exija, xjia.T, alpha=fneg, beta=1, c=vev)
+    mpi_helper.nrange_reduce(islice, 0, nocc, vv, vev)
 
     vv = vv.reshape(nmo, nmo)
     vev = vev.reshape(nmo, nmo)
@@ -365,24 +371,27 @@ def build_mats_uagf2_outcore(qeri, e_occ, e_vir, os_factor=1.0, ss_factor=1.0):
     eja_a = lib.direct_sum('j,a->ja', e_occ[0], -e_vir[0]).ravel()
     eja_b = lib.direct_sum('j,a->ja', e_occ[1], -e_vir[1]).ravel()
 
-    for i in mpi_helper.nrange(noa):
-        xija_aa = qeri[0][:,i].reshape(nmo, -1)
-        xija_ab = qeri[1][:,i].reshape(nmo, -1)
-        xjia_aa = qeri[0][:,:,i].reshape(nmo, -1)
+    def islice(irange, vv, vev):
+        for i in irange:
+            xija_aa = qeri[0][:,i].reshape(nmo, -1)
+            xija_ab = qeri[1][:,i].reshape(nmo, -1)
+            xjia_aa = qeri[0][:,:,i].reshape(nmo, -1)
 
-        eija_aa = eja_a + e_occ[0][i]
-        eija_ab = eja_b + e_occ[0][i]
+            eija_aa = eja_a + e_occ[0][i]
+            eija_ab = eja_b + e_occ[0][i]
 
-        vv = lib.dot(xija_aa, xija_aa.T, alpha=fposa, beta=1, c=vv)
-        vv = lib.dot(xija_aa, xjia_aa.T, alpha=fnega, beta=1, c=vv)
-        vv = lib.dot(xija_ab, xija_ab.T, alpha=fposb, beta=1, c=vv)
+            lib.dot(xija_aa, xija_aa.T, alpha=fposa, beta=1, c=vv)
+            lib.dot(xija_aa, xjia_aa.T, alpha=fnega, beta=1, c=vv)
+            lib.dot(xija_ab, xija_ab.T, alpha=fposb, beta=1, c=vv)
 
-        exija_aa = xija_aa * eija_aa[None]
-        exija_ab = xija_ab * eija_ab[None]
+            exija_aa = xija_aa * eija_aa[None]
+            exija_ab = xija_ab * eija_ab[None]
 
-        vev = lib.dot(exija_aa, xija_aa.T, alpha=fposa, beta=1, c=vev)
-        vev = lib.dot(exija_aa, xjia_aa.T, alpha=fnega, beta=1, c=vev)
-        vev = lib.dot(exija_ab, xija_ab.T, alpha=fposb, beta=1, c=vev)
+            lib.dot(exija_aa, xija_aa.T, alpha=fposa, beta=1, c=vev)
+            lib.dot(exija_aa, xjia_aa.T, alpha=fnega, beta=1, c=vev)
+            lib.dot(exija_ab, xija_ab.T, alpha=fposb, beta=1, c=vev)
+
+    mpi_helper.nrange_reduce(islice, 0, noa, vv, vev)
 
     vv = vv.reshape(nmo, nmo)
     vev = vev.reshape(nmo, nmo)
@@ -544,30 +553,33 @@ def build_mats_dfuagf2_outcore(qxi, qja, e_occ, e_vir, os_factor=1.0, ss_factor=
     eja_a = lib.direct_sum('j,a->ja', e_occ[0], -e_vir[0]).ravel()
     eja_b = lib.direct_sum('j,a->ja', e_occ[1], -e_vir[1]).ravel()
 
-    buf = (np.zeros((nmo, noa*nva)),
-           np.zeros((nmo, nob*nvb)),
-           np.zeros((nmo*noa, nva)))
+    def islice(irange, vv, vev):
+        buf = (np.zeros((nmo, noa*nva)),
+               np.zeros((nmo, nob*nvb)),
+               np.zeros((nmo*noa, nva)))
+
+        for i in irange:
+            qx_a = qxi_a.reshape(naux, nmo, noa)[:,:,i]
+            xija_aa = lib.dot(qx_a.T, qja_a, c=buf[0])
+            xija_ab = lib.dot(qx_a.T, qja_b, c=buf[1])
+            xjia_aa = lib.dot(qxi_a.T, qja_a[:,i*nva:(i+1)*nva], c=buf[2])
+            xjia_aa = xjia_aa.reshape(nmo, -1)
 
-    for i in mpi_helper.nrange(noa):
-        qx_a = qxi_a.reshape(naux, nmo, noa)[:,:,i]
-        xija_aa = lib.dot(qx_a.T, qja_a, c=buf[0])
-        xija_ab = lib.dot(qx_a.T, qja_b, c=buf[1])
-        xjia_aa = lib.dot(qxi_a.T, qja_a[:,i*nva:(i+1)*nva], c=buf[2])
-        xjia_aa = xjia_aa.reshape(nmo, -1)
+            eija_aa = eja_a + e_occ[0][i]
+            eija_ab = eja_b + e_occ[0][i]
 
-        eija_aa = eja_a + e_occ[0][i]
-        eija_ab = eja_b + e_occ[0][i]
+            lib.dot(xija_aa, xija_aa.T, alpha=fposa, beta=1, c=vv)
+            lib.dot(xija_aa, xjia_aa.T, alpha=fnega, beta=1, c=vv)
+            lib.dot(xija_ab, xija_ab.T, alpha=fposb, beta=1, c=vv)
 
-        vv = lib.dot(xija_aa, xija_aa.T, alpha=fposa, beta=1, c=vv)
-        vv = lib.dot(xija_aa, xjia_aa.T, alpha=fnega, beta=1, c=vv)
-        vv = lib.dot(xija_ab, xija_ab.T, alpha=fposb, beta=1, c=vv)
+            exija_aa = xija_aa * eija_aa[None]
+            exija_ab = xija_ab * eija_ab[None]
 
-        exija_aa = xija_aa * eija_aa[None]
-        exija_ab = xija_ab * eija_ab[None]
+            lib.dot(exija_aa, xija_aa.T, alpha=fposa, beta=1, c=vev)
+            lib.dot(exija_aa, xjia_aa.T, alpha=fnega, beta=1, c=vev)
+            lib.dot(exija_ab, xija_ab.T, alpha=fposb, beta=1, c=vev)
 
-        vev = lib.dot(exija_aa, xija_aa.T, alpha=fposa, beta=1, c=vev)
-        vev = lib.dot(exija_aa, xjia_aa.T, alpha=fnega, beta=1, c=vev)
-        vev = lib.dot(exija_ab, xija_ab.T, alpha=fposb, beta=1, c=vev)
+    mpi_helper.nrange_reduce(islice, 0, noa, vv, vev)
 
     vv = vv.reshape(nmo, nmo)
     vev = vev.reshape(nmo, nmo)
@@ -18,8 +18,12 @@
 
 '''
 MPI helper functions using mpi4py
+
+Without mpi4py, :func:`nrange_reduce` distributes the work over a pool of
+threads sharing the memory of a single process.
 '''
 
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from pyscf import lib
 from pyscf.lib import logger
@@ -42,6 +46,10 @@ except Exception:
 
 SCALE_PRANGE_STEP = False
 
+# Number of node-local workers used when MPI is absent. 0 means one worker
+# per OpenMP thread (lib.num_threads())
+NUM_WORKERS = getattr(__config__, 'agf2_mpi_helper_num_workers', 0)
+
 
 def bcast(buf, root=0):
     if size == 1:
@@ -153,3 +161,53 @@ def prange(start, stop, step):
 
         for p0, p1 in lib.prange(start0, stop0, step):
             yield p0, p1
+
+
+def num_workers(n=None):
+    ''' Number of node-local workers used by :func:`nrange_reduce`.
+        Only a single worker is used when running with MPI.
+    '''
+
+    if size > 1:
+        return 1
+
+    nworkers = NUM_WORKERS or lib.num_threads()
+    if n is not None:
+        nworkers = min(nworkers, n)
+
+    return max(nworkers, 1)
+
+
+def nrange_reduce(func, start, stop, *bufs):
+    ''' Sums the contributions of :func:`nrange` into :attr:`bufs`.
+
+    :attr:`func(indices, *bufs)` accumulates the contributions of an
+    iterable of indices into the arrays :attr:`bufs` in place. With MPI
+    the indices are distributed as in :func:`nrange` and the result is
+    local to the rank (to be reduced by the caller). Without MPI they are
+    further distributed over a pool of threads, each accumulating into
+    its own buffers, which are summed into :attr:`bufs` on return. The
+    OpenMP threads are shared out among the workers so that the OpenMP
+    kernels called by :attr:`func` do not oversubscribe the cores.
+    '''
+
+    nworkers = num_workers(stop-start)
+
+    if nworkers == 1:
+        func(nrange(start, stop), *bufs)
+        return bufs
+
+    nthreads = max(1, lib.num_threads() // nworkers)
+
+    def worker(w):
+        bufs_w = [np.zeros_like(buf) for buf in bufs]
+        with lib.with_omp_threads(nthreads):
+            func(range(start+w, stop, nworkers), *bufs_w)
+        return bufs_w
+
+    with ThreadPoolExecutor(max_workers=nworkers) as executor:
+        for bufs_w in executor.map(worker, range(nworkers)):
+            for buf, buf_w in zip(bufs, bufs_w):
+                buf += buf_w
+
+    return bufs
@@ -388,15 +388,18 @@ def energy_2body(agf2, gf, se):
     gf_occ = gf.get_occupied()
     se_vir = se.get_virtual()
 
-    e2b = 0.0
+    e2b = np.zeros(1, dtype=np.result_type(gf_occ.coupling, se_vir.coupling))
 
-    for l in mpi_helper.nrange(gf_occ.naux):
-        vxl = gf_occ.coupling[:,l]
-        vxk = se_vir.coupling
-        dlk = gf_occ.energy[l] - se_vir.energy
+    def lslice(lrange, e2b):
+        for l in lrange:
+            vxl = gf_occ.coupling[:,l]
+            vxk = se_vir.coupling
+            dlk = gf_occ.energy[l] - se_vir.energy
 
-        vv = vxk * vxl[:,None]
-        e2b += lib.einsum('xk,yk,k->', vv, vv.conj(), 1./dlk)
+            vv = vxk * vxl[:,None]
+            e2b += lib.einsum('xk,yk,k->', vv, vv.conj(), 1./dlk)
+
+    mpi_helper.nrange_reduce(lslice, 0, gf_occ.naux, e2b)
 
     e2b *= 2
 
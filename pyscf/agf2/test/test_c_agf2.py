@@ -18,7 +18,8 @@
 
 import unittest
 import numpy as np
-from pyscf.agf2 import aux, _agf2
+from pyscf import lib
+from pyscf.agf2 import aux, _agf2, mpi_helper
 
 
 class KnownValues(unittest.TestCase):
@@ -78,6 +79,37 @@ class KnownValues(unittest.TestCase):
         self.assertAlmostEqual(np.max(np.absolute(vv1-vv2)), 0.0, 10)
         self.assertAlmostEqual(np.max(np.absolute(vev1-vev2)), 0.0, 10)
 
+    def test_nrange_reduce(self):
+        xija = np.random.random((self.nmo, self.nocc, self.nocc, self.nvir))
+        e_occ = np.random.random(self.nocc)
+        e_vir = np.random.random(self.nvir)
+        num_workers = mpi_helper.NUM_WORKERS
+        try:
+            mpi_helper.NUM_WORKERS = 1
+            vv1, vev1 = _agf2.build_mats_ragf2_outcore(xija, e_occ, e_vir)
+            mpi_helper.NUM_WORKERS = 3
+            vv2, vev2 = _agf2.build_mats_ragf2_outcore(xija, e_occ, e_vir)
+        finally:
+            mpi_helper.NUM_WORKERS = num_workers
+        self.assertAlmostEqual(np.max(np.absolute(vv1-vv2)), 0.0, 10)
+        self.assertAlmostEqual(np.max(np.absolute(vev1-vev2)), 0.0, 10)
+
+    def test_nrange_reduce_threads(self):
+        # Each worker is given a share of the OpenMP threads
+        def func(indices, buf):
+            for i in indices:
+                buf[i] = lib.num_threads()
+        num_workers = mpi_helper.NUM_WORKERS
+        try:
+            mpi_helper.NUM_WORKERS = 2
+            with lib.with_omp_threads(4):
+                buf = mpi_helper.nrange_reduce(func, 0, 6, np.zeros(6))[0]
+                self.assertEqual(lib.num_threads(), 4)
+        finally:
+            mpi_helper.NUM_WORKERS = num_workers
+        if mpi_helper.size == 1:
+            self.assertTrue(np.all(buf == 2))
+
         
 if __name__ == '__main__':
     print('AGF2 C implementations')
@@ -64,28 +64,43 @@ def kernel(mycc, eris=None, t1=None, t2=None, max_cycle=50, tol=1e-8,
     else:
         adiis = None
 
+    # In the mixed precision mode, the vvvv contraction is carried out in
+    # single precision until norm(t1,t2) drops below mixed_precision_tol
+    mycc._vvvv_fp32 = bool(getattr(mycc, 'mixed_precision', False))
+    if mycc._vvvv_fp32:
+        log.info('Single precision vvvv contraction until norm(t1,t2) < %g',
+                 mycc.mixed_precision_tol)
+
     conv = False
-    for istep in range(max_cycle):
-        t1new, t2new = mycc.update_amps(t1, t2, eris)
-        tmpvec = mycc.amplitudes_to_vector(t1new, t2new)
-        tmpvec -= mycc.amplitudes_to_vector(t1, t2)
-        normt = numpy.linalg.norm(tmpvec)
-        tmpvec = None
-        if mycc.iterative_damping < 1.0:
-            alpha = mycc.iterative_damping
-            t1new = (1-alpha) * t1 + alpha * t1new
-            t2new *= alpha
-            t2new += (1-alpha) * t2
-        t1, t2 = t1new, t2new
-        t1new = t2new = None
-        t1, t2 = mycc.run_diis(t1, t2, istep, normt, eccsd-eold, adiis)
-        eold, eccsd = eccsd, mycc.energy(t1, t2, eris)
-        log.info('cycle = %d  E_corr(CCSD) = %.15g  dE = %.9g  norm(t1,t2) = %.6g',
-                 istep+1, eccsd, eccsd - eold, normt)
-        cput1 = log.timer('CCSD iter', *cput1)
-        if abs(eccsd-eold) < tol and normt < tolnormt:
-            conv = True
-            break
+    try:
+        for istep in range(max_cycle):
+            fp32_step = mycc._vvvv_fp32
+            t1new, t2new = mycc.update_amps(t1, t2, eris)
+            tmpvec = mycc.amplitudes_to_vector(t1new, t2new)
+            tmpvec -= mycc.amplitudes_to_vector(t1, t2)
+            normt = numpy.linalg.norm(tmpvec)
+            tmpvec = None
+            if mycc.iterative_damping < 1.0:
+                alpha = mycc.iterative_damping
+                t1new = (1-alpha) * t1 + alpha * t1new
+                t2new *= alpha
+                t2new += (1-alpha) * t2
+            t1, t2 = t1new, t2new
+            t1new = t2new = None
+            t1, t2 = mycc.run_diis(t1, t2, istep, normt, eccsd-eold, adiis)
+            eold, eccsd = eccsd, mycc.energy(t1, t2, eris)
+            log.info('cycle = %d  E_corr(CCSD) = %.15g  dE = %.9g  norm(t1,t2) = %.6g',
+                     istep+1, eccsd, eccsd - eold, normt)
+            cput1 = log.timer('CCSD iter', *cput1)
+            if fp32_step:
+                if normt < mycc.mixed_precision_tol:
+                    log.info('Switch to double precision vvvv contraction')
+                    mycc._vvvv_fp32 = False
+            elif abs(eccsd-eold) < tol and normt < tolnormt:
+                conv = True
+                break
+    finally:
+        mycc._vvvv_fp32 = False
     log.timer('CCSD', *cput0)
     return conv, eccsd, t1, t2
 
@@ -485,6 +500,9 @@ def _contract_s4vvvv_t2(mycc, mol, vvvv, t2, out=None, verbose=None):
     if t2.size == 0:
         return numpy.zeros_like(t2)
 
+    if vvvv is not None and getattr(mycc, '_vvvv_fp32', False):
+        return _contract_s4vvvv_t2_fp32(mycc, mol, vvvv, t2, out, verbose)
+
     _dgemm = lib.numpy_helper._dgemm
     time0 = logger.process_clock(), logger.perf_counter()
     log = logger.new_logger(mycc, verbose)
@@ -563,7 +581,7 @@ def _contract_s4vvvv_t2(mycc, mol, vvvv, t2, out=None, verbose=None):
 
         if mycc.async_io:
             fmap = lib.map_with_prefetch
-            unit += nvira*nvir_pair
+            unit += nvira*nvir_pair * lib.misc.PREFETCH_DEPTH
         else:
             fmap = map
 
@@ -595,6 +613,68 @@ def _contract_s4vvvv_t2(mycc, mol, vvvv, t2, out=None, verbose=None):
             time0 = log.timer_debug1('vvvv [%d:%d]'%(i0,i1), *time0)
     return Ht2.reshape(t2.shape)
 
+def _contract_s4vvvv_t2_fp32(mycc, mol, vvvv, t2, out=None, verbose=None):
+    '''Single precision version of _contract_s4vvvv_t2 for the vvvv
+    integrals stored in 4-fold symmetry. The integral blocks and the
+    amplitudes are converted to float32. The result is returned in double
+    precision.
+    '''
+    time0 = logger.process_clock(), logger.perf_counter()
+    log = logger.new_logger(mycc, verbose)
+
+    nvira, nvirb = t2.shape[-2:]
+    x2 = numpy.asarray(t2.reshape(-1,nvira,nvirb), dtype=numpy.float32)
+    Ht2 = numpy.zeros(x2.shape, dtype=numpy.float32)
+
+    max_memory = max(MEMORYMIN, mycc.max_memory - lib.current_memory()[0])
+    nvir_pair = nvirb * (nvirb+1) // 2
+    unit = (nvira*nvir_pair*2 + nvirb**2*nvira/4 + 1) / 2
+    if mycc.async_io:
+        fmap = lib.map_with_prefetch
+        unit += nvira*nvir_pair * lib.misc.PREFETCH_DEPTH / 2
+    else:
+        fmap = map
+    blksize = numpy.sqrt(max(BLKMIN**2, max_memory*.95e6/8/unit))
+    blksize = int(min((nvira+3)/4, blksize))
+
+    def load(v_slice):
+        i0, i1 = v_slice
+        off0 = i0*(i0+1)//2
+        off1 = i1*(i1+1)//2
+        return numpy.asarray(vvvv[off0:off1], dtype=numpy.float32)
+
+    tril2sq = lib.square_mat_in_trilu_indices(nvira)
+    slices = [(i0, i1) for i0, i1 in lib.prange(0, nvira, blksize)]
+    for istep, wwbuf in enumerate(fmap(load, slices)):
+        i0, i1 = slices[istep]
+        off0 = i0*(i0+1)//2
+        for j0, j1 in lib.prange(0, i1, blksize):
+            eri = wwbuf[tril2sq[i0:i1,j0:j1]-off0]
+            _contract_vvvv_blk_fp32_(x2, Ht2, eri, i0, i1, j0, j1)
+        wwbuf = None
+        time0 = log.timer_debug1('vvvv fp32 [%d:%d]'%(i0,i1), *time0)
+
+    out = numpy.ndarray(x2.shape, dtype=numpy.double, buffer=out)
+    out[:] = Ht2
+    return out.reshape(t2.shape)
+
+def _contract_vvvv_blk_fp32_(x2, Ht2, eri, i0, i1, j0, j1):
+    '''Ht2[:,j0:j1] += numpy.einsum('xef,efab->xab', x2[:,i0:i1], eri) and the
+    transposed contribution for i0 > j0, in single precision.
+
+    eri is a block of vvvv integrals in single precision with shape
+    (i1-i0, j1-j0, nvir_pair)
+    '''
+    nocc2, nvira, nvirb = x2.shape
+    ic = i1 - i0
+    jc = j1 - j0
+    eri = eri.reshape(ic*jc, -1)[:,lib.square_mat_in_trilu_indices(nvirb)]
+    eri = eri.reshape(ic,jc,nvirb,nvirb).transpose(0,2,1,3).reshape(ic*nvirb,jc*nvirb)
+    Ht2[:,j0:j1] += numpy.dot(x2[:,i0:i1].reshape(nocc2,-1), eri).reshape(nocc2,jc,nvirb)
+    if i0 > j0:
+        Ht2[:,i0:i1] += numpy.dot(x2[:,j0:j1].reshape(nocc2,-1), eri.T).reshape(nocc2,ic,nvirb)
+    return Ht2
+
 def _contract_s1vvvv_t2(mycc, mol, vvvv, t2, out=None, verbose=None):
     '''Ht2 = numpy.einsum('ijcd,acdb->ijab', t2, vvvv)
     where vvvv can be real or complex and no permutation symmetry is available in vvvv.
@@ -842,6 +922,12 @@ class CCSD(lib.StreamObject):
             Allow for asynchronous function execution. Default is True.
         incore_complete : bool
             Avoid all I/O (also for DIIS). Default is False.
+        mixed_precision : bool
+            Evaluate the vvvv contraction in single precision in the first
+            iterations. Default is False.
+        mixed_precision_tol : float
+            Switch to double precision when norm(t1,t2) is smaller than this
+            threshold.  Default is 1e-3.
         level_shift : float
             A shift on virtual orbital energies to stablize the CCSD iteration
         frozen : int or list
@@ -886,6 +972,8 @@ class CCSD(lib.StreamObject):
     async_io = getattr(__config__, 'cc_ccsd_CCSD_async_io', True)
     incore_complete = getattr(__config__, 'cc_ccsd_CCSD_incore_complete', False)
     cc2 = getattr(__config__, 'cc_ccsd_CCSD_cc2', False)
+    mixed_precision = getattr(__config__, 'cc_ccsd_CCSD_mixed_precision', False)
+    mixed_precision_tol = getattr(__config__, 'cc_ccsd_CCSD_mixed_precision_tol', 1e-3)
 
     def __init__(self, mf, frozen=None, mo_coeff=None, mo_occ=None):
         if isinstance(mf, gto.Mole):
@@ -938,7 +1026,8 @@ http://sunqm.net/pyscf/code-rule.html#api-rules for the details of API conventio
         keys = set(('max_cycle', 'conv_tol', 'iterative_damping',
                     'conv_tol_normt', 'diis', 'diis_space', 'diis_file',
                     'diis_start_cycle', 'diis_start_energy_diff', 'direct',
-                    'async_io', 'incore_complete', 'cc2'))
+                    'async_io', 'incore_complete', 'cc2', 'mixed_precision',
+                    'mixed_precision_tol'))
         self._keys = set(self.__dict__.keys()).union(keys)
 
     @property
@@ -983,6 +1072,9 @@ http://sunqm.net/pyscf/code-rule.html#api-rules for the details of API conventio
             log.info('frozen orbitals %s', self.frozen)
         log.info('max_cycle = %d', self.max_cycle)
         log.info('direct = %d', self.direct)
+        if self.mixed_precision:
+            log.info('mixed_precision = %s, mixed_precision_tol = %g',
+                     self.mixed_precision, self.mixed_precision_tol)
         log.info('conv_tol = %g', self.conv_tol)
         log.info('conv_tol_normt = %s', self.conv_tol_normt)
         log.info('diis_space = %d', self.diis_space)
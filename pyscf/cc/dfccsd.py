@@ -55,6 +55,9 @@ def _contract_vvvv_t2(mycc, mol, vvL, t2, out=None, verbose=None):
         vvvv : None or integral object
             if vvvv is None, contract t2 to AO-integrals using AO-direct algorithm
     '''
+    if getattr(mycc, '_vvvv_fp32', False):
+        return _contract_vvvv_t2_fp32(mycc, mol, vvL, t2, out, verbose)
+
     _dgemm = lib.numpy_helper._dgemm
     time0 = logger.process_clock(), logger.perf_counter()
     log = logger.new_logger(mol, verbose)
@@ -114,6 +117,51 @@ def _contract_vvvv_t2(mycc, mol, vvL, t2, out=None, verbose=None):
     return Ht2.reshape(t2.shape)
 
 
+def _contract_vvvv_t2_fp32(mycc, mol, vvL, t2, out=None, verbose=None):
+    '''Single precision version of _contract_vvvv_t2. The vvvv integrals are
+    generated from the float32 copy of the DF tensor vvL.
+    '''
+    time0 = logger.process_clock(), logger.perf_counter()
+    log = logger.new_logger(mol, verbose)
+
+    naux = vvL.shape[-1]
+    nvira, nvirb = t2.shape[-2:]
+    x2 = numpy.asarray(t2.reshape(-1,nvira,nvirb), dtype=numpy.float32)
+    Ht2 = numpy.zeros(x2.shape, dtype=numpy.float32)
+
+    # The single precision vvL takes half of the memory of the double
+    # precision tensor. It is loaded once for all blocks if possible.
+    max_memory = max(MEMORYMIN, mycc.max_memory - lib.current_memory()[0])
+    nvir_pair = nvirb * (nvirb+1) // 2
+    if nvir_pair * naux * 4 < max_memory * .4e6:
+        vvL = numpy.asarray(vvL, dtype=numpy.float32)
+        max_memory -= vvL.nbytes / 1e6
+    dmax = numpy.sqrt(max_memory*.7e6/4/nvirb**2/2)
+    dmax = int(min((nvira+3)//4, max(ccsd.BLKMIN, dmax)))
+    vvblk = (max_memory*1e6/4 - dmax**2*(nvirb**2*1.5+naux))/naux
+    vvblk = int(min(nvir_pair, max(ccsd.BLKMIN, vvblk/dmax**2)))
+    tril2sq = lib.square_mat_in_trilu_indices(nvira)
+
+    for i0, i1 in lib.prange(0, nvira, dmax):
+        off0 = i0*(i0+1)//2
+        off1 = i1*(i1+1)//2
+        vvL0 = numpy.asarray(vvL[off0:off1], dtype=numpy.float32)
+        for j0, j1 in lib.prange(0, i1, dmax):
+            ijL = vvL0[tril2sq[i0:i1,j0:j1] - off0].reshape(-1,naux)
+            eri = numpy.empty((ijL.shape[0],nvir_pair), dtype=numpy.float32)
+            for p0, p1 in lib.prange(0, nvir_pair, vvblk):
+                vvL1 = numpy.asarray(vvL[p0:p1], dtype=numpy.float32)
+                eri[:,p0:p1] = numpy.dot(ijL, vvL1.T)
+                vvL1 = None
+            ccsd._contract_vvvv_blk_fp32_(x2, Ht2, eri, i0, i1, j0, j1)
+            eri = None
+            time0 = log.timer_debug1('vvvv fp32 [%d:%d,%d:%d]'%(i0,i1,j0,j1), *time0)
+
+    out = numpy.ndarray(x2.shape, buffer=out)
+    out[:] = Ht2
+    return out.reshape(t2.shape)
+
+
 class _ChemistsERIs(ccsd._ChemistsERIs):
     def _contract_vvvv_t2(self, mycc, t2, direct=False, out=None, verbose=None):
         assert(not direct)
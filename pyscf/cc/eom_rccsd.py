@@ -69,14 +69,18 @@ def kernel(eom, nroots=1, koopmans=False, guess=None, left=False,
             return lib.linalg_helper._eigs_cmplx2real(w, v, idx, real_system)
         conv, es, vs = eig(matvec, guess, precond, pick=eig_close_to_init_guess,
                            tol=eom.conv_tol, max_cycle=eom.max_cycle,
-                           max_space=eom.max_space, nroots=nroots, verbose=log)
+                           max_space=eom.max_space, nroots=nroots, verbose=log,
+                           chkfile=eom.davidson_chkfile,
+                           single_prec=eom.davidson_single_prec)
     else:
         def pickeig(w, v, nroots, envs):
             real_idx = np.where(abs(w.imag) < 1e-3)[0]
             return lib.linalg_helper._eigs_cmplx2real(w, v, real_idx, real_system)
         conv, es, vs = eig(matvec, guess, precond, pick=pickeig,
                            tol=eom.conv_tol, max_cycle=eom.max_cycle,
-                           max_space=eom.max_space, nroots=nroots, verbose=log)
+                           max_space=eom.max_space, nroots=nroots, verbose=log,
+                           chkfile=eom.davidson_chkfile,
+                           single_prec=eom.davidson_single_prec)
 
     if eom.verbose >= logger.INFO:
         for n, en, vn, convn in zip(range(nroots), es, vs, conv):
@@ -107,6 +111,10 @@ class EOM(lib.StreamObject):
         self.max_cycle = getattr(__config__, 'eom_rccsd_EOM_max_cycle', cc.max_cycle)
         self.conv_tol = getattr(__config__, 'eom_rccsd_EOM_conv_tol', cc.conv_tol)
         self.partition = getattr(__config__, 'eom_rccsd_EOM_partition', None)
+        # HDF5 file to checkpoint (and resume) the Davidson iterations
+        self.davidson_chkfile = None
+        # Store the Davidson subspace vectors in single precision
+        self.davidson_single_prec = getattr(__config__, 'eom_rccsd_EOM_davidson_single_prec', False)
 
 ##################################################
 # don't modify the following attributes, they are not input options
@@ -123,6 +131,10 @@ class EOM(lib.StreamObject):
         logger.info(self, 'max_cycle = %d', self.max_cycle)
         logger.info(self, 'conv_tol = %s', self.conv_tol)
         logger.info(self, 'partition = %s', self.partition)
+        if self.davidson_chkfile:
+            logger.info(self, 'davidson_chkfile = %s', self.davidson_chkfile)
+        if self.davidson_single_prec:
+            logger.info(self, 'davidson_single_prec = %s', self.davidson_single_prec)
         #logger.info(self, 'nocc = %d', self.nocc)
         #logger.info(self, 'nmo = %d', self.nmo)
         logger.info(self, 'max_memory %d MB (current use %d MB)',
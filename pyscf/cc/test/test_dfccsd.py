@@ -89,6 +89,11 @@ class KnownValues(unittest.TestCase):
         self.assertAlmostEqual(lib.finger(numpy.array(eris.vvvv)), 43.562457227975969, 11)
 
 
+    def test_mixed_precision(self):
+        cc2 = dfccsd.RCCSD(mf).set(mixed_precision=True, conv_tol=1e-10)
+        cc2.kernel()
+        self.assertAlmostEqual(cc2.e_corr, cc1.e_corr, 8)
+
     def test_df_ipccsd(self):
         e,v = mycc.ipccsd(nroots=1)
         self.assertAlmostEqual(e, 0.42788191082629801, 6)
@@ -144,6 +144,39 @@ class KnownValues(unittest.TestCase):
         cc1.kernel()
         self.assertAlmostEqual(cc1.e_corr, -0.13539788638119823, 8)
 
+    def test_mixed_precision(self):
+        cc1 = cc.CCSD(mf)
+        cc1.mixed_precision = True
+        cc1.conv_tol = 1e-10
+        cc1.kernel()
+        self.assertFalse(cc1._vvvv_fp32)
+        self.assertAlmostEqual(cc1.e_corr, -0.13539788638119823, 8)
+
+        cc1.incore_complete = True
+        cc1.kernel()
+        self.assertAlmostEqual(cc1.e_corr, -0.13539788638119823, 8)
+
+        eris1 = cc1.ao2mo()
+        numpy.random.seed(2)
+        t2 = numpy.random.random((5,5,8,8)) - .5
+        t2 = t2 + t2.transpose(1,0,3,2)
+        ref = ccsd._contract_s4vvvv_t2(cc1, mol, eris1.vvvv, t2)
+        cc1._vvvv_fp32 = True
+        out = ccsd._contract_s4vvvv_t2(cc1, mol, eris1.vvvv, t2)
+        cc1._vvvv_fp32 = False
+        self.assertEqual(out.dtype, numpy.double)
+        self.assertAlmostEqual(abs(out - ref).max(), 0, 5)
+
+        # The single precision flag is reset if the iterations fail
+        cc2 = cc.CCSD(mf)
+        cc2.mixed_precision = True
+        def update_amps(t1, t2, eris):
+            raise KeyboardInterrupt
+        cc2.update_amps = update_amps
+        with self.assertRaises(KeyboardInterrupt):
+            cc2.kernel()
+        self.assertFalse(cc2._vvvv_fp32)
+
     def test_no_diis(self):
         cc1 = cc.CCSD(mf)
         cc1.diis = False
@@ -209,7 +209,10 @@ class DF(lib.StreamObject):
                         b0, b1 = aux_slice
                         return numpy.asarray(feri[b0:b1])
 
-                for dat in lib.map_with_prefetch(load, self.prange(0, naoaux, blksize)):
+                mem_now = lib.current_memory()[0]
+                max_memory = max(0, self.max_memory - mem_now) * .5
+                for dat in lib.map_with_prefetch(load, self.prange(0, naoaux, blksize),
+                                                 max_memory=max_memory):
                     yield dat
                     dat = None
 
@@ -497,11 +497,17 @@ class Grids(lib.StreamObject):
         self.prune = _load_conf(None, 'dft_gen_grid_Grids_prune', nwchem_prune)
 
         self.level = getattr(__config__, 'dft_gen_grid_Grids_level', 3)
+        # Reuse the atomic grids of the same element across build() calls
+        self.cache_atomic_grids = getattr(__config__, 'dft_gen_grid_Grids_cache_atomic_grids', True)
 
 ##################################################
 # don't modify the following attributes, they are not input options
         self.coords  = None
         self.weights = None
+        # Atomic grids are independent of the geometry. They are kept when
+        # the grids are reset for a new geometry (e.g. in scanner).
+        self._atom_grids_cache = {}
+        self._atom_grids_stats = {'hits': 0, 'misses': 0, 'time_saved': 0.}
         self._keys = set(self.__dict__.keys())
 
     @property
@@ -566,7 +572,38 @@ class Grids(lib.StreamObject):
         if radi_method is None: radi_method = self.radi_method
         if level is None: level = self.level
         if prune is None: prune = self.prune
-        return gen_atomic_grids(mol, atom_grid, self.radi_method, level, prune, **kwargs)
+        if kwargs or not self.cache_atomic_grids:
+            return gen_atomic_grids(mol, atom_grid, self.radi_method, level,
+                                    prune, **kwargs)
+
+        symbs = set([mol.atom_symbol(ia) for ia in range(mol.natm)])
+        if isinstance(atom_grid, (list, tuple)):
+            grid_keys = dict([(symb, tuple(atom_grid)) for symb in symbs])
+        else:
+            grid_keys = dict([(symb, tuple(atom_grid[symb]) if symb in atom_grid
+                               else None) for symb in symbs])
+        cache_keys = dict([(symb, (symb, grid_keys[symb], self.radi_method,
+                                   level, prune)) for symb in symbs])
+
+        cache = self._atom_grids_cache
+        stats = self._atom_grids_stats
+        if all(cache_keys[symb] in cache for symb in symbs):
+            atom_grids_tab = {}
+            for symb in symbs:
+                coords, vol, t_build = cache[cache_keys[symb]]
+                atom_grids_tab[symb] = (coords, vol)
+                stats['time_saved'] += t_build
+            stats['hits'] += 1
+            logger.debug1(self, 'Atomic grids of %s found in cache', symbs)
+        else:
+            t0 = logger.perf_counter()
+            atom_grids_tab = gen_atomic_grids(mol, atom_grid, self.radi_method,
+                                              level, prune)
+            t_build = (logger.perf_counter() - t0) / len(atom_grids_tab)
+            for symb, (coords, vol) in atom_grids_tab.items():
+                cache[cache_keys[symb]] = (coords, vol, t_build)
+            stats['misses'] += 1
+        return atom_grids_tab
 
     @lib.with_doc(get_partition.__doc__)
     def get_partition(self, mol, atom_grids_tab=None,
@@ -16,6 +16,7 @@
 # Author: Qiming Sun <osirpt.sun@gmail.com>
 #
 
+import copy
 import warnings
 import ctypes
 import numpy
@@ -2382,6 +2383,64 @@ def cache_xc_kernel(ni, mol, grids, xc_code, mo_coeff, mo_occ, spin=0,
                           verbose=0)[1:3]
     return rho, vxc, fxc
 
+def cache_ao_blocks(ni, mol, grids, deriv=0, max_memory=2000):
+    '''Generate a copy of ni which keeps the AO values evaluated in the first
+    pass of ni.block_loop over grids and replays them in the following passes.
+    The response functions of TDDFT and CPKS call the XC kernel once per
+    iteration. The AO values on grids are then evaluated only once for all
+    iterations.
+
+    Kwargs:
+        deriv : int
+            AO derivative order of the cached AO values
+        max_memory : int or float
+            The maximum size (in MB) allowed for the cached AO values. If the
+            AO values do not fit in max_memory, ni is returned unchanged.
+
+    Returns:
+        An instance of :class:`NumInt`
+    '''
+    # block_loop of pbc NumInt has a different signature
+    if getattr(ni.block_loop, '__func__', None) is not NumInt.block_loop:
+        return ni
+
+    if grids.coords is None:
+        grids.build(with_non0tab=True)
+    nao = mol.nao_nr()
+    comp = (deriv+1)*(deriv+2)*(deriv+3)//6
+    if comp * grids.weights.size * nao * 8e-6 > max_memory:
+        return ni
+
+    block_loop = ni.block_loop
+    cache = []
+    def cached_block_loop(mol1, grids1, nao1=None, deriv1=0, max_memory=2000,
+                          non0tab=None, blksize=None, buf=None):
+        if (mol1 is not mol or grids1 is not grids or deriv1 != deriv or
+            non0tab is not None or blksize is not None):
+            for x in block_loop(mol1, grids1, nao1, deriv1, max_memory,
+                                non0tab, blksize, buf):
+                yield x
+            return
+
+        if cache:
+            for x in cache:
+                yield x
+            return
+
+        blocks = []
+        for ao, mask, weight, coords \
+                in block_loop(mol, grids, nao, deriv, max_memory):
+            # The AO buffer is reused by block_loop
+            ao = numpy.array(ao)
+            blocks.append((ao, mask, weight, coords))
+            yield ao, mask, weight, coords
+        # The cache is filled only if the loop is completed
+        cache.extend(blocks)
+
+    ni = copy.copy(ni)
+    ni.block_loop = cached_block_loop
+    return ni
+
 def get_rho(ni, mol, dm, grids, max_memory=2000):
     '''Density in real space
     '''
@@ -2432,6 +2491,7 @@ class NumInt(object):
     nr_rks_fxc = nr_rks_fxc
     nr_uks_fxc = nr_uks_fxc
     cache_xc_kernel  = cache_xc_kernel
+    cache_ao_blocks = cache_ao_blocks
     get_rho = get_rho
 
     @lib.with_doc(eval_ao.__doc__)
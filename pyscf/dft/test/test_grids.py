@@ -118,6 +118,25 @@ class KnownValues(unittest.TestCase):
         grid.atom_grid = {"H": (10, 58), "O": (10, 50),}
         self.assertRaises(ValueError, grid.build)
 
+    def test_atomic_grids_cache(self):
+        grid = gen_grid.Grids(h2o)
+        grid.build()
+        coords0, weights0 = grid.coords, grid.weights
+        mol1 = h2o.set_geom_('O 0 0 0; H 0 -.757 .587; H 0 .757 .6', inplace=False)
+        grid.reset(mol1).build()
+        self.assertEqual(grid._atom_grids_stats['misses'], 1)
+        self.assertEqual(grid._atom_grids_stats['hits'], 1)
+        ref = gen_grid.Grids(mol1).set(cache_atomic_grids=False).build()
+        self.assertAlmostEqual(abs(grid.coords - ref.coords).max(), 0, 12)
+        self.assertAlmostEqual(abs(grid.weights - ref.weights).max(), 0, 12)
+
+        grid.atom_grid = {"H": (10, 110)}
+        grid.build()
+        self.assertEqual(grid._atom_grids_stats['misses'], 2)
+        ref.atom_grid = {"H": (10, 110)}
+        ref.build()
+        self.assertAlmostEqual(abs(grid.weights - ref.weights).max(), 0, 12)
+
     def test_make_mask(self):
         grid = gen_grid.Grids(h2o)
         grid.atom_grid = {"H": (10, 110), "O": (10, 110),}
@@ -465,6 +465,30 @@ class KnownValues(unittest.TestCase):
         #self.assertAlmostEqual(abs(fxc1[1] - fxc2[1]), 0, 0)
         #self.assertAlmostEqual(abs(fxc1[2] - fxc2[2]), 0, 0)
 
+    def test_cache_ao_blocks(self):
+        mf = dft.RKS(h2o)
+        mf.grids.atom_grid = {"H": (20, 110), "O": (20, 110),}
+        mf.xc = 'b88,p86'
+        mf.run()
+        ni = mf._numint
+        rho0, vxc, fxc = ni.cache_xc_kernel(h2o, mf.grids, mf.xc, mf.mo_coeff, mf.mo_occ)
+        numpy.random.seed(2)
+        dms = numpy.random.random((3,h2o.nao,h2o.nao)) - .5
+        ref = ni.nr_rks_fxc(h2o, mf.grids, mf.xc, None, dms, 0, 0, rho0, vxc, fxc)
+
+        ni1 = ni.cache_ao_blocks(h2o, mf.grids, 1, max_memory=4000)
+        self.assertTrue(ni1 is not ni)
+        for i in range(2):
+            v = ni1.nr_rks_fxc(h2o, mf.grids, mf.xc, None, dms, 0, 0, rho0, vxc, fxc)
+            self.assertAlmostEqual(abs(v - ref).max(), 0, 12)
+
+        # The cached blocks are not used for different AO derivative order
+        rho_ref = ni.get_rho(h2o, mf.make_rdm1(), mf.grids)
+        rho = ni1.get_rho(h2o, mf.make_rdm1(), mf.grids)
+        self.assertAlmostEqual(abs(rho - rho_ref).max(), 0, 12)
+
+        self.assertTrue(ni.cache_ao_blocks(h2o, mf.grids, 1, max_memory=0) is ni)
+
 
 if __name__ == "__main__":
     print("Test numint")
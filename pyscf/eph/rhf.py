@@ -22,6 +22,8 @@ Analytical electron-phonon matrix for restricted hartree fock
 
 import numpy as np
 import scipy.linalg
+import h5py
+from pyscf import lib
 from pyscf.hessian import rhf
 from pyscf.lib import logger, chkfile
 from pyscf.scf._response_functions import _gen_rhf_response
@@ -142,10 +144,102 @@ def _freq_mass_weighted_vec(vec, omega, mass):
     vec = vec.reshape(3*natoms,nmodes)
     return vec
 
-def get_eph(ephobj, mo1, omega, vec, mo_rep):
+def _mo1_loader(mo1, spin=None):
+    '''Returns a function to read the first order orbitals of one atom
+    from the chkfile (or the dict) generated by the Hessian solver'''
     if isinstance(mo1, str):
-        mo1 = chkfile.load(mo1, 'scf_mo1')
-        mo1 = dict([(int(k), mo1[k]) for k in mo1])
+        if spin is None:
+            key = 'scf_mo1/%d'
+        else:
+            key = 'scf_mo1/%d/%%d' % spin
+        return lambda ia: chkfile.load(mo1, key % ia)
+    elif spin is None:
+        return lambda ia: mo1[ia]
+    else:
+        return lambda ia: mo1[spin][ia]
+
+def contract_eph(ephobj, gen_vcore, omega, vec, mo_rep, mo_coeff=None):
+    '''Projects the derivatives of the potential on the normal modes.
+
+    The derivatives are generated by gen_vcore(atmlst) for batches of
+    atoms which fit in ephobj.max_memory and contracted with the mode
+    vectors on the fly. Only the modes in ephobj.modes and, if mo_rep is
+    set, the orbitals in ephobj.orbs are kept. If ephobj.eph_chkfile is
+    set, the partial eph matrix is saved in this file after each batch and
+    the calculation resumes from it.
+    '''
+    log = logger.new_logger(ephobj)
+    mol = ephobj.mol
+    if mo_coeff is None: mo_coeff = ephobj.base.mo_coeff
+    mo_coeff = np.asarray(mo_coeff)
+    unrestricted = mo_coeff.ndim == 3
+    nset = 2 if unrestricted else 1
+    nao = mo_coeff.shape[-2]
+    natoms = mol.natm
+
+    mass = mol.atom_mass_list() * MP_ME
+    vec = _freq_mass_weighted_vec(vec, omega, mass)
+    if ephobj.modes is not None:
+        vec = vec[:,ephobj.modes]
+    nmodes = vec.shape[1]
+    vec = vec.reshape(natoms,3,nmodes)
+
+    if mo_rep:
+        orbs = ephobj.orbs
+        if orbs is None:
+            orbs = np.arange(mo_coeff.shape[-1])
+        orb = mo_coeff[...,orbs].reshape(nset,nao,-1)
+        norb = orb.shape[-1]
+    else:
+        orbs = None
+        norb = nao
+    mat = np.zeros((nset,nmodes,norb,norb), dtype=np.result_type(vec, mo_coeff))
+
+    # The derivative potentials of each atom, the first order orbitals
+    # and the J/K intermediates are held at the same time
+    mem_now = lib.current_memory()[0]
+    max_memory = max(0, ephobj.max_memory - mem_now - mat.nbytes/1e6)
+    blksize = int(max_memory*1e6/8 / (nset*3*nao**2*4))
+    blksize = max(1, min(natoms, blksize))
+    log.debug1('EPH: max_memory %d MB, %d atoms per batch', max_memory, blksize)
+
+    a_start = 0
+    key = 'eph_partial'
+    if ephobj.eph_chkfile and h5py.is_hdf5(ephobj.eph_chkfile):
+        saved = chkfile.load(ephobj.eph_chkfile, key)
+        if (saved is not None and saved['mat'].shape == mat.shape and
+            saved['vec'].shape == vec.shape and abs(saved['vec']-vec).max() < 1e-12 and
+            bool(saved['mo_rep']) == bool(mo_rep)):
+            mat[:] = saved['mat']
+            a_start = int(saved['atm_done'])
+            log.info('EPH: restart from atom %d', a_start)
+
+    for a0, a1 in lib.prange(a_start, natoms, blksize):
+        vcore = np.asarray(gen_vcore(range(a0, a1))).reshape(nset,-1,nao,nao)
+        vec_blk = vec[a0:a1].reshape(-1,nmodes)
+        for s in range(nset):
+            v = vcore[s]
+            if mo_rep:
+                v = lib.einsum('xuv,up,vq->xpq', v, orb[s].conj(), orb[s])
+            mat[s] += lib.einsum('xJ,xpq->Jpq', vec_blk, v)
+        vcore = v = None
+        if ephobj.eph_chkfile:
+            chkfile.save(ephobj.eph_chkfile, key,
+                         {'mat': mat, 'vec': vec, 'mo_rep': bool(mo_rep), 'atm_done': a1})
+        log.debug('EPH: atoms %d:%d projected', a0, a1)
+
+    if ephobj.eph_chkfile and h5py.is_hdf5(ephobj.eph_chkfile):
+        with h5py.File(ephobj.eph_chkfile, 'a') as f:
+            if key in f:
+                del f[key]
+
+    if unrestricted:
+        return mat
+    else:
+        return mat[0]
+
+def get_eph(ephobj, mo1, omega, vec, mo_rep):
+    mo1 = _mo1_loader(mo1)
 
     mol = ephobj.mol
     mf = ephobj.base
@@ -155,29 +249,23 @@ def get_eph(ephobj, mo1, omega, vec, mo_rep):
     mocc = mf.mo_coeff[:,mf.mo_occ>0]
     dm0 = np.dot(mocc, mocc.T) * 2
 
-    natoms = mol.natm
-    nao = mol.nao_nr()
-
-    vcore = []
-    for ia in range(natoms):
-        h1 = vnuc_deriv(ia)
-        v1 = vind(mo1[ia])
-        shl0, shl1, p0, p1 = aoslices[ia]
-        shls_slice = (shl0, shl1) + (0, mol.nbas)*3
-        vj1, vk1= rhf._get_jk(mol, 'int2e_ip1', 3, 's2kl',
-                                     ['ji->s2kl', -dm0[:,p0:p1],  # vj1
-                                      'li->s1kj', -dm0[:,p0:p1]], # vk1
-                                     shls_slice=shls_slice)
-        vhf = vj1 - vk1*.5
-        vtot = h1 + v1 + vhf + vhf.transpose(0,2,1)
-        vcore.append(vtot)
-    vcore = np.asarray(vcore).reshape(-1,nao,nao)
-    mass = mol.atom_mass_list() * MP_ME
-    vec = _freq_mass_weighted_vec(vec, omega, mass)
-    mat = np.einsum('xJ,xuv->Juv', vec, vcore)
-    if mo_rep:
-        mat = np.einsum('Juv,up,vq->Jpq', mat, mf.mo_coeff.conj(), mf.mo_coeff, optimize=True)
-    return mat
+    def gen_vcore(atmlst):
+        vcore = []
+        for ia in atmlst:
+            h1 = vnuc_deriv(ia)
+            v1 = vind(mo1(ia))
+            shl0, shl1, p0, p1 = aoslices[ia]
+            shls_slice = (shl0, shl1) + (0, mol.nbas)*3
+            vj1, vk1= rhf._get_jk(mol, 'int2e_ip1', 3, 's2kl',
+                                         ['ji->s2kl', -dm0[:,p0:p1],  # vj1
+                                          'li->s1kj', -dm0[:,p0:p1]], # vk1
+                                         shls_slice=shls_slice)
+            vhf = vj1 - vk1*.5
+            vtot = h1 + v1 + vhf + vhf.transpose(0,2,1)
+            vcore.append(vtot)
+        return vcore
+
+    return contract_eph(ephobj, gen_vcore, omega, vec, mo_rep, mf.mo_coeff)
 
 
 class EPH(rhf.Hessian):
@@ -188,6 +276,18 @@ class EPH(rhf.Hessian):
             cutoff frequency in cm-1. Default is 80
         keep_imag_frequency : bool
             Whether to keep imaginary frequencies in the output.  Default is False
+        modes : list of int
+            Indices of the (retained) modes to compute the coupling for.
+            Default is None, meaning all modes
+        orbs : list of int
+            Indices of the MOs kept in the MO representation (mo_rep=True).
+            Default is None, meaning all MOs
+        eph_chkfile : str
+            HDF5 file to checkpoint the partial eph matrix after each batch
+            of atoms. If the file holds the partial matrix of an earlier
+            (interrupted) calculation, the calculation is resumed from it.
+            The partial matrix is removed from the file when the eph matrix
+            is completed.  Default is None
 
     Saved results
 
@@ -204,6 +304,10 @@ class EPH(rhf.Hessian):
         rhf.Hessian.__init__(self, scf_method)
         self.cutoff_frequency = cutoff_frequency
         self.keep_imag_frequency = keep_imag_frequency
+        self.modes = None
+        self.orbs = None
+        self.eph_chkfile = None
+        self._keys = self._keys.union(['modes', 'orbs', 'eph_chkfile'])
 
     get_mode = get_mode
     get_eph = get_eph
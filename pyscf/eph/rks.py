@@ -27,12 +27,11 @@ from pyscf.hessian import rhf as rhf_hess
 from pyscf.grad import rks as rks_grad
 from pyscf.dft import numint
 from pyscf.eph import rhf as rhf_eph
-from pyscf.data.nist import MP_ME
 
 CUTOFF_FREQUENCY = rhf_eph.CUTOFF_FREQUENCY
 KEEP_IMAG_FREQUENCY = rhf_eph.KEEP_IMAG_FREQUENCY
 
-def _get_vxc_deriv1(hessobj, mo_coeff, mo_occ, max_memory):
+def _get_vxc_deriv1(hessobj, mo_coeff, mo_occ, max_memory, atmlst=None):
     """" This functions is slightly different from hessian.rks._get_vxc_deriv1 in that <\nabla u|Vxc|v> is removed"""
     mol = hessobj.mol
     mf = hessobj.base
@@ -50,7 +49,9 @@ def _get_vxc_deriv1(hessobj, mo_coeff, mo_occ, max_memory):
     shls_slice = (0, mol.nbas)
     ao_loc = mol.ao_loc_nr()
     dm0 = mf.make_rdm1(mo_coeff, mo_occ)
-    vmat = np.zeros((mol.natm,3,nao,nao))
+    if atmlst is None:
+        atmlst = range(mol.natm)
+    vmat = np.zeros((len(atmlst),3,nao,nao))
     max_memory = max(2000, max_memory-vmat.size*8/1e6)
     if xctype == 'LDA':
         ao_deriv = 1
@@ -60,15 +61,15 @@ def _get_vxc_deriv1(hessobj, mo_coeff, mo_occ, max_memory):
             vxc, fxc = ni.eval_xc(mf.xc, rho, 0, deriv=2)[1:3]
             frr = fxc[0]
             ao_dm0 = numint._dot_ao_dm(mol, ao[0], dm0, mask, shls_slice, ao_loc)
-            for ia in range(mol.natm):
+            for k, ia in enumerate(atmlst):
                 p0, p1 = aoslices[ia][2:]
                 rho1 = np.einsum('xpi,pi->xp', ao[1:,:,p0:p1], ao_dm0[:,p0:p1])
                 aow = np.einsum('pi,xp->xpi', ao[0], weight*frr*rho1)
-                rks_grad._d1_dot_(vmat[ia], mol, aow, ao[0], mask, ao_loc, True)
+                rks_grad._d1_dot_(vmat[k], mol, aow, ao[0], mask, ao_loc, True)
             ao_dm0 = aow = None
 
-        for ia in range(mol.natm):
-            vmat[ia] = -vmat[ia] - vmat[ia].transpose(0,2,1)
+        for k in range(len(atmlst)):
+            vmat[k] = -vmat[k] - vmat[k].transpose(0,2,1)
 
     elif xctype == 'GGA':
         ao_deriv = 2
@@ -82,17 +83,17 @@ def _get_vxc_deriv1(hessobj, mo_coeff, mo_occ, max_memory):
             # rks_grad._gga_grad_sum_(v_ip, mol, ao, wv, mask, ao_loc)
             ao_dm0 = [numint._dot_ao_dm(mol, ao[i], dm0, mask, shls_slice, ao_loc)
                       for i in range(4)]
-            for ia in range(mol.natm):
+            for k, ia in enumerate(atmlst):
                 wv = dR_rho1 = rks_hess._make_dR_rho1(ao, ao_dm0, ia, aoslices)
                 wv[0] = numint._rks_gga_wv1(rho, dR_rho1[0], vxc, fxc, weight)
                 wv[1] = numint._rks_gga_wv1(rho, dR_rho1[1], vxc, fxc, weight)
                 wv[2] = numint._rks_gga_wv1(rho, dR_rho1[2], vxc, fxc, weight)
                 aow = np.einsum('npi,Xnp->Xpi', ao[:4], wv)
-                rks_grad._d1_dot_(vmat[ia], mol, aow, ao[0], mask, ao_loc, True)
+                rks_grad._d1_dot_(vmat[k], mol, aow, ao[0], mask, ao_loc, True)
             ao_dm0 = aow = None
 
-        for ia in range(mol.natm):
-            vmat[ia] = -vmat[ia] - vmat[ia].transpose(0,2,1)
+        for k in range(len(atmlst)):
+            vmat[k] = -vmat[k] - vmat[k].transpose(0,2,1)
 
     elif xctype == 'MGGA':
         raise NotImplementedError('meta-GGA')
@@ -100,9 +101,7 @@ def _get_vxc_deriv1(hessobj, mo_coeff, mo_occ, max_memory):
     return vmat
 
 def get_eph(ephobj, mo1, omega, vec, mo_rep):
-    if isinstance(mo1, str):
-        mo1 = lib.chkfile.load(mo1, 'scf_mo1')
-        mo1 = dict([(int(k), mo1[k]) for k in mo1])
+    mo1 = rhf_eph._mo1_loader(mo1)
 
     mol = ephobj.mol
     mf = ephobj.base
@@ -116,46 +115,41 @@ def get_eph(ephobj, mo1, omega, vec, mo_rep):
     mocc = mf.mo_coeff[:,mf.mo_occ>0]
     dm0 = np.dot(mocc, mocc.T) * 2
 
-    natoms = mol.natm
-    nao = mol.nao_nr()
-    mem_now = lib.current_memory()[0]
-    max_memory = max(2000, mf.max_memory*.9-mem_now)
-    vxc1ao = _get_vxc_deriv1(ephobj, mf.mo_coeff, mf.mo_occ, max_memory)
-    vcore = []
-    for ia in range(natoms):
-        h1 = vnuc_deriv(ia)
-        v1 = vind(mo1[ia])
-        shl0, shl1, p0, p1 = aoslices[ia]
-        shls_slice = (shl0, shl1) + (0, mol.nbas)*3
-
-        if abs(hyb)>1e-10:
-            vj1, vk1 = \
-                    rhf_hess._get_jk(mol, 'int2e_ip1', 3, 's2kl',
-                                     ['ji->s2kl', -dm0[:,p0:p1], #vj1
-                                      'li->s1kj', -dm0[:,p0:p1]], #vk1
-                                     shls_slice=shls_slice)
-            veff = vj1 - hyb * .5 * vk1
-            if abs(omg) > 1e-10:
-                with mol.with_range_coulomb(omg):
-                    vk1 = \
+    def gen_vcore(atmlst):
+        mem_now = lib.current_memory()[0]
+        max_memory = max(2000, mf.max_memory*.9-mem_now)
+        vxc1ao = _get_vxc_deriv1(ephobj, mf.mo_coeff, mf.mo_occ, max_memory, atmlst)
+        vcore = []
+        for k, ia in enumerate(atmlst):
+            h1 = vnuc_deriv(ia)
+            v1 = vind(mo1(ia))
+            shl0, shl1, p0, p1 = aoslices[ia]
+            shls_slice = (shl0, shl1) + (0, mol.nbas)*3
+
+            if abs(hyb)>1e-10:
+                vj1, vk1 = \
                         rhf_hess._get_jk(mol, 'int2e_ip1', 3, 's2kl',
-                                         ['li->s1kj', -dm0[:,p0:p1]], # vk1
+                                         ['ji->s2kl', -dm0[:,p0:p1], #vj1
+                                          'li->s1kj', -dm0[:,p0:p1]], #vk1
                                          shls_slice=shls_slice)
-                veff -= (alpha-hyb) * .5 * vk1
-        else:
-            vj1 = rhf_hess._get_jk(mol, 'int2e_ip1', 3, 's2kl',
-                                        ['ji->s2kl', -dm0[:,p0:p1]], # vj1
-                                        shls_slice=shls_slice)
-            veff = vj1[0]
-        vtot = h1 + v1 + veff + vxc1ao[ia] + veff.transpose(0,2,1)
-        vcore.append(vtot)
-    vcore = np.asarray(vcore).reshape(-1,nao,nao)
-    mass = mol.atom_mass_list() * MP_ME
-    vec = rhf_eph._freq_mass_weighted_vec(vec, omega, mass)
-    mat = np.einsum('xJ,xuv->Juv', vec, vcore, optimize=True)
-    if mo_rep:
-        mat = np.einsum('Juv,up,vq->Jpq', mat, mf.mo_coeff.conj(), mf.mo_coeff, optimize=True)
-    return mat
+                veff = vj1 - hyb * .5 * vk1
+                if abs(omg) > 1e-10:
+                    with mol.with_range_coulomb(omg):
+                        vk1 = \
+                            rhf_hess._get_jk(mol, 'int2e_ip1', 3, 's2kl',
+                                             ['li->s1kj', -dm0[:,p0:p1]], # vk1
+                                             shls_slice=shls_slice)
+                    veff -= (alpha-hyb) * .5 * vk1
+            else:
+                vj1 = rhf_hess._get_jk(mol, 'int2e_ip1', 3, 's2kl',
+                                            ['ji->s2kl', -dm0[:,p0:p1]], # vj1
+                                            shls_slice=shls_slice)
+                veff = vj1[0]
+            vtot = h1 + v1 + veff + vxc1ao[k] + veff.transpose(0,2,1)
+            vcore.append(vtot)
+        return vcore
+
+    return rhf_eph.contract_eph(ephobj, gen_vcore, omega, vec, mo_rep, mf.mo_coeff)
 
 
 class EPH(rks_hess.Hessian):
@@ -166,6 +160,18 @@ class EPH(rks_hess.Hessian):
             cutoff frequency in cm-1. Default is 80
         keep_imag_frequency : bool
             Whether to keep imaginary frequencies in the output.  Default is False
+        modes : list of int
+            Indices of the (retained) modes to compute the coupling for.
+            Default is None, meaning all modes
+        orbs : list of int
+            Indices of the MOs kept in the MO representation (mo_rep=True).
+            Default is None, meaning all MOs
+        eph_chkfile : str
+            HDF5 file to checkpoint the partial eph matrix after each batch
+            of atoms. If the file holds the partial matrix of an earlier
+            (interrupted) calculation, the calculation is resumed from it.
+            The partial matrix is removed from the file when the eph matrix
+            is completed.  Default is None
 
     Saved results
 
@@ -181,6 +187,10 @@ class EPH(rks_hess.Hessian):
         rks_hess.Hessian.__init__(self, scf_method)
         self.cutoff_frequency = cutoff_frequency
         self.keep_imag_frequency = keep_imag_frequency
+        self.modes = None
+        self.orbs = None
+        self.eph_chkfile = None
+        self._keys = self._keys.union(['modes', 'orbs', 'eph_chkfile'])
 
     get_mode = rhf_eph.get_mode
     get_eph = get_eph
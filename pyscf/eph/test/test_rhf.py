@@ -15,6 +15,7 @@
 #
 
 import tempfile
+import h5py
 from pyscf import scf, gto
 from pyscf.eph import eph_fd, rhf
 import numpy as np
@@ -60,6 +61,54 @@ class KnownValues(unittest.TestCase):
             self.assertTrue(min(np.linalg.norm(ephmo[i]-matmo[i]),np.linalg.norm(ephmo[i]+matmo[i]))<1e-5)
             self.assertTrue(min(abs(ephmo[i]-matmo[i]).max(), abs(ephmo[i]+matmo[i]).max())<1e-5)
 
+    def test_eph_batches(self):
+        mf = scf.RHF(mol)
+        mf.chkfile = tempfile.NamedTemporaryFile().name
+        mf.conv_tol = 1e-14
+        mf.conv_tol_grad = 1e-9
+        mf.kernel()
+
+        myeph = rhf.EPH(mf)
+        ephmo, omega = myeph.kernel(mo_rep=True)
+
+        myeph.max_memory = 1  # one atom per batch
+        myeph.modes = [0, 2]
+        myeph.orbs = [1, 2, 3]
+        eph1 = myeph.get_eph(myeph.chkfile, omega, myeph.vec, True)
+        self.assertEqual(eph1.shape, (2, 3, 3))
+        self.assertAlmostEqual(abs(eph1 - ephmo[[0,2]][:,1:4,1:4]).max(), 0, 9)
+
+        # Interrupt the calculation after the first two atoms and resume it
+        # from the partial eph matrix in eph_chkfile
+        myeph.eph_chkfile = tempfile.NamedTemporaryFile().name
+        vnuc_generator = myeph.vnuc_generator
+        atoms = []
+        def count_vnuc_generator(mol, stop_at=None):
+            vnuc_deriv = vnuc_generator(mol)
+            def fn(ia):
+                if len(atoms) == stop_at:
+                    raise KeyboardInterrupt
+                atoms.append(ia)
+                return vnuc_deriv(ia)
+            return fn
+        myeph.vnuc_generator = lambda mol: count_vnuc_generator(mol, 2)
+        with self.assertRaises(KeyboardInterrupt):
+            myeph.get_eph(myeph.chkfile, omega, myeph.vec, True)
+        with h5py.File(myeph.eph_chkfile, 'r') as f:
+            self.assertTrue('eph_partial' in f)
+
+        atoms = []
+        myeph.vnuc_generator = count_vnuc_generator
+        eph1 = myeph.get_eph(myeph.chkfile, omega, myeph.vec, True)
+        self.assertEqual(atoms, [2])
+        self.assertAlmostEqual(abs(eph1 - ephmo[[0,2]][:,1:4,1:4]).max(), 0, 9)
+        # The partial matrix is removed once the eph matrix is completed and
+        # the SCF chkfile is never touched
+        with h5py.File(myeph.eph_chkfile, 'r') as f:
+            self.assertFalse('eph_partial' in f)
+        with h5py.File(myeph.chkfile, 'r') as f:
+            self.assertFalse('eph_partial' in f)
+
 if __name__ == '__main__':
     print("Full Tests for RHF")
     unittest.main()
@@ -20,12 +20,10 @@
 Analytical electron-phonon matrix for unrestricted hartree fock
 '''
 import numpy as np
-from pyscf import lib
 from pyscf.eph import rhf as rhf_eph
 from pyscf.hessian import uhf as uhf_hess
 from pyscf.hessian import rhf as rhf_hess
 from pyscf.scf._response_functions import _gen_uhf_response
-from pyscf.data.nist import MP_ME
 
 CUTOFF_FREQUENCY = rhf_eph.CUTOFF_FREQUENCY
 KEEP_IMAG_FREQUENCY = rhf_eph.KEEP_IMAG_FREQUENCY
@@ -54,12 +52,8 @@ def uhf_deriv_generator(mf, mo_coeff, mo_occ):
     return fx
 
 def get_eph(ephobj, mo1, omega, vec, mo_rep):
-    if isinstance(mo1, str):
-        mo1 = lib.chkfile.load(mo1, 'scf_mo1')
-        mo1a = mo1['0']
-        mo1b = mo1['1']
-        mo1a = dict([(int(k), mo1a[k]) for k in mo1a])
-        mo1b = dict([(int(k), mo1b[k]) for k in mo1b])
+    mo1a = rhf_eph._mo1_loader(mo1, 0)
+    mo1b = rhf_eph._mo1_loader(mo1, 1)
 
     mol = ephobj.mol
     mf = ephobj.base
@@ -68,45 +62,35 @@ def get_eph(ephobj, mo1, omega, vec, mo_rep):
 
     mo_coeff, mo_occ = mf.mo_coeff, mf.mo_occ
     vind = uhf_deriv_generator(mf, mf.mo_coeff, mf.mo_occ)
-    nao, nmo = mo_coeff[0].shape
     mocca = mo_coeff[0][:,mo_occ[0]>0]
     moccb = mo_coeff[1][:,mo_occ[1]>0]
     dm0a = np.dot(mocca, mocca.T)
     dm0b = np.dot(moccb, moccb.T)
 
-    natoms = mol.natm
-    vcorea = []
-    vcoreb = []
-    for ia in range(natoms):
-        h1 = vnuc_deriv(ia)
-        moia = np.hstack((mo1a[ia], mo1b[ia]))
-        v1 = vind(moia)
-        shl0, shl1, p0, p1 = aoslices[ia]
-        shls_slice = (shl0, shl1) + (0, mol.nbas)*3
-        vja, vjb, vka, vkb= rhf_hess._get_jk(mol, 'int2e_ip1', 3, 's2kl',
-                                             ['ji->s2kl', -dm0a[:,p0:p1],  # vja
-                                              'ji->s2kl', -dm0b[:,p0:p1],  # vjb
-                                              'li->s1kj', -dm0a[:,p0:p1],  # vka
-                                              'li->s1kj', -dm0b[:,p0:p1]], # vkb
-                                             shls_slice=shls_slice)
-        vhfa = vja + vjb - vka
-        vhfb = vjb + vjb - vkb
-        vtota = h1 + v1[0] + vhfa + vhfa.transpose(0,2,1)
-        vtotb = h1 + v1[1] + vhfb + vhfb.transpose(0,2,1)
-        vcorea.append(vtota)
-        vcoreb.append(vtotb)
-
-    vcorea = np.asarray(vcorea).reshape(-1,nao,nao)
-    vcoreb = np.asarray(vcoreb).reshape(-1,nao,nao)
-
-    mass = mol.atom_mass_list() * MP_ME
-    vec = rhf_eph._freq_mass_weighted_vec(vec, omega, mass)
-    mata = np.einsum('xJ,xuv->Juv', vec, vcorea)
-    matb = np.einsum('xJ,xuv->Juv', vec, vcoreb)
-    if mo_rep:
-        mata = np.einsum('Juv,up,vq->Jpq', mata, mf.mo_coeff[0].conj(), mf.mo_coeff[0], optimize=True)
-        matb = np.einsum('Juv,up,vq->Jpq', matb, mf.mo_coeff[1].conj(), mf.mo_coeff[1], optimize=True)
-    return np.asarray([mata,matb])
+    def gen_vcore(atmlst):
+        vcorea = []
+        vcoreb = []
+        for ia in atmlst:
+            h1 = vnuc_deriv(ia)
+            moia = np.hstack((mo1a(ia), mo1b(ia)))
+            v1 = vind(moia)
+            shl0, shl1, p0, p1 = aoslices[ia]
+            shls_slice = (shl0, shl1) + (0, mol.nbas)*3
+            vja, vjb, vka, vkb= rhf_hess._get_jk(mol, 'int2e_ip1', 3, 's2kl',
+                                                 ['ji->s2kl', -dm0a[:,p0:p1],  # vja
+                                                  'ji->s2kl', -dm0b[:,p0:p1],  # vjb
+                                                  'li->s1kj', -dm0a[:,p0:p1],  # vka
+                                                  'li->s1kj', -dm0b[:,p0:p1]], # vkb
+                                                 shls_slice=shls_slice)
+            vhfa = vja + vjb - vka
+            vhfb = vjb + vjb - vkb
+            vtota = h1 + v1[0] + vhfa + vhfa.transpose(0,2,1)
+            vtotb = h1 + v1[1] + vhfb + vhfb.transpose(0,2,1)
+            vcorea.append(vtota)
+            vcoreb.append(vtotb)
+        return np.asarray([vcorea, vcoreb])
+
+    return rhf_eph.contract_eph(ephobj, gen_vcore, omega, vec, mo_rep, mo_coeff)
 
 
 class EPH(uhf_hess.Hessian):
@@ -117,6 +101,18 @@ class EPH(uhf_hess.Hessian):
             cutoff frequency in cm-1. Default is 80
         keep_imag_frequency : bool
             Whether to keep imaginary frequencies in the output.  Default is False
+        modes : list of int
+            Indices of the (retained) modes to compute the coupling for.
+            Default is None, meaning all modes
+        orbs : list of int
+            Indices of the MOs kept in the MO representation (mo_rep=True).
+            Default is None, meaning all MOs
+        eph_chkfile : str
+            HDF5 file to checkpoint the partial eph matrix after each batch
+            of atoms. If the file holds the partial matrix of an earlier
+            (interrupted) calculation, the calculation is resumed from it.
+            The partial matrix is removed from the file when the eph matrix
+            is completed.  Default is None
 
     Saved results
 
@@ -133,6 +129,10 @@ class EPH(uhf_hess.Hessian):
         uhf_hess.Hessian.__init__(self, scf_method)
         self.cutoff_frequency = cutoff_frequency
         self.keep_imag_frequency = keep_imag_frequency
+        self.modes = None
+        self.orbs = None
+        self.eph_chkfile = None
+        self._keys = self._keys.union(['modes', 'orbs', 'eph_chkfile'])
 
     get_mode = rhf_eph.get_mode
     get_eph = get_eph
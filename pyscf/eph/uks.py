@@ -29,12 +29,11 @@ from pyscf.grad import rks as rks_grad
 from pyscf.dft import numint
 from pyscf.eph import rhf as rhf_eph
 from pyscf.eph.uhf import uhf_deriv_generator
-from pyscf.data.nist import MP_ME
 
 CUTOFF_FREQUENCY = rhf_eph.CUTOFF_FREQUENCY
 KEEP_IMAG_FREQUENCY = rhf_eph.KEEP_IMAG_FREQUENCY
 
-def _get_vxc_deriv1(hessobj, mo_coeff, mo_occ, max_memory):
+def _get_vxc_deriv1(hessobj, mo_coeff, mo_occ, max_memory, atmlst=None):
     mol = hessobj.mol
     mf = hessobj.base
     if hessobj.grids is not None:
@@ -52,8 +51,10 @@ def _get_vxc_deriv1(hessobj, mo_coeff, mo_occ, max_memory):
     ao_loc = mol.ao_loc_nr()
     dm0a, dm0b = mf.make_rdm1(mo_coeff, mo_occ)
 
-    vmata = np.zeros((mol.natm,3,nao,nao))
-    vmatb = np.zeros((mol.natm,3,nao,nao))
+    if atmlst is None:
+        atmlst = range(mol.natm)
+    vmata = np.zeros((len(atmlst),3,nao,nao))
+    vmatb = np.zeros((len(atmlst),3,nao,nao))
     max_memory = max(2000, max_memory-(vmata.size+vmatb.size)*8/1e6)
     if xctype == 'LDA':
         ao_deriv = 1
@@ -66,7 +67,7 @@ def _get_vxc_deriv1(hessobj, mo_coeff, mo_occ, max_memory):
 
             ao_dm0a = numint._dot_ao_dm(mol, ao[0], dm0a, mask, shls_slice, ao_loc)
             ao_dm0b = numint._dot_ao_dm(mol, ao[0], dm0b, mask, shls_slice, ao_loc)
-            for ia in range(mol.natm):
+            for k, ia in enumerate(atmlst):
                 p0, p1 = aoslices[ia][2:]
                 # First order density = rho1 * 2.  *2 is not applied because + c.c. in the end
                 rho1a = np.einsum('xpi,pi->xp', ao[1:,:,p0:p1], ao_dm0a[:,p0:p1])
@@ -75,17 +76,17 @@ def _get_vxc_deriv1(hessobj, mo_coeff, mo_occ, max_memory):
                 wv = u_u * rho1a + u_d * rho1b
                 wv *= weight
                 aow = np.einsum('pi,xp->xpi', ao[0], wv)
-                rks_grad._d1_dot_(vmata[ia], mol, aow, ao[0], mask, ao_loc, True)
+                rks_grad._d1_dot_(vmata[k], mol, aow, ao[0], mask, ao_loc, True)
 
                 wv = u_d * rho1a + d_d * rho1b
                 wv *= weight
                 aow = np.einsum('pi,xp->xpi', ao[0], wv)
-                rks_grad._d1_dot_(vmatb[ia], mol, aow, ao[0], mask, ao_loc, True)
+                rks_grad._d1_dot_(vmatb[k], mol, aow, ao[0], mask, ao_loc, True)
             ao_dm0a = ao_dm0b = aow = None
 
-        for ia in range(mol.natm):
-            vmata[ia] = -vmata[ia] - vmata[ia].transpose(0,2,1)
-            vmatb[ia] = -vmatb[ia] - vmatb[ia].transpose(0,2,1)
+        for k in range(len(atmlst)):
+            vmata[k] = -vmata[k] - vmata[k].transpose(0,2,1)
+            vmatb[k] = -vmatb[k] - vmatb[k].transpose(0,2,1)
 
     elif xctype == 'GGA':
         ao_deriv = 2
@@ -101,7 +102,7 @@ def _get_vxc_deriv1(hessobj, mo_coeff, mo_occ, max_memory):
                        for i in range(4)]
             ao_dm0b = [numint._dot_ao_dm(mol, ao[i], dm0b, mask, shls_slice, ao_loc)
                        for i in range(4)]
-            for ia in range(mol.natm):
+            for k, ia in enumerate(atmlst):
                 wva = dR_rho1a = rks_hess._make_dR_rho1(ao, ao_dm0a, ia, aoslices)
                 wvb = dR_rho1b = rks_hess._make_dR_rho1(ao, ao_dm0b, ia, aoslices)
                 wva[0], wvb[0] = numint._uks_gga_wv1((rhoa,rhob), (dR_rho1a[0],dR_rho1b[0]), vxc, fxc, weight)
@@ -109,14 +110,14 @@ def _get_vxc_deriv1(hessobj, mo_coeff, mo_occ, max_memory):
                 wva[2], wvb[2] = numint._uks_gga_wv1((rhoa,rhob), (dR_rho1a[2],dR_rho1b[2]), vxc, fxc, weight)
 
                 aow = np.einsum('npi,Xnp->Xpi', ao[:4], wva)
-                rks_grad._d1_dot_(vmata[ia], mol, aow, ao[0], mask, ao_loc, True)
+                rks_grad._d1_dot_(vmata[k], mol, aow, ao[0], mask, ao_loc, True)
                 aow = np.einsum('npi,Xnp->Xpi', ao[:4], wvb)
-                rks_grad._d1_dot_(vmatb[ia], mol, aow, ao[0], mask, ao_loc, True)
+                rks_grad._d1_dot_(vmatb[k], mol, aow, ao[0], mask, ao_loc, True)
             ao_dm0a = ao_dm0b = aow = None
 
-        for ia in range(mol.natm):
-            vmata[ia] = -vmata[ia] - vmata[ia].transpose(0,2,1)
-            vmatb[ia] = -vmatb[ia] - vmatb[ia].transpose(0,2,1)
+        for k in range(len(atmlst)):
+            vmata[k] = -vmata[k] - vmata[k].transpose(0,2,1)
+            vmatb[k] = -vmatb[k] - vmatb[k].transpose(0,2,1)
 
     elif xctype == 'MGGA':
         raise NotImplementedError('meta-GGA')
@@ -124,12 +125,8 @@ def _get_vxc_deriv1(hessobj, mo_coeff, mo_occ, max_memory):
     return vmata, vmatb
 
 def get_eph(ephobj, mo1, omega, vec, mo_rep):
-    if isinstance(mo1, str):
-        mo1 = lib.chkfile.load(mo1, 'scf_mo1')
-        mo1a = mo1['0']
-        mo1b = mo1['1']
-        mo1a = dict([(int(k), mo1a[k]) for k in mo1a])
-        mo1b = dict([(int(k), mo1b[k]) for k in mo1b])
+    mo1a = rhf_eph._mo1_loader(mo1, 0)
+    mo1b = rhf_eph._mo1_loader(mo1, 1)
 
     mol = ephobj.mol
     mf = ephobj.base
@@ -142,66 +139,55 @@ def get_eph(ephobj, mo1, omega, vec, mo_rep):
 
     mo_coeff, mo_occ = mf.mo_coeff, mf.mo_occ
     vind = uhf_deriv_generator(mf, mf.mo_coeff, mf.mo_occ)
-    mem_now = lib.current_memory()[0]
-    max_memory = max(2000, mf.max_memory*.9-mem_now)
-    vxc1aoa, vxc1aob = _get_vxc_deriv1(ephobj, mf.mo_coeff, mf.mo_occ, max_memory)
-    nao, nmo = mo_coeff[0].shape
     mocca = mo_coeff[0][:,mo_occ[0]>0]
     moccb = mo_coeff[1][:,mo_occ[1]>0]
     dm0a = np.dot(mocca, mocca.T)
     dm0b = np.dot(moccb, moccb.T)
 
-    natoms = mol.natm
-    vcorea = []
-    vcoreb = []
-
-    for ia in range(natoms):
-        h1 = vnuc_deriv(ia)
-        moia = np.hstack((mo1a[ia], mo1b[ia]))
-        v1 = vind(moia)
-        shl0, shl1, p0, p1 = aoslices[ia]
-        shls_slice = (shl0, shl1) + (0, mol.nbas)*3
-        if abs(hyb)>1e-10:
-            vja, vjb, vka, vkb = \
-                    rhf_hess._get_jk(mol, 'int2e_ip1', 3, 's2kl',
-                                     ['ji->s2kl', -dm0a[:,p0:p1], #vja
-                                      'ji->s2kl', -dm0b[:,p0:p1], #vjb
-                                      'li->s1kj', -dm0a[:,p0:p1],
-                                      'li->s1kj', -dm0b[:,p0:p1]], #vka
-                                     shls_slice=shls_slice)
-            vhfa = vja + vjb - hyb * vka
-            vhfb = vjb + vja - hyb * vkb
-            if abs(omg) > 1e-10:
-                with mol.with_range_coulomb(omg):
-                    vka, vkb = \
+    def gen_vcore(atmlst):
+        mem_now = lib.current_memory()[0]
+        max_memory = max(2000, mf.max_memory*.9-mem_now)
+        vxc1aoa, vxc1aob = _get_vxc_deriv1(ephobj, mo_coeff, mo_occ, max_memory, atmlst)
+        vcorea = []
+        vcoreb = []
+        for k, ia in enumerate(atmlst):
+            h1 = vnuc_deriv(ia)
+            moia = np.hstack((mo1a(ia), mo1b(ia)))
+            v1 = vind(moia)
+            shl0, shl1, p0, p1 = aoslices[ia]
+            shls_slice = (shl0, shl1) + (0, mol.nbas)*3
+            if abs(hyb)>1e-10:
+                vja, vjb, vka, vkb = \
                         rhf_hess._get_jk(mol, 'int2e_ip1', 3, 's2kl',
-                                         ['li->s1kj', -dm0a[:,p0:p1],
-                                          'li->s1kj', -dm0b[:,p0:p1]], # vk1
+                                         ['ji->s2kl', -dm0a[:,p0:p1], #vja
+                                          'ji->s2kl', -dm0b[:,p0:p1], #vjb
+                                          'li->s1kj', -dm0a[:,p0:p1],
+                                          'li->s1kj', -dm0b[:,p0:p1]], #vka
                                          shls_slice=shls_slice)
-                vhfa -= (alpha-hyb) * vka
-                vhfb -= (alpha-hyb) * vkb
-        else:
-            vja, vjb = rhf_hess._get_jk(mol, 'int2e_ip1', 3, 's2kl',
-                                        ['ji->s2kl', -dm0a[:,p0:p1],
-                                         'ji->s2kl', -dm0b[:,p0:p1]], # vj1
-                                        shls_slice=shls_slice)
-            vhfa = vhfb = vja + vjb
-        vtota = h1 + v1[0] + vxc1aoa[ia] + vhfa + vhfa.transpose(0,2,1)
-        vtotb = h1 + v1[1] + vxc1aob[ia] + vhfb + vhfb.transpose(0,2,1)
-        vcorea.append(vtota)
-        vcoreb.append(vtotb)
-
-    vcorea = np.asarray(vcorea).reshape(-1,nao,nao)
-    vcoreb = np.asarray(vcoreb).reshape(-1,nao,nao)
-
-    mass = mol.atom_mass_list() * MP_ME
-    vec = rhf_eph._freq_mass_weighted_vec(vec, omega, mass)
-    mata = np.einsum('xJ,xuv->Juv', vec, vcorea)
-    matb = np.einsum('xJ,xuv->Juv', vec, vcoreb)
-    if mo_rep:
-        mata = np.einsum('Juv,up,vq->Jpq', mata, mf.mo_coeff[0].conj(), mf.mo_coeff[0], optimize=True)
-        matb = np.einsum('Juv,up,vq->Jpq', matb, mf.mo_coeff[1].conj(), mf.mo_coeff[1], optimize=True)
-    return np.asarray([mata,matb])
+                vhfa = vja + vjb - hyb * vka
+                vhfb = vjb + vja - hyb * vkb
+                if abs(omg) > 1e-10:
+                    with mol.with_range_coulomb(omg):
+                        vka, vkb = \
+                            rhf_hess._get_jk(mol, 'int2e_ip1', 3, 's2kl',
+                                             ['li->s1kj', -dm0a[:,p0:p1],
+                                              'li->s1kj', -dm0b[:,p0:p1]], # vk1
+                                             shls_slice=shls_slice)
+                    vhfa -= (alpha-hyb) * vka
+                    vhfb -= (alpha-hyb) * vkb
+            else:
+                vja, vjb = rhf_hess._get_jk(mol, 'int2e_ip1', 3, 's2kl',
+                                            ['ji->s2kl', -dm0a[:,p0:p1],
+                                             'ji->s2kl', -dm0b[:,p0:p1]], # vj1
+                                            shls_slice=shls_slice)
+                vhfa = vhfb = vja + vjb
+            vtota = h1 + v1[0] + vxc1aoa[k] + vhfa + vhfa.transpose(0,2,1)
+            vtotb = h1 + v1[1] + vxc1aob[k] + vhfb + vhfb.transpose(0,2,1)
+            vcorea.append(vtota)
+            vcoreb.append(vtotb)
+        return np.asarray([vcorea, vcoreb])
+
+    return rhf_eph.contract_eph(ephobj, gen_vcore, omega, vec, mo_rep, mo_coeff)
 
 
 class EPH(uks_hess.Hessian):
@@ -212,6 +198,18 @@ class EPH(uks_hess.Hessian):
             cutoff frequency in cm-1. Default is 80
         keep_imag_frequency : bool
             Whether to keep imaginary frequencies in the output.  Default is False
+        modes : list of int
+            Indices of the (retained) modes to compute the coupling for.
+            Default is None, meaning all modes
+        orbs : list of int
+            Indices of the MOs kept in the MO representation (mo_rep=True).
+            Default is None, meaning all MOs
+        eph_chkfile : str
+            HDF5 file to checkpoint the partial eph matrix after each batch
+            of atoms. If the file holds the partial matrix of an earlier
+            (interrupted) calculation, the calculation is resumed from it.
+            The partial matrix is removed from the file when the eph matrix
+            is completed.  Default is None
 
     Saved results
 
@@ -228,6 +226,10 @@ class EPH(uks_hess.Hessian):
         uks_hess.Hessian.__init__(self, scf_method)
         self.cutoff_frequency = cutoff_frequency
         self.keep_imag_frequency = keep_imag_frequency
+        self.modes = None
+        self.orbs = None
+        self.eph_chkfile = None
+        self._keys = self._keys.union(['modes', 'orbs', 'eph_chkfile'])
 
     get_mode = rhf_eph.get_mode
     get_eph = get_eph
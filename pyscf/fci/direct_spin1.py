@@ -698,6 +698,11 @@ class FCIBase(lib.StreamObject):
     pspace_size = getattr(__config__, 'fci_direct_spin1_FCI_pspace_size', 400)
     threads = getattr(__config__, 'fci_direct_spin1_FCI_threads', None)
     lessio = getattr(__config__, 'fci_direct_spin1_FCI_lessio', False)
+    # HDF5 file to checkpoint the davidson iterations. If the file exists, the
+    # davidson iterations are resumed from the checkpoint.
+    davidson_chkfile = None
+    # Store the subspace vectors of davidson solver in single precision
+    davidson_single_prec = getattr(__config__, 'fci_direct_spin1_FCI_davidson_single_prec', False)
 
     def __init__(self, mol=None):
         if mol is None:
@@ -724,7 +729,7 @@ class FCIBase(lib.StreamObject):
 
         keys = set(('max_cycle', 'max_space', 'conv_tol', 'lindep',
                     'level_shift', 'davidson_only', 'pspace_size', 'threads',
-                    'lessio'))
+                    'lessio', 'davidson_chkfile', 'davidson_single_prec'))
         self._keys = set(self.__dict__.keys()).union(keys)
 
     @property
@@ -783,6 +788,8 @@ class FCIBase(lib.StreamObject):
             self.converged = True
             return scipy.linalg.eigh(op)
 
+        kwargs.setdefault('chkfile', self.davidson_chkfile)
+        kwargs.setdefault('single_prec', self.davidson_single_prec)
         self.converged, e, ci = \
                 lib.davidson1(lambda xs: [op(x) for x in xs],
                               x0, precond, lessio=self.lessio, **kwargs)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# Copyright 2014-2021 The PySCF Developers. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Coulomb potential and field of an electron density on a large number of points
+
+The integrals (mu|1/|r-R||nu) are computed for blocks of points and blocks of
+shell pairs, and are contracted with the density matrix immediately. The 3-index
+tensor of the integrals is never formed for all points.
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy
+from pyscf import lib
+from pyscf.gto import moleintor
+from pyscf import __config__
+
+# Shell pairs are skipped if the estimated contributions are smaller than CUTOFF
+CUTOFF = getattr(__config__, 'gto_grid_potential_cutoff', 1e-14)
+# Number of points in each task. The Python overhead of the loop over shell
+# pairs is amortized over the points of a task. Larger blocks do not help
+# because GTOgrids_int2c evaluates the points in chunks of 312 anyway. Each
+# call then stays within a single chunk of the integral kernel.
+BLKSIZE = 312
+
+def eval_potential(mol, dm, coords, with_field=False, cutoff=CUTOFF,
+                   nthreads=None):
+    r'''Coulomb potential of the electron density at the given points
+
+    .. math::
+
+        J(R) = \sum_{\mu\nu} D_{\mu\nu} (\mu|\frac{1}{|r-R|}|\nu)
+
+    The electrostatic potential generated by the electrons is -J(R).
+
+    Args:
+        dm : 2D array or a list of 2D arrays
+            Density matrices in AO basis
+        coords : (N, 3) array
+            Coordinates of the points
+
+    Kwargs:
+        with_field : bool
+            Whether to return the derivatives dJ/dR as well.  The electric
+            field generated by the electrons is dJ/dR.
+        cutoff : float
+            Shell pairs are skipped if the product of the largest density
+            matrix element and the overlap of the most diffuse functions of
+            the two shells is smaller than cutoff.
+        nthreads : int
+            Number of threads to evaluate the blocks of points.  Default is
+            lib.num_threads().
+
+    Returns:
+        J of shape (N,) for single density matrix or (nset, N) for a list of
+        density matrices.  If with_field is set, dJ/dR of shape (N, 3) or
+        (nset, N, 3) is returned as the second value.
+
+    Examples:
+
+    >>> mol = gto.M(atom='H 0 0 0; F 0 0 1.1', basis='ccpvdz')
+    >>> dm = scf.RHF(mol).run().make_rdm1()
+    >>> coords = numpy.random.random((1000000, 3)) * 5
+    >>> vele, fele = mol.eval_potential(dm, coords, with_field=True)
+    '''
+    dm = numpy.asarray(dm)
+    is_single_dm = dm.ndim == 2
+    dms = dm.reshape(-1,mol.nao,mol.nao)
+    nset = dms.shape[0]
+    coords = numpy.asarray(coords, dtype=numpy.double, order='C').reshape(-1,3)
+    ngrids = coords.shape[0]
+    if nthreads is None:
+        nthreads = lib.num_threads()
+
+    shl_blks = _screen_shell_pairs(mol, dms, cutoff, with_field)
+    ao_loc = mol.ao_loc_nr()
+    # Density matrix blocks, transposed to match the layout of the integrals
+    dm_blks = []
+    for ia, ib, ish0, ish1, jsh0, jsh1 in shl_blks:
+        i0, i1 = ao_loc[ish0], ao_loc[ish1]
+        j0, j1 = ao_loc[jsh0], ao_loc[jsh1]
+        dm_ab = dms[:,i0:i1,j0:j1] + dms[:,j0:j1,i0:i1].transpose(0,2,1)
+        dm_blks.append(dm_ab.transpose(0,2,1).reshape(nset,-1))
+
+    intor = mol._add_suffix('int1e_grids')
+    intor_ip = mol._add_suffix('int1e_grids_ip')
+    cintopt = moleintor.make_cintopt(mol._atm, mol._bas, mol._env, intor)
+    if with_field:
+        cintopt_ip = moleintor.make_cintopt(mol._atm, mol._bas, mol._env, intor_ip)
+        dvj = numpy.empty((nset,3,ngrids))
+    vj = numpy.empty((nset,ngrids))
+    ptr_grids = mol._env.size
+
+    def eval_blk(p0, p1):
+        env = numpy.append(mol._env, coords[p0:p1].ravel())
+        env[moleintor.NGRIDS] = p1 - p0
+        env[moleintor.PTR_GRIDS] = ptr_grids
+        v = numpy.zeros((nset,p1-p0))
+        if with_field:
+            dv = numpy.zeros((nset,3,p1-p0))
+        for (ia, ib, ish0, ish1, jsh0, jsh1), dm_ab in zip(shl_blks, dm_blks):
+            shls_slice = (ish0, ish1, jsh0, jsh1)
+            nij = dm_ab.shape[1]
+            # The pairs (A, B) with A < B are needed by the field only. The
+            # potential is evaluated for A >= B with the symmetrized dm.
+            if ia >= ib:
+                # ints in F-order (ngrids,ni,nj), ints.T is C-contiguous
+                ints = moleintor.getints(intor, mol._atm, mol._bas, env,
+                                         shls_slice, hermi=0, cintopt=cintopt)
+                if ia == ib:
+                    v += lib.dot(dm_ab, ints.T.reshape(nij,-1), .5)
+                else:
+                    v += lib.dot(dm_ab, ints.T.reshape(nij,-1))
+            if with_field:
+                # ints of shape (3,ngrids,ni,nj), stored as (ngrids,ni,nj,3) in F-order
+                ints = moleintor.getints(intor_ip, mol._atm, mol._bas, env,
+                                         shls_slice, comp=3, hermi=0,
+                                         cintopt=cintopt_ip)
+                ints = ints.transpose(0,3,2,1)
+                for x in range(3):
+                    dv[:,x] += lib.dot(dm_ab, ints[x].reshape(nij,-1))
+        vj[:,p0:p1] = v
+        if with_field:
+            dvj[:,:,p0:p1] = dv
+
+    def eval_task(blks):
+        # Each thread runs the integral kernels in serial
+        with lib.with_omp_threads(1):
+            for p0, p1 in blks:
+                eval_blk(p0, p1)
+
+    blks = list(lib.prange(0, ngrids, BLKSIZE))
+    if nthreads > 1 and len(blks) > 1:
+        with ThreadPoolExecutor(max_workers=nthreads) as executor:
+            for fut in [executor.submit(eval_task, blks[i::nthreads])
+                        for i in range(nthreads)]:
+                fut.result()
+    else:
+        for p0, p1 in blks:
+            eval_blk(p0, p1)
+
+    if with_field:
+        dvj = dvj.transpose(0,2,1)
+        if is_single_dm:
+            return vj[0], dvj[0]
+        return vj, dvj
+    if is_single_dm:
+        return vj[0]
+    return vj
+
+def _screen_shell_pairs(mol, dms, cutoff, with_field=False):
+    '''Blocks of shell pairs which have non-negligible contributions to the
+    potential. A shell pair is negligible if the product of the largest
+    density matrix element of the pair and the overlap of the most diffuse
+    functions of the two shells is smaller than cutoff.
+
+    The significant shell pairs of each pair of atoms (A, B) are taken in one
+    block if none of them is negligible. Otherwise they are grouped by the
+    shells of A, each block covering the shells of B from the first to the
+    last significant one. Pairs (A, B) are generated with A >= B unless
+    with_field is set.
+
+    Returns:
+        A list of (ia, ib, ish0, ish1, jsh0, jsh1)
+    '''
+    ao_loc = mol.ao_loc_nr()
+    aoslices = mol.aoslice_by_atom()
+    bas_coords = numpy.array([mol.bas_coord(i) for i in range(mol.nbas)])
+    # The most diffuse exponent of each shell
+    bas_exp = numpy.array([mol.bas_exp(i).min() for i in range(mol.nbas)])
+    a = bas_exp[:,None]
+    b = bas_exp
+    r2 = numpy.einsum('ijx,ijx->ij', bas_coords[:,None] - bas_coords,
+                      bas_coords[:,None] - bas_coords)
+    ovlp = (4*a*b/(a+b)**2)**.75 * numpy.exp(-a*b/(a+b)*r2)
+
+    dm_max = abs(dms).max(axis=0)
+    dm_max = numpy.maximum(dm_max, dm_max.T)
+    dm_cond = numpy.maximum.reduceat(dm_max, ao_loc[:-1], axis=0)
+    dm_cond = numpy.maximum.reduceat(dm_cond, ao_loc[:-1], axis=1)
+    mask = dm_cond * ovlp >= cutoff
+
+    blocks = []
+    for ia in range(mol.natm):
+        ish0, ish1 = aoslices[ia,:2]
+        if ish0 == ish1:
+            continue
+        for ib in range(mol.natm):
+            if ib > ia and not with_field:
+                break
+            jsh0, jsh1 = aoslices[ib,:2]
+            if jsh0 == jsh1:
+                continue
+            mask_ab = mask[ish0:ish1,jsh0:jsh1]
+            if mask_ab.all():
+                blocks.append((ia, ib, ish0, ish1, jsh0, jsh1))
+                continue
+            for i in numpy.where(mask_ab.any(axis=1))[0]:
+                js = numpy.where(mask_ab[i])[0]
+                blocks.append((ia, ib, ish0+i, ish0+i+1,
+                               jsh0+js[0], jsh0+js[-1]+1))
+    return blocks
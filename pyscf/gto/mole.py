@@ -45,6 +45,7 @@ from pyscf.gto import cmd_args
 from pyscf.gto import basis
 from pyscf.gto import moleintor
 from pyscf.gto.eval_gto import eval_gto
+from pyscf.gto.grid_potential import eval_potential
 from pyscf.gto.ecp import core_configuration
 from pyscf import __config__
 
@@ -1778,6 +1779,39 @@ def same_mol(mol1, mol2, tol=1e-5, cmp_basis=True, ignore_chiral=False):
             (ignore_chiral and inspect(chg1, r1, chg2, -r2)))
 is_same_mol = same_mol
 
+def atom_hash_keys(mol):
+    '''Keys to identify the changes of a molecule between two geometries.
+
+    Returns:
+        A key for the global attributes (charge, spin, ...) and a list of keys
+        for each atom.  The key of an atom is made of the nuclear charge, the
+        coordinates, the basis and ECP functions of the atom.
+    '''
+    env = mol._env
+    def shell_keys(bas, ia, ecp=False):
+        keys = []
+        for b in bas[bas[:,ATOM_OF] == ia]:
+            nprim = b[NPRIM_OF]
+            # NCTR_OF of ECP shells is the power of r
+            nctr = b[NCTR_OF]
+            ncoef = nprim if ecp else nprim * nctr
+            exps = env[b[PTR_EXP]:b[PTR_EXP]+nprim]
+            cs = env[b[PTR_COEFF]:b[PTR_COEFF]+ncoef]
+            keys.append((b[ANG_OF], b[KAPPA_OF], nctr,
+                         exps.tobytes(), cs.tobytes()))
+        return tuple(keys)
+
+    atom_keys = []
+    for ia in range(mol.natm):
+        atom_keys.append((mol.atom_symbol(ia), mol.atom_charge(ia),
+                          mol._atm[ia,NUC_MOD_OF],
+                          mol.atom_coord(ia).tobytes(),
+                          shell_keys(mol._bas, ia),
+                          shell_keys(mol._ecpbas, ia, True)))
+    mol_key = (mol.natm, mol.nbas, mol.charge, mol.spin, mol.cart,
+               mol.symmetry, mol.symmetry_subgroup, mol.omega)
+    return mol_key, atom_keys
+
 def chiral_mol(mol1, mol2=None):
     '''Detect whether the given molelcule is chiral molecule or two molecules
     are chiral isomers.
@@ -3391,6 +3425,7 @@ class Mole(lib.StreamObject):
                                           self._env, comp)
 
     eval_ao = eval_gto = eval_gto
+    eval_potential = eval_potential
 
     energy_nuc = energy_nuc
     def get_enuc(self):
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# Copyright 2014-2021 The PySCF Developers. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import numpy
+from pyscf import gto
+from pyscf import lib
+from pyscf.gto import grid_potential
+
+
+def setUpModule():
+    global mol, dm, coords
+    mol = gto.M(atom='''
+    O    0.   0.       0.
+    H    0.   -0.757   0.587
+    H    0.   0.757    0.587
+    He   6.   0.       0.''', basis='ccpvdz', verbose=0)
+    numpy.random.seed(1)
+    dm = numpy.random.random((2,mol.nao,mol.nao)) - .5
+    coords = numpy.random.random((1000,3)) * 8 - 1
+
+def tearDownModule():
+    global mol, dm, coords
+    del mol, dm, coords
+
+class KnownValues(unittest.TestCase):
+    def test_eval_potential(self):
+        ints = mol.intor('int1e_grids', grids=coords)
+        ref = numpy.einsum('gij,nij->ng', ints, dm)
+        v = mol.eval_potential(dm, coords)
+        self.assertAlmostEqual(abs(v - ref).max(), 0, 12)
+
+        v = mol.eval_potential(dm[0], coords, nthreads=3)
+        self.assertEqual(v.shape, (1000,))
+        self.assertAlmostEqual(abs(v - ref[0]).max(), 0, 12)
+
+    def test_eval_field(self):
+        v, dv = mol.eval_potential(dm, coords[:400], with_field=True)
+        self.assertEqual(dv.shape, (2,400,3))
+        ip = mol.intor('int1e_grids_ip', grids=coords[:400])
+        ref = numpy.einsum('xgij,nij->ngx', ip, dm + dm.transpose(0,2,1))
+        self.assertAlmostEqual(abs(dv - ref).max(), 0, 12)
+
+        disp = 1e-4
+        c1 = coords[:400].copy()
+        c1[:,2] += disp
+        v1 = mol.eval_potential(dm, c1)
+        c1[:,2] -= 2*disp
+        v2 = mol.eval_potential(dm, c1)
+        self.assertAlmostEqual(abs((v1-v2)/(2*disp) - dv[:,:,2]).max(), 0, 6)
+
+    def test_screening(self):
+        blks = grid_potential._screen_shell_pairs(mol, dm, 1e-14)
+        self.assertEqual(len(set((b[0], b[1]) for b in blks)), 10)
+        # Some shell pairs are skipped within the atom pairs. All atom pairs
+        # together have 144 shell pairs.
+        self.assertEqual(sum((b[3]-b[2])*(b[5]-b[4]) for b in blks), 108)
+        # He is far from the other atoms
+        blks = grid_potential._screen_shell_pairs(mol, dm, 1e-3)
+        self.assertEqual(len(set((b[0], b[1]) for b in blks)), 7)
+        v = mol.eval_potential(dm, coords, cutoff=1e-3)
+        ref = mol.eval_potential(dm, coords)
+        self.assertAlmostEqual(abs(v - ref).max(), 0, 2)
+
+
+if __name__ == "__main__":
+    print("Full Tests for grid potential")
+    unittest.main()
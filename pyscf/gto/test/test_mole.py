@@ -181,6 +181,23 @@ C    SP
                              H 0.0000000000 0.0000000000 0.0516931447''')
         self.assertTrue(not gto.same_mol(mol3, mol2))
 
+    def test_atom_hash_keys(self):
+        mol1 = gto.M(atom='O 0 0 0; H 0 -.757 .587; H 0 .757 .587', basis='631g')
+        mol2 = mol1.set_geom_('O 0 0 0; H 0 -.757 .587; H 0 .76 .587', inplace=False)
+        key1, atom_keys1 = gto.atom_hash_keys(mol1)
+        key2, atom_keys2 = gto.atom_hash_keys(mol2)
+        self.assertEqual(key1, key2)
+        self.assertEqual([k1 == k2 for k1, k2 in zip(atom_keys1, atom_keys2)],
+                         [True, True, False])
+        # same coordinates but a different basis on the first H atom
+        mol3 = gto.M(atom='O 0 0 0; H1 0 -.757 .587; H 0 .757 .587',
+                     basis={'O': '631g', 'H': '631g', 'H1': 'sto3g'})
+        atom_keys3 = gto.atom_hash_keys(mol3)[1]
+        self.assertEqual([k1 == k3 for k1, k3 in zip(atom_keys1, atom_keys3)],
+                         [True, False, True])
+        mol4 = mol1.copy().set(charge=2).build()
+        self.assertNotEqual(gto.atom_hash_keys(mol4)[0], key1)
+
     def test_same_mol2(self):
         mol1 = gto.M(atom='H 0.0052917700 0.0000000000 -0.8746076326; F 0.0000000000 0.0000000000 0.0464013747')
         mol2 = gto.M(atom='H 0.0000000000 0.0000000000 -0.8746076326; F 0.0052917700 0.0000000000 0.0464013747')
@@ -20,12 +20,15 @@
 Extension to scipy.linalg module
 '''
 
+import os
 import sys
 import inspect
 import warnings
+import functools
 from functools import reduce
 import numpy
 import scipy.linalg
+import h5py
 from pyscf.lib import logger
 from pyscf.lib import numpy_helper
 from pyscf.lib import misc
@@ -50,6 +53,8 @@ PROJECT_OUT_CONV_EIGS = \
         getattr(__config__, 'lib_linalg_helper_davidson_project_out_eigs', False)
 
 FOLLOW_STATE = getattr(__config__, 'lib_linalg_helper_davidson_follow_state', False)
+# Remove the checkpoint file of the Davidson solver after convergence
+REMOVE_CHKFILE = getattr(__config__, 'lib_linalg_helper_davidson_remove_chkfile', False)
 
 
 def safe_eigh(h, s, lindep=SAFE_EIGH_LINDEP):
@@ -288,12 +293,25 @@ def davidson(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
     else:
         return e, x
 
+def _with_checkpoint(davidson):
+    '''Open the checkpoint file given by the chkfile argument of the Davidson
+    solver and close it when the solver returns or is interrupted.'''
+    @functools.wraps(davidson)
+    def solver(*args, **kwargs):
+        chkfile = kwargs.get('chkfile')
+        if chkfile is None:
+            return davidson(*args, **kwargs)
+        with _DavidsonCheckpoint(chkfile) as kwargs['chkfile']:
+            return davidson(*args, **kwargs)
+    return solver
+
+@_with_checkpoint
 def davidson1(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
               lindep=DAVIDSON_LINDEP, max_memory=MAX_MEMORY,
               dot=numpy.dot, callback=None,
               nroots=1, lessio=False, pick=None, verbose=logger.WARN,
               follow_state=FOLLOW_STATE, tol_residual=None,
-              fill_heff=_fill_heff_hermitian):
+              fill_heff=_fill_heff_hermitian, chkfile=None, single_prec=False):
     r'''Davidson diagonalization method to solve  a c = e c.  Ref
     [1] E.R. Davidson, J. Comput. Phys. 17 (1), 87-94 (1975).
     [2] http://people.inf.ethz.ch/arbenz/ewp/Lnotes/chapter11.pdf
@@ -350,6 +368,19 @@ def davidson1(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
             If the solution dramatically changes in two iterations, clean the
             subspace and restart the iteration with the old solution.  It can
             help to improve numerical stability.  Default is False.
+        chkfile : str
+            HDF5 file to checkpoint the subspace vectors, the projected
+            Hamiltonian and the convergence state in every iteration. If the
+            file holds the checkpoint of an earlier (interrupted) run for the
+            same problem, the iterations are resumed from the checkpoint.
+            The subspace vectors are stored in this file instead of memory.
+            The file is kept after the solver converges unless
+            lib_linalg_helper_davidson_remove_chkfile is set in __config__.
+        single_prec : bool
+            Whether to store the subspace vectors (and their products with
+            the matrix) in single precision to halve the memory or disk
+            footprint. The residual norm cannot be converged below ~1e-6
+            (relative to the norm of the matrix) in this mode.
 
     Returns:
         conv : bool
@@ -392,7 +423,16 @@ def davidson1(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
     #max_cycle = min(max_cycle, x0[0].size)
     max_space = max_space + (nroots-1) * 3
     # max_space*2 for holding ax and xs, nroots*2 for holding axt and xt
-    _incore = max_memory*1e6/x0[0].nbytes > max_space*2+nroots*3
+    if single_prec:
+        _incore = max_memory*1e6/x0[0].nbytes > max_space+nroots*3
+    else:
+        _incore = max_memory*1e6/x0[0].nbytes > max_space*2+nroots*3
+    if chkfile is not None:
+        # The subspace is held by the checkpoint file. chkfile was opened as
+        # a _DavidsonCheckpoint object by the decorator _with_checkpoint.
+        chk = chkfile
+        chk.log = log
+        _incore = False
     lessio = lessio and not _incore
     log.debug1('max_cycle %d  max_space %d  max_memory %d  incore %s',
                max_cycle, max_space, max_memory, _incore)
@@ -404,10 +444,31 @@ def davidson1(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
     conv = [False] * nroots
     emin = None
     norm_min = 1
-
-    for icyc in range(max_cycle):
+    icyc0 = 0
+    if chkfile is not None:
+        fingerprint = _precond_fingerprint(precond, x0[0])
+        x0, resumed = chk.load(x0, nroots, max_space, fingerprint)
+        if resumed:
+            icyc0 = resumed['icyc'] + 1
+            fresh_start = resumed['fresh_start']
+            max_dx_last = resumed['max_dx_last']
+            e, v, conv = resumed['e'], resumed['v'], list(resumed['conv'])
+            xt = list(resumed['xt'])
+            dtype = resumed['heff'].dtype
+            heff = numpy.empty((max_space+nroots,max_space+nroots), dtype=dtype)
+            if not fresh_start:
+                # Vectors appended to the subspace after the last completed
+                # iteration are discarded
+                space = resumed['space']
+                xs, ax = chk.subspace(space)
+                heff[:space,:space] = resumed['heff']
+            log.debug('Resume davidson from cycle %d of %s', icyc0, chk.filename)
+
+    for icyc in range(icyc0, max_cycle):
         if fresh_start:
-            if _incore:
+            if chkfile is not None:
+                xs, ax = chk.new_subspace()
+            elif _incore:
                 xs = []
                 ax = []
             else:
@@ -434,8 +495,12 @@ def davidson1(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
 
         axt = aop(xt)
         for k, xi in enumerate(xt):
-            xs.append(xt[k])
-            ax.append(axt[k])
+            if single_prec:
+                xs.append(_to_single_prec(xt[k]))
+                ax.append(_to_single_prec(axt[k]))
+            else:
+                xs.append(xt[k])
+                ax.append(axt[k])
         rnow = len(xt)
         head, space = space, space+rnow
 
@@ -564,6 +629,10 @@ def davidson1(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
         max_dx_last = max_dx_norm
         fresh_start = space+nroots > max_space
 
+        if chkfile is not None:
+            chk.dump(icyc, fresh_start, max_dx_last, e, v, conv, x0, xt,
+                     heff[:space,:space], nroots, max_space, fingerprint)
+
         if callable(callback):
             callback(locals())
 
@@ -580,6 +649,8 @@ def davidson1(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
         msg = 'Not enough eigenvectors (len(x0)=%d, nroots=%d)' % (len(x0), nroots)
         warnings.warn(msg)
 
+    if chkfile is not None and all(conv):
+        chk.converged = True
     return numpy.asarray(conv), e, x0
 
 
@@ -753,12 +824,14 @@ def eig(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
             return e, x
 davidson_nosym = eig
 
+@_with_checkpoint
 def davidson_nosym1(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
                     lindep=DAVIDSON_LINDEP, max_memory=MAX_MEMORY,
                     dot=numpy.dot, callback=None,
                     nroots=1, lessio=False, left=False, pick=pick_real_eigs,
                     verbose=logger.WARN, follow_state=FOLLOW_STATE,
-                    tol_residual=None, fill_heff=_fill_heff):
+                    tol_residual=None, fill_heff=_fill_heff, chkfile=None,
+                    single_prec=False):
     if isinstance(verbose, logger.Logger):
         log = verbose
     else:
@@ -780,7 +853,16 @@ def davidson_nosym1(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
     #max_cycle = min(max_cycle, x0[0].size)
     max_space = max_space + (nroots-1) * 4
     # max_space*2 for holding ax and xs, nroots*2 for holding axt and xt
-    _incore = max_memory*1e6/x0[0].nbytes > max_space*2+nroots*3
+    if single_prec:
+        _incore = max_memory*1e6/x0[0].nbytes > max_space+nroots*3
+    else:
+        _incore = max_memory*1e6/x0[0].nbytes > max_space*2+nroots*3
+    if chkfile is not None:
+        # The subspace is held by the checkpoint file. chkfile was opened as
+        # a _DavidsonCheckpoint object by the decorator _with_checkpoint.
+        chk = chkfile
+        chk.log = log
+        _incore = False
     lessio = lessio and not _incore
     log.debug1('max_cycle %d  max_space %d  max_memory %d  incore %s',
                max_cycle, max_space, max_memory, _incore)
@@ -792,10 +874,31 @@ def davidson_nosym1(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
     conv = [False] * nroots
     emin = None
     norm_min = 1
-
-    for icyc in range(max_cycle):
+    icyc0 = 0
+    if chkfile is not None:
+        fingerprint = _precond_fingerprint(precond, x0[0])
+        x0, resumed = chk.load(x0, nroots, max_space, fingerprint)
+        if resumed:
+            icyc0 = resumed['icyc'] + 1
+            fresh_start = resumed['fresh_start']
+            max_dx_last = resumed['max_dx_last']
+            e, v, conv = resumed['e'], resumed['v'], list(resumed['conv'])
+            xt = list(resumed['xt'])
+            dtype = resumed['heff'].dtype
+            heff = numpy.empty((max_space+nroots,max_space+nroots), dtype=dtype)
+            if not fresh_start:
+                # Vectors appended to the subspace after the last completed
+                # iteration are discarded
+                space = resumed['space']
+                xs, ax = chk.subspace(space)
+                heff[:space,:space] = resumed['heff']
+            log.debug('Resume davidson from cycle %d of %s', icyc0, chk.filename)
+
+    for icyc in range(icyc0, max_cycle):
         if fresh_start:
-            if _incore:
+            if chkfile is not None:
+                xs, ax = chk.new_subspace()
+            elif _incore:
                 xs = []
                 ax = []
             else:
@@ -820,8 +923,12 @@ def davidson_nosym1(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
 
         axt = aop(xt)
         for k, xi in enumerate(xt):
-            xs.append(xt[k])
-            ax.append(axt[k])
+            if single_prec:
+                xs.append(_to_single_prec(xt[k]))
+                ax.append(_to_single_prec(axt[k]))
+            else:
+                xs.append(xt[k])
+                ax.append(axt[k])
         rnow = len(xt)
         head, space = space, space+rnow
 
@@ -949,6 +1056,10 @@ def davidson_nosym1(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
         max_dx_last = max_dx_norm
         fresh_start = space+nroots > max_space
 
+        if chkfile is not None:
+            chk.dump(icyc, fresh_start, max_dx_last, e, v, conv, x0, xt,
+                     heff[:space,:space], nroots, max_space, fingerprint)
+
         if callable(callback):
             callback(locals())
 
@@ -971,9 +1082,13 @@ def davidson_nosym1(aop, x0, precond, tol=1e-12, max_cycle=50, max_space=12,
         x0 = _gen_x0(v[:,:nroots], xs)
         xl = [x for x in xl]  # nparray -> list
         x0 = [x for x in x0]  # nparray -> list
+        if chkfile is not None and all(conv):
+            chk.converged = True
         return numpy.asarray(conv), e[:nroots], xl, x0
     else:
         x0 = [x for x in x0]  # nparray -> list
+        if chkfile is not None and all(conv):
+            chk.converged = True
         return numpy.asarray(conv), e, x0
 
 def dgeev(abop, x0, precond, type=1, tol=1e-12, max_cycle=50, max_space=12,
@@ -1564,10 +1679,24 @@ def _sort_elast(elast, conv_last, vlast, v, fresh_start, log):
     return [elast[i] for i in idx], [conv_last[i] for i in idx]
 
 
+def _to_single_prec(x):
+    x = numpy.asarray(x)
+    if x.dtype == numpy.complex128:
+        return x.astype(numpy.complex64)
+    elif x.dtype == numpy.double:
+        return x.astype(numpy.float32)
+    else:
+        return x
+
 class _Xlist(list):
-    def __init__(self):
-        self.scr_h5 = misc.H5TmpFile()
-        self.index = []
+    def __init__(self, scr_h5=None):
+        if scr_h5 is None:
+            self.scr_h5 = misc.H5TmpFile()
+            self.index = []
+        else:
+            # An HDF5 group which may hold the vectors of an earlier run
+            self.scr_h5 = scr_h5
+            self.index = sorted(int(key) for key in scr_h5.keys())
 
     def __getitem__(self, n):
         key = self.index[n]
@@ -1582,7 +1711,7 @@ class _Xlist(list):
         self.index.append(key)
 
         self.scr_h5[str(key)] = x
-        self.scr_h5.flush()
+        self.scr_h5.file.flush()
 
     def extend(self, x):
         for xi in x:
@@ -1591,7 +1720,7 @@ class _Xlist(list):
     def __setitem__(self, n, x):
         key = self.index[n]
         self.scr_h5[str(key)][:] = x
-        self.scr_h5.flush()
+        self.scr_h5.file.flush()
 
     def __len__(self):
         return len(self.index)
@@ -1600,6 +1729,125 @@ class _Xlist(list):
         key = self.index.pop(index)
         del(self.scr_h5[str(key)])
 
+def _precond_fingerprint(precond, x):
+    '''Fingerprint of the preconditioner to identify the problem saved in the
+    checkpoint file'''
+    dx = numpy.cos(numpy.arange(x.size) + .5).astype(x.dtype).reshape(x.shape)
+    return misc.fp(precond(dx, 0., dx.copy()))
+
+class _DavidsonCheckpoint(object):
+    '''Checkpoint file of the Davidson solvers.
+
+    The subspace vectors xs and ax are written to the groups "xs" and "ax"
+    when they are added to the subspace. The remaining iteration state
+    (projected Hamiltonian, eigenvalues, eigenvectors of the projected
+    Hamiltonian, convergence flags, the current solution x0 and the trial
+    vectors of the next iteration) is updated in the group "state" at the end
+    of every iteration. The size of the subspace is saved in the state so
+    that the vectors appended by an interrupted iteration can be dropped.
+    The state is tagged with a fingerprint of the preconditioner. It is
+    discarded if the fingerprint does not match the current problem.
+    '''
+    def __init__(self, filename, log=None):
+        self.filename = filename
+        self.log = log
+        self.converged = False
+        self.h5 = h5py.File(filename, 'a')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close(delete=self.converged and REMOVE_CHKFILE)
+
+    def load(self, x0, nroots, max_space, fingerprint):
+        '''Initial guess and the state to resume the iterations.'''
+        if 'state' not in self.h5:
+            return x0, None
+
+        state = self.h5['state']
+        x0_chk = state['x0'][:]
+        if x0_chk.shape[1] != x0[0].size:
+            self.log.warn('Vector size in checkpoint file %s does not match '
+                          'the problem. Checkpoint is ignored.', self.filename)
+            del self.h5['state']
+            return x0, None
+        if ('fingerprint' not in state.attrs or
+            abs(state.attrs['fingerprint'] - fingerprint) > 1e-12 * max(1, abs(fingerprint))):
+            self.log.warn('Checkpoint file %s was generated for a different '
+                          'problem. Checkpoint is ignored.', self.filename)
+            del self.h5['state']
+            return x0, None
+
+        x0 = list(x0_chk) + list(x0[len(x0_chk):])
+        if state.attrs['nroots'] != nroots or state.attrs['max_space'] != max_space:
+            self.log.info('Checkpoint file %s was generated with different '
+                          'nroots or max_space. Restart davidson from the '
+                          'saved eigenvectors.', self.filename)
+            return x0, None
+
+        resumed = {
+            'icyc': int(state.attrs['icyc']),
+            'space': int(state.attrs['space']),
+            'fresh_start': bool(state.attrs['fresh_start']),
+            'max_dx_last': float(state.attrs['max_dx_last']),
+            'e': state['e'][:],
+            'v': state['v'][:],
+            'conv': state['conv'][:],
+            'xt': state['xt'][:],
+            'heff': state['heff'][:],
+        }
+        return x0, resumed
+
+    def subspace(self, space):
+        xs = _Xlist(self.h5['xs'])
+        ax = _Xlist(self.h5['ax'])
+        for xlist in (xs, ax):
+            while len(xlist) > space:
+                xlist.pop(-1)
+        return xs, ax
+
+    def new_subspace(self):
+        for key in ('xs', 'ax'):
+            if key in self.h5:
+                del self.h5[key]
+        return (_Xlist(self.h5.create_group('xs')),
+                _Xlist(self.h5.create_group('ax')))
+
+    def dump(self, icyc, fresh_start, max_dx_last, e, v, conv, x0, xt,
+             heff, nroots, max_space, fingerprint):
+        if 'state.new' in self.h5:
+            del self.h5['state.new']
+        state = self.h5.create_group('state.new')
+        state.attrs['icyc'] = icyc
+        state.attrs['fresh_start'] = fresh_start
+        state.attrs['max_dx_last'] = max_dx_last
+        state.attrs['nroots'] = nroots
+        state.attrs['max_space'] = max_space
+        state.attrs['space'] = heff.shape[0]
+        state.attrs['fingerprint'] = fingerprint
+        state['e'] = e
+        state['v'] = v
+        state['conv'] = numpy.asarray(conv, dtype=bool)
+        state['x0'] = numpy.asarray(x0)
+        if len(xt) > 0:
+            state['xt'] = numpy.asarray(xt)
+        else:
+            state['xt'] = numpy.zeros((0, x0[0].size))
+        state['heff'] = heff
+        # Replace the state of last iteration only when the new state is
+        # completed
+        if 'state' in self.h5:
+            del self.h5['state']
+        self.h5.move('state.new', 'state')
+        self.h5.flush()
+
+    def close(self, delete=False):
+        if self.h5:
+            self.h5.close()
+        if delete and os.path.isfile(self.filename):
+            os.remove(self.filename)
+
 del(SAFE_EIGH_LINDEP, DAVIDSON_LINDEP, DSOLVE_LINDEP, MAX_MEMORY)
 
 
@@ -262,10 +262,50 @@ def prange_tril(start, stop, blocksize):
     displs = [x+start for x in _blocksize_partition(cum_costs, blocksize)]
     return zip(displs[:-1], displs[1:])
 
-def map_with_prefetch(func, *iterables):
+def _prefetch_depth_in_budget(result, depth, max_memory):
+    '''Reduce the prefetch depth so that the results of the prefetched tasks
+    fit the memory budget (in MB)'''
+    if isinstance(result, numpy.ndarray):
+        nbytes = result.nbytes
+    elif isinstance(result, (tuple, list)):
+        nbytes = sum([getattr(x, 'nbytes', 0) for x in result])
+    else:
+        nbytes = getattr(result, 'nbytes', 0)
+    if nbytes > 0:
+        depth = min(depth, max(1, int(max_memory*1e6 / nbytes)))
+    return depth
+
+def map_with_prefetch(func, *iterables, **kwargs):
     '''
-    Apply function to an task and prefetch the next task
+    Apply function to an task and prefetch the next task(s)
+
+    Kwargs:
+        depth : int
+            Number of tasks to prefetch ahead of the task being consumed.
+            Default is lib.misc.PREFETCH_DEPTH (1).
+        nthreads : int
+            Number of background threads to run the prefetch tasks.
+            Default is lib.misc.IO_THREADS (1).
+        max_memory : float
+            Memory budget (in MB) for the prefetched results. The prefetch
+            depth is reduced if the results of the prefetched tasks do not
+            fit the budget. It is estimated based on the size of the first
+            result.
+
+    Examples:
+
+    >>> f = lib.H5TmpFile()
+    >>> f['a'] = numpy.arange(100.)
+    >>> def load(p0, p1):
+    ...     return f['a'][p0:p1]
+    >>> p0, p1 = zip(*lib.prange(0, 100, 10))
+    >>> for dat in lib.map_with_prefetch(load, p0, p1, depth=2, nthreads=2):
+    ...     print(dat.sum())
     '''
+    depth = max(1, kwargs.get('depth', PREFETCH_DEPTH))
+    nthreads = max(1, kwargs.get('nthreads', IO_THREADS))
+    max_memory = kwargs.get('max_memory', None)
+
     global_import_lock = False
     if sys.version_info < (3, 6):
         import imp
@@ -276,17 +316,19 @@ def map_with_prefetch(func, *iterables):
             yield func(*task)
 
     elif ThreadPoolExecutor is not None:
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = None
+        with ThreadPoolExecutor(max_workers=nthreads) as executor:
+            futures = collections.deque()
             for task in zip(*iterables):
-                if future is None:
-                    future = executor.submit(func, *task)
-                else:
-                    result = future.result()
-                    future = executor.submit(func, *task)
+                futures.append(executor.submit(func, *task))
+                while len(futures) > depth:
+                    result = futures.popleft().result()
+                    if max_memory is not None and depth > 1:
+                        depth = _prefetch_depth_in_budget(result, depth, max_memory)
                     yield result
-            if future is not None:
-                yield future.result()
+                    result = None
+            while futures:
+                yield futures.popleft().result()
+
     else:
         def func_with_buf(_output_buf, *args):
             _output_buf[0] = func(*args)
@@ -779,6 +821,10 @@ bg = background = bg_thread = background_thread
 bp = bg_process = background_process
 
 ASYNC_IO = getattr(__config__, 'ASYNC_IO', True)
+# The number of tasks to prefetch and the number of I/O threads in
+# map_with_prefetch
+PREFETCH_DEPTH = getattr(__config__, 'lib_misc_prefetch_depth', 1)
+IO_THREADS = getattr(__config__, 'lib_misc_io_threads', 1)
 class call_in_background(object):
     '''Within this macro, function(s) can be executed asynchronously (the
     given functions are executed in background).
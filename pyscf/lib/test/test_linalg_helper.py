@@ -15,10 +15,13 @@
 # Author: Qiming Sun <osirpt.sun@gmail.com>
 #
 
+import os
 import unittest
 import numpy
 import scipy.linalg
 import tempfile
+from pyscf import lib
+from pyscf.lib import linalg_helper
 from pyscf import gto
 from pyscf import scf
 from pyscf import fci
@@ -46,6 +49,96 @@ class KnownValues(unittest.TestCase):
         ci = fci.FCI(mol.RHF().run()).run()
         self.assertAlmostEqual(ci.e_tot, -74.74294263255416, 9)
 
+    def test_davidson_restart_from_chkfile(self):
+        numpy.random.seed(12)
+        n = 200
+        a = numpy.random.random((n,n)) * .1
+        a = a + a.T + numpy.diag(numpy.arange(n) * .3)
+        ncall = [0]
+        def aop(xs):
+            ncall[0] += 1
+            return [a.dot(x) for x in xs]
+        x0 = [numpy.eye(n)[i] + 1e-2 for i in range(3)]
+        e_ref = scipy.linalg.eigh(a)[0][:3]
+
+        for eig in (lib.davidson1, lib.davidson_nosym1):
+            conv, e0, c0 = eig(aop, x0, a.diagonal(), nroots=3, max_space=4,
+                               tol=1e-12)
+            ncall_ref, ncall[0] = ncall[0], 0
+            with tempfile.TemporaryDirectory(dir=lib.param.TMPDIR) as tmpdir:
+                chkfile = os.path.join(tmpdir, 'davidson.h5')
+                conv, e1, c1 = eig(aop, x0, a.diagonal(), nroots=3, max_space=4,
+                                   tol=1e-12, max_cycle=5, chkfile=chkfile)
+                self.assertFalse(all(conv))
+                self.assertTrue(os.path.isfile(chkfile))
+                conv, e1, c1 = eig(aop, x0, a.diagonal(), nroots=3, max_space=4,
+                                   tol=1e-12, chkfile=chkfile)
+                # The file provided by the caller is not removed by default
+                self.assertTrue(os.path.isfile(chkfile))
+                self.assertTrue(all(conv))
+                self.assertEqual(ncall[0], ncall_ref)
+                self.assertAlmostEqual(abs(e1 - e_ref).max(), 0, 9)
+
+                with lib.temporary_env(linalg_helper, REMOVE_CHKFILE=True):
+                    conv, e1, c1 = eig(aop, x0, a.diagonal(), nroots=3,
+                                       max_space=4, tol=1e-12, chkfile=chkfile)
+                self.assertTrue(all(conv))
+                self.assertAlmostEqual(abs(e1 - e_ref).max(), 0, 9)
+                self.assertFalse(os.path.isfile(chkfile))
+            ncall[0] = 0
+
+    def test_davidson_resume_interrupted(self):
+        numpy.random.seed(12)
+        n = 200
+        a = numpy.random.random((n,n)) * .1
+        a = a + a.T + numpy.diag(numpy.arange(n) * .3)
+        aop = lambda xs: [a.dot(x) for x in xs]
+        x0 = [numpy.eye(n)[i] + 1e-2 for i in range(3)]
+        e_ref = scipy.linalg.eigh(a)[0][:3]
+        diag_precond = lib.make_diag_precond(a.diagonal())
+
+        for eig in (lib.davidson1, lib.davidson_nosym1):
+            ncall = [0]
+            def precond(dx, e, x0):
+                ncall[0] += 1
+                if ncall[0] == 7:
+                    raise KeyboardInterrupt
+                return diag_precond(dx, e, x0)
+            with tempfile.TemporaryDirectory(dir=lib.param.TMPDIR) as tmpdir:
+                chkfile = os.path.join(tmpdir, 'davidson.h5')
+                # The solver is killed in the middle of an iteration, after
+                # the new trial vectors were written to the subspace
+                with self.assertRaises(KeyboardInterrupt):
+                    eig(aop, x0, precond, nroots=3, max_space=4, tol=1e-12,
+                        chkfile=chkfile)
+                conv, e1, c1 = eig(aop, x0, precond, nroots=3, max_space=4,
+                                   tol=1e-12, chkfile=chkfile)
+                self.assertTrue(all(conv))
+                self.assertAlmostEqual(abs(e1 - e_ref).max(), 0, 9)
+
+                # Checkpoint of a different problem is rejected
+                conv, e1, c1 = eig(aop, x0, a.diagonal(), nroots=3, max_space=4,
+                                   tol=1e-12, max_cycle=5, chkfile=chkfile)
+                b = a + numpy.diag(numpy.arange(n) * .01)
+                conv, e2, c2 = eig(lambda xs: [b.dot(x) for x in xs], x0,
+                                   b.diagonal(), nroots=3, max_space=4,
+                                   tol=1e-12, chkfile=chkfile)
+                self.assertTrue(all(conv))
+                self.assertAlmostEqual(abs(e2 - scipy.linalg.eigh(b)[0][:3]).max(), 0, 9)
+
+    def test_davidson_single_prec(self):
+        numpy.random.seed(12)
+        n = 200
+        a = numpy.random.random((n,n)) * .1
+        a = a + a.T + numpy.diag(numpy.arange(n) * .3)
+        aop = lambda xs: [a.dot(x) for x in xs]
+        x0 = [numpy.eye(n)[i] + 1e-2 for i in range(3)]
+        e_ref = scipy.linalg.eigh(a)[0][:3]
+        conv, e, c = lib.davidson1(aop, x0, a.diagonal(), nroots=3, tol=1e-10,
+                                   single_prec=True)
+        self.assertTrue(all(conv))
+        self.assertAlmostEqual(abs(e - e_ref).max(), 0, 9)
+
 
 if __name__ == "__main__":
     print("Full Tests for linalg_helper")
@@ -30,6 +30,21 @@ class KnownValues(unittest.TestCase):
 
         self.assertRaises(lib.ThreadRuntimeError, bg_raise)
 
+    def test_map_with_prefetch(self):
+        ref = [numpy.arange(i, i+10.) for i in range(0, 100, 10)]
+        def load(p0, p1):
+            return numpy.arange(p0, p1, dtype=float)
+        p0, p1 = zip(*lib.prange(0, 100, 10))
+        for kwargs in ({}, {'depth': 3, 'nthreads': 2},
+                       {'depth': 4, 'nthreads': 3, 'max_memory': 1e-4}):
+            out = list(lib.map_with_prefetch(load, p0, p1, **kwargs))
+            self.assertEqual(len(out), len(ref))
+            for x, y in zip(out, ref):
+                self.assertTrue(numpy.array_equal(x, y))
+
+        self.assertEqual(lib.misc._prefetch_depth_in_budget(
+            numpy.zeros(1000), 4, 0.02), 2)
+
     def test_index_tril_to_pair(self):
         i_j = (numpy.random.random((2,30)) * 100).astype(int)
         i0 = numpy.max(i_j, axis=0)
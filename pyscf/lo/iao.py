@@ -77,35 +77,39 @@ def iao(mol, orbocc, minao=MINAO, kpts=None):
         s12 = gto.mole.intor_cross('int1e_ovlp', mol, pmol)
 
     if len(s1.shape) == 2:
-        s21 = s12.conj().T
-        s1cd = scipy.linalg.cho_factor(s1)
-        s2cd = scipy.linalg.cho_factor(s2)
-        p12 = scipy.linalg.cho_solve(s1cd, s12)
-        ctild = scipy.linalg.cho_solve(s2cd, numpy.dot(s21, orbocc))
-        ctild = scipy.linalg.cho_solve(s1cd, numpy.dot(s12, ctild))
-        ctild = vec_lowdin(ctild, s1)
-        ccs1 = reduce(numpy.dot, (orbocc, orbocc.conj().T, s1))
-        ccs2 = reduce(numpy.dot, (ctild, ctild.conj().T, s1))
-        #a is the set of IAOs in the original basis
-        a = (p12 + reduce(numpy.dot, (ccs1, ccs2, p12)) * 2
-             - numpy.dot(ccs1, p12) - numpy.dot(ccs2, p12))
+        a = _iao_sub(s1, s2, s12, orbocc)
     else: # k point sampling
-        s21 = numpy.swapaxes(s12, -1, -2).conj()
         nkpts = len(kpts)
         a = numpy.zeros((nkpts, s1.shape[-1], s2.shape[-1]), dtype=numpy.complex128)
         for k in range(nkpts):
-            # ZHC NOTE check the case, at some kpts, there is no occupied MO.
-            s1cd_k = scipy.linalg.cho_factor(s1[k])
-            s2cd_k = scipy.linalg.cho_factor(s2[k])
-            p12_k = scipy.linalg.cho_solve(s1cd_k, s12[k])
-            ctild_k = scipy.linalg.cho_solve(s2cd_k, numpy.dot(s21[k], orbocc[k]))
-            ctild_k = scipy.linalg.cho_solve(s1cd_k, numpy.dot(s12[k], ctild_k))
-            ctild_k = vec_lowdin(ctild_k, s1[k])
-            ccs1_k = reduce(numpy.dot, (orbocc[k], orbocc[k].conj().T, s1[k]))
-            ccs2_k = reduce(numpy.dot, (ctild_k, ctild_k.conj().T, s1[k]))
-            #a is the set of IAOs in the original basis
-            a[k] = (p12_k + reduce(numpy.dot, (ccs1_k, ccs2_k, p12_k)) * 2
-                    - numpy.dot(ccs1_k, p12_k) - numpy.dot(ccs2_k, p12_k))
+            a[k] = _iao_sub(s1[k], s2[k], s12[k], orbocc[k])
+    return a
+
+def _iao_sub(s1, s2, s12, orbocc):
+    '''IAOs for one set of overlap matrices (a molecule or a k-point).
+
+    The projectors |C><C|S1 are applied in the low-rank form. The (nao,nao)
+    projection matrices are not constructed.
+    '''
+    s21 = s12.conj().T
+    s1cd = scipy.linalg.cho_factor(s1)
+    p12 = scipy.linalg.cho_solve(s1cd, s12)
+    # ZHC NOTE check the case, at some kpts, there is no occupied MO.
+    if orbocc.shape[1] == 0:
+        return p12
+
+    s2cd = scipy.linalg.cho_factor(s2)
+    ctild = scipy.linalg.cho_solve(s2cd, numpy.dot(s21, orbocc))
+    ctild = scipy.linalg.cho_solve(s1cd, numpy.dot(s12, ctild))
+    ctild = vec_lowdin(ctild, s1)
+    # a = p12 + 2 C C^+ S1 Ct Ct^+ S1 p12 - C C^+ S1 p12 - Ct Ct^+ S1 p12
+    # where S1 p12 = s12
+    cs12 = numpy.dot(orbocc.conj().T, s12)
+    ctild_s12 = numpy.dot(ctild.conj().T, s12)
+    ccs = reduce(numpy.dot, (orbocc.conj().T, s1, ctild))
+    #a is the set of IAOs in the original basis
+    a = (p12 + numpy.dot(orbocc, numpy.dot(ccs, ctild_s12) * 2 - cs12)
+         - numpy.dot(ctild, ctild_s12))
     return a
 
 def reference_mol(mol, minao=MINAO):
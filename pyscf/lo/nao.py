@@ -75,7 +75,8 @@ def nao(mol, mf, s=None, restore=True):
         # restore natural character
         p_nao = reduce(numpy.dot, (cnao.T, p, cnao))
         s_nao = numpy.eye(p_nao.shape[0])
-        cnao = numpy.dot(cnao, _prenao_sub(mol, p_nao, s_nao)[1])
+        cnao = _dot_block_diag(cnao, _prenao_sub(mol, p_nao, s_nao)[1],
+                               mol.aoslice_by_atom()[:,2:])
     return cnao
 
 
@@ -85,6 +86,9 @@ def _prenao_sub(mol, p, s):
     occ = numpy.zeros(nao)
     cao = numpy.zeros((nao,nao), dtype=s.dtype)
 
+    # The spherically averaged blocks of all atoms are grouped by their shapes.
+    # Eigenvalue problems of the same shape are solved together.
+    blocks = {}
     bas_ang = mol._bas[:,mole.ANG_OF]
     for ia, (b0,b1,p0,p1) in enumerate(mol.aoslice_by_atom(ao_loc)):
         l_max = bas_ang[b0:b1].max()
@@ -102,18 +106,30 @@ def _prenao_sub(mol, p, s):
                 degen = l * 2 + 1
             p_frag = _spheric_average_mat(p, l, idx, degen)
             s_frag = _spheric_average_mat(s, l, idx, degen)
-            e, v = scipy.linalg.eigh(p_frag, s_frag)
-            e = e[::-1]
-            v = v[:,::-1]
-
-            idx = idx.reshape(-1,degen)
-            for k in range(degen):
-                ilst = idx[:,k]
-                occ[ilst] = e
-                for i,i0 in enumerate(ilst):
-                    cao[i0,ilst] = v[i]
+            blocks.setdefault((idx.size, degen), []).append((idx, p_frag, s_frag))
+
+    for (nidx, degen), blks in blocks.items():
+        idx, p_frag, s_frag = [numpy.asarray(x) for x in zip(*blks)]
+        e, v = _eigh_batch(p_frag, s_frag)
+        e = e[:,::-1]
+        v = v[:,:,::-1]
+
+        idx = idx.reshape(len(blks),-1,degen)
+        for k in range(degen):
+            ilst = idx[:,:,k]
+            occ[ilst] = e
+            cao[ilst[:,:,None],ilst[:,None,:]] = v
     return occ, cao
 
+def _eigh_batch(a, b):
+    '''Solve the generalized eigenvalue problems a[k] x = e b[k] x'''
+    l = numpy.linalg.cholesky(b)
+    linv = numpy.linalg.inv(l)
+    a = numpy.einsum('kij,kjl,kml->kim', linv, a, linv.conj())
+    e, u = numpy.linalg.eigh(a)
+    v = numpy.einsum('kji,kjl->kil', linv.conj(), u)
+    return e, v
+
 def _nao_sub(mol, pre_occ, pre_nao, s=None):
     if s is None:
         if getattr(mol, 'pbc_intor', None):  # whether mol object is a cell
@@ -125,33 +141,63 @@ def _nao_sub(mol, pre_occ, pre_nao, s=None):
     nao = mol.nao_nr()
     pre_nao = pre_nao.astype(s.dtype)
     cnao = numpy.empty((nao,nao), dtype=s.dtype)
+    # S*cnao is updated along with cnao. The overlap matrix is multiplied only
+    # once with pre_nao, which is block diagonal over atoms in most cases.
+    scnao = numpy.empty((nao,nao), dtype=s.dtype)
+    aoslices = mol.aoslice_by_atom()[:,2:]
+    if _is_block_diag(pre_nao, aoslices):
+        spre = _dot_block_diag(s, pre_nao, aoslices)
+    else:
+        spre = lib.dot(s, pre_nao)
 
     if core_lst:
-        c = pre_nao[:,core_lst].copy()
-        s1 = reduce(lib.dot, (c.conj().T, s, c))
-        cnao[:,core_lst] = c1 = lib.dot(c, orth.lowdin(s1))
-        c = pre_nao[:,val_lst].copy()
-        c -= reduce(lib.dot, (c1, c1.conj().T, s, c))
+        c = pre_nao[:,core_lst]
+        s1 = lib.dot(c.conj().T, spre[:,core_lst])
+        x = orth.lowdin(s1)
+        cnao[:,core_lst] = c1 = lib.dot(c, x)
+        scnao[:,core_lst] = sc1 = lib.dot(spre[:,core_lst], x)
+        x = lib.dot(c1.conj().T, spre[:,val_lst])
+        c = pre_nao[:,val_lst] - lib.dot(c1, x)
+        sc = spre[:,val_lst] - lib.dot(sc1, x)
     else:
         c = pre_nao[:,val_lst]
+        sc = spre[:,val_lst]
 
     if val_lst:
-        s1 = reduce(lib.dot, (c.conj().T, s, c))
+        s1 = lib.dot(c.conj().T, sc)
         wt = pre_occ[val_lst]
-        cnao[:,val_lst] = lib.dot(c, orth.weight_orth(s1, wt))
+        x = orth.weight_orth(s1, wt)
+        cnao[:,val_lst] = lib.dot(c, x)
+        scnao[:,val_lst] = lib.dot(sc, x)
 
     if rydbg_lst:
         cvlst = core_lst + val_lst
-        c1 = cnao[:,cvlst].copy()
-        c = pre_nao[:,rydbg_lst].copy()
-        c -= reduce(lib.dot, (c1, c1.conj().T, s, c))
-        s1 = reduce(lib.dot, (c.conj().T, s, c))
-        cnao[:,rydbg_lst] = lib.dot(c, orth.lowdin(s1))
-    snorm = numpy.linalg.norm(reduce(lib.dot, (cnao.conj().T, s, cnao)) - numpy.eye(nao))
+        c1 = cnao[:,cvlst]
+        x = lib.dot(c1.conj().T, spre[:,rydbg_lst])
+        c = pre_nao[:,rydbg_lst] - lib.dot(c1, x)
+        sc = spre[:,rydbg_lst] - lib.dot(scnao[:,cvlst], x)
+        s1 = lib.dot(c.conj().T, sc)
+        x = orth.lowdin(s1)
+        cnao[:,rydbg_lst] = lib.dot(c, x)
+        scnao[:,rydbg_lst] = lib.dot(sc, x)
+    snorm = numpy.linalg.norm(lib.dot(cnao.conj().T, scnao) - numpy.eye(nao))
     if snorm > 1e-9:
         logger.warn(mol, 'Weak orthogonality for localized orbitals %s', snorm)
     return cnao
 
+def _is_block_diag(c, aoslices):
+    mask = numpy.ones(c.shape, dtype=bool)
+    for p0, p1 in aoslices:
+        mask[p0:p1,p0:p1] = False
+    return c.shape[0] == c.shape[1] and not c[mask].any()
+
+def _dot_block_diag(a, c, aoslices):
+    '''a*c for the block diagonal matrix c'''
+    ac = numpy.zeros((a.shape[0], c.shape[1]), dtype=numpy.result_type(a, c))
+    for p0, p1 in aoslices:
+        ac[:,p0:p1] = lib.dot(a[:,p0:p1], c[p0:p1,p0:p1])
+    return ac
+
 def _core_val_ryd_list(mol):
     from pyscf.gto.ecp import core_configuration
     count = numpy.zeros((mol.natm, 9), dtype=int)
@@ -49,6 +49,38 @@ class KnownValues(unittest.TestCase):
         p,chg = iao.fast_iao_mullikan_pop(mol, mf.make_rdm1(), a)
         self.assertAlmostEqual(lib.finger(p[0]+p[1]), 0.56812564587009806, 5)
 
+    def test_iao_kpts(self):
+        from pyscf.pbc import gto as pbcgto
+        from pyscf.pbc import scf as pbcscf
+        cell = pbcgto.M(atom='H 0 0 0; H 0 0 1.4', a=numpy.diag([2.8, 6., 6.]),
+                        basis='ccpvdz', unit='B', verbose=0)
+        kpts = cell.make_kpts([3,1,1])
+        mf = pbcscf.KRHF(cell, kpts)
+        mo_energy, mo_coeff = mf.eig(mf.get_hcore(), mf.get_ovlp())
+        orbocc = [c[:,:1] for c in mo_coeff]
+        # No occupied orbitals at the last k-point
+        orbocc[2] = orbocc[2][:,:0]
+        a = iao.iao(cell, orbocc, kpts=kpts)
+
+        pcell = iao.reference_mol(cell)
+        s1 = cell.pbc_intor('int1e_ovlp', kpts=kpts)
+        s2 = pcell.pbc_intor('int1e_ovlp', kpts=kpts)
+        s12 = pbcgto.cell.intor_cross('int1e_ovlp', cell, pcell, kpts=kpts)
+        for k in range(len(kpts)):
+            ref = _iao_dense(s1[k], s2[k], s12[k], orbocc[k])
+            self.assertAlmostEqual(abs(a[k] - ref).max(), 0, 7)
+
+def _iao_dense(s1, s2, s12, c):
+    p12 = numpy.linalg.solve(s1, s12)
+    if c.shape[1] == 0:
+        return p12
+    ctild = numpy.linalg.solve(s1, s12.dot(numpy.linalg.solve(s2, s12.conj().T.dot(c))))
+    ctild = iao.vec_lowdin(ctild, s1)
+    ccs1 = reduce(numpy.dot, (c, c.conj().T, s1))
+    ccs2 = reduce(numpy.dot, (ctild, ctild.conj().T, s1))
+    return (p12 + reduce(numpy.dot, (ccs1, ccs2, p12)) * 2
+            - numpy.dot(ccs1, p12) - numpy.dot(ccs2, p12))
+
 
 if __name__ == "__main__":
     print("TODO: Test iao")
@@ -16,6 +16,7 @@
 import unittest
 from functools import reduce
 import numpy
+import scipy.linalg
 from pyscf import gto
 from pyscf import scf
 from pyscf.lo import nao
@@ -69,6 +70,35 @@ class KnowValues(unittest.TestCase):
         self.assertAlmostEqual(numpy.linalg.norm(c), 9.4629575662640129, 9)
         self.assertAlmostEqual(abs(c).sum(), 100.24554485355642, 6)
 
+    def test_eigh_batch(self):
+        numpy.random.seed(1)
+        a = numpy.random.random((3,4,4))
+        a = a + a.transpose(0,2,1)
+        b = numpy.random.random((3,4,4))
+        b = numpy.einsum('kij,klj->kil', b, b) + numpy.eye(4)
+        e, v = nao._eigh_batch(a, b)
+        for k in range(3):
+            e_ref, v_ref = scipy.linalg.eigh(a[k], b[k])
+            self.assertAlmostEqual(abs(e[k] - e_ref).max(), 0, 12)
+            self.assertAlmostEqual(abs(abs(v[k]) - abs(v_ref)).max(), 0, 12)
+
+    def test_meta_lowdin_block_diag(self):
+        from pyscf.lo import orth
+        s = mol.intor('int1e_ovlp')
+        pre_orth_ao = orth.restore_ao_character(mol, 'ANO')
+        aoslices = mol.aoslice_by_atom()[:,2:]
+        self.assertTrue(nao._is_block_diag(pre_orth_ao, aoslices))
+        c = orth.orth_ao(mol, 'meta_lowdin', pre_orth_ao, s=s)
+        self.assertAlmostEqual(abs(reduce(numpy.dot, (c.T, s, c)) - numpy.eye(mol.nao)).max(), 0, 9)
+        self.assertAlmostEqual(abs(nao._dot_block_diag(s, pre_orth_ao, aoslices) -
+                                   s.dot(pre_orth_ao)).max(), 0, 12)
+
+        # Mixing the AOs of different atoms
+        pre_orth_ao[0,-1] = .1
+        self.assertFalse(nao._is_block_diag(pre_orth_ao, aoslices))
+        c = orth.orth_ao(mol, 'meta_lowdin', pre_orth_ao, s=s)
+        self.assertAlmostEqual(abs(reduce(numpy.dot, (c.T, s, c)) - numpy.eye(mol.nao)).max(), 0, 9)
+
 
 if __name__ == "__main__":
     print("Test orth")
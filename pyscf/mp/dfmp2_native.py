@@ -131,7 +131,7 @@ class DFRMP2(lib.StreamObject):
         logger.info('')
         logger.info('Calculating DF-MP2 energy')
         self.e_corr = emp2_rhf(self._intsfile, self.mo_energy, self.frozen_mask,
-                               logger, ps=self.ps, pt=self.pt)
+                               logger, ps=self.ps, pt=self.pt, max_memory=self.max_memory)
         logger.note('DF-MP2 correlation energy: {0:.14f}'.format(self.e_corr))
         return self.e_corr
 
@@ -296,33 +296,51 @@ def ints3c_cholesky(mol, auxmol, mo_coeff1, mo_coeff2, max_memory, logger):
     logger.debug('    MO dimensions: {0:d} x {1:d}'.format(nmo1, nmo2))
     logger.debug('    Aux functions: {0:d}'.format(nauxfcns))
 
+    nao = mol.nao
     intsfile_cho = lib.H5TmpFile(libver='latest')
     with lib.H5TmpFile(libver='latest') as intsfile_tmp:
 
         logger.debug('    Calculating three center integrals in MO basis.')
-        logger.debug('    Temporary file: {0:s}'.format(intsfile_tmp.filename))
 
         intor = mol._add_suffix('int3c2e')
         logger.debug2('    intor = {0:s}'.format(intor))
 
-        # Loop over shells of auxiliary functions.
-        # AO integrals are calculated in memory and directly transformed to MO basis.
-        ints_3c = intsfile_tmp.create_dataset('ints_3c', (nauxfcns, nmo1, nmo2), dtype='f8')
-        aux_ctr = 0
-        for auxsh in range(auxmol.nbas):
+        # The half-transformed integrals are kept in memory if possible.
+        mem_avail = max_memory - lib.current_memory()[0]
+        if _fits_in_memory(nauxfcns * nmo1 * nmo2 * 8 / 1e6, max_memory, 0.5):
+            logger.debug('    Three center integrals in memory')
+            ints_3c = np.empty((nauxfcns, nmo1, nmo2))
+            mem_avail -= ints_3c.nbytes / 1e6
+        else:
+            logger.debug('    Temporary file: {0:s}'.format(intsfile_tmp.filename))
+            ints_3c = intsfile_tmp.create_dataset('ints_3c', (nauxfcns, nmo1, nmo2), dtype='f8')
+
+        # Batches of auxiliary shells. The AO integrals of the next batch are
+        # computed in the background while the current batch is transformed.
+        # AO integrals (x2 for the prefetched batch), half- and fully
+        # transformed integrals are held for each auxiliary function.
+        size_per_aux = (2 * nao * nao + nao * min(nmo1, nmo2) + nmo1 * nmo2) * 8
+        naux_max = int(mem_avail * 1e6 / size_per_aux)
+        naux_max = max(naux_max, np.diff(auxmol.ao_loc).max())
+        batches = list(shellBatchGenerator(auxmol, naux_max))
+        logger.debug2('    Max. auxiliary functions per batch: {0:d}'.format(naux_max))
+
+        def get_aoints(auxsh_range):
             # needs to follow the convention (AO, AO | Aux)
-            shls_slice = (0, mol.nbas, 0, mol.nbas, mol.nbas+auxsh, mol.nbas+auxsh+1)
-            # AO integrals
-            aoints_auxshell = gto.getints(intor, atm, bas, env, shls_slice)
-            # loop over aux functions
-            for m in range(aoints_auxshell.shape[2]):
-                aoints = aoints_auxshell[:, :, m]
-                if nmo1 <= nmo2:
-                    moints = lib.dot(lib.dot(mo_coeff1.T, aoints), mo_coeff2)
-                else:
-                    moints = lib.dot(mo_coeff1.T, lib.dot(aoints, mo_coeff2))
-                ints_3c[aux_ctr, :, :] = moints
-                aux_ctr += 1
+            shls_slice = (0, mol.nbas, 0, mol.nbas,
+                          mol.nbas+auxsh_range[0], mol.nbas+auxsh_range[1])
+            return gto.getints(intor, atm, bas, env, shls_slice)
+
+        # AO integrals are calculated in memory and directly transformed to MO basis.
+        shranges, auxranges = zip(*batches)
+        for (p0, p1), aoints in zip(auxranges, lib.map_with_prefetch(get_aoints, shranges)):
+            if nmo1 <= nmo2:
+                half = lib.einsum('pqP,pi->Piq', aoints, mo_coeff1)
+                ints_3c[p0:p1] = lib.einsum('Piq,qa->Pia', half, mo_coeff2)
+            else:
+                half = lib.einsum('pqP,qa->Ppa', aoints, mo_coeff2)
+                ints_3c[p0:p1] = lib.einsum('Ppa,pi->Pia', half, mo_coeff1)
+            half = aoints = None
 
         logger.debug('    Calculating fitted three center integrals.')
         logger.debug('    Storage file: {0:s}'.format(intsfile_cho.filename))
@@ -339,7 +357,8 @@ def ints3c_cholesky(mol, auxmol, mo_coeff1, mo_coeff2, max_memory, logger):
 
         # Buffer only serves to reduce the read operations of the second index in ints_3c
         # (I/O overhead increases from first to third index).
-        bufsize = int((max_memory - lib.current_memory()[0]) * 1e6 / (nauxfcns * nmo2 * 8))
+        # Two copies of the buffer are needed to reorder the indices.
+        bufsize = int((max_memory - lib.current_memory()[0]) * 1e6 / (2 * nauxfcns * nmo2 * 8))
         if bufsize < 1:
             raise MemoryError('Insufficient memory (PYSCF_MAX_MEMORY).')
         bufsize = min(nmo1, bufsize)
@@ -347,19 +366,23 @@ def ints3c_cholesky(mol, auxmol, mo_coeff1, mo_coeff2, max_memory, logger):
 
         # In batches:
         # - Read integrals from the temporary file.
-        # - Instead of multiplying with L^-1, solve linear equation system.
+        # - Instead of multiplying with L^-1, solve linear equation system
+        #   for all orbitals of the batch at once.
         # - Store the "fitted" integrals in the integrals file.
         for istart in range(0, nmo1, bufsize):
             iend = min(istart+bufsize, nmo1)
-            intsbuf = ints_3c[:, istart:iend, :]
-            for i in range(istart, iend):
-                ints_cholesky[i, :, :] = scipy.linalg.solve_triangular(L, intsbuf[:, i-istart, :], lower=True)
+            intsbuf = np.asarray(ints_3c[:, istart:iend, :]).reshape(nauxfcns, -1)
+            intsbuf = scipy.linalg.solve_triangular(L, intsbuf, lower=True, overwrite_b=True)
+            intsbuf = intsbuf.reshape(nauxfcns, iend-istart, nmo2).transpose(1, 0, 2)
+            ints_cholesky[istart:iend] = intsbuf
+            intsbuf = None
+        ints_3c = None
 
     logger.debug('    DF transformation finished')
     return intsfile_cho
 
 
-def emp2_rhf(intsfile, mo_energy, frozen_mask, logger, ps=1.0, pt=1.0):
+def emp2_rhf(intsfile, mo_energy, frozen_mask, logger, ps=1.0, pt=1.0, max_memory=None):
     '''
     Calculates the DF-MP2 energy with an RHF reference.
 
@@ -370,14 +393,18 @@ def emp2_rhf(intsfile, mo_energy, frozen_mask, logger, ps=1.0, pt=1.0):
         logger : Logger instance
         ps : SCS factor for opposite-spin contributions
         pt : SCS factor for same-spin contributions
+        max_memory : memory threshold in MB, determines the number of
+            occupied orbitals j processed together
 
     Returns:
         the MP2 correlation energy
     '''
     ints = intsfile['ints_cholesky']
-    nocc_act, _, nvirt = ints.shape
+    nocc_act, naux, nvirt = ints.shape
     nfrozen = np.count_nonzero(frozen_mask)
     nocc = nocc_act + nfrozen
+    if max_memory is None:
+        max_memory = lib.param.MAX_MEMORY
 
     logger.debug('    RHF-DF-MP2 energy routine')
     logger.debug('    Occupied orbitals: {0:d}'.format(nocc))
@@ -386,35 +413,63 @@ def emp2_rhf(intsfile, mo_energy, frozen_mask, logger, ps=1.0, pt=1.0):
     logger.debug('    Integrals from file: {0:s}'.format(intsfile.filename))
 
     mo_energy_masked = mo_energy[~frozen_mask]
+    ints = _load_in_memory(ints, max_memory, logger)
+
+    # Eab[a, b] = mo_energy[a] + mo_energy[b] for division with numpy.
+    e_vir = mo_energy[nocc:nocc+nvirt]
+    Eab = e_vir[:, None] + e_vir
 
-    # Somewhat awkward workaround to perform division in the MP2 energy expression
-    # through numpy routines. We precompute Eab[a, b] = mo_energy[a] + mo_energy[b].
-    Eab = np.zeros((nvirt, nvirt))
-    for a in range(nvirt):
-        Eab[a, :] += mo_energy[nocc + a]
-        Eab[:, a] += mo_energy[nocc + a]
+    # Kab, Tab and the integrals of j (x2 if prefetched from disk)
+    mem_avail = max_memory - lib.current_memory()[0]
+    blksize = int(mem_avail * 1e6 / ((3 * nvirt * nvirt + 2 * naux * nvirt) * 8))
+    blksize = max(1, min(nocc_act, blksize))
 
     energy = 0.0
     for i in range(nocc_act):
-        ints3c_ia = ints[i, :, :]
-        # contributions for occupied orbitals j < i
-        for j in range(i):
-            ints3c_jb = ints[j, :, :]
-            Kab = lib.dot(ints3c_ia.T, ints3c_jb)
-            DE = mo_energy_masked[i] + mo_energy_masked[j] - Eab
+        ints3c_ia = np.asarray(ints[i])
+        # contributions for occupied orbitals j <= i
+        jranges = list(lib.prange(0, i+1, blksize))
+        for (j0, j1), ints3c_jb in zip(jranges, lib.map_with_prefetch(
+                lambda j0, j1: np.asarray(ints[j0:j1]), *zip(*jranges))):
+            Kab = lib.einsum('Pa,jPb->jab', ints3c_ia, ints3c_jb)
+            DE = (mo_energy_masked[i] + mo_energy_masked[j0:j1])[:, None, None] - Eab
             Tab = Kab / DE
-            energy += 2.0 * (ps + pt) * lib.einsum('ab,ab', Tab, Kab)
-            energy -= 2.0 * pt * lib.einsum('ab,ba', Tab, Kab)
-        # contribution for j == i
-        Kab = lib.dot(ints3c_ia.T, ints3c_ia)
-        DE = 2.0 * mo_energy_masked[i] - Eab
-        Tab = Kab / DE
-        energy += ps * lib.einsum('ab,ab', Tab, Kab)
+            # weights: 2 for j < i, 1 for j == i
+            fac = np.full(j1-j0, 2.0)
+            if j1 == i + 1:
+                fac[-1] = 1.0
+            energy += (ps + pt) * np.dot(fac, lib.einsum('jab,jab->j', Tab, Kab))
+            energy -= pt * np.dot(fac, lib.einsum('jab,jba->j', Tab, Kab))
+        Kab = DE = Tab = ints3c_jb = None
 
     logger.debug('    DF-MP2 correlation energy: {0:.14f}'.format(energy))
     return energy
 
 
+def _fits_in_memory(size, max_memory, fraction):
+    '''
+    Whether an array of the given size (in MB) fits into the given fraction
+    of the available memory. Arrays which do not fit are stored in or read
+    from HDF5 files.
+    '''
+    return size < fraction * (max_memory - lib.current_memory()[0])
+
+
+def _load_in_memory(dset, max_memory, logger=None, fraction=0.5):
+    '''
+    Returns the content of the h5py dataset as a numpy array if it fits into
+    the given fraction of the available memory, otherwise the dataset itself.
+    '''
+    if isinstance(dset, np.ndarray):
+        return dset
+    size = np.prod(dset.shape) * dset.dtype.itemsize / 1e6
+    if _fits_in_memory(size, max_memory, fraction):
+        if logger is not None:
+            logger.debug2('    Load {0:s} ({1:.1f} MB) into memory'.format(dset.name, size))
+        return dset[()]
+    return dset
+
+
 def make_rdm1(mp2, relaxed, logger=None):
     '''
     Calculates the unrelaxed or relaxed MP2 density matrix.
@@ -483,7 +538,8 @@ def rmp2_densities_contribs(intsfile, mo_energy, frozen_mask, max_memory, logger
         pt : SCS factor for same-spin contributions
 
     Returns:
-        matrix containing the 1-RDM contribution, file with 3c2e density if requested
+        matrix containing the 1-RDM contribution, file (or dict if kept in memory)
+        with 3c2e density if requested
     '''
     ints = intsfile['ints_cholesky']
     nocc_act, naux, nvirt = ints.shape
@@ -500,19 +556,26 @@ def rmp2_densities_contribs(intsfile, mo_energy, frozen_mask, max_memory, logger
     logger.debug('    Three center integrals from file: {0:s}'.format(intsfile.filename))
 
     # Precompute Eab[a, b] = mo_energy[a] + mo_energy[b] for division with numpy.
-    Eab = np.zeros((nvirt, nvirt))
-    for a in range(nvirt):
-        Eab[a, :] += mo_energy[nocc + a]
-        Eab[:, a] += mo_energy[nocc + a]
+    e_vir = mo_energy[nocc:nocc+nvirt]
+    Eab = e_vir[:, None] + e_vir
+
+    # The integrals are read from disk only if they do not fit into memory.
+    ints = _load_in_memory(ints, max_memory, logger)
 
     GammaFile, Gamma, LT = None, None, None
     if calcGamma:
         if not auxmol:
             raise RuntimeError('auxmol needs to be specified for relaxed density computation')
-        # create temporary file to store the two-body density Gamma
-        GammaFile = lib.H5TmpFile(libver='latest')
-        Gamma = GammaFile.create_dataset('Gamma', (nocc_act, naux, nvirt), dtype='f8')
-        logger.debug('    Storing 3c2e density in file: {0:s}'.format(GammaFile.filename))
+        if _fits_in_memory(nocc_act * naux * nvirt * 8 / 1e6, max_memory, 0.4):
+            # keep the two-body density Gamma in memory
+            GammaFile = {'Gamma': np.zeros((nocc_act, naux, nvirt))}
+            logger.debug('    Storing 3c2e density in memory')
+        else:
+            # create temporary file to store the two-body density Gamma
+            GammaFile = lib.H5TmpFile(libver='latest')
+            GammaFile.create_dataset('Gamma', (nocc_act, naux, nvirt), dtype='f8')
+            logger.debug('    Storing 3c2e density in file: {0:s}'.format(GammaFile.filename))
+        Gamma = GammaFile['Gamma']
         # We will need LT = L^T, where L L^T = V
         LT = scipy.linalg.cholesky(auxmol.intor('int2c2e'), lower=False)
 
@@ -521,32 +584,49 @@ def rmp2_densities_contribs(intsfile, mo_energy, frozen_mask, max_memory, logger
     mo_energy_masked = mo_energy[~frozen_mask]
 
     with lib.H5TmpFile(libver='latest') as tfile:
-        logger.debug('    Storing amplitudes in temporary file: {0:s}'.format(tfile.filename))
-
-        # For each occupied orbital i, all amplitudes are calculated once and stored on disk.
-        # The occupied 1-RDM contribution is calculated in a batched algorithm.
-        # More memory -> more efficient I/O.
+        # For each occupied orbital i, all amplitudes are calculated once and kept in
+        # memory or stored on disk. The occupied 1-RDM contribution is calculated in
+        # a batched algorithm. More memory -> more efficient I/O.
         # The virtual contribution to the 1-RDM is calculated in memory.
-        tiset = tfile.create_dataset('amplitudes', (nocc_act, nvirt, nvirt), dtype='f8')
-        for i in range(nocc_act):
-            ints3c_ia = ints[i, :, :]
+        if _fits_in_memory(nocc_act * nvirt * nvirt * 8 / 1e6, max_memory, 0.4):
+            logger.debug('    Storing amplitudes in memory')
+            tiset = np.empty((nocc_act, nvirt, nvirt))
+        else:
+            logger.debug('    Storing amplitudes in temporary file: {0:s}'.format(tfile.filename))
+            tiset = tfile.create_dataset('amplitudes', (nocc_act, nvirt, nvirt), dtype='f8')
+
+        # Number of occupied orbitals j for which the amplitudes are evaluated together:
+        # Kab, Tab, TCab and the integrals of j (x2 if prefetched from disk).
+        mem_avail = max_memory - lib.current_memory()[0]
+        blksize = int(mem_avail * 1e6 / ((3 * nvirt * nvirt + 2 * naux * nvirt) * 8))
+        blksize = max(1, min(nocc_act, blksize))
+        jranges = list(lib.prange(0, nocc_act, blksize))
+        logger.debug2('    Amplitudes - batch size {0:d} (of {1:d})'.format(blksize, nocc_act))
+
+        def load_ints(j0, j1):
+            return np.asarray(ints[j0:j1])
+
+        for i, ints3c_ia in enumerate(lib.map_with_prefetch(
+                load_ints, range(nocc_act), range(1, nocc_act+1))):
+            ints3c_ia = ints3c_ia[0]
 
             # Calculate amplitudes T^ij_ab for a given i and all j, a, b
-            # Store the amplitudes in a file.
-            for j in range(nocc_act):
-                ints3c_jb = ints[j, :, :]
-                Kab = lib.dot(ints3c_ia.T, ints3c_jb)
-                DE = mo_energy_masked[i] + mo_energy_masked[j] - Eab
+            for (j0, j1), ints3c_jb in zip(jranges, lib.map_with_prefetch(load_ints, *zip(*jranges))):
+                Kab = lib.einsum('Pa,jPb->jab', ints3c_ia, ints3c_jb)
+                DE = (mo_energy_masked[i] + mo_energy_masked[j0:j1])[:, None, None] - Eab
                 Tab = Kab / DE
-                TCab = 2.0 * (ps + pt) * Tab - 2.0 * pt * Tab.T
-                tiset[j, :, :] = Tab
+                TCab = 2.0 * (ps + pt) * Tab - 2.0 * pt * Tab.transpose(0, 2, 1)
+                tiset[j0:j1] = Tab
                 # virtual 1-RDM contribution
-                P[nocc:, nocc:] += lib.dot(Tab, TCab.T)
-            del ints3c_jb, Kab, DE, Tab, TCab
-
-            # Read batches of amplitudes from disk and calculate the occupied 1-RDM.
-            batchsize = int((max_memory - lib.current_memory()[0]) * 1e6 / (2 * nocc_act * nvirt * 8))
-            batchsize = min(nvirt, batchsize)
+                P[nocc:, nocc:] += lib.einsum('jab,jcb->ac', Tab, TCab)
+            Kab = DE = Tab = TCab = ints3c_jb = None
+
+            # Read batches of amplitudes and calculate the occupied 1-RDM.
+            if isinstance(tiset, np.ndarray):
+                batchsize = nvirt
+            else:
+                batchsize = int((max_memory - lib.current_memory()[0]) * 1e6 / (2 * nocc_act * nvirt * 8))
+                batchsize = min(nvirt, batchsize)
             if batchsize < 1:
                 raise MemoryError('Insufficient memory (PYSCF_MAX_MEMORY).')
             logger.debug2('      Pij formation - MO {0:d}, batch size {1:d} (of {2:d})'.
@@ -558,13 +638,13 @@ def rmp2_densities_contribs(intsfile, mo_energy, frozen_mask, max_memory, logger
                 P[nfrozen:nocc, nfrozen:nocc] += \
                     - 2.0 * (ps + pt) * lib.einsum('iab,jab->ij', tbatch1, tbatch1) \
                     + 2.0 * pt * lib.einsum('iab,jba->ij', tbatch1, tbatch2)
-            del tbatch1, tbatch2
+            tbatch1 = tbatch2 = None
 
             if calcGamma:
                 # This produces (P | Q)^-1 (Q | i a)
                 ints3cV1_ia = scipy.linalg.solve_triangular(LT, ints3c_ia, lower=False)
-                # Read batches of amplitudes from disk and calculate the two-body density Gamma
-                size = nvirt * nvirt * 8 + naux * nvirt * 8
+                # Read batches of amplitudes and calculate the two-body density Gamma
+                size = 2 * nvirt * nvirt * 8 + 2 * naux * nvirt * 8
                 batchsize = int((max_memory - lib.current_memory()[0]) * 1e6 / size)
                 batchsize = min(nocc_act, batchsize)
                 if batchsize < 1:
@@ -573,13 +653,14 @@ def rmp2_densities_contribs(intsfile, mo_energy, frozen_mask, max_memory, logger
                               format(i, batchsize, nocc_act))
                 for jstart in range(0, nocc_act, batchsize):
                     jend = min(jstart+batchsize, nocc_act)
-                    tbatch = tiset[jstart:jend, :, :]
-                    Gbatch = Gamma[jstart:jend, :, :]
-                    for jj in range(jend-jstart):
-                        TCijab_scal = 4.0 * (pt + pt) * tbatch[jj] - 4.0 * pt * tbatch[jj].T
-                        Gbatch[jj] += lib.dot(ints3cV1_ia, TCijab_scal)
-                    Gamma[jstart:jend, :, :] = Gbatch
-                del ints3cV1_ia, tbatch, Gbatch, TCijab_scal
+                    tbatch = np.asarray(tiset[jstart:jend])
+                    TCijab_scal = 4.0 * (pt + pt) * tbatch - 4.0 * pt * tbatch.transpose(0, 2, 1)
+                    Gbatch = lib.einsum('Pa,jab->jPb', ints3cV1_ia, TCijab_scal)
+                    if isinstance(Gamma, np.ndarray):
+                        Gamma[jstart:jend] += Gbatch
+                    else:
+                        Gamma[jstart:jend] = Gamma[jstart:jend] + Gbatch
+                ints3cV1_ia = tbatch = Gbatch = TCijab_scal = None
 
     # now reorder P such that the frozen orbitals correspond to frozen_mask
     idx_reordered = np.concatenate([np.arange(nmo)[frozen_mask], np.arange(nmo)[~frozen_mask]])
@@ -630,7 +711,8 @@ def orbgrad_from_Gamma(mol, auxmol, Gamma, mo_coeff, frozen_mask, max_memory, lo
     Args:
         mol : Mole object
         auxmol : Mole object for the auxiliary functions
-        Gamma : h5py dataset with the 3c2e density, order: [occ. orbs., aux. fcns., virt. orbs.]
+        Gamma : h5py dataset or array with the 3c2e density,
+                order: [occ. orbs., aux. fcns., virt. orbs.]
         mo_coeff : molecular orbital coefficients
         frozen_mask : boolean mask for frozen orbitals
         max_memory : memory limit in MB
@@ -661,44 +743,57 @@ def orbgrad_from_Gamma(mol, auxmol, Gamma, mo_coeff, frozen_mask, max_memory, lo
     intor = mol._add_suffix('int3c2e')
     logger.debug2('    intor = {0:s}'.format(intor))
 
+    Cocc = mo_coeff[:, occ_mask]
+    Cfrz = mo_coeff[:, frozen_mask]
+    Cvir = mo_coeff[:, nocc:]
+    nao = mol.nao
     Lov_act = np.zeros((nocc_act, nvirt))
     Lof_act = np.zeros((nocc_act, nfrozen))
     Lfv = np.zeros((nfrozen, nvirt))
     # process as many auxiliary functions in a go as possible: may reduce I/O cost
-    size_per_aux = (nocc_act * nvirt + mol.nao ** 2) * 8
+    # Gamma and AO integrals (x2 for the prefetched batch), half-transformed
+    # Gamma and the integrals in occupied MO basis.
+    size_per_aux = (2 * nocc_act * nvirt + 2 * nao ** 2 + 2 * nocc_act * nao
+                    + nocc * nocc_act) * 8
     naux_max = int((max_memory - lib.current_memory()[0]) * 1e6 / size_per_aux)
     logger.debug2('    Max. auxiliary functions per batch: {0:d}'.format(naux_max))
-    try:
 
-        # loop over batches of auxiliary function shells
-        for auxsh_range, aux_range in shellBatchGenerator(auxmol, naux_max):
-            auxsh_start, auxsh_stop = auxsh_range
-            aux_start, aux_stop = aux_range
-            logger.debug2('      aux from {0:d} to {1:d}'.format(aux_start, aux_stop))
-            # needs to follow the convention (AO, AO | Aux)
-            shls_slice = (0, mol.nbas, 0, mol.nbas, mol.nbas+auxsh_start, mol.nbas+auxsh_stop)
-            # AO integrals
-            aoints_auxshell = gto.getints(intor, atm, bas, env, shls_slice)
-            # read 3c2e density elements for the current aux functions
-            GiKa = Gamma[:, aux_start:aux_stop, :]
-            for m in range(aux_stop - aux_start):
-                # Half-transformed Gamma for specific auxiliary function m
-                G12 = lib.dot(GiKa[:, m, :], mo_coeff[:, nocc:].T)
-                # product of Gamma with integrals: one index still in AO basis
-                Gints = lib.dot(G12, aoints_auxshell[:, :, m])
-                # 3c2e integrals in occupied MO basis
-                intso12 = lib.dot(aoints_auxshell[:, :, m], mo_coeff[:, occ_mask])
-                intsoo = lib.dot(mo_coeff[:, occ_mask].T, intso12)
-                intsfo = lib.dot(mo_coeff[:, frozen_mask].T, intso12)
-                # contributions to the orbital gradient
-                Lov_act += lib.dot(intsoo, GiKa[:, m, :]) - lib.dot(Gints, mo_coeff[:, nocc:])
-                Lof_act -= lib.dot(Gints, mo_coeff[:, frozen_mask])
-                Lfv += lib.dot(intsfo, GiKa[:, m, :])
-            del GiKa, aoints_auxshell
+    def load(auxsh_range, aux_range):
+        # needs to follow the convention (AO, AO | Aux)
+        shls_slice = (0, mol.nbas, 0, mol.nbas,
+                      mol.nbas+auxsh_range[0], mol.nbas+auxsh_range[1])
+        # AO integrals, stored as [aux, AO, AO]
+        aoints = gto.getints(intor, atm, bas, env, shls_slice).transpose(2, 1, 0)
+        # 3c2e density elements for the current aux functions
+        GiKa = np.asarray(Gamma[:, aux_range[0]:aux_range[1], :])
+        return aoints, GiKa
 
+    try:
+        batches = list(shellBatchGenerator(auxmol, naux_max))
     except BatchSizeError:
         raise MemoryError('Insufficient memory (PYSCF_MAX_MEMORY)')
 
+    # The integrals and the density of the next batch are loaded in the background
+    # while the current batch is contracted.
+    for (aux_start, aux_stop), (aoints, GiKa) in zip(
+            [aux_range for _, aux_range in batches],
+            lib.map_with_prefetch(load, *zip(*batches))):
+        logger.debug2('      aux from {0:d} to {1:d}'.format(aux_start, aux_stop))
+        # Half-transformed Gamma
+        G12 = lib.einsum('imb,qb->miq', GiKa, Cvir)
+        # product of Gamma with integrals: one index still in AO basis
+        Gints = lib.einsum('miq,mqp->ip', G12, aoints)
+        # 3c2e integrals in occupied MO basis
+        intso12 = lib.einsum('mpq,qj->mpj', aoints, Cocc)
+        intsfo = lib.einsum('pf,mpj->mfj', Cfrz, intso12)
+        intsoo = lib.einsum('pi,mpj->mij', Cocc, intso12)
+        intso12 = None
+        # contributions to the orbital gradient
+        Lov_act += lib.einsum('mij,jmb->ib', intsoo, GiKa) - lib.dot(Gints, Cvir)
+        Lof_act -= lib.dot(Gints, Cfrz)
+        Lfv += lib.einsum('mfj,jmb->fb', intsfo, GiKa)
+        aoints = GiKa = G12 = Gints = intsoo = intsfo = None
+
     # convert to full matrix with frozen orbitals
     Lvo = np.zeros((nvirt, nocc))
     Lvo[:, occ_mask[:nocc]] = Lov_act.T
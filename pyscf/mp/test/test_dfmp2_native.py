@@ -20,6 +20,7 @@ import numpy
 from pyscf import gto
 from pyscf import scf
 from pyscf import lib
+from pyscf.mp import dfmp2_native
 from pyscf.mp.dfmp2_native import DFMP2, SCSMP2
 from pyscf.mp.dfmp2_native import solve_cphf_rhf, fock_response_rhf
 
@@ -266,6 +267,27 @@ class KnownValues(unittest.TestCase):
             self.assertAlmostEqual(natocc_re[7], 1.9402044334, delta=1.0e-7)
             self.assertAlmostEqual(natocc_re[8], 0.0459829060, delta=1.0e-7)
 
+    def test_outcore(self):
+        # Integrals, amplitudes and the 3c2e density on disk
+        with DFMP2(self.mf) as pt:
+            pt.cphf_tol = 1e-12
+            e0 = pt.kernel()
+            dm0 = pt.make_rdm1(relaxed=True)
+        sizes = []
+        def fits_in_memory(size, max_memory, fraction):
+            sizes.append(size)
+            return False
+        with lib.temporary_env(dfmp2_native, _fits_in_memory=fits_in_memory):
+            with DFMP2(self.mf) as pt:
+                pt.cphf_tol = 1e-12
+                e1 = pt.kernel()
+                dm1 = pt.make_rdm1(relaxed=True)
+        # ints3c_cholesky, emp2_rhf, amplitudes, Gamma and the integrals in
+        # rmp2_densities_contribs
+        self.assertEqual(len(sizes), 5)
+        self.assertAlmostEqual(e1, e0, 10)
+        self.assertAlmostEqual(abs(dm1 - dm0).max(), 0, 9)
+
     def test_scs_energy(self):
         with SCSMP2(self.mf) as pt:
             pt.kernel()
@@ -172,7 +172,7 @@ def assemble_eri(cell, orb_pair_invG1, orb_pair_G2, q=None, verbose=logger.INFO)
     if q is None:
         q = np.zeros(3)
 
-    coulqG = tools.get_coulG(cell, -1.0*q)
+    coulqG = tools.get_coulG_cached(cell, -1.0*q)
     ngrids = orb_pair_invG1.shape[0]
     Jorb_pair_G2 = np.einsum('g,gn->gn',coulqG,orb_pair_G2)*(cell.vol/ngrids**2)
     eri = np.dot(orb_pair_invG1.T, Jorb_pair_G2)
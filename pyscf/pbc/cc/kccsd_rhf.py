@@ -18,6 +18,7 @@
 #
 
 
+import collections
 from functools import reduce
 import numpy as np
 import h5py
@@ -704,6 +705,99 @@ KRCCSD = RCCSD
 #
 # TODO: use the same convention as kccsd_uhf
 #
+class _KBlockCache(object):
+    '''Access to the k-point blocks of a (nkpts,nkpts,nkpts,...) tensor which
+    is stored on disk.
+
+    Only the momentum conserving blocks (the 4th k-point index is determined
+    by kconserv) are stored in the HDF5 dataset. The blocks read from disk are
+    kept in an LRU cache. The cache size is bounded by max_memory (in MB).
+    Blocks returned from the cache are read-only.
+
+    This is a read cache for the out-of-core ERIs. It saves disk reads but
+    does not reduce the memory footprint. The amplitudes t1 and t2 are still
+    held in memory as (nkpts,nkpts,nkpts,...) arrays.
+    '''
+    def __init__(self, dataset, max_memory=2000):
+        self.dataset = dataset
+        self.shape = dataset.shape
+        self.dtype = dataset.dtype
+        self.ndim = len(self.shape)
+        blksize = np.prod(self.shape[3:]) * self.dtype.itemsize / 1e6
+        self.max_blocks = max(1, int(max_memory / max(blksize, 1e-6)))
+        self._cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _block(self, key):
+        cache = self._cache
+        if key in cache:
+            self.hits += 1
+            cache.move_to_end(key)
+            return cache[key]
+
+        self.misses += 1
+        blk = self.dataset[key]
+        blk.flags.writeable = False
+        cache[key] = blk
+        if len(cache) > self.max_blocks:
+            cache.popitem(last=False)
+        return blk
+
+    def _kindices(self, idx):
+        if not isinstance(idx, tuple):
+            idx = (idx,)
+        if any(x is Ellipsis or x is None for x in idx[:3]):
+            raise NotImplementedError('Index %s' % str(idx))
+        kidx = idx[:3] + (slice(None),) * (3 - len(idx[:3]))
+        klists = []
+        squeeze = []
+        for i, k in enumerate(kidx):
+            if isinstance(k, (int, np.integer)):
+                klists.append([int(k) % self.shape[i]])
+                squeeze.append(i)
+            elif isinstance(k, slice):
+                klists.append(range(*k.indices(self.shape[i])))
+            else:
+                klists.append([int(x) for x in np.asarray(k).ravel()])
+        return klists, squeeze, idx[3:]
+
+    def __getitem__(self, idx):
+        klists, squeeze, rest = self._kindices(idx)
+        if len(squeeze) == 3:
+            out = self._block((klists[0][0], klists[1][0], klists[2][0]))
+        else:
+            kshape = [len(x) for x in klists]
+            out = np.empty(kshape + list(self.shape[3:]), dtype=self.dtype)
+            for i, k0 in enumerate(klists[0]):
+                for j, k1 in enumerate(klists[1]):
+                    for k, k2 in enumerate(klists[2]):
+                        out[i,j,k] = self._block((k0, k1, k2))
+            out = out.reshape([n for i, n in enumerate(kshape) if i not in squeeze] +
+                              list(self.shape[3:]))
+        if rest:
+            out = out[(slice(None),) * (3-len(squeeze)) + rest]
+        return out
+
+    def __setitem__(self, idx, val):
+        klists, squeeze, rest = self._kindices(idx)
+        self.dataset[idx] = val
+        for k0 in klists[0]:
+            for k1 in klists[1]:
+                for k2 in klists[2]:
+                    self._cache.pop((k0, k1, k2), None)
+
+    def __array__(self, dtype=None):
+        return np.asarray(self.dataset[:], dtype=dtype)
+
+    def cache_info(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'max_blocks': self.max_blocks, 'cached_blocks': len(self._cache)}
+
+
 class _ERIS:  # (pyscf.cc.ccsd._ChemistsERIs):
     def __init__(self, cc, mo_coeff=None, method='incore'):
         from pyscf.pbc import df
@@ -807,20 +901,27 @@ class _ERIS:  # (pyscf.cc.ccsd._ChemistsERIs):
             log.info('using HDF5 ERI storage')
             self.feri1 = lib.H5TmpFile()
 
-            self.oooo = self.feri1.create_dataset('oooo', (nkpts, nkpts, nkpts, nocc, nocc, nocc, nocc), dtype.char)
-            self.ooov = self.feri1.create_dataset('ooov', (nkpts, nkpts, nkpts, nocc, nocc, nocc, nvir), dtype.char)
-            self.oovv = self.feri1.create_dataset('oovv', (nkpts, nkpts, nkpts, nocc, nocc, nvir, nvir), dtype.char)
-            self.ovov = self.feri1.create_dataset('ovov', (nkpts, nkpts, nkpts, nocc, nvir, nocc, nvir), dtype.char)
-            self.voov = self.feri1.create_dataset('voov', (nkpts, nkpts, nkpts, nvir, nocc, nocc, nvir), dtype.char)
-            self.vovv = self.feri1.create_dataset('vovv', (nkpts, nkpts, nkpts, nvir, nocc, nvir, nvir), dtype.char)
-
             vvvv_required = ((not cc.direct)
                              # cc._scf.with_df needs to be df.GDF only (not MDF)
                              or type(cc._scf.with_df) is not df.GDF
                              # direct-vvvv for pbc-2D is not supported so far
                              or cell.dimension == 2)
+
+            # The blocks of ERIs read from disk are cached in memory. Half of
+            # the available memory is distributed over the ERI tensors.
+            mem_cache = max(0, cc.max_memory - mem_now) * .5 / 7
+            def create_dataset(key, shape):
+                dataset = self.feri1.create_dataset(key, shape, dtype.char)
+                return _KBlockCache(dataset, mem_cache)
+
+            self.oooo = create_dataset('oooo', (nkpts, nkpts, nkpts, nocc, nocc, nocc, nocc))
+            self.ooov = create_dataset('ooov', (nkpts, nkpts, nkpts, nocc, nocc, nocc, nvir))
+            self.oovv = create_dataset('oovv', (nkpts, nkpts, nkpts, nocc, nocc, nvir, nvir))
+            self.ovov = create_dataset('ovov', (nkpts, nkpts, nkpts, nocc, nvir, nocc, nvir))
+            self.voov = create_dataset('voov', (nkpts, nkpts, nkpts, nvir, nocc, nocc, nvir))
+            self.vovv = create_dataset('vovv', (nkpts, nkpts, nkpts, nvir, nocc, nvir, nvir))
             if vvvv_required:
-                self.vvvv = self.feri1.create_dataset('vvvv', (nkpts,nkpts,nkpts,nvir,nvir,nvir,nvir), dtype.char)
+                self.vvvv = create_dataset('vvvv', (nkpts,nkpts,nkpts,nvir,nvir,nvir,nvir))
             else:
                 self.vvvv = None
 
@@ -223,6 +223,30 @@ class KnownValues(unittest.TestCase):
         self.assertAlmostEqual(ehf, ehf_bench, 9)
         self.assertAlmostEqual(ecc, ecc_bench, 7)
 
+    def test_kblock_cache(self):
+        np.random.seed(3)
+        ref = np.random.random((3,3,3,2,3,2,3))
+        ftmp = lib.H5TmpFile()
+        ftmp['a'] = ref
+        a = pbcc.kccsd_rhf._KBlockCache(ftmp['a'], max_memory=ref[0,0,0].nbytes*2e-6)
+        self.assertEqual(a.max_blocks, 2)
+        self.assertAlmostEqual(abs(a[1,2,0] - ref[1,2,0]).max(), 0, 14)
+        self.assertAlmostEqual(abs(a[1,2,0] - ref[1,2,0]).max(), 0, 14)
+        self.assertEqual(a.hits, 1)
+        self.assertAlmostEqual(abs(a[1,2] - ref[1,2]).max(), 0, 14)
+        self.assertAlmostEqual(abs(a[:,2,1] - ref[:,2,1]).max(), 0, 14)
+        self.assertAlmostEqual(abs(a[0,:,1,:,1:] - ref[0,:,1,:,1:]).max(), 0, 14)
+        self.assertAlmostEqual(abs(a[2,1,0,1] - ref[2,1,0,1]).max(), 0, 14)
+        self.assertAlmostEqual(abs(np.asarray(a) - ref).max(), 0, 14)
+        self.assertFalse(a[2,1,0].flags.writeable)
+
+        a[2,1,0] = ref[0,0,0]
+        a[0,0,0,1] = 0
+        ref[2,1,0] = ref[0,0,0]
+        ref[0,0,0,1] = 0
+        self.assertAlmostEqual(abs(a[2,1,0] - ref[2,1,0]).max(), 0, 14)
+        self.assertAlmostEqual(abs(a[0,0,0] - ref[0,0,0]).max(), 0, 14)
+
     def test_ao2mo(self):
         kmf = make_rand_kmf()
         rand_cc = pbcc.KRCCSD(kmf)
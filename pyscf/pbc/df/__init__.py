@@ -23,6 +23,7 @@ from .rsdf import RSDF, RSGDF
 from .mdf import MDF
 from .aft import AFTDF
 from .fft import FFTDF
+from .isdf import ISDF
 from pyscf.df.addons import aug_etb
 
 # For backward compatibility
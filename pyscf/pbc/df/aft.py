@@ -282,9 +282,8 @@ def weighted_coulG(mydf, kpt=numpy.zeros(3), exx=False, mesh=None):
     if mesh is None:
         mesh = mydf.mesh
     Gv, Gvbase, kws = cell.get_Gv_weights(mesh)
-    coulG = tools.get_coulG(cell, kpt, exx, mydf, mesh, Gv)
-    coulG *= kws
-    return coulG
+    coulG = tools.get_coulG_cached(cell, kpt, exx, mydf, mesh)
+    return coulG * kws
 
 
 class AFTDF(lib.StreamObject):
@@ -33,8 +33,13 @@ import os
 
 import copy
 import ctypes
+import shutil
+import hashlib
+import weakref
 import warnings
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy
 import h5py
 import scipy.linalg
@@ -43,6 +48,7 @@ from pyscf import gto
 from pyscf.lib import logger
 from pyscf.df import addons
 from pyscf.df.outcore import _guess_shell_ranges
+from pyscf.ao2mo.outcore import balance_segs
 from pyscf.pbc.gto.cell import _estimate_rcut
 from pyscf.pbc import tools
 from pyscf.pbc.df import outcore
@@ -155,6 +161,12 @@ def _make_j3c(mydf, cell, auxcell, kptij_lst, cderi_file):
     max_memory = max(2000, mydf.max_memory-lib.current_memory()[0])
     fused_cell, fuse = fuse_auxcell(mydf, auxcell)
 
+    shards = _j3c_shards(mydf, cell, auxcell, kptij_lst, cderi_file)
+    if shards is not None and shards.j3c_complete():
+        log.info('Restore DF integrals from %s', shards.shard_dir)
+        shards.merge()
+        return
+
     # The ideal way to hold the temporary integrals is to store them in the
     # cderi_file and overwrite them inplace in the second pass.  The current
     # HDF5 library does not have an efficient way to manage free space in
@@ -168,8 +180,17 @@ def _make_j3c(mydf, cell, auxcell, kptij_lst, cderi_file):
     # Unlink swapfile to avoid trash
     swapfile = None
 
-    outcore._aux_e2(cell, fused_cell, fswap, 'int3c2e', aosym='s2',
-                    kptij_lst=kptij_lst, dataname='j3c-junk', max_memory=max_memory)
+    if shards is None:
+        outcore._aux_e2(cell, fused_cell, fswap, 'int3c2e', aosym='s2',
+                        kptij_lst=kptij_lst, dataname='j3c-junk', max_memory=max_memory)
+        j3c_junk = fswap
+    else:
+        def aux_e2(feri, aux_range, max_memory):
+            shls_slice = (0, cell.nbas, 0, cell.nbas) + tuple(aux_range)
+            outcore._aux_e2(cell, fused_cell, feri, 'int3c2e', aosym='s2',
+                            kptij_lst=kptij_lst, dataname='j3c-junk',
+                            shls_slice=shls_slice, max_memory=max_memory)
+        j3c_junk = shards.aux_e2(aux_e2, fused_cell)
     t1 = log.timer_debug1('3c2e', *t1)
 
     nao = cell.nao_nr()
@@ -252,10 +273,9 @@ def _make_j3c(mydf, cell, auxcell, kptij_lst, cderi_file):
             j2ctag = 'eig'
         return j2c, j2c_negative, j2ctag
 
-    feri = h5py.File(cderi_file, 'w')
-    feri['j3c-kptij'] = kptij_lst
-    nsegs = len(fswap['j3c-junk/0'])
-    def make_kpt(uniq_kptji_id, cholesky_j2c):
+    fswap.flush()
+    nsegs = len(j3c_junk['j3c-junk/0'])
+    def make_kpt(uniq_kptji_id, cholesky_j2c, feri):
         kpt = uniq_kpts[uniq_kptji_id]  # kpt = kptj - kpti
         log.debug1('kpt = %s', kpt)
         adapted_ji_idx = numpy.where(uniq_inverse == uniq_kptji_id)[0]
@@ -304,7 +324,7 @@ def _make_j3c(mydf, cell, auxcell, kptij_lst, cderi_file):
             j3cR = []
             j3cI = []
             for k, idx in enumerate(adapted_ji_idx):
-                v = numpy.vstack([fswap['j3c-junk/%d/%d'%(idx,i)][0,col0:col1].T
+                v = numpy.vstack([j3c_junk['j3c-junk/%d/%d'%(idx,i)][0,col0:col1].T
                                   for i in range(nsegs)])
                 # vbar is the interaction between the background charge
                 # and the auxiliary basis.  0D, 1D, 2D do not have vbar.
@@ -369,23 +389,40 @@ def _make_j3c(mydf, cell, auxcell, kptij_lst, cderi_file):
                     feri['j3c-/%d/%d'%(ji,istep)] = lib.dot(j2c_negative, v)
             j3cR = j3cI = None
 
-        for ji in adapted_ji_idx:
-            del(fswap['j3c-junk/%d'%ji])
-
-    # Wrapped around boundary and symmetry between k and -k can be used
-    # explicitly for the metric integrals.  We consider this symmetry
-    # because it is used in the df_ao2mo module when contracting two 3-index
-    # integral tensors to the 4-index 2e integral tensor. If the symmetry
-    # related k-points are treated separately, the resultant 3-index tensors
-    # may have inconsistent dimension due to the numerial noise when handling
-    # linear dependency of j2c.
-    def conj_j2c(cholesky_j2c):
-        j2c, j2c_negative, j2ctag = cholesky_j2c
-        if j2c_negative is None:
-            return j2c.conj(), None, j2ctag
-        else:
-            return j2c.conj(), j2c_negative.conj(), j2ctag
+        if shards is None:  # otherwise j3c-junk is held in the shard files
+            for ji in adapted_ji_idx:
+                del(fswap['j3c-junk/%d'%ji])
+
+    _make_j3c_kpts(mydf, cell, kptij_lst, cholesky_decomposed_metric, make_kpt,
+                   cderi_file, shards)
+    if shards is not None:
+        j3c_junk.close()
+        shards.remove('j3c-junk')
+
+
+# Wrapped around boundary and symmetry between k and -k can be used
+# explicitly for the metric integrals.  We consider this symmetry
+# because it is used in the df_ao2mo module when contracting two 3-index
+# integral tensors to the 4-index 2e integral tensor. If the symmetry
+# related k-points are treated separately, the resultant 3-index tensors
+# may have inconsistent dimension due to the numerial noise when handling
+# linear dependency of j2c.
+def _conj_j2c(cholesky_j2c):
+    j2c, j2c_negative, j2ctag = cholesky_j2c
+    if j2c_negative is None:
+        return j2c.conj(), None, j2ctag
+    else:
+        return j2c.conj(), j2c_negative.conj(), j2ctag
 
+def _metric_symmetry_groups(cell, uniq_kpts, log):
+    '''Group the unique k-point differences which can share one decomposed
+    metric: (k - k')*a = 2n pi (same metric) and (k + k')*a = 2n pi (complex
+    conjugated metric).
+
+    Returns:
+        A list of (k, [(uniq_kptji_id, conj), ...]). The metric of uniq_kpts[k]
+        is used by all members of the group.
+    '''
     a = cell.lattice_vectors() / (2*numpy.pi)
     def kconserve_indices(kpt):
         '''search which (kpts+kpt) satisfies momentum conservation'''
@@ -395,22 +432,18 @@ def _make_j3c(mydf, cell, auxcell, kptij_lst, cderi_file):
         uniq_kptji_ids = numpy.where(mask)[0]
         return uniq_kptji_ids
 
+    groups = []
     done = numpy.zeros(len(uniq_kpts), dtype=bool)
     for k, kpt in enumerate(uniq_kpts):
         if done[k]:
             continue
 
-        log.debug1('Cholesky decomposition for j2c at kpt %s', k)
-        cholesky_j2c = cholesky_decomposed_metric(k)
-
         # The k-point k' which has (k - k') * a = 2n pi. Metric integrals have the
         # symmetry S = S
         uniq_kptji_ids = kconserve_indices(-kpt)
         log.debug1("Symmetry pattern (k - %s)*a= 2n pi", kpt)
         log.debug1("    make_kpt for uniq_kptji_ids %s", uniq_kptji_ids)
-        for uniq_kptji_id in uniq_kptji_ids:
-            if not done[uniq_kptji_id]:
-                make_kpt(uniq_kptji_id, cholesky_j2c)
+        members = [(i, False) for i in uniq_kptji_ids if not done[i]]
         done[uniq_kptji_ids] = True
 
         # The k-point k' which has (k + k') * a = 2n pi. Metric integrals have the
@@ -418,13 +451,230 @@ def _make_j3c(mydf, cell, auxcell, kptij_lst, cderi_file):
         uniq_kptji_ids = kconserve_indices(kpt)
         log.debug1("Symmetry pattern (k + %s)*a= 2n pi", kpt)
         log.debug1("    make_kpt for %s", uniq_kptji_ids)
-        cholesky_j2c = conj_j2c(cholesky_j2c)
-        for uniq_kptji_id in uniq_kptji_ids:
-            if not done[uniq_kptji_id]:
-                make_kpt(uniq_kptji_id, cholesky_j2c)
+        members.extend([(i, True) for i in uniq_kptji_ids if not done[i]])
         done[uniq_kptji_ids] = True
+        groups.append((k, members))
+    return groups
+
+def _make_j3c_kpts(mydf, cell, kptij_lst, cholesky_decomposed_metric, make_kpt,
+                   cderi_file, shards=None):
+    '''The second pass of _make_j3c. make_kpt(uniq_kptji_id, cholesky_j2c, feri)
+    is called for all unique k-point differences of kptij_lst. When shards
+    are given, each group of k-points is written to its own shard file by
+    concurrent workers and the shards are merged into cderi_file.
+    '''
+    log = logger.new_logger(mydf)
+    if shards is None:
+        uniq_kpts = unique(kptij_lst[:,1] - kptij_lst[:,0])[0]
+        groups = _metric_symmetry_groups(cell, uniq_kpts, log)
+    else:
+        groups = shards.groups
 
-    feri.close()
+    def make_group(k, members, feri):
+        log.debug1('Cholesky decomposition for j2c at kpt %s', k)
+        cholesky_j2c = cholesky_decomposed_metric(k)
+        cholesky_j2c_conj = None
+        for uniq_kptji_id, conj in members:
+            if not conj:
+                make_kpt(uniq_kptji_id, cholesky_j2c, feri)
+            else:
+                if cholesky_j2c_conj is None:
+                    cholesky_j2c_conj = _conj_j2c(cholesky_j2c)
+                make_kpt(uniq_kptji_id, cholesky_j2c_conj, feri)
+
+    if shards is None:
+        feri = h5py.File(cderi_file, 'w')
+        feri['j3c-kptij'] = kptij_lst
+        for k, members in groups:
+            make_group(k, members, feri)
+        feri.close()
+    else:
+        shards.run(lambda g, feri: make_group(*groups[g], feri))
+        shards.merge()
+
+def _parallel_map(func, tasks, nworkers):
+    '''Call func(task) for all tasks in nworkers threads. Tasks are handed out
+    to the threads in the given order as they become idle. Each thread is
+    given a share of the OpenMP threads.'''
+    nworkers = min(nworkers, len(tasks))
+    if nworkers <= 1:
+        for task in tasks:
+            func(task)
+        return
+
+    nthreads = max(1, lib.num_threads() // nworkers)
+    def worker(task):
+        with lib.with_omp_threads(nthreads):
+            func(task)
+
+    with ThreadPoolExecutor(max_workers=nworkers) as executor:
+        for fut in [executor.submit(worker, task) for task in tasks]:
+            fut.result()
+
+class _J3CShards(object):
+    '''Shard files of a parallel, restartable _make_j3c.
+
+    The 3-center integrals of auxiliary shell ranges (first pass) and the DF
+    tensors of each group of k-points (second pass) are computed by
+    mydf.j3c_nproc concurrent workers. The workers are threads which share
+    the OpenMP threads (the integral and BLAS kernels release the GIL).
+    Each task writes its own shard file in the
+    directory cderi_file+'.shards'. A shard is marked complete by the
+    signature of the input. Complete shards are reused if the build is
+    restarted. The final cderi_file has HDF5 virtual datasets that refer to
+    the shards of the second pass, so the shards must be kept with
+    cderi_file.
+    '''
+    def __init__(self, mydf, cell, auxcell, kptij_lst, cderi_file):
+        self.mydf = mydf
+        self.stdout = mydf.stdout
+        self.verbose = mydf.verbose
+        self.nproc = max(1, getattr(mydf, 'j3c_nproc', 1))
+        self.cderi_file = cderi_file
+        self.kptij_lst = kptij_lst
+        self.shard_dir = cderi_file + '.shards'
+        if not os.path.isdir(self.shard_dir):
+            os.makedirs(self.shard_dir)
+        tmpfile = getattr(mydf, '_cderi_to_save', None)
+        if getattr(tmpfile, 'name', None) == cderi_file:
+            # Remove the shards together with the temporary cderi file
+            weakref.finalize(tmpfile, shutil.rmtree, self.shard_dir, True)
+
+        md5 = hashlib.md5()
+        for x in (cell._atm, cell._bas, cell._env, cell.lattice_vectors(),
+                  auxcell._atm, auxcell._bas, auxcell._env, kptij_lst):
+            md5.update(numpy.ascontiguousarray(x).tobytes())
+        md5.update(repr((mydf.__class__.__name__, mydf.mesh,
+                         getattr(mydf, 'eta', None),
+                         getattr(mydf, 'omega', None),
+                         getattr(mydf, 'mesh_compact', None),
+                         mydf.linear_dep_threshold)).encode())
+        self.signature = md5.hexdigest()
+
+        uniq_kpts, uniq_index, uniq_inverse = unique(kptij_lst[:,1] - kptij_lst[:,0])
+        self.groups = _metric_symmetry_groups(cell, uniq_kpts, logger.new_logger(mydf))
+        # Cost of each group ~ the number of k-point pairs
+        counts = numpy.bincount(uniq_inverse, minlength=len(uniq_kpts))
+        self.costs = [sum(counts[i] for i, conj in members)
+                      for k, members in self.groups]
+        self.filenames = [self.filename('j3c', g) for g in range(len(self.groups))]
+
+    def filename(self, label, i):
+        return os.path.join(self.shard_dir, '%s.%d.h5' % (label, i))
+
+    def is_complete(self, filename):
+        if not os.path.isfile(filename):
+            return False
+        try:
+            with h5py.File(filename, 'r') as f:
+                return f.attrs.get('signature') == self.signature
+        except (IOError, OSError):
+            return False
+
+    def j3c_complete(self):
+        return all(self.is_complete(f) for f in self.filenames)
+
+    def _run(self, filenames, func, tasks):
+        '''func(task, feri) for tasks whose shard is not complete'''
+        todo = [t for t in tasks if not self.is_complete(filenames[t])]
+        logger.info(self, 'j3c shards: %d of %d %s restored',
+                    len(tasks)-len(todo), len(tasks),
+                    os.path.basename(filenames[0]).split('.')[0])
+        nproc = min(self.nproc, len(todo))
+        max_memory = max(2000, self.mydf.max_memory / max(nproc, 1))
+        def task(t):
+            with h5py.File(filenames[t], 'w') as feri:
+                func(t, feri)
+                feri.attrs['signature'] = self.signature
+        with lib.temporary_env(self.mydf, max_memory=max_memory):
+            _parallel_map(task, todo, nproc)
+
+    def aux_e2(self, aux_e2, auxcell, dataname='j3c-junk'):
+        '''Evaluate aux_e2(feri, aux_shls_range, max_memory) for ranges of the
+        auxiliary shells. Returns a read-only view of the results in the layout
+        of outcore._aux_e2.'''
+        aux_loc = auxcell.ao_loc_nr()
+        naux = aux_loc[-1]
+        ntasks = min(auxcell.nbas, self.nproc * 2)
+        segs = balance_segs(aux_loc[1:] - aux_loc[:-1], (naux+ntasks-1)//ntasks)
+        filenames = [self.filename(dataname, i) for i in range(len(segs))]
+        def task(i, feri):
+            aux_e2(feri, segs[i][:2], self.mydf.max_memory)
+        self._run(filenames, task, list(range(len(segs))))
+
+        links = {}
+        istep = 0
+        for filename in filenames:
+            with h5py.File(filename, 'r') as f:
+                nkptij = len(f[dataname])
+                nsegs = len(f['%s/0' % dataname])
+            for k in range(nkptij):
+                for i in range(nsegs):
+                    links['%s/%d/%d' % (dataname, k, istep+i)] = \
+                            (filename, '%s/%d/%d' % (dataname, k, i))
+            istep += nsegs
+        return _ShardView(links)
+
+    def run(self, make_group):
+        '''make_group(g, feri) for all groups of k-points, the most expensive
+        groups first'''
+        order = numpy.argsort(self.costs, kind='stable')[::-1]
+        self._run(self.filenames, make_group, [int(g) for g in order])
+
+    def merge(self):
+        '''Collect the datasets of all shards as virtual datasets in cderi_file'''
+        cderi_dir = os.path.dirname(os.path.abspath(self.cderi_file))
+        with h5py.File(self.cderi_file, 'w') as feri:
+            feri['j3c-kptij'] = self.kptij_lst
+            for filename in self.filenames:
+                # Relative path is resolved with respect to cderi_file
+                source = os.path.relpath(os.path.abspath(filename), cderi_dir)
+                with h5py.File(filename, 'r') as f:
+                    def add(name, obj):
+                        if isinstance(obj, h5py.Dataset):
+                            layout = h5py.VirtualLayout(obj.shape, obj.dtype)
+                            layout[...] = h5py.VirtualSource(source, name, obj.shape)
+                            feri.create_virtual_dataset(name, layout)
+                    f.visititems(add)
+
+    def remove(self, label):
+        '''Remove the shard files of label. Views returned by aux_e2 on these
+        files should be closed first.'''
+        for filename in os.listdir(self.shard_dir):
+            if filename.startswith(label + '.'):
+                os.remove(os.path.join(self.shard_dir, filename))
+
+class _ShardView(object):
+    '''Read-only view of datasets distributed over shard files. The files
+    are opened on demand and stay open until close() is called.'''
+    def __init__(self, links):
+        self.links = links
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        if key in self.links:
+            filename, name = self.links[key]
+            with self._lock:
+                if filename not in self._files:
+                    self._files[filename] = h5py.File(filename, 'r')
+                return self._files[filename][name]
+        # Members of a group
+        prefix = key.rstrip('/') + '/'
+        return [x for x in self.links
+                if x.startswith(prefix) and '/' not in x[len(prefix):]]
+
+    def close(self):
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files = {}
+
+def _j3c_shards(mydf, cell, auxcell, kptij_lst, cderi_file):
+    '''_J3CShards if the parallel/sharded build is requested'''
+    if getattr(mydf, 'j3c_nproc', 1) > 1 or getattr(mydf, 'j3c_shards', False):
+        return _J3CShards(mydf, cell, auxcell, kptij_lst, cderi_file)
+    return None
 
 
 class GDF(aft.AFTDF):
@@ -470,6 +720,13 @@ class GDF(aft.AFTDF):
         # 0 since v1.5.2.
         self.exp_to_discard = cell.exp_to_discard
 
+        # Number of workers to build the DF integral tensor. With more than
+        # one worker, or if j3c_shards is set, the integrals are written to
+        # shard files in the directory <cderi-file>.shards which also allow a
+        # build to be restarted after interruption.
+        self.j3c_nproc = getattr(__config__, 'pbc_df_df_DF_j3c_nproc', 1)
+        self.j3c_shards = getattr(__config__, 'pbc_df_df_DF_j3c_shards', False)
+
         # The following attributes are not input options.
         self.exxdiv = None  # to mimic KRHF/KUHF object in function get_coulG
         self.auxcell = None
@@ -522,6 +779,8 @@ class GDF(aft.AFTDF):
             log.info('auxbasis = %s', self.auxcell.basis)
         log.info('eta = %s', self.eta)
         log.info('exp_to_discard = %s', self.exp_to_discard)
+        if self.j3c_nproc > 1 or self.j3c_shards:
+            log.info('j3c_nproc = %d  (sharded j3c build)', self.j3c_nproc)
         if isinstance(self._cderi, str):
             log.info('_cderi = %s  where DF integrals are loaded (readonly).',
                      self._cderi)
@@ -335,6 +335,14 @@ class FFTDF(lib.StreamObject):
                 vj = fft_jk.get_j_kpts(self, dm, hermi, kpts, kpts_band)
         return vj, vk
 
+    def get_k_ace(self, dm, kpts=None, exxdiv=None):
+        '''Adaptively compressed exchange operator. See
+        :func:`fft_jk.get_k_ace_kpts`'''
+        from pyscf.pbc.df import fft_jk
+        if kpts is None:
+            kpts = self.kpts
+        return fft_jk.get_k_ace_kpts(self, dm, kpts, exxdiv)
+
     get_eri = get_ao_eri = fft_ao2mo.get_eri
     ao2mo = get_mo_eri = fft_ao2mo.general
     ao2mo_7d = fft_ao2mo.ao2mo_7d
@@ -54,7 +54,7 @@ def get_eri(mydf, kpts=None,
 
     kpti, kptj, kptk, kptl = kptijkl
     q = kptj - kpti
-    coulG = tools.get_coulG(cell, q, mesh=mydf.mesh)
+    coulG = tools.get_coulG_cached(cell, q, mesh=mydf.mesh)
     coords = cell.gen_uniform_grids(mydf.mesh)
     max_memory = mydf.max_memory - lib.current_memory()[0]
 
@@ -116,7 +116,7 @@ def general(mydf, mo_coeffs, kpts=None,
 
     allreal = not any(numpy.iscomplexobj(mo) for mo in mo_coeffs)
     q = kptj - kpti
-    coulG = tools.get_coulG(cell, q, mesh=mydf.mesh)
+    coulG = tools.get_coulG_cached(cell, q, mesh=mydf.mesh)
     coords = cell.gen_uniform_grids(mydf.mesh)
     max_memory = mydf.max_memory - lib.current_memory()[0]
 
@@ -392,8 +392,8 @@ def ao2mo_7d(mydf, mo_coeff_kpts, kpts=None, factor=1, out=None):
         ki = adapted_ji_idx[0] // nkpts
         kj = adapted_ji_idx[0] % nkpts
 
-        coulG = tools.get_coulG(cell, q, mesh=mydf.mesh)
-        coulG *= (cell.vol/ngrids) * factor
+        coulG = tools.get_coulG_cached(cell, q, mesh=mydf.mesh)
+        coulG = coulG * ((cell.vol/ngrids) * factor)
         phase = numpy.exp(-1j * numpy.dot(coords, q))
 
         for kk in range(nkpts):
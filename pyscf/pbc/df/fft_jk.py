@@ -21,7 +21,9 @@ JK with discrete Fourier transformation
 '''
 
 
+from functools import reduce
 import numpy as np
+import scipy.linalg
 from pyscf import lib
 from pyscf.lib import logger
 from pyscf.pbc import tools
@@ -57,7 +59,7 @@ def get_j_kpts(mydf, dm_kpts, hermi=1, kpts=np.zeros((1,3)), kpts_band=None):
     dms = _format_dms(dm_kpts, kpts)
     nset, nkpts, nao = dms.shape[:3]
 
-    coulG = tools.get_coulG(cell, mesh=mesh)
+    coulG = tools.get_coulG_cached(cell, mesh=mesh)
     ngrids = len(coulG)
 
     if hermi == 1 or gamma_point(kpts):
@@ -121,7 +123,7 @@ def get_j_e1_kpts(mydf, dm_kpts, kpts=np.zeros((1,3)), kpts_band=None):
     dms = _format_dms(dm_kpts, kpts)
     nset, nkpts, nao = dms.shape[:3]
 
-    coulG = tools.get_coulG(cell, mesh=mesh)
+    coulG = tools.get_coulG_cached(cell, mesh=mesh)
     ngrids = len(coulG)
 
     if gamma_point(kpts):
@@ -265,9 +267,9 @@ def get_k_kpts(mydf, dm_kpts, hermi=1, kpts=np.zeros((1,3)), kpts_band=None,
             # end of the function to bypass any discretization errors
             # that arise from the FFT.
             if exxdiv == 'ewald' or exxdiv is None:
-                coulG = tools.get_coulG(cell, kpt2-kpt1, False, mydf, mesh)
+                coulG = tools.get_coulG_cached(cell, kpt2-kpt1, False, mydf, mesh)
             else:
-                coulG = tools.get_coulG(cell, kpt2-kpt1, exxdiv, mydf, mesh)
+                coulG = tools.get_coulG_cached(cell, kpt2-kpt1, exxdiv, mydf, mesh)
             if is_zero(kpt1-kpt2):
                 expmikr = np.array(1.)
             else:
@@ -301,6 +303,139 @@ def get_k_kpts(mydf, dm_kpts, hermi=1, kpts=np.zeros((1,3)), kpts_band=None,
 
     return _format_jks(vk_kpts, dm_kpts, input_band, kpts)
 
+def get_k_ace_kpts(mydf, dm_kpts, kpts=np.zeros((1,3)), exxdiv=None):
+    '''Adaptively compressed exchange (ACE) operator of the given density
+    matrices. The exchange matrix at each k-point is represented as
+
+        K = xi xi^\\dagger,  xi = W (C^\\dagger W)^{-1/2},  W = K C
+
+    where C are the occupied orbitals. Only the pair densities of the
+    occupied orbitals are transformed on the FFT mesh, which costs
+    nkpts^2*nocc^2 FFTs in contrast to nkpts^2*nao*nocc FFTs of get_k_kpts.
+    K is exact when applied to the occupied orbitals.
+
+    Ref: L. Lin, J. Chem. Theory Comput., 12, 2242 (2016)
+
+    Args:
+        dm_kpts : (nkpts, nao, nao) ndarray or a list of them
+            Density matrices at each k-point. If the orbitals are not attached
+            to dm_kpts (as the attributes mo_coeff and mo_occ), the natural
+            orbitals of the density matrices are used.
+        kpts : (nkpts, 3) ndarray
+
+    Returns:
+        xi : a list (for each density matrix) of lists (for each k-point) of
+        (nao, nocc) arrays
+    '''
+    cell = mydf.cell
+    mesh = mydf.mesh
+    kpts = np.asarray(kpts).reshape(-1,3)
+    dm_kpts = lib.asarray(dm_kpts, order='C')
+    dms = _format_dms(dm_kpts, kpts)
+    nset, nkpts, nao = dms.shape[:3]
+
+    if getattr(dm_kpts, 'mo_coeff', None) is not None:
+        mo_coeff = dm_kpts.mo_coeff
+        mo_occ = dm_kpts.mo_occ
+        if dm_kpts.ndim == 2:
+            mo_coeff, mo_occ = [[mo_coeff]], [[mo_occ]]
+        elif dm_kpts.ndim == 3:
+            mo_coeff, mo_occ = [mo_coeff], [mo_occ]
+    else:
+        mo_coeff, mo_occ = _natural_orbitals(cell, dms, kpts)
+
+    coords = mydf.grids.coords
+    ngrids = coords.shape[0]
+    weight = 1./nkpts * (cell.vol/ngrids)
+    ao_kpts = [np.asarray(ao.T, order='C')
+               for ao in mydf._numint.eval_ao(cell, coords, kpts=kpts)]
+    if gamma_point(kpts):
+        dtype = dms.dtype
+    else:
+        dtype = np.complex128
+
+    if exxdiv == 'ewald':
+        vk_G0 = np.zeros((nset,nkpts,nao,nao), dtype=dtype)
+        _ewald_exxdiv_for_G0(cell, kpts, dms, vk_G0)
+
+    max_memory = mydf.max_memory - lib.current_memory()[0]
+    t1 = (logger.process_clock(), logger.perf_counter())
+    xi = []
+    for i in range(nset):
+        orbs = [c[:,occ>0] for c, occ in zip(mo_coeff[i], mo_occ[i])]
+        # phi_i(r) and sqrt(n_i) phi_i(r) on the real space mesh
+        bra_kpts = [np.dot(c.T, ao) for c, ao in zip(orbs, ao_kpts)]
+        ket_kpts = [bra * np.sqrt(occ[occ>0])[:,None]
+                    for bra, occ in zip(bra_kpts, mo_occ[i])]
+        nocc_max = max([c.shape[1] for c in orbs] + [1])
+        blksize = int(min(nocc_max, max(1, max_memory*1e6/16/4/ngrids/nocc_max)))
+
+        xi.append([])
+        for k1, bra in enumerate(bra_kpts):
+            nocc1 = bra.shape[0]
+            # W^\dagger = C^\dagger K
+            wh = np.zeros((nocc1,nao), dtype=dtype)
+            vR_dm = np.empty((nocc1,ngrids), dtype=dtype)
+            for k2, ket in enumerate(ket_kpts):
+                if nocc1 == 0 or ket.size == 0:
+                    continue
+                kpt1, kpt2 = kpts[k1], kpts[k2]
+                if exxdiv == 'ewald' or exxdiv is None:
+                    coulG = tools.get_coulG_cached(cell, kpt2-kpt1, False, mydf, mesh)
+                else:
+                    coulG = tools.get_coulG_cached(cell, kpt2-kpt1, exxdiv, mydf, mesh)
+                if is_zero(kpt1-kpt2):
+                    expmikr = np.array(1.)
+                else:
+                    expmikr = np.exp(-1j * np.dot(coords, kpt2-kpt1))
+
+                nocc2 = ket.shape[0]
+                for p0, p1 in lib.prange(0, nocc1, blksize):
+                    rho1 = np.einsum('ig,jg->ijg', bra[p0:p1].conj()*expmikr, ket)
+                    vG = tools.fft(rho1.reshape(-1,ngrids), mesh)
+                    rho1 = None
+                    vG *= coulG
+                    vR = tools.ifft(vG, mesh).reshape(p1-p0,nocc2,ngrids)
+                    vG = None
+                    if dtype == np.double:
+                        vR = vR.real
+                    np.einsum('ijg,jg->ig', vR, ket.conj(), out=vR_dm[p0:p1])
+                    vR = None
+                vR_dm *= expmikr.conj()
+                wh += weight * lib.dot(vR_dm, ao_kpts[k1].T)
+
+            if exxdiv == 'ewald':
+                wh += lib.dot(orbs[k1].conj().T, vk_G0[i,k1])
+            xi[i].append(_ace_projector(wh, orbs[k1]))
+        t1 = logger.timer_debug1(mydf, 'get_k_ace_kpts: dm %d'%i, *t1)
+    return xi
+
+def _ace_projector(wh, orbs, cutoff=1e-12):
+    '''xi = W M^{-1/2} with M = C^\\dagger W. Eigenvectors of M with tiny
+    eigenvalues are discarded.'''
+    m = lib.dot(wh, orbs)
+    e, u = scipy.linalg.eigh((m + m.conj().T) * .5)
+    if e.size == 0:
+        return np.zeros((wh.shape[1],0), dtype=wh.dtype)
+    mask = e > e[-1] * cutoff
+    return lib.dot(wh.conj().T, u[:,mask] / np.sqrt(e[mask]))
+
+def _natural_orbitals(cell, dms, kpts):
+    '''Orbitals and occupations which satisfy D = C n C^\\dagger'''
+    s = cell.pbc_intor('int1e_ovlp', hermi=1, kpts=kpts)
+    mo_coeff = []
+    mo_occ = []
+    for dm in dms:
+        mo_coeff.append([])
+        mo_occ.append([])
+        for k in range(len(kpts)):
+            sds = reduce(np.dot, (s[k], dm[k], s[k]))
+            n, c = scipy.linalg.eigh(sds, s[k])
+            n[n < 1e-10] = 0
+            mo_coeff[-1].append(c)
+            mo_occ[-1].append(n)
+    return mo_coeff, mo_occ
+
 def get_k_e1_kpts(mydf, dm_kpts, kpts=np.zeros((1,3)), kpts_band=None,
                   exxdiv=None):
     '''Derivatives of exchange (K) AO matrix at sampled k-points.
@@ -377,9 +512,9 @@ def get_k_e1_kpts(mydf, dm_kpts, kpts=np.zeros((1,3)), kpts_band=None,
             # end of the function to bypass any discretization errors
             # that arise from the FFT.
             if exxdiv == 'ewald' or exxdiv is None:
-                coulG = tools.get_coulG(cell, kpt2-kpt1, False, mydf, mesh)
+                coulG = tools.get_coulG_cached(cell, kpt2-kpt1, False, mydf, mesh)
             else:
-                coulG = tools.get_coulG(cell, kpt2-kpt1, exxdiv, mydf, mesh)
+                coulG = tools.get_coulG_cached(cell, kpt2-kpt1, exxdiv, mydf, mesh)
             if is_zero(kpt1-kpt2):
                 expmikr = np.array(1.)
             else:
@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+# Copyright 2014-2021 The PySCF Developers. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+r'''
+Interpolative separable density fitting (ISDF) for the exchange matrix
+
+The products of the cell-periodic parts u^k(r) = exp(-ikr) \phi^k(r) of the
+Bloch AOs are interpolated on a set of points {r_P} of the uniform grid
+
+    u^{k1}_p(r)^* u^{k2}_q(r) ~= \sum_P u^{k1}_p(r_P)^* u^{k2}_q(r_P) \zeta_P(r)
+
+The interpolation points are selected by the QR factorization with column
+pivoting of randomly sketched pair products. The interpolation vectors
+\zeta_P(r) are real, periodic and shared by all pairs of k-points. The
+exchange matrix
+
+    K^{k1} = 1/Nk \sum_{k2} \Phi^{k1\dagger} [W^{k2-k1} o (\Phi^{k2} D^{k2} \Phi^{k2\dagger})] \Phi^{k1}
+
+(\Phi^k being the values of the Bloch AOs on the interpolation points and W^q
+the Coulomb matrix of the phase-shifted vectors \zeta_P) is computed with
+cubic scaling in the system size. The Coulomb matrix J is computed exactly
+with FFTDF.
+
+Ref:
+    J. Lu, L. Ying, J. Comput. Phys., 302, 329 (2015)
+    W. Hu, L. Lin, C. Yang, J. Chem. Theory Comput., 13, 1188 (2017)
+'''
+
+from functools import reduce
+import numpy
+import scipy.linalg
+from pyscf import lib
+from pyscf.lib import logger
+from pyscf.pbc import tools
+from pyscf.pbc.df import fft
+from pyscf.pbc.df import fft_jk
+from pyscf.pbc.df.df_jk import _format_dms, _format_jks, _ewald_exxdiv_for_G0
+from pyscf.pbc.lib.kpts_helper import is_zero, gamma_point
+from pyscf import __config__
+
+# Number of interpolation points = C_ISDF * nao
+C_ISDF = getattr(__config__, 'pbc_df_isdf_c_isdf', 10)
+# Additional random samples in the selection of the interpolation points
+OVERSAMPLING = getattr(__config__, 'pbc_df_isdf_oversampling', 10)
+# The linear dependency in the interpolation vectors is removed
+LINDEP = getattr(__config__, 'pbc_df_isdf_lindep', 1e-12)
+
+
+def _eval_periodic_ao(mydf, coords, kpts):
+    '''Cell-periodic parts exp(-ikr) \\phi^k(r) of the Bloch AOs'''
+    ao_kpts = mydf._numint.eval_ao(mydf.cell, coords, kpts=kpts)
+    if gamma_point(kpts):
+        return [numpy.asarray(ao, order='C') for ao in ao_kpts]
+    u_kpts = []
+    for k, ao in enumerate(ao_kpts):
+        if is_zero(kpts[k]):
+            u_kpts.append(numpy.asarray(ao, dtype=numpy.complex128))
+        else:
+            u_kpts.append(ao * numpy.exp(-1j*numpy.dot(coords, kpts[k]))[:,None])
+    return u_kpts
+
+def select_interpolation_points(mydf, nip, kpts, seed=None):
+    '''Selects nip interpolation points on the uniform grid with the QR
+    factorization with column pivoting of the sketched AO pair products
+
+        M_{ab}(r) = X_a(r)^* Y_b(r),  X_a(r) = \\sum_{k,p} u^k_p(r) G_{kp,a}
+
+    where G is a random matrix.
+
+    Returns:
+        The indices of the interpolation points in mydf.grids.coords
+    '''
+    cell = mydf.cell
+    kpts = numpy.reshape(kpts, (-1,3))
+    nkpts = len(kpts)
+    nao = cell.nao_nr()
+    coords = mydf.grids.coords
+    ngrids = len(coords)
+    nip = min(nip, ngrids)
+    nsketch = int(numpy.ceil(numpy.sqrt(nip + OVERSAMPLING)))
+
+    rng = numpy.random.RandomState(seed)
+    if gamma_point(kpts):
+        dtype = numpy.double
+        g1 = rng.standard_normal((nkpts,nao,nsketch))
+        g2 = rng.standard_normal((nkpts,nao,nsketch))
+    else:
+        dtype = numpy.complex128
+        g1 = (rng.standard_normal((nkpts,nao,nsketch)) +
+              rng.standard_normal((nkpts,nao,nsketch)) * 1j)
+        g2 = (rng.standard_normal((nkpts,nao,nsketch)) +
+              rng.standard_normal((nkpts,nao,nsketch)) * 1j)
+
+    max_memory = max(2000, mydf.max_memory - lib.current_memory()[0])
+    blksize = int(min(ngrids, max(64, max_memory*1e6/16/(nkpts+1)/nao)))
+    xs = numpy.zeros((ngrids,nsketch), dtype=dtype)
+    ys = numpy.zeros((ngrids,nsketch), dtype=dtype)
+    for p0, p1 in lib.prange(0, ngrids, blksize):
+        for k, u in enumerate(_eval_periodic_ao(mydf, coords[p0:p1], kpts)):
+            xs[p0:p1] += lib.dot(u, g1[k])
+            ys[p0:p1] += lib.dot(u, g2[k])
+
+    sketch = numpy.einsum('ga,gb->abg', xs.conj(), ys).reshape(-1,ngrids)
+    xs = ys = None
+    piv = scipy.linalg.qr(sketch, mode='r', pivoting=True)[1]
+    return numpy.sort(piv[:nip])
+
+def get_isdf_vectors(mydf, ip_idx, kpts):
+    '''Least-squares fit of the interpolation vectors \\zeta_P(r).
+
+    With A(r, Q) = \\sum_{k,p} u^k_p(r) u^k_p(r_Q)^*, the normal equation of
+    the fitting is
+
+        \\sum_Q |A(r_P, r_Q)|^2 \\zeta_Q(r) = |A(r, r_P)|^2
+
+    Returns:
+        zeta : (nip, ngrids) ndarray
+    '''
+    kpts = numpy.reshape(kpts, (-1,3))
+    nkpts = len(kpts)
+    nao = mydf.cell.nao_nr()
+    coords = mydf.grids.coords
+    ngrids = len(coords)
+    nip = len(ip_idx)
+
+    u_ip = _eval_periodic_ao(mydf, coords[ip_idx], kpts)
+    a = sum(lib.dot(u, u.conj().T) for u in u_ip)
+    e, v = scipy.linalg.eigh(abs(a)**2)
+    mask = e > e[-1] * LINDEP
+    logger.debug(mydf, 'ISDF: %d linearly dependent interpolation vectors '
+                 'are removed', nip - numpy.count_nonzero(mask))
+    v = v[:,mask]
+    cct_inv = lib.dot(v / e[mask], v.T)
+
+    max_memory = max(2000, mydf.max_memory - lib.current_memory()[0])
+    blksize = int(min(ngrids, max(64, max_memory*1e6/16/(nkpts*nao+2*nip))))
+    zeta = numpy.empty((nip,ngrids))
+    for p0, p1 in lib.prange(0, ngrids, blksize):
+        u_r = _eval_periodic_ao(mydf, coords[p0:p1], kpts)
+        a = sum(lib.dot(u, u1.conj().T) for u, u1 in zip(u_r, u_ip))
+        zeta[:,p0:p1] = lib.dot(cct_inv, (abs(a)**2).T)
+    return zeta
+
+def get_k_kpts(mydf, dm_kpts, hermi=1, kpts=numpy.zeros((1,3)), kpts_band=None,
+               exxdiv=None):
+    '''Exchange matrices at sampled k-points with ISDF. kpts_band is not
+    supported.
+
+    Args:
+        dm_kpts : (nkpts, nao, nao) ndarray or a list of them
+            Density matrix at each k-point
+        kpts : (nkpts, 3) ndarray
+
+    Returns:
+        vk : (nkpts, nao, nao) ndarray
+        or list of vk if the input dm_kpts is a list of DMs
+    '''
+    if kpts_band is not None:
+        raise NotImplementedError('ISDF exchange matrix for kpts_band')
+    cell = mydf.cell
+    kpts = numpy.reshape(kpts, (-1,3))
+    dm_kpts = lib.asarray(dm_kpts, order='C')
+    dms = _format_dms(dm_kpts, kpts)
+    nset, nkpts, nao = dms.shape[:3]
+
+    ip_ao = mydf.get_ip_ao(kpts)
+    ngrids = len(mydf.grids.coords)
+    weight = 1./nkpts * (cell.vol/ngrids)
+    if gamma_point(kpts):
+        vk_kpts = numpy.zeros((nset,nkpts,nao,nao), dtype=dms.dtype)
+    else:
+        vk_kpts = numpy.zeros((nset,nkpts,nao,nao), dtype=numpy.complex128)
+
+    t1 = (logger.process_clock(), logger.perf_counter())
+    for i in range(nset):
+        dm_ip = [reduce(lib.dot, (ip_ao[k], dms[i,k], ip_ao[k].conj().T))
+                 for k in range(nkpts)]
+        for k1 in range(nkpts):
+            vk_ip = 0
+            for k2 in range(nkpts):
+                vk_ip += mydf.get_coulomb_matrix(kpts[k2]-kpts[k1], exxdiv) * dm_ip[k2]
+            vk_kpts[i,k1] = weight * reduce(lib.dot, (ip_ao[k1].conj().T, vk_ip,
+                                                      ip_ao[k1]))
+    t1 = logger.timer_debug1(mydf, 'ISDF get_k_kpts', *t1)
+
+    if exxdiv == 'ewald':
+        _ewald_exxdiv_for_G0(cell, kpts, dms, vk_kpts)
+    return _format_jks(vk_kpts, dm_kpts, None, kpts)
+
+
+class ISDF(fft.FFTDF):
+    '''Interpolative separable density fitting. The exchange matrix is
+    computed with the ISDF decomposition of AO pair products. The Coulomb
+    matrix and the other integrals are computed with FFTDF.
+
+    Attributes:
+        c_isdf : int
+            The number of interpolation points is c_isdf * nao.
+        seed : int
+            Seed of the random sketch in the selection of interpolation
+            points.
+    '''
+    def __init__(self, cell, kpts=numpy.zeros((1,3))):
+        fft.FFTDF.__init__(self, cell, kpts)
+        self.c_isdf = C_ISDF
+        self.seed = None
+
+        # Interpolation points (indices in grids.coords), the kpts for which
+        # the interpolation vectors were built, the Fourier transformed
+        # interpolation vectors, and the cached Coulomb matrices
+        self._ip_idx = None
+        self._isdf_kpts = None
+        self._ip_ao = None
+        self._zeta_G = None
+        self._coulomb = {}
+        self._keys = self._keys.union(['c_isdf', 'seed'])
+
+    def reset(self, cell=None):
+        fft.FFTDF.reset(self, cell)
+        self._ip_idx = None
+        self._isdf_kpts = None
+        self._ip_ao = None
+        self._zeta_G = None
+        self._coulomb = {}
+        return self
+
+    def dump_flags(self, verbose=None):
+        fft.FFTDF.dump_flags(self, verbose)
+        logger.info(self, 'c_isdf = %s', self.c_isdf)
+        if self._ip_idx is not None:
+            logger.info(self, 'Number of interpolation points = %d',
+                        len(self._ip_idx))
+        return self
+
+    def build(self, kpts=None):
+        if kpts is None:
+            kpts = self.kpts
+        kpts = numpy.reshape(kpts, (-1,3))
+        cell = self.cell
+        log = logger.new_logger(self)
+        cpu0 = (logger.process_clock(), logger.perf_counter())
+        self.reset()
+
+        nip = int(self.c_isdf * cell.nao_nr())
+        self._ip_idx = select_interpolation_points(self, nip, kpts, self.seed)
+        cpu0 = log.timer('ISDF interpolation points', *cpu0)
+        zeta = get_isdf_vectors(self, self._ip_idx, kpts)
+        self._zeta_G = tools.fft(zeta, self.mesh)
+        zeta = None
+        self._ip_ao = [numpy.asarray(ao, order='C') for ao in
+                       self._numint.eval_ao(cell, self.grids.coords[self._ip_idx],
+                                            kpts=kpts)]
+        self._isdf_kpts = kpts
+        log.timer('ISDF vectors', *cpu0)
+        if self.verbose >= logger.INFO:
+            self.dump_flags()
+        return self
+
+    def get_ip_ao(self, kpts):
+        '''Bloch AOs on the interpolation points'''
+        kpts = numpy.reshape(kpts, (-1,3))
+        if (self._isdf_kpts is None or self._isdf_kpts.shape != kpts.shape or
+            not numpy.allclose(self._isdf_kpts, kpts)):
+            self.build(kpts)
+        return self._ip_ao
+
+    def get_coulomb_matrix(self, q, exxdiv=None):
+        '''The Coulomb matrix of the interpolation vectors shifted by the
+        phase exp(iqr)
+
+            W^q_{PQ} = \\sum_G \\zeta_P(G) v(q+G) \\zeta_Q(G)^* / N_G
+                       * exp(-iq(r_P - r_Q))
+
+        The matrices are cached as long as they fit in max_memory.
+        Otherwise they are recomputed on demand.
+        '''
+        cell = self.cell
+        key = (str(exxdiv), cell.omega) + tuple(numpy.round(q, 9) + 0.)
+        w = self._coulomb.get(key)
+        if w is None:
+            if exxdiv == 'ewald' or exxdiv is None:
+                coulG = tools.get_coulG_cached(cell, q, False, self, self.mesh)
+            else:
+                coulG = tools.get_coulG_cached(cell, q, exxdiv, self, self.mesh)
+            zeta_G = self._zeta_G
+            w = lib.dot(zeta_G * coulG, zeta_G.conj().T)
+            w *= 1. / zeta_G.shape[1]
+            if is_zero(q):
+                if gamma_point(self._isdf_kpts):
+                    w = w.real
+            else:
+                phase = numpy.exp(-1j*numpy.dot(self.grids.coords[self._ip_idx], q))
+                w *= phase[:,None] * phase.conj()
+            if w.nbytes*1e-6 < self.max_memory - lib.current_memory()[0]:
+                self._coulomb[key] = w
+        return w
+
+    def get_jk(self, dm, hermi=1, kpts=None, kpts_band=None,
+               with_j=True, with_k=True, omega=None, exxdiv=None):
+        if omega is not None or kpts_band is not None or not with_k:
+            return fft.FFTDF.get_jk(self, dm, hermi, kpts, kpts_band,
+                                    with_j, with_k, omega, exxdiv)
+
+        if kpts is None:
+            if numpy.all(self.kpts == 0): # Gamma-point J/K by default
+                kpts = numpy.zeros(3)
+            else:
+                kpts = self.kpts
+        else:
+            kpts = numpy.asarray(kpts)
+
+        vj = None
+        if kpts.shape == (3,):
+            vk = get_k_kpts(self, dm, hermi, kpts.reshape(1,3), None, exxdiv)
+            if with_j:
+                vj = fft_jk.get_j(self, dm, hermi, kpts)
+            # The k-point dimension of the single k-point DMs
+            vk = vk.reshape(numpy.shape(dm))
+        else:
+            vk = get_k_kpts(self, dm, hermi, kpts, None, exxdiv)
+            if with_j:
+                vj = fft_jk.get_j_kpts(self, dm, hermi, kpts)
+        return vj, vk
@@ -36,7 +36,6 @@ the LR integrals are evaluated in reciprocal space with a plane wave basis.
 '''
 
 import os
-import h5py
 import scipy.linalg
 import tempfile
 import numpy as np
@@ -131,6 +130,12 @@ def _make_j3c(mydf, cell, auxcell, kptij_lst, cderi_file):
 
     omega = abs(mydf.omega)
 
+    shards = df.df._j3c_shards(mydf, cell, auxcell, kptij_lst, cderi_file)
+    if shards is not None and shards.j3c_complete():
+        log.info('Restore DF integrals from %s', shards.shard_dir)
+        shards.merge()
+        return
+
     if mydf.use_bvk and mydf.kpts_band is None:
         bvk_kmesh = kpts_to_kmesh(cell, mydf.kpts)
         if bvk_kmesh is None:
@@ -255,12 +260,24 @@ def _make_j3c(mydf, cell, auxcell, kptij_lst, cderi_file):
     # inverting j2c, and use it's column max to determine an extra precision for 3c2e prescreening
 
     # short-range part
-    rsdf_helper._aux_e2_nospltbas(
-                    cell, auxcell, omega, fswap, 'int3c2e', aosym='s2',
-                    kptij_lst=kptij_lst, dataname='j3c-junk',
-                    max_memory=max_memory,
-                    bvk_kmesh=bvk_kmesh,
-                    precision=mydf.precision_R)
+    if shards is None:
+        rsdf_helper._aux_e2_nospltbas(
+                        cell, auxcell, omega, fswap, 'int3c2e', aosym='s2',
+                        kptij_lst=kptij_lst, dataname='j3c-junk',
+                        max_memory=max_memory,
+                        bvk_kmesh=bvk_kmesh,
+                        precision=mydf.precision_R)
+        j3c_junk = fswap
+    else:
+        def aux_e2(feri, aux_range, max_memory):
+            shls_slice = (0, cell.nbas, 0, cell.nbas) + tuple(aux_range)
+            rsdf_helper._aux_e2_nospltbas(
+                            cell, auxcell, omega, feri, 'int3c2e', aosym='s2',
+                            kptij_lst=kptij_lst, dataname='j3c-junk',
+                            shls_slice=shls_slice, max_memory=max_memory,
+                            bvk_kmesh=bvk_kmesh,
+                            precision=mydf.precision_R)
+        j3c_junk = shards.aux_e2(aux_e2, auxcell)
     t1 = log.timer_debug1('3c2e', *t1)
 
     # recompute g0 and Gvectors for j3c
@@ -273,10 +290,9 @@ def _make_j3c(mydf, cell, auxcell, kptij_lst, cderi_file):
     # Add (1) short-range G=0 (i.e., charge) part and (2) long-range part
     tspans = np.zeros((3,2))    # lr, j2c_inv, j2c_cntr
     tspannames = ["ftaop+pw", "j2c_inv", "j2c_cntr"]
-    feri = h5py.File(cderi_file, 'w')
-    feri['j3c-kptij'] = kptij_lst
-    nsegs = len(fswap['j3c-junk/0'])
-    def make_kpt(uniq_kptji_id, cholesky_j2c):
+    fswap.flush()
+    nsegs = len(j3c_junk['j3c-junk/0'])
+    def make_kpt(uniq_kptji_id, cholesky_j2c, feri):
         kpt = uniq_kpts[uniq_kptji_id]  # kpt = kptj - kpti
         log.debug1('kpt = %s', kpt)
         adapted_ji_idx = np.where(uniq_inverse == uniq_kptji_id)[0]
@@ -325,7 +341,7 @@ def _make_j3c(mydf, cell, auxcell, kptij_lst, cderi_file):
             j3cR = []
             j3cI = []
             for k, idx in enumerate(adapted_ji_idx):
-                v = np.vstack([fswap['j3c-junk/%d/%d'%(idx,i)][0,col0:col1].T
+                v = np.vstack([j3c_junk['j3c-junk/%d/%d'%(idx,i)][0,col0:col1].T
                                for i in range(nsegs)])
                 # vbar is the interaction between the background charge
                 # and the auxiliary basis.  0D, 1D, 2D do not have vbar.
@@ -396,65 +412,22 @@ def _make_j3c(mydf, cell, auxcell, kptij_lst, cderi_file):
             tick_ = np.asarray((logger.process_clock(), logger.perf_counter()))
             tspans[2] += tick_ - tock_
 
-        for ji in adapted_ji_idx:
-            del(fswap['j3c-junk/%d'%ji])
-
-    # Wrapped around boundary and symmetry between k and -k can be used
-    # explicitly for the metric integrals.  We consider this symmetry
-    # because it is used in the df_ao2mo module when contracting two 3-index
-    # integral tensors to the 4-index 2e integral tensor. If the symmetry
-    # related k-points are treated separately, the resultant 3-index tensors
-    # may have inconsistent dimension due to the numerial noise when handling
-    # linear dependency of j2c.
-    def conj_j2c(cholesky_j2c):
-        j2c, j2c_negative, j2ctag = cholesky_j2c
-        if j2c_negative is None:
-            return j2c.conj(), None, j2ctag
-        else:
-            return j2c.conj(), j2c_negative.conj(), j2ctag
-
-    a = cell.lattice_vectors() / (2*np.pi)
-    def kconserve_indices(kpt):
-        '''search which (kpts+kpt) satisfies momentum conservation'''
-        kdif = np.einsum('wx,ix->wi', a, uniq_kpts + kpt)
-        kdif_int = np.rint(kdif)
-        mask = np.einsum('wi->i', abs(kdif - kdif_int)) < KPT_DIFF_TOL
-        uniq_kptji_ids = np.where(mask)[0]
-        return uniq_kptji_ids
-
-    done = np.zeros(len(uniq_kpts), dtype=bool)
-    for k, kpt in enumerate(uniq_kpts):
-        if done[k]:
-            continue
+        if shards is None:  # otherwise j3c-junk is held in the shard files
+            for ji in adapted_ji_idx:
+                del(fswap['j3c-junk/%d'%ji])
 
-        log.debug1('Cholesky decomposition for j2c at kpt %s', k)
+    def timed_cholesky_decomposed_metric(uniq_kptji_id):
         tick_ = np.asarray((logger.process_clock(), logger.perf_counter()))
-        cholesky_j2c = cholesky_decomposed_metric(k)
+        cholesky_j2c = cholesky_decomposed_metric(uniq_kptji_id)
         tock_ = np.asarray((logger.process_clock(), logger.perf_counter()))
         tspans[1] += tock_ - tick_
+        return cholesky_j2c
 
-        # The k-point k' which has (k - k') * a = 2n pi. Metric integrals have the
-        # symmetry S = S
-        uniq_kptji_ids = kconserve_indices(-kpt)
-        log.debug1("Symmetry pattern (k - %s)*a= 2n pi", kpt)
-        log.debug1("    make_kpt for uniq_kptji_ids %s", uniq_kptji_ids)
-        for uniq_kptji_id in uniq_kptji_ids:
-            if not done[uniq_kptji_id]:
-                make_kpt(uniq_kptji_id, cholesky_j2c)
-        done[uniq_kptji_ids] = True
-
-        # The k-point k' which has (k + k') * a = 2n pi. Metric integrals have the
-        # symmetry S = S*
-        uniq_kptji_ids = kconserve_indices(kpt)
-        log.debug1("Symmetry pattern (k + %s)*a= 2n pi", kpt)
-        log.debug1("    make_kpt for %s", uniq_kptji_ids)
-        cholesky_j2c = conj_j2c(cholesky_j2c)
-        for uniq_kptji_id in uniq_kptji_ids:
-            if not done[uniq_kptji_id]:
-                make_kpt(uniq_kptji_id, cholesky_j2c)
-        done[uniq_kptji_ids] = True
-
-    feri.close()
+    df.df._make_j3c_kpts(mydf, cell, kptij_lst, timed_cholesky_decomposed_metric,
+                         make_kpt, cderi_file, shards)
+    if shards is not None:
+        j3c_junk.close()
+        shards.remove('j3c-junk')
 
     # report time for aft part
     for tspan, tspanname in zip(tspans, tspannames):
@@ -556,6 +529,8 @@ cell.dimension=3 with large vacuum.""")
                  auxcell.npgto_nr())
 
         log.info('exp_to_discard = %s', self.exp_to_discard)
+        if self.j3c_nproc > 1 or self.j3c_shards:
+            log.info('j3c_nproc = %d  (sharded j3c build)', self.j3c_nproc)
         if isinstance(self._cderi, str):
             log.info('_cderi = %s  where DF integrals are loaded (readonly).',
                      self._cderi)
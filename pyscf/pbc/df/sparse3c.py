@@ -0,0 +1,438 @@
+#!/usr/bin/env python
+# Copyright 2014-2021 The PySCF Developers. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+r'''
+Block-sparse lattice-summed 3-center integrals at the Gamma point
+
+For large supercells most AO pairs (ij| and most auxiliary functions |L) of
+the short-range 3-center integrals
+
+    (ij|L) = \sum_{lm} (i[l] j[m]| erfc(\omega r_{12})/r_{12} |L[0])
+
+are spatially separated. The integrals are computed for the atom pairs (A,B)
+whose AO shells overlap in at least one lattice image and, for each atom pair,
+only for the auxiliary shells within the range of the attenuated Coulomb
+operator. The tensor is stored as dense blocks (A,B,L_{AB}) and contracted
+block by block in the Coulomb and exchange matrices. For insulators the
+number of blocks and the size of each block are independent of the size of
+the supercell thus the memory grows linearly with the number of atoms.
+
+The long-range part of the Coulomb operator is smooth and not sparse in real
+space. :class:`SparseRSDF` evaluates it with the analytical Fourier transform
+of the AO pairs on a small plane-wave mesh and adds it to the short-range
+part. The resultant object can be used as the with_df of Gamma point SCF.
+'''
+
+import numpy
+import scipy.linalg
+import scipy.optimize
+import scipy.special
+from pyscf import lib
+from pyscf import gto
+from pyscf.lib import logger
+from pyscf.pbc import tools
+from pyscf.pbc.df import aft
+from pyscf.pbc.df import incore
+from pyscf.pbc.lib.kpts_helper import is_zero
+from pyscf import __config__
+
+LINEAR_DEP_THRESHOLD = getattr(__config__, 'pbc_df_sparse3c_lindep', 1e-10)
+OMEGA = getattr(__config__, 'pbc_df_sparse3c_omega', 0.5)
+
+
+class BlockSparse3c(object):
+    '''3-center integrals stored as dense blocks of the significant atom pairs.
+
+    Attributes:
+        pairs : (npair, 2) int array
+            Atom pairs (A,B) with A >= B. The integrals of the pair (B,A)
+            are the transpose of (A,B).
+        aux_idx : list of 1D int arrays
+            Indices of the auxiliary functions kept for each atom pair.
+        blocks : list of 3D arrays
+            (ij|L) of each atom pair in the shape (nao_A, nao_B, len(aux_idx)).
+    '''
+    def __init__(self, cell, auxcell, pairs, aux_idx, blocks):
+        self.cell = cell
+        self.auxcell = auxcell
+        self.pairs = pairs
+        self.aux_idx = aux_idx
+        self.blocks = blocks
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def __iter__(self):
+        aoslices = self.cell.aoslice_by_atom()
+        for (ia, ib), idx, blk in zip(self.pairs, self.aux_idx, self.blocks):
+            yield (slice(*aoslices[ia,2:]), slice(*aoslices[ib,2:]),
+                   ia == ib, idx, blk)
+
+    @property
+    def nbytes(self):
+        return sum(blk.nbytes for blk in self.blocks)
+
+    def todense(self):
+        '''The (nao,nao,naux) tensor'''
+        nao = self.cell.nao_nr()
+        naux = self.auxcell.nao_nr()
+        out = numpy.zeros((nao, nao, naux))
+        for si, sj, diag, idx, blk in self:
+            out[si,sj,idx] = blk
+            if not diag:
+                out[sj,si,idx] = blk.transpose(1,0,2)
+        return out
+
+def estimate_sr_range(omega, precision):
+    '''The distance beyond which erfc(omega r)/r drops below precision'''
+    f = lambda r: scipy.special.erfc(omega * r) / r - precision
+    r1 = 1.
+    while f(r1) > 0:
+        r1 *= 2
+    if r1 == 1:
+        return r1
+    return scipy.optimize.brentq(f, r1/2, r1)
+
+def _atom_rcut(mol, precision):
+    '''The largest bas_rcut of the shells on each atom'''
+    rcut = numpy.zeros(mol.natm)
+    for ib in range(mol.nbas):
+        ia = mol.bas_atom(ib)
+        rcut[ia] = max(rcut[ia], mol.bas_rcut(ib, precision))
+    return rcut
+
+def _atom_min_exp(mol):
+    '''The most diffuse exponent of each atom'''
+    atm_exp = numpy.full(mol.natm, numpy.inf)
+    for ib in range(mol.nbas):
+        ia = mol.bas_atom(ib)
+        atm_exp[ia] = min(atm_exp[ia], mol.bas_exp(ib).min())
+    return atm_exp
+
+def _min_image_dist(r1, r2, Ls):
+    '''Distances between r1[i] and the closest image of r2[j]'''
+    out = numpy.empty((len(r1), len(r2)))
+    blksize = max(1, int(4e6 / (max(len(r2), 1) * len(Ls))))
+    for p0, p1 in lib.prange(0, len(r1), blksize):
+        d = r1[p0:p1,None,None] - r2[:,None] - Ls
+        out[p0:p1] = numpy.einsum('ijlx,ijlx->ijl', d, d).min(axis=2)
+    return numpy.sqrt(out)
+
+def screen_triplets(cell, auxcell, omega, precision=None):
+    '''Screens the shell triplets (i[l] j[m]|L[0]) by the overlap distance
+    across the lattice images.
+
+    An atom pair (A,B) is kept if the overlap of the most diffuse functions of
+    A and the closest image of B is larger than precision. For each kept pair,
+    an auxiliary shell on atom C is kept if C lies within the range of the
+    short-range Coulomb operator of both A and B.
+
+    Returns:
+        pairs : (npair, 2) array of atom pairs A >= B
+        aux_shls : list of arrays of the auxiliary shell Ids for each pair
+    '''
+    if precision is None:
+        precision = cell.precision
+    ao_rcut = _atom_rcut(cell, precision)
+    aux_rcut = numpy.array([auxcell.bas_rcut(ib, precision)
+                            for ib in range(auxcell.nbas)])
+    aux_atom = auxcell._bas[:,gto.ATOM_OF]
+    sr_range = estimate_sr_range(abs(omega), precision)
+
+    coords = cell.atom_coords()
+    aux_coords = auxcell.atom_coords()
+    Ls = cell.get_lattice_Ls(rcut=ao_rcut.max() + aux_rcut.max() + sr_range)
+    dist_ab = _min_image_dist(coords, coords, Ls)
+    dist_ac = _min_image_dist(coords, aux_coords, Ls)[:,aux_atom]
+
+    ia, ib = numpy.tril_indices(cell.natm)
+    atm_exp = _atom_min_exp(cell)
+    a = atm_exp[ia]
+    b = atm_exp[ib]
+    ovlp = (4*a*b/(a+b)**2)**.75 * numpy.exp(-a*b/(a+b) * dist_ab[ia,ib]**2)
+    mask = ovlp > precision
+    pairs = numpy.vstack((ia[mask], ib[mask])).T
+
+    range_ac = ao_rcut[:,None] + aux_rcut + sr_range
+    aux_mask = dist_ac < range_ac
+    aux_shls = [numpy.where(aux_mask[a] & aux_mask[b])[0] for a, b in pairs]
+    return pairs, aux_shls
+
+def _shell_runs(shls):
+    '''Splits a sorted list of shell Ids into contiguous ranges'''
+    if len(shls) == 0:
+        return []
+    breaks = numpy.where(numpy.diff(shls) != 1)[0] + 1
+    return [(seg[0], seg[-1]+1) for seg in numpy.split(shls, breaks)]
+
+def aux_e2_sparse(cell, auxcell_or_auxbasis, omega, precision=None):
+    '''Block-sparse Gamma point 3-center integrals (ij|L) of the short-range
+    Coulomb operator erfc(omega r12)/r12.
+
+    Returns:
+        A :class:`BlockSparse3c` object
+    '''
+    if isinstance(auxcell_or_auxbasis, gto.Mole):
+        auxcell = auxcell_or_auxbasis
+    else:
+        auxcell = incore.make_auxcell(cell, auxcell_or_auxbasis)
+    log = logger.new_logger(cell)
+    cput0 = (logger.process_clock(), logger.perf_counter())
+
+    pairs, aux_shls = screen_triplets(cell, auxcell, omega, precision)
+    aoslices = cell.aoslice_by_atom()
+    aux_loc = auxcell.ao_loc_nr()
+
+    aux_idx = []
+    blocks = []
+    with cell.with_short_range_coulomb(omega), \
+            auxcell.with_short_range_coulomb(omega):
+        int3c = incore.wrap_int3c(cell, auxcell, 'int3c2e', 's1', 1)
+        for (ia, ib), shls in zip(pairs, aux_shls):
+            ish0, ish1, i0, i1 = aoslices[ia]
+            jsh0, jsh1, j0, j1 = aoslices[ib]
+            ni = i1 - i0
+            nj = j1 - j0
+            runs = _shell_runs(shls)
+            idx = numpy.hstack([numpy.arange(aux_loc[k0], aux_loc[k1])
+                                for k0, k1 in runs] + [numpy.zeros(0, dtype=int)])
+            blk = numpy.empty((ni, nj, idx.size))
+            p0 = 0
+            for k0, k1 in runs:
+                p1 = p0 + aux_loc[k1] - aux_loc[k0]
+                buf = numpy.empty((1, 1, ni*nj, p1-p0))
+                int3c((ish0, ish1, jsh0, jsh1, k0, k1), buf)
+                blk[:,:,p0:p1] = buf.reshape(ni, nj, p1-p0)
+                p0 = p1
+            aux_idx.append(idx)
+            blocks.append(blk)
+
+    out = BlockSparse3c(cell, auxcell, pairs, aux_idx, blocks)
+    nao = cell.nao_nr()
+    dense_size = nao * (nao+1) // 2 * auxcell.nao_nr() * 8
+    log.debug('Sparse 3c integrals: %d of %d atom pairs, %.1f MB (%.2f%% of the dense tensor)',
+              len(pairs), cell.natm*(cell.natm+1)//2, out.nbytes/1e6,
+              out.nbytes * 100. / max(dense_size, 1))
+    log.timer('aux_e2_sparse', *cput0)
+    return out
+
+def get_j2c(auxcell, omega):
+    '''Gamma point metric (L|erfc(omega r12)/r12|M)'''
+    with auxcell.with_short_range_coulomb(omega):
+        return auxcell.pbc_intor('int2c2e', hermi=1)
+
+def _gen_metric_solver(j2c, lindep=LINEAR_DEP_THRESHOLD):
+    '''Function to solve j2c x = b for the columns of b. The Cholesky
+    factorization is used unless j2c is linearly dependent.'''
+    try:
+        cd = scipy.linalg.cho_factor(j2c, lower=True)
+        return lambda b: scipy.linalg.cho_solve(cd, b)
+    except scipy.linalg.LinAlgError:
+        w, v = scipy.linalg.eigh(j2c)
+        mask = w > lindep
+        v = v[:,mask]
+        w = w[mask]
+        return lambda b: lib.dot(v / w, lib.dot(v.T, b))
+
+def _atom_aux_index(int3c):
+    '''The union of the auxiliary indices of the pairs that each atom belongs
+    to, and the positions of the auxiliary indices of each pair in the union
+    of its atoms.'''
+    natm = int3c.cell.natm
+    atom_aux = [[numpy.zeros(0, dtype=int)] for ia in range(natm)]
+    for (ia, ib), idx in zip(int3c.pairs, int3c.aux_idx):
+        atom_aux[ia].append(idx)
+        atom_aux[ib].append(idx)
+    atom_aux = [numpy.unique(numpy.hstack(x)) for x in atom_aux]
+    pos = [(numpy.searchsorted(atom_aux[ia], idx),
+            numpy.searchsorted(atom_aux[ib], idx))
+           for (ia, ib), idx in zip(int3c.pairs, int3c.aux_idx)]
+    return atom_aux, pos
+
+def get_jk(int3c, j2c, dm, with_j=True, with_k=True, max_memory=2000):
+    '''Coulomb and exchange matrices of the short-range operator for real
+    symmetric density matrices, contracted block by block from the sparse
+    3-center integrals
+
+        J_{ij} = \\sum_{LM} (ij|L) (j2c^{-1})_{LM} (M|kl) D_{kl}
+
+    The exchange matrix is evaluated with the eigenvectors of the density
+    matrices in batches which fit max_memory. For each batch, the
+    half-transformed integrals (i m|L) are held per atom of i, for the
+    auxiliary functions of the atom pairs that the atom belongs to.
+    '''
+    dm = numpy.asarray(dm)
+    dms = dm.reshape(-1, *dm.shape[-2:])
+    nset, nao = dms.shape[:2]
+    naux = j2c.shape[0]
+    solve = _gen_metric_solver(j2c)
+
+    vj = vk = None
+    if with_j:
+        rho = numpy.zeros((nset, naux))
+        for si, sj, diag, idx, blk in int3c:
+            dab = dms[:,si,sj]
+            if not diag:
+                dab = dab + dms[:,sj,si].transpose(0,2,1)
+            rho[:,idx] += lib.einsum('ijp,nij->np', blk, dab)
+        coef = solve(rho.T).T
+        vj = numpy.zeros((nset, nao, nao))
+        for si, sj, diag, idx, blk in int3c:
+            v = lib.einsum('ijp,np->nij', blk, coef[:,idx])
+            vj[:,si,sj] += v
+            if not diag:
+                vj[:,sj,si] += v.transpose(0,2,1)
+        vj = vj.reshape(dm.shape)
+
+    if with_k:
+        natm = int3c.cell.natm
+        aoslices = [slice(*x[2:]) for x in int3c.cell.aoslice_by_atom()]
+        atom_aux, pos = _atom_aux_index(int3c)
+        nao_atm = [x.stop - x.start for x in aoslices]
+        size = sum(n * x.size for n, x in zip(nao_atm, atom_aux))
+        size += max(nao_atm) * naux
+        blksize = max(1, int(max_memory*1e6/8 / size))
+
+        vk = numpy.zeros((nset, nao, nao))
+        for n in range(nset):
+            e, c = scipy.linalg.eigh(dms[n])
+            mask = abs(e) > 1e-14
+            e, c = e[mask], c[:,mask]
+            for m0, m1 in lib.prange(0, e.size, blksize):
+                cm = c[:,m0:m1]
+                # Half-transformed integrals (i m|L) of each atom of i
+                bufs = [numpy.zeros((m1-m0, ni, x.size))
+                        for ni, x in zip(nao_atm, atom_aux)]
+                for (ia, ib), (pa, pb), blk in zip(int3c.pairs, pos, int3c.blocks):
+                    bufs[ia][:,:,pa] += lib.einsum('ijp,jm->mip', blk, cm[aoslices[ib]])
+                    if ia != ib:
+                        bufs[ib][:,:,pb] += lib.einsum('ijp,im->mjp', blk, cm[aoslices[ia]])
+
+                for ia in range(natm):
+                    if atom_aux[ia].size == 0:
+                        continue
+                    fit = numpy.zeros((naux, (m1-m0)*nao_atm[ia]))
+                    fit[atom_aux[ia]] = bufs[ia].reshape(-1, atom_aux[ia].size).T
+                    fit = solve(fit).T.reshape(m1-m0, nao_atm[ia], naux)
+                    fit *= e[m0:m1,None,None]
+                    for ib in range(natm):
+                        if atom_aux[ib].size > 0:
+                            vk[n,aoslices[ia],aoslices[ib]] += lib.einsum(
+                                'mip,mjp->ij', fit[:,:,atom_aux[ib]], bufs[ib])
+        vk = vk.reshape(dm.shape)
+    return vj, vk
+
+
+class SparseRSDF(aft.AFTDF):
+    '''Gamma point range-separated density fitting. The short-range part of
+    the Coulomb operator is density fitted with the block-sparse 3-center
+    integrals. The long-range part is evaluated with the analytical Fourier
+    transform of the AO pairs on a plane-wave mesh which converges the
+    attenuated Coulomb kernel erf(omega r12)/r12.
+
+    Attributes:
+        auxbasis : str or dict
+            Auxiliary basis for the short-range part.
+        omega : float
+            Range-separation parameter of the Coulomb operator.
+    '''
+    def __init__(self, cell, auxbasis=None, omega=OMEGA):
+        aft.AFTDF.__init__(self, cell)
+        self.auxbasis = auxbasis
+        self.omega = omega
+        self.lr_mesh = None
+
+        # The following attributes are not input options.
+        self.auxcell = None
+        self._int3c = None
+        self._j2c = None
+        self._lr_df = None
+        self._madelung_sr = None
+        self._keys = set(self.__dict__.keys())
+
+    def dump_flags(self, verbose=None):
+        aft.AFTDF.dump_flags(self, verbose)
+        logger.info(self, 'auxbasis = %s', self.auxbasis)
+        logger.info(self, 'omega = %s', self.omega)
+        logger.info(self, 'lr_mesh = %s', self.lr_mesh)
+        return self
+
+    def reset(self, cell=None):
+        aft.AFTDF.reset(self, cell)
+        self.auxcell = None
+        self._int3c = None
+        self._j2c = None
+        self._lr_df = None
+        self._madelung_sr = None
+        return self
+
+    def build(self):
+        cell = self.cell
+        if self.lr_mesh is None:
+            ke_cutoff = aft.estimate_ke_cutoff_for_omega(cell, self.omega)
+            mesh = tools.cutoff_to_mesh(cell.lattice_vectors(), ke_cutoff)
+            self.lr_mesh = numpy.min([mesh, self.mesh], axis=0)
+        self.dump_flags()
+        self.auxcell = incore.make_auxcell(cell, self.auxbasis)
+        self._int3c = aux_e2_sparse(cell, self.auxcell, self.omega)
+        self._j2c = get_j2c(self.auxcell, self.omega)
+        self._lr_df = aft.AFTDF(cell)
+        self._lr_df.mesh = self.lr_mesh
+        return self
+
+    def get_jk(self, dm, hermi=1, kpts=None, kpts_band=None,
+               with_j=True, with_k=True, omega=None, exxdiv=None):
+        if omega is not None:
+            raise NotImplementedError('SparseRSDF for RSH functionals')
+        if ((kpts is not None and not is_zero(kpts)) or
+            (kpts_band is not None and not is_zero(kpts_band))):
+            raise NotImplementedError('SparseRSDF for k-points')
+        if hermi != 1 or numpy.iscomplexobj(dm):
+            raise NotImplementedError('SparseRSDF for non-symmetric density matrices')
+        if self._int3c is None:
+            self.build()
+
+        vj, vk = get_jk(self._int3c, self._j2c, dm, with_j, with_k,
+                        self.max_memory - lib.current_memory()[0])
+
+        # The G=0 component of the short-range kernel, pi/omega^2, is
+        # included in the short-range integrals. It is excluded from the
+        # Coulomb kernel of the other DF methods.
+        cell = self.cell
+        s = cell.pbc_intor('int1e_ovlp', hermi=1)
+        g0 = numpy.pi / self.omega**2 / cell.vol
+        dms = numpy.asarray(dm).reshape(-1, *s.shape)
+        if with_j:
+            nelec = numpy.einsum('nij,ji->n', dms, s)
+            vj -= (g0 * nelec[:,None,None] * s).reshape(vj.shape)
+        if with_k:
+            if exxdiv == 'ewald':
+                # The long-range part below only corrects the G=0 component
+                # of the long-range kernel
+                if self._madelung_sr is None:
+                    gamma = numpy.zeros((1,3))
+                    with cell.with_range_coulomb(self.omega):
+                        madelung_lr = tools.madelung(cell, gamma)
+                    self._madelung_sr = tools.madelung(cell, gamma) - madelung_lr
+                g0 -= self._madelung_sr
+            vk -= g0 * lib.einsum('ij,njk,kl->nil', s, dms, s).reshape(vk.shape)
+
+        vjlr, vklr = self._lr_df.get_jk(dm, hermi, kpts, kpts_band, with_j, with_k,
+                                        omega=self.omega, exxdiv=exxdiv)
+        if with_j:
+            vj += vjlr.real
+        if with_k:
+            vk += vklr.real
+        return vj, vk
@@ -12,6 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import shutil
+import tempfile
 import unittest
 import numpy
 from pyscf import lib
@@ -170,6 +173,33 @@ Li  P
         eri1 = df.GDF(cell).set(auxbasis=aug_etb(cell)).get_eri()
         self.assertAlmostEqual(abs(eri1-eri0).max(), 0, 2)
 
+    def test_sharded_j3c(self):
+        kpts = cell.make_kpts([2,2,1])
+        ref = df.GDF(cell, kpts).set(mesh=(6,)*3).build()
+        with tempfile.NamedTemporaryFile() as ftmp:
+            # The workers share the OpenMP threads
+            with lib.with_omp_threads(4):
+                mydf = df.GDF(cell, kpts).set(mesh=(6,)*3, j3c_nproc=2)
+                mydf._cderi_to_save = ftmp.name
+                mydf.build()
+                self.assertEqual(lib.num_threads(), 4)
+            shard_dir = ftmp.name + '.shards'
+            # The shards of the first pass are removed
+            self.assertEqual(sorted(os.listdir(shard_dir)),
+                             ['j3c.%d.h5' % i for i in range(4)])
+
+            # Restart from the remaining shards
+            os.remove(os.path.join(shard_dir, 'j3c.1.h5'))
+            mydf = df.GDF(cell, kpts).set(mesh=(6,)*3, j3c_shards=True)
+            mydf._cderi_to_save = ftmp.name
+            mydf.build()
+            for ki, kj in [(0,0), (1,3), (3,2), (2,1)]:
+                kptij = kpts[[ki,kj]]
+                v0 = numpy.vstack([x[0]+x[1]*1j for x in ref.sr_loop(kptij, compact=False)])
+                v1 = numpy.vstack([x[0]+x[1]*1j for x in mydf.sr_loop(kptij, compact=False)])
+                self.assertAlmostEqual(abs(v1-v0).max(), 0, 12)
+            shutil.rmtree(shard_dir)
+
 
 if __name__ == '__main__':
     print("Full Tests for df")
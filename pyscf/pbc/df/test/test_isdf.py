@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# Copyright 2014-2021 The PySCF Developers. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import numpy
+from pyscf.pbc import gto as pgto
+from pyscf.pbc import scf as pscf
+from pyscf.pbc.df import fft, isdf
+
+
+def setUpModule():
+    global cell, kpts
+    cell = pgto.Cell()
+    cell.atom = 'C 0 0 0; C .89175 .89175 .89175'
+    cell.a = '''0      1.7835 1.7835
+                1.7835 0      1.7835
+                1.7835 1.7835 0     '''
+    cell.basis = 'gth-szv'
+    cell.pseudo = 'gth-pade'
+    cell.mesh = [11]*3
+    cell.verbose = 0
+    cell.build()
+    kpts = cell.make_kpts([2,1,1])
+
+def tearDownModule():
+    global cell
+    del cell
+
+class KnownValues(unittest.TestCase):
+    def test_get_jk_kpts(self):
+        numpy.random.seed(1)
+        nao = cell.nao
+        dm = numpy.random.random((2,len(kpts),nao,nao)) - .5
+        dm = dm + dm.transpose(0,1,3,2)
+        mydf = isdf.ISDF(cell, kpts)
+        mydf.c_isdf = 20
+        mydf.seed = 1
+        vj, vk = mydf.get_jk(dm, kpts=kpts, exxdiv='ewald')
+        ref = fft.FFTDF(cell, kpts).get_jk(dm, kpts=kpts, exxdiv='ewald')
+        self.assertEqual(vk.shape, dm.shape)
+        self.assertAlmostEqual(abs(vj - ref[0]).max(), 0, 9)
+        self.assertAlmostEqual(abs(vk - ref[1]).max(), 0, 3)
+
+        # The interpolation vectors are reused for the second call
+        idx = mydf._ip_idx
+        vk = mydf.get_jk(dm[0], kpts=kpts, with_j=False, exxdiv='ewald')[1]
+        self.assertTrue(mydf._ip_idx is idx)
+        self.assertAlmostEqual(abs(vk - ref[1][0]).max(), 0, 3)
+        self.assertTrue(len(mydf._coulomb) > 0)
+
+        # The Coulomb matrices are recomputed if they do not fit in memory
+        mydf._coulomb = {}
+        mydf.max_memory = 0
+        vk1 = mydf.get_jk(dm[0], kpts=kpts, with_j=False, exxdiv='ewald')[1]
+        self.assertEqual(len(mydf._coulomb), 0)
+        self.assertAlmostEqual(abs(vk1 - vk).max(), 0, 12)
+
+    def test_get_jk_gamma(self):
+        numpy.random.seed(2)
+        nao = cell.nao
+        dm = numpy.random.random((nao,nao)) - .5
+        dm = dm + dm.T
+        mydf = isdf.ISDF(cell)
+        mydf.c_isdf = 20
+        mydf.seed = 1
+        vj, vk = mydf.get_jk(dm, exxdiv=None)
+        ref = fft.FFTDF(cell).get_jk(dm, exxdiv=None)
+        self.assertEqual(vk.dtype, numpy.double)
+        self.assertAlmostEqual(abs(vj - ref[0]).max(), 0, 9)
+        self.assertAlmostEqual(abs(vk - ref[1]).max(), 0, 3)
+
+    def test_krhf(self):
+        mf = pscf.KRHF(cell, kpts)
+        e_ref = mf.kernel()
+        mf.with_df = isdf.ISDF(cell, kpts)
+        mf.with_df.c_isdf = 20
+        mf.with_df.seed = 1
+        self.assertAlmostEqual(mf.kernel(), e_ref, 5)
+
+if __name__ == '__main__':
+    print("Full Tests for ISDF")
+    unittest.main()
@@ -0,0 +1,77 @@
+# Copyright 2014-2021 The PySCF Developers. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import numpy
+from pyscf.pbc import gto as pgto
+from pyscf.pbc import scf
+from pyscf.pbc.df import incore, fft, sparse3c
+from pyscf.df.addons import aug_etb
+
+def setUpModule():
+    global cell, auxcell
+    cell = pgto.M(a=numpy.diag([3., 3., 30.]),
+                  atom=';'.join('He 0 0 %g' % (i*3.) for i in range(10)),
+                  basis='6-31g', verbose=0)
+    auxcell = incore.make_auxcell(cell, 'weigend')
+
+def tearDownModule():
+    global cell, auxcell
+    del cell, auxcell
+
+class KnownValues(unittest.TestCase):
+    def test_sparse_jk(self):
+        omega = 0.8
+        int3c = sparse3c.aux_e2_sparse(cell, auxcell, omega)
+        self.assertTrue(len(int3c) < cell.natm*(cell.natm+1)//2)
+
+        nao = cell.nao_nr()
+        with cell.with_short_range_coulomb(omega), \
+                auxcell.with_short_range_coulomb(omega):
+            ref = incore.aux_e2(cell, auxcell, 'int3c2e', aosym='s1')
+        ref = ref.reshape(nao, nao, -1)
+        self.assertAlmostEqual(abs(int3c.todense() - ref).max(), 0, 7)
+
+        ref = int3c.todense()
+        numpy.random.seed(2)
+        dm = numpy.random.random((2,nao,nao))
+        dm = dm + dm.transpose(0,2,1)
+        j2c = sparse3c.get_j2c(auxcell, omega)
+        vj, vk = sparse3c.get_jk(int3c, j2c, dm, max_memory=.01)
+        j2c_inv = numpy.linalg.inv(j2c)
+        vj0 = numpy.einsum('ijp,pq,nkl,klq->nij', ref, j2c_inv, dm, ref, optimize=True)
+        vk0 = numpy.einsum('ikp,pq,nkl,jlq->nij', ref, j2c_inv, dm, ref, optimize=True)
+        self.assertAlmostEqual(abs(vj - vj0).max(), 0, 9)
+        self.assertAlmostEqual(abs(vk - vk0).max(), 0, 9)
+
+    def test_sparse_rsdf(self):
+        cell = pgto.M(a=numpy.diag([3., 3., 12.]),
+                      atom=';'.join('He 0 0 %g' % (i*3.) for i in range(4)),
+                      basis='gth-dzv', pseudo='gth-pade', mesh=[31,31,121],
+                      verbose=0)
+        mydf = sparse3c.SparseRSDF(cell, auxbasis=aug_etb(cell, beta=1.6))
+        dm = scf.RHF(cell).get_init_guess()
+        vj, vk = mydf.get_jk(dm, exxdiv='ewald')
+        vj0, vk0 = fft.FFTDF(cell).get_jk(dm, exxdiv='ewald')
+        self.assertAlmostEqual(abs(vj - vj0).max(), 0, 3)
+        self.assertAlmostEqual(abs(vk - vk0).max(), 0, 3)
+
+        vk = mydf.get_jk(dm, with_j=False)[1]
+        vk0 = fft.FFTDF(cell).get_jk(dm, with_j=False)[1]
+        self.assertAlmostEqual(abs(vk - vk0).max(), 0, 3)
+
+
+if __name__ == '__main__':
+    print("Full Tests for sparse 3c integrals")
+    unittest.main()
@@ -20,6 +20,8 @@
 
 import ctypes
 import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy
 import scipy.linalg
 
@@ -50,6 +52,8 @@ INIT_MESH_ORTH = getattr(__config__, 'pbc_dft_multigrid_init_mesh_orth', (12,12,
 INIT_MESH_NONORTH = getattr(__config__, 'pbc_dft_multigrid_init_mesh_nonorth', (32,32,32))
 KE_RATIO = getattr(__config__, 'pbc_dft_multigrid_ke_ratio', 1.3)
 TASKS_TYPE = getattr(__config__, 'pbc_dft_multigrid_tasks_type', 'ke_cut') # 'rcut'
+# Execute the grid levels of multigrid tasks concurrently
+PARALLEL_TASKS = getattr(__config__, 'pbc_dft_multigrid_parallel_tasks', True)
 
 # RHOG_HIGH_ORDER=True will compute the high order derivatives of electron
 # density in real space and FT to reciprocal space.  Set RHOG_HIGH_ORDER=False
@@ -446,7 +450,7 @@ def get_j_kpts(mydf, dm_kpts, hermi=1, kpts=numpy.zeros((1,3)), kpts_band=None):
     cell = mydf.cell
     dm_kpts = numpy.asarray(dm_kpts)
     rhoG = _eval_rhoG(mydf, dm_kpts, hermi, kpts, deriv=0)
-    coulG = tools.get_coulG(cell, mesh=cell.mesh)
+    coulG = tools.get_coulG_cached(cell, mesh=cell.mesh)
     #:vG = numpy.einsum('ng,g->ng', rhoG[:,0], coulG)
     vG = rhoG[:,0]
     vG *= coulG
@@ -496,16 +500,20 @@ def _eval_rhoG(mydf, dm_kpts, hermi=1, kpts=numpy.zeros((1,3)), deriv=0,
 
     nx, ny, nz = mydf.mesh
     rhoG = numpy.zeros((nset*rhodim,nx,ny,nz), dtype=numpy.complex128)
-    for grids_dense, grids_sparse in tasks:
+    lock = threading.Lock()
+
+    def eval_level(task_id, grids_dense, grids_sparse):
         h_cell = grids_dense.cell
         mesh = tuple(grids_dense.mesh)
         ngrids = numpy.prod(mesh)
         log.debug('mesh %s  rcut %g', mesh, h_cell.rcut)
+        bra_buf = _rs_buffer(mydf, ('rho_bra', task_id))
+        ket_buf = _rs_buffer(mydf, ('rho_ket', task_id))
 
         if grids_sparse is None:
             # The first pass handles all diffused functions using the regular
             # matrix multiplication code.
-            rho = numpy.zeros((nset,rhodim,ngrids), dtype=numpy.complex128)
+            rho = bra_buf((nset,rhodim,ngrids), numpy.complex128)
             idx_h = grids_dense.ao_idx
             dms_hh = numpy.asarray(dms[:,:,idx_h[:,None],idx_h], order='C')
             for ao_h_etc, p0, p1 in mydf.aoR_loop(grids_dense, kpts, deriv):
@@ -547,7 +555,8 @@ def _eval_rhoG(mydf, dm_kpts, hermi=1, kpts=numpy.zeros((1,3)), deriv=0,
                     #:rho = eval_rho(t_cell, pgto_dms, shls_slice, 0, 'LDA', kpts,
                     #:               offset=None, submesh=None, ignore_imag=True)
                     rho = _eval_rho_bra(t_cell, pgto_dms, shls_slice, 0,
-                                        'LDA', kpts, grids_dense, True, log)
+                                        'LDA', kpts, grids_dense, True, log,
+                                        bra_buf)
 
                 else:
                     pgto_dms = lib.einsum('nkij,pi,qj->nkpq', dms_ht, h_coeff, t_coeff)
@@ -555,13 +564,15 @@ def _eval_rhoG(mydf, dm_kpts, hermi=1, kpts=numpy.zeros((1,3)), deriv=0,
                     #:rho = eval_rho(t_cell, pgto_dms, shls_slice, 0, 'LDA', kpts,
                     #:               offset=None, submesh=None)
                     rho = _eval_rho_bra(t_cell, pgto_dms, shls_slice, 0,
-                                        'LDA', kpts, grids_dense, True, log)
+                                        'LDA', kpts, grids_dense, True, log,
+                                        bra_buf)
                     pgto_dms = lib.einsum('nkij,pi,qj->nkpq', dms_lh, l_coeff, h_coeff)
                     shls_slice = (nshells_h, nshells_t, 0, nshells_h)
                     #:rho += eval_rho(t_cell, pgto_dms, shls_slice, 0, 'LDA', kpts,
                     #:                offset=None, submesh=None)
                     rho += _eval_rho_ket(t_cell, pgto_dms, shls_slice, 0,
-                                         'LDA', kpts, grids_dense, True, log)
+                                         'LDA', kpts, grids_dense, True, log,
+                                         ket_buf)
 
             elif deriv == 1:
                 h_coeff = scipy.linalg.block_diag(*t_coeff[:h_cell.nbas])
@@ -573,14 +584,14 @@ def _eval_rhoG(mydf, dm_kpts, hermi=1, kpts=numpy.zeros((1,3)), deriv=0,
                 #:rho = eval_rho(t_cell, pgto_dms, shls_slice, 0, 'GGA', kpts,
                 #:               ignore_imag=ignore_imag)
                 rho = _eval_rho_bra(t_cell, pgto_dms, shls_slice, 0, 'GGA',
-                                    kpts, grids_dense, ignore_imag, log)
+                                    kpts, grids_dense, ignore_imag, log, bra_buf)
 
                 pgto_dms = lib.einsum('nkij,pi,qj->nkpq', dms_lh, l_coeff, h_coeff)
                 shls_slice = (nshells_h, nshells_t, 0, nshells_h)
                 #:rho += eval_rho(t_cell, pgto_dms, shls_slice, 0, 'GGA', kpts,
                 #:                ignore_imag=ignore_imag)
                 rho += _eval_rho_ket(t_cell, pgto_dms, shls_slice, 0, 'GGA',
-                                     kpts, grids_dense, ignore_imag, log)
+                                     kpts, grids_dense, ignore_imag, log, ket_buf)
                 if hermi == 1:
                     # \nabla \chi_i DM(i,j) \chi_j was computed above.
                     # *2 for \chi_i DM(i,j) \nabla \chi_j
@@ -595,8 +606,12 @@ def _eval_rhoG(mydf, dm_kpts, hermi=1, kpts=numpy.zeros((1,3)), deriv=0,
         gy = numpy.fft.fftfreq(mesh[1], 1./mesh[1]).astype(numpy.int32)
         gz = numpy.fft.fftfreq(mesh[2], 1./mesh[2]).astype(numpy.int32)
         #:rhoG[:,gx[:,None,None],gy[:,None],gz] += rho_freq.reshape((-1,)+mesh)
-        _takebak_4d(rhoG, rho_freq.reshape((-1,) + mesh), (None, gx, gy, gz))
+        with lock:
+            _takebak_4d(rhoG, rho_freq.reshape((-1,) + mesh), (None, gx, gy, gz))
 
+    # bra and ket buffers and the FFT of rho
+    _run_tasks(mydf, tasks, eval_level, '_eval_rhoG', log,
+               mem_per_grid=nset*rhodim*16*3)
     rhoG = rhoG.reshape(nset,rhodim,-1)
 
     if gga_high_order:
@@ -607,7 +622,7 @@ def _eval_rhoG(mydf, dm_kpts, hermi=1, kpts=numpy.zeros((1,3)), deriv=0,
 
 
 def _eval_rho_bra(cell, dms, shls_slice, hermi, xctype, kpts, grids,
-                  ignore_imag, log):
+                  ignore_imag, log, buf=None):
     a = cell.lattice_vectors()
     rmax = a.max()
     mesh = numpy.asarray(grids.mesh)
@@ -623,10 +638,12 @@ def _eval_rho_bra(cell, dms, shls_slice, hermi, xctype, kpts, grids,
                        mesh, ignore_imag=ignore_imag)
         return numpy.reshape(rho, (nset, rhodim, numpy.prod(mesh)))
 
+    if buf is None:
+        buf = numpy.zeros
     if hermi == 1 or ignore_imag:
-        rho = numpy.zeros((nset, rhodim) + tuple(mesh))
+        rho = buf((nset, rhodim) + tuple(mesh), numpy.double)
     else:
-        rho = numpy.zeros((nset, rhodim) + tuple(mesh), dtype=numpy.complex128)
+        rho = buf((nset, rhodim) + tuple(mesh), numpy.complex128)
 
     b = numpy.linalg.inv(a.T)
     ish0, ish1, jsh0, jsh1 = shls_slice
@@ -685,7 +702,7 @@ def _eval_rho_bra(cell, dms, shls_slice, hermi, xctype, kpts, grids,
     return rho.reshape((nset, rhodim, numpy.prod(mesh)))
 
 def _eval_rho_ket(cell, dms, shls_slice, hermi, xctype, kpts, grids,
-                  ignore_imag, log):
+                  ignore_imag, log, buf=None):
     a = cell.lattice_vectors()
     rmax = a.max()
     mesh = numpy.asarray(grids.mesh)
@@ -701,10 +718,12 @@ def _eval_rho_ket(cell, dms, shls_slice, hermi, xctype, kpts, grids,
                        mesh, ignore_imag=ignore_imag)
         return numpy.reshape(rho, (nset, rhodim, numpy.prod(mesh)))
 
+    if buf is None:
+        buf = numpy.zeros
     if hermi == 1 or ignore_imag:
-        rho = numpy.zeros((nset, rhodim) + tuple(mesh))
+        rho = buf((nset, rhodim) + tuple(mesh), numpy.double)
     else:
-        rho = numpy.zeros((nset, rhodim) + tuple(mesh), dtype=numpy.complex128)
+        rho = buf((nset, rhodim) + tuple(mesh), numpy.complex128)
 
     b = numpy.linalg.inv(a.T)
     ish0, ish1, jsh0, jsh1 = shls_slice
@@ -782,7 +801,9 @@ def _get_j_pass2(mydf, vG, kpts=numpy.zeros((1,3)), verbose=None):
     else:
         vj_kpts = numpy.zeros((nset,nkpts,nao,nao), dtype=numpy.complex128)
 
-    for grids_dense, grids_sparse in tasks:
+    lock = threading.Lock()
+
+    def eval_level(task_id, grids_dense, grids_sparse):
         mesh = grids_dense.mesh
         ngrids = numpy.prod(mesh)
         log.debug('mesh %s', mesh)
@@ -806,7 +827,8 @@ def _get_j_pass2(mydf, vG, kpts=numpy.zeros((1,3)), verbose=None):
                 for k in range(nkpts):
                     for i in range(nset):
                         vj_sub = lib.dot(ao_h[k].conj().T*v_rs[i,p0:p1], ao_h[k])
-                        vj_kpts[i,k,idx_h[:,None],idx_h] += vj_sub
+                        with lock:
+                            vj_kpts[i,k,idx_h[:,None],idx_h] += vj_sub
                 ao_h = ao_h_etc = None
         else:
             idx_h = grids_dense.ao_idx
@@ -835,16 +857,20 @@ def _get_j_pass2(mydf, vG, kpts=numpy.zeros((1,3)), verbose=None):
                 vp = vp + vpI * 1j
                 vpI = None
 
-            vj_kpts[:,:,idx_h[:,None],idx_h] += vp[:,:,:,:naoh]
-            vj_kpts[:,:,idx_h[:,None],idx_l] += vp[:,:,:,naoh:]
+            with lock:
+                vj_kpts[:,:,idx_h[:,None],idx_h] += vp[:,:,:,:naoh]
+                vj_kpts[:,:,idx_h[:,None],idx_l] += vp[:,:,:,naoh:]
 
-            #:shls_slice = (nshells_h, nshells_t, 0, nshells_h)
-            #:vp = eval_mat(t_cell, vR, shls_slice, 1, 0, 'LDA', kpts)
-            #:vp = lib.einsum('nkpq,pi,qj->nkij', vp, l_coeff, h_coeff)
-            #:vj_kpts[:,:,idx_l[:,None],idx_h] += vp
-            vj_kpts[:,:,idx_l[:,None],idx_h] += \
-                    vp[:,:,:,naoh:].transpose(0,1,3,2).conj()
+                #:shls_slice = (nshells_h, nshells_t, 0, nshells_h)
+                #:vp = eval_mat(t_cell, vR, shls_slice, 1, 0, 'LDA', kpts)
+                #:vp = lib.einsum('nkpq,pi,qj->nkij', vp, l_coeff, h_coeff)
+                #:vj_kpts[:,:,idx_l[:,None],idx_h] += vp
+                vj_kpts[:,:,idx_l[:,None],idx_h] += \
+                        vp[:,:,:,naoh:].transpose(0,1,3,2).conj()
 
+    # sub_vG, v_rs and their real and imaginary parts
+    _run_tasks(mydf, tasks, eval_level, '_get_j_pass2', log,
+               mem_per_grid=nset*16*3)
     return vj_kpts
 
 
@@ -862,7 +888,9 @@ def _get_gga_pass2(mydf, vG, kpts=numpy.zeros((1,3)), verbose=None):
     else:
         veff = numpy.zeros((nset,nkpts,nao,nao), dtype=numpy.complex128)
 
-    for grids_dense, grids_sparse in mydf.tasks:
+    lock = threading.Lock()
+
+    def eval_level(task_id, grids_dense, grids_sparse):
         mesh = grids_dense.mesh
         ngrids = numpy.prod(mesh)
         log.debug('mesh %s', mesh)
@@ -884,7 +912,8 @@ def _get_gga_pass2(mydf, vG, kpts=numpy.zeros((1,3)), verbose=None):
                     for i in range(nset):
                         aow = numint._scale_ao(ao_h[k], wv[i])
                         v = lib.dot(aow.conj().T, ao_h[k][0])
-                        veff[i,k,idx_h[:,None],idx_h] += v + v.conj().T
+                        with lock:
+                            veff[i,k,idx_h[:,None],idx_h] += v + v.conj().T
                 ao_h = ao_h_etc = None
         else:
             idx_h = grids_dense.ao_idx
@@ -906,17 +935,22 @@ def _get_gga_pass2(mydf, vG, kpts=numpy.zeros((1,3)), verbose=None):
             shls_slice = (0, nshells_h, 0, nshells_t)
             v = eval_mat(t_cell, wv, shls_slice, 1, 0, 'GGA', kpts)
             v = lib.einsum('nkpq,pi,qj->nkij', v, h_coeff, t_coeff)
-            veff[:,:,idx_h[:,None],idx_h] += v[:,:,:,:naoh]
-            veff[:,:,idx_h[:,None],idx_h] += v[:,:,:,:naoh].conj().transpose(0,1,3,2)
-            veff[:,:,idx_h[:,None],idx_l] += v[:,:,:,naoh:]
-            veff[:,:,idx_l[:,None],idx_h] += v[:,:,:,naoh:].conj().transpose(0,1,3,2)
+            with lock:
+                veff[:,:,idx_h[:,None],idx_h] += v[:,:,:,:naoh]
+                veff[:,:,idx_h[:,None],idx_h] += v[:,:,:,:naoh].conj().transpose(0,1,3,2)
+                veff[:,:,idx_h[:,None],idx_l] += v[:,:,:,naoh:]
+                veff[:,:,idx_l[:,None],idx_h] += v[:,:,:,naoh:].conj().transpose(0,1,3,2)
 
             shls_slice = (nshells_h, nshells_t, 0, nshells_h)
             v = eval_mat(t_cell, wv, shls_slice, 1, 0, 'GGA', kpts)#, offset, submesh)
             v = lib.einsum('nkpq,pi,qj->nkij', v, l_coeff.conj(), h_coeff)
-            veff[:,:,idx_l[:,None],idx_h] += v
-            veff[:,:,idx_h[:,None],idx_l] += v.conj().transpose(0,1,3,2)
+            with lock:
+                veff[:,:,idx_l[:,None],idx_h] += v
+                veff[:,:,idx_h[:,None],idx_l] += v.conj().transpose(0,1,3,2)
 
+    # sub_vG, its inverse FFT and the real part wv
+    _run_tasks(mydf, mydf.tasks, eval_level, '_get_gga_pass2', log,
+               mem_per_grid=nset*4*(16*2+8))
     return veff
 
 
@@ -961,7 +995,7 @@ def nr_rks(mydf, xc_code, dm_kpts, hermi=1, kpts=None,
 
     mesh = mydf.mesh
     ngrids = numpy.prod(mesh)
-    coulG = tools.get_coulG(cell, mesh=mesh)
+    coulG = tools.get_coulG_cached(cell, mesh=mesh)
     vG = numpy.einsum('ng,g->ng', rhoG[:,0], coulG)
     ecoul = .5 * numpy.einsum('ng,ng->n', rhoG[:,0].real, vG.real)
     ecoul+= .5 * numpy.einsum('ng,ng->n', rhoG[:,0].imag, vG.imag)
@@ -1061,7 +1095,7 @@ def nr_uks(mydf, xc_code, dm_kpts, hermi=1, kpts=None,
 
     mesh = mydf.mesh
     ngrids = numpy.prod(mesh)
-    coulG = tools.get_coulG(cell, mesh=mesh)
+    coulG = tools.get_coulG_cached(cell, mesh=mesh)
     vG = numpy.einsum('ng,g->g', rhoG[:,0], coulG)
     ecoul = .5 * numpy.einsum('ng,g->', rhoG[:,0].real, vG.real)
     ecoul+= .5 * numpy.einsum('ng,g->', rhoG[:,0].imag, vG.imag)
@@ -1151,7 +1185,7 @@ def nr_rks_fxc(mydf, xc_code, dm0, dms, hermi=1, with_j=False,
     rho1 = tools.ifft(rhoG.reshape(-1,ngrids), mesh).real * (1./weight)
     rho1 = rho1.reshape(nset,-1,ngrids)
     if with_j:
-        coulG = tools.get_coulG(cell, mesh=mesh)
+        coulG = tools.get_coulG_cached(cell, mesh=mesh)
         vG = rhoG[:,0] * coulG
         vG = vG.reshape(nset, *mesh)
 
@@ -1213,7 +1247,7 @@ def nr_rks_fxc_st(mydf, xc_code, dm0, dms_alpha, hermi=1, singlet=True, with_j=F
     rho1 = tools.ifft(rhoG.reshape(-1,ngrids), mesh).real * (1./weight)
     rho1 = rho1.reshape(nset,-1,ngrids)
     if with_j:
-        coulG = tools.get_coulG(cell, mesh=mesh)
+        coulG = tools.get_coulG_cached(cell, mesh=mesh)
         vG = rhoG[:,0] * coulG
         vG = vG.reshape(nset, *mesh)
 
@@ -1295,7 +1329,7 @@ def nr_uks_fxc(mydf, xc_code, dm0, dms, hermi=1, with_j=False,
     rho1 = tools.ifft(rhoG.reshape(-1,ngrids), mesh).real * (1./weight)
     rho1 = rho1.reshape(nset,-1,ngrids)
     if with_j:
-        coulG = tools.get_coulG(cell, mesh=mesh)
+        coulG = tools.get_coulG_cached(cell, mesh=mesh)
         vG = (rhoG[0,0] + rhoG[1,0]) * coulG
         vG = vG.reshape(mesh)
 
@@ -1707,14 +1741,18 @@ class MultiGridFFTDF(fft.FFTDF):
         fft.FFTDF.__init__(self, cell, kpts)
         self.tasks = None
         self._keys = self._keys.union(['tasks'])
+        # Real-space buffers of the grid levels reused across SCF cycles
+        self._rsbuf = {}
 
     def build(self):
         self.tasks = multi_grids_tasks(self.cell, self.mesh, self.verbose)
+        self._rsbuf = {}
         return self
 
     def reset(self, cell=None):
         self.tasks = None
-        return fft.FFTDF.reset(cell)
+        self._rsbuf = {}
+        return fft.FFTDF.reset(self, cell)
 
     get_pp = get_pp
     get_nuc = get_nuc
@@ -1763,6 +1801,90 @@ def multigrid(mf):
     return mf
 
 
+def _rs_buffer(mydf, key):
+    '''A function to allocate zero-initialized real-space arrays. The arrays
+    are kept in mydf and reused by the next call with the same key, shape and
+    dtype as long as they fit in mydf.max_memory.
+    '''
+    bufs = getattr(mydf, '_rsbuf', None)
+    if bufs is None:
+        return numpy.zeros
+
+    def alloc(shape, dtype=numpy.double):
+        buf = bufs.get(key)
+        if buf is not None and buf.shape == shape and buf.dtype == dtype:
+            buf[:] = 0
+            return buf
+
+        bufs.pop(key, None)
+        buf = numpy.zeros(shape, dtype=dtype)
+        if buf.nbytes*1e-6 < mydf.max_memory - lib.current_memory()[0]:
+            bufs[key] = buf
+        return buf
+    return alloc
+
+def _task_costs(tasks):
+    '''Estimated cost of each grid level, ~ ngrids * nao'''
+    costs = []
+    for grids_dense, grids_sparse in tasks:
+        nao = len(grids_dense.ao_idx)
+        if grids_sparse is not None:
+            nao += len(grids_sparse.ao_idx)
+        costs.append(numpy.prod(grids_dense.mesh) * float(max(nao, 1)))
+    return numpy.asarray(costs)
+
+def _run_tasks(mydf, tasks, eval_level, label, log, mem_per_grid=0):
+    '''Calls eval_level(task_id, grids_dense, grids_sparse) for all grid levels.
+
+    The levels are started in the order of decreasing estimated cost. With
+    PARALLEL_TASKS, levels are executed concurrently and each level is given a
+    share of the OpenMP threads proportional to its cost. The coarse levels
+    thus run next to the finest level rather than after it. mem_per_grid is
+    the size (in bytes) of the real-space arrays of a level per grid point.
+    The number of concurrent levels is limited so that their real-space arrays
+    fit in mydf.max_memory.
+    '''
+    costs = _task_costs(tasks)
+    order = numpy.argsort(-costs)
+    nthreads = lib.num_threads()
+    timing = numpy.zeros(len(tasks))
+
+    def run(task_id, nthreads_i):
+        t0 = logger.perf_counter()
+        with lib.with_omp_threads(nthreads_i):
+            eval_level(task_id, *tasks[task_id])
+        timing[task_id] = logger.perf_counter() - t0
+
+    nworkers = 1
+    if PARALLEL_TASKS and nthreads > 1 and len(tasks) > 1:
+        shares = numpy.maximum(1, (nthreads * costs / costs.sum()).astype(int))
+        nworkers = min(len(tasks), nthreads - shares.max() + 1)
+        # At most the nworkers largest levels are executed at the same time
+        ngrids = numpy.sort([numpy.prod(t[0].mesh) for t in tasks])[::-1]
+        mem = numpy.cumsum(ngrids * (mem_per_grid * 1e-6))
+        max_memory = mydf.max_memory - lib.current_memory()[0]
+        nfit = max(1, numpy.count_nonzero(mem < max_memory))
+        if nfit < nworkers:
+            log.debug1('%s: %d levels executed concurrently due to max_memory',
+                       label, nfit)
+            nworkers = nfit
+
+    if nworkers > 1:
+        with ThreadPoolExecutor(max_workers=nworkers) as ex:
+            for fut in [ex.submit(run, i, shares[i]) for i in order]:
+                fut.result()
+    else:
+        shares = numpy.repeat(nthreads, len(tasks))
+        for i in order:
+            run(i, None)
+
+    if log.verbose >= logger.DEBUG:
+        for i, (grids_dense, grids_sparse) in enumerate(tasks):
+            log.debug('%s level %d mesh %s: %d threads, est. cost %.1f%%, wall %.3f s',
+                      label, i, grids_dense.mesh, shares[i],
+                      costs[i] * 100 / costs.sum(), timing[i])
+    return timing
+
 def _pgto_shells(cell):
     return cell._bas[:,NPRIM_OF].sum()
 
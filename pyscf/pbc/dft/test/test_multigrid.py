@@ -427,6 +427,32 @@ class KnownValues(unittest.TestCase):
         self.assertAlmostEqual(exc1, exc2, 8)
         self.assertAlmostEqual(abs(v1-v2).max(), 0, 8)
 
+    def test_parallel_tasks(self):
+        xc = 'b88,'
+        with lib.temporary_env(multigrid, PARALLEL_TASKS=False):
+            mg_df = multigrid.MultiGridFFTDF(cell_orth)
+            n0, exc0, v0 = multigrid.nr_rks(mg_df, xc, dm1, kpts=kpts)
+        with lib.with_omp_threads(3):
+            mg_df = multigrid.MultiGridFFTDF(cell_orth)
+            n1, exc1, v1 = multigrid.nr_rks(mg_df, xc, dm1, kpts=kpts)
+            bufs = dict(mg_df._rsbuf)
+            # The real-space buffers are reused in the next cycle
+            n2, exc2, v2 = multigrid.nr_rks(mg_df, xc, dm1, kpts=kpts)
+        self.assertTrue(len(bufs) > 0)
+        self.assertTrue(all(mg_df._rsbuf[k] is bufs[k] for k in bufs))
+        self.assertAlmostEqual(n1, n0, 9)
+        self.assertAlmostEqual(exc1, exc0, 9)
+        self.assertAlmostEqual(abs(v1-v0).max(), 0, 9)
+        self.assertAlmostEqual(abs(v2-v0).max(), 0, 9)
+
+        # Neither the buffers nor the concurrent levels exceed max_memory
+        with lib.with_omp_threads(3):
+            mg_df = multigrid.MultiGridFFTDF(cell_orth)
+            mg_df.max_memory = 0
+            n3, exc3, v3 = multigrid.nr_rks(mg_df, xc, dm1, kpts=kpts)
+        self.assertEqual(len(mg_df._rsbuf), 0)
+        self.assertAlmostEqual(abs(v3-v0).max(), 0, 9)
+
 
 if __name__ == '__main__':
     print("Full Tests for multigrid")
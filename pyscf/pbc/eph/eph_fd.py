@@ -15,6 +15,7 @@
 #
 
 import numpy as np
+from pyscf import lib
 from pyscf.pbc import scf, dft, gto
 from pyscf.eph.rhf import solve_hmat, _freq_mass_weighted_vec
 from pyscf.lib import logger, param
@@ -75,9 +76,7 @@ def gen_cells(cell, disp):
             cell_s.append(cell.set_geom_(atoms, inplace=False))
     return cell_a, cell_s
 
-def get_vmat(mf, mfset, disp):
-    nconfigs = len(mfset)
-    vmat=[]
+def _get_vtmp(mf):
     mygrad = mf.nuc_grad_method()
     veff  = mygrad.get_veff()
     RESTRICTED = (veff.ndim==4)
@@ -86,37 +85,37 @@ def get_vmat(mf, mfset, disp):
         vtmp = veff - v1e.transpose(1,0,2,3)
     else:
         vtmp = veff - v1e.transpose(1,0,2,3)[:,None]
+    return vtmp, RESTRICTED
 
-    aoslice = mf.cell.aoslice_by_atom()
-    for i in range(nconfigs):
-        atmid, axis = np.divmod(i, 3)
-        p0, p1 = aoslice[atmid][2:]
-        mf1, mf2 = mfset[i]
-        if RESTRICTED:
-            vfull1 = mf1.get_veff() + mf1.get_hcore() \
-                   - np.asarray(mf1.cell.pbc_intor('int1e_kin', kpts=mf1.kpts))  # <u+|V+|v+>
-            vfull2 = mf2.get_veff() + mf2.get_hcore() \
-                   - np.asarray(mf2.cell.pbc_intor('int1e_kin', kpts=mf2.kpts))  # <u-|V-|v->
-        else:
-            vfull1 = mf1.get_veff() + mf1.get_hcore()[None] \
-                   - np.asarray(mf1.cell.pbc_intor('int1e_kin', kpts=mf1.kpts))[None]  # <u+|V+|v+>
-            vfull2 = mf2.get_veff() + mf2.get_hcore()[None] \
-                   - np.asarray(mf2.cell.pbc_intor('int1e_kin', kpts=mf2.kpts))[None]  # <u-|V-|v->
-        vfull = (vfull1 - vfull2)/disp  # (<p+|V+|q+>-<p-|V-|q->)/dR
-        if RESTRICTED:
-            vfull[:,p0:p1] -= vtmp[axis,:,p0:p1]
-            vfull[:,:,p0:p1] -= vtmp[axis,:,p0:p1].transpose(0,2,1).conj()
-        else:
-            vfull[:,:,p0:p1] -= vtmp[axis,:,:,p0:p1]
-            vfull[:,:,:,p0:p1] -= vtmp[axis,:,:,p0:p1].transpose(0,1,3,2).conj()
-
-        vmat.append(vfull)
-
-    vmat= np.asarray(vmat)
+def _get_vmat_disp(mf, mf1, mf2, i, disp, vtmp, RESTRICTED):
+    '''(<p+|V+|q+>-<p-|V-|q->)/dR for the i-th displacement'''
+    atmid, axis = np.divmod(i, 3)
+    p0, p1 = mf.cell.aoslice_by_atom()[atmid][2:]
+    if RESTRICTED:
+        vfull1 = mf1.get_veff() + mf1.get_hcore() \
+               - np.asarray(mf1.cell.pbc_intor('int1e_kin', kpts=mf1.kpts))  # <u+|V+|v+>
+        vfull2 = mf2.get_veff() + mf2.get_hcore() \
+               - np.asarray(mf2.cell.pbc_intor('int1e_kin', kpts=mf2.kpts))  # <u-|V-|v->
+    else:
+        vfull1 = mf1.get_veff() + mf1.get_hcore()[None] \
+               - np.asarray(mf1.cell.pbc_intor('int1e_kin', kpts=mf1.kpts))[None]  # <u+|V+|v+>
+        vfull2 = mf2.get_veff() + mf2.get_hcore()[None] \
+               - np.asarray(mf2.cell.pbc_intor('int1e_kin', kpts=mf2.kpts))[None]  # <u-|V-|v->
+    vfull = (vfull1 - vfull2)/disp  # (<p+|V+|q+>-<p-|V-|q->)/dR
     if RESTRICTED:
-        return vmat[:,0]
+        vfull[:,p0:p1] -= vtmp[axis,:,p0:p1]
+        vfull[:,:,p0:p1] -= vtmp[axis,:,p0:p1].transpose(0,2,1).conj()
+        return vfull[0]
     else:
-        return vmat[:,:,0]
+        vfull[:,:,p0:p1] -= vtmp[axis,:,:,p0:p1]
+        vfull[:,:,:,p0:p1] -= vtmp[axis,:,:,p0:p1].transpose(0,1,3,2).conj()
+        return vfull[:,0]
+
+def get_vmat(mf, mfset, disp):
+    vtmp, RESTRICTED = _get_vtmp(mf)
+    vmat = [_get_vmat_disp(mf, mf1, mf2, i, disp, vtmp, RESTRICTED)
+            for i, (mf1, mf2) in enumerate(mfset)]
+    return np.asarray(vmat)
 
 def run_hess(mfset, disp):
     natoms = len(mfset[0][0].cell.atom_mass_list())
@@ -132,29 +131,90 @@ def run_hess(mfset, disp):
     return hess
 
 
-def kernel(mf, disp=1e-4, mo_rep=False):
+def kernel(mf, disp=1e-4, mo_rep=False, modes=None, orbs=None, max_memory=None):
+    '''Electron-phonon matrix at the Gamma point from finite difference.
+
+    The displaced calculations are run one at a time. Their potential
+    derivatives are kept in a scratch file and projected on the normal
+    modes in batches bounded by max_memory once the Hessian is known.
+
+    Kwargs:
+        modes : list of int
+            Indices of the (retained) modes to compute the coupling for.
+            The returned frequencies include all retained modes
+        orbs : list of int
+            Indices of the MOs kept in the MO representation
+    '''
     if not mf.converged: mf.kernel()
+    if max_memory is None: max_memory = mf.max_memory
+    log = logger.new_logger(mf)
     mo_coeff = np.asarray(mf.mo_coeff)
     RESTRICTED= (mo_coeff.ndim==3)
     cell = mf.cell
+    natoms = cell.natm
+    nao = cell.nao_nr()
+    nset = 1 if RESTRICTED else 2
     cells_a, cells_b = gen_cells(cell, disp/2.0) # generate a bunch of cells with disp/2 on each cartesion coord
-    mfset = run_mfs(mf, cells_a, cells_b) # run mean field calculations on all these cells
-    vmat = get_vmat(mf, mfset, disp) # extracting <u|dV|v>/dR
-    hmat = run_hess(mfset, disp)
+    nconfigs = len(cells_a)
+
+    vtmp = _get_vtmp(mf)[0]
+    dm0 = mf.make_rdm1()
+    feri = lib.H5TmpFile()
+    vmat = None
+    hess = []
+    for i in range(nconfigs):
+        # run mean field calculations on the two displaced cells and
+        # extract <u|dV|v>/dR before moving to the next displacement
+        mf1 = copy_mf(mf, cells_a[i])
+        mf2 = copy_mf(mf, cells_b[i])
+        mf1.kernel(dm0=dm0)
+        mf2.kernel(dm0=dm0)
+        if not (mf1.converged):
+            logger.warn(mf, "%ith config mf1 not converged", i)
+        if not (mf2.converged):
+            logger.warn(mf, "%ith config mf2 not converged", i)
+        v = _get_vmat_disp(mf, mf1, mf2, i, disp, vtmp, RESTRICTED)
+        if vmat is None:
+            vmat = feri.create_dataset('vmat', (nconfigs,)+v.shape, v.dtype.char)
+        vmat[i] = v
+        g1 = mf1.nuc_grad_method().kernel()
+        g2 = mf2.nuc_grad_method().kernel()
+        hess.append((g1-g2) / disp)
+        mf1 = mf2 = v = None
+    hmat = np.asarray(hess).reshape(natoms, 3, natoms, 3).transpose(0,2,1,3)
+
     omega, vec = solve_hmat(cell, hmat)
     mass = cell.atom_mass_list() * MP_ME
     vec = _freq_mass_weighted_vec(vec, omega, mass)
-    if mo_rep:
-        if RESTRICTED:
-            vmat = np.einsum('xuv,up,vq->xpq', vmat, mo_coeff[0].conj(), mo_coeff[0])
-        else:
-            vmat = np.einsum('xsuv,sup,svq->xspq', vmat, mo_coeff[:,0].conj(), mo_coeff[:,0])
+    if modes is not None:
+        vec = vec[:,modes]
+    nmodes = vec.shape[1]
+
+    if RESTRICTED:
+        orb = mo_coeff[0].reshape(1,nao,-1)
+    else:
+        orb = mo_coeff[:,0]
+    if orbs is not None:
+        orb = orb[:,:,orbs]
+    norb = orb.shape[-1] if mo_rep else nao
+    mat = np.zeros((nset,nmodes,norb,norb), dtype=np.result_type(vec, vmat.dtype, orb))
+
+    mem_avail = max(0, max_memory - lib.current_memory()[0] - mat.nbytes/1e6)
+    blksize = max(1, min(nconfigs, int(mem_avail*1e6/16/(nset*nao**2*2))))
+    for p0, p1 in lib.prange(0, nconfigs, blksize):
+        v = np.asarray(vmat[p0:p1]).reshape(p1-p0,nset,nao,nao)
+        for s in range(nset):
+            vs = v[:,s]
+            if mo_rep:
+                vs = lib.einsum('xuv,up,vq->xpq', vs, orb[s].conj(), orb[s])
+            mat[s] += lib.einsum('xJ,xpq->Jpq', vec[p0:p1], vs)
+        log.debug('EPH: displacements %d:%d projected', p0, p1)
+    feri.close()
 
     if RESTRICTED:
-        mat = np.einsum('xJ,xpq->Jpq', vec, vmat)
+        return mat[0], omega
     else:
-        mat = np.einsum('xJ,xspq->sJpq', vec, vmat)
-    return mat, omega
+        return mat, omega
 
 if __name__ == '__main__':
     cell = gto.Cell()
@@ -208,7 +208,8 @@ def unpack(celldic):
 def dumps(cell):
     '''Serialize Cell object to a JSON formatted str.
     '''
-    exclude_keys = set(('output', 'stdout', '_keys'))
+    exclude_keys = set(('output', 'stdout', '_keys', '_coulG_cache',
+                        '_lattice_Ls_cache'))
 
     celldic = dict(cell.__dict__)
     for k in exclude_keys:
@@ -391,6 +392,9 @@ def intor_cross(intor, cell1, cell2, comp=None, hermi=0, kpts=None, kpt=None,
         cpbcopt = lib.c_null_ptr()
 
     Ls = cell1.get_lattice_Ls(rcut=max(cell1.rcut, cell2.rcut))
+    if isinstance(pbcopt, _pbcintor.PBCOpt):
+        Ls = pbctools.screen_lattice_Ls(cell1, cell2, Ls, shls_slice,
+                                        pcell.precision)
     expkL = np.asarray(np.exp(1j*np.dot(kpts_lst, Ls.T)), order='C')
     drv = libpbc.PBCnr2c_drv
 
@@ -29,6 +29,7 @@ import numpy
 import scipy.special
 from pyscf import lib
 from pyscf import gto
+from pyscf.pbc.tools import pbc as pbctools
 
 libpbc = lib.load_library('libpbc')
 
@@ -289,6 +290,7 @@ def _int_vnl(cell, fakecell, hl_blocks, kpts):
     '''Vnuc - Vloc'''
     rcut = max(cell.rcut, fakecell.rcut)
     Ls = cell.get_lattice_Ls(rcut=rcut)
+    Ls = pbctools.screen_lattice_Ls(fakecell, cell, Ls)
     nimgs = len(Ls)
     expkL = numpy.asarray(numpy.exp(1j*numpy.dot(kpts, Ls.T)), order='C')
     nkpts = len(kpts)
@@ -107,6 +107,25 @@ class KnownValues(unittest.TestCase):
         rcut = max([cell.bas_rcut(ib, 1e-9) for ib in range(cell.nbas)])
         self.assertEqual(cell.get_lattice_Ls(rcut=rcut).shape, (1465, 3))
 
+    def test_lattice_Ls_cache(self):
+        from pyscf.pbc.tools import pbc as pbctools
+        cell = pgto.M(atom='C 0 0 0; C 1.685 1.685 1.685', unit='B',
+                      basis='gth-szv', pseudo='gth-pade',
+                      a=(numpy.ones((3,3)) - numpy.eye(3)) * 3.37)
+        Ls = cell.get_lattice_Ls()
+        ref = Ls.copy()
+        Ls[:] = 0  # the cached image list is not modified
+        self.assertAlmostEqual(abs(cell.get_lattice_Ls() - ref).max(), 0, 12)
+
+        kpts = cell.make_kpts([2,1,1])
+        s0 = cell.pbc_intor('int1e_ovlp', kpts=kpts, pbcopt=False)
+        s1 = cell.pbc_intor('int1e_ovlp', kpts=kpts)
+        self.assertAlmostEqual(abs(numpy.array(s1) - numpy.array(s0)).max(), 0, 9)
+        stats = pbctools.lattice_sum_stats(cell)
+        self.assertTrue(stats['hits'] > 0)
+        self.assertTrue(0 < stats['images_skipped'] < stats['images'])
+        self.assertTrue(0 < stats['shell_pair_images_skipped'] < stats['shell_pair_images'])
+
     def test_ewald(self):
         cell = pgto.Cell()
         cell.unit = 'B'
@@ -0,0 +1,620 @@
+#!/usr/bin/env python
+# Copyright 2014-2021 The PySCF Developers. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+r'''
+Band structure of a converged mean-field calculation at arbitrary k-points
+
+The Fock matrix at a band k-point
+
+    F(k) = h(k) + \int \phi_k(r)^* v(r) \phi_k(r) dr - c K(k)
+
+depends on the SCF solution through the local potential v(r) (Hartree and
+XC potential) and through the exchange operator K. The local potential is
+evaluated once on the integration grids when the engine is built. For FFTDF,
+the occupied orbitals of the SCF k-points are evaluated on the FFT mesh once
+as well (the compact form of the exchange operator). The exchange matrices of
+the band k-points are computed from these orbitals without evaluating the AOs
+of the SCF k-points again. The band k-points are processed in batches. With
+multiple OpenMP threads, the batches are evaluated concurrently and the
+threads are shared among them.
+
+For very dense k-paths, the Fock matrices of the SCF k-point mesh can be
+Fourier interpolated in the AO basis (:meth:`BandEngine.interpolate_fock`).
+The images of each AO pair are assigned to the Wigner-Seitz supercell of the
+Born-von Karman lattice. Alternatively, the bands can be interpolated with
+the maximally localized Wannier functions of pywannier90
+(:meth:`BandEngine.interpolate_wannier`).
+
+The get_bands methods of the SCF classes are a separate entry point. They
+build the Fock matrices of the band k-points with get_veff for any given
+density matrix and do not use the caches of this engine.
+
+Examples:
+
+>>> mf = pbc.dft.KRKS(cell, cell.make_kpts([3,3,3])).run()
+>>> e_kn, c_kn = BandEngine(mf).kernel(kpts_band)
+'''
+
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+import numpy
+from pyscf import lib
+from pyscf.lib import logger
+from pyscf.pbc import tools
+from pyscf.pbc.scf import hf as pbchf
+from pyscf.pbc.scf import uhf as pbcuhf
+from pyscf.pbc.scf import rohf as pbcrohf
+from pyscf.pbc.scf import khf
+from pyscf.pbc.df import fft
+from pyscf.pbc.df.df_jk import _ewald_exxdiv_for_G0
+from pyscf.pbc.dft import numint
+from pyscf.pbc.lib.kpts_helper import gamma_point
+from pyscf import __config__
+
+# Number of band k-points evaluated together. It is estimated from max_memory
+# if not specified.
+KPTS_PER_BATCH = getattr(__config__, 'pbc_scf_bands_kpts_per_batch', None)
+# Distance tolerance to identify the degenerated images in the Wigner-Seitz
+# supercell
+WS_DISTANCE_TOL = getattr(__config__, 'pbc_scf_bands_ws_distance_tol', 1e-6)
+
+
+def _slice_vxc(vxc, p0, p1):
+    return [None if v is None else v[p0:p1] for v in vxc]
+
+def _eval_mats(ni, cell, ao, weight, mask, xctype, rho, vxc, nspin):
+    '''Potential matrices of each spin for one block of grids'''
+    if rho is None or nspin == 1:
+        mat = ni.eval_mat(cell, ao, weight, None if rho is None else rho[0],
+                          vxc, mask, xctype, 0)
+        return [mat] * nspin
+
+    rho_a, rho_b = rho
+    vrho = vxc[0]
+    if xctype == 'LDA':
+        mata = ni.eval_mat(cell, ao, weight, rho_a[0], vrho[:,0], mask, xctype, 1)
+        matb = ni.eval_mat(cell, ao, weight, rho_b[0], vrho[:,1], mask, xctype, 1)
+    else:
+        vsigma = vxc[1]
+        mata = ni.eval_mat(cell, ao, weight, (rho_a, rho_b),
+                           (vrho[:,0], (vsigma[:,0], vsigma[:,1])),
+                           mask, xctype, 1)
+        matb = ni.eval_mat(cell, ao, weight, (rho_b, rho_a),
+                           (vrho[:,1], (vsigma[:,2], vsigma[:,1])),
+                           mask, xctype, 1)
+    return [mata, matb]
+
+def _kmesh_of(cell, kpts):
+    '''The Monkhorst-Pack mesh of the k-points'''
+    scaled_kpts = cell.get_scaled_kpts(kpts)
+    scaled_kpts = numpy.round(scaled_kpts % 1, 8) % 1
+    kmesh = [len(numpy.unique(scaled_kpts[:,x])) for x in range(3)]
+    if numpy.prod(kmesh) != len(kpts):
+        raise ValueError('SCF k-points do not form a regular mesh')
+    return kmesh
+
+def _ws_translations(cell, kmesh, tol=WS_DISTANCE_TOL):
+    '''Images of the Born-von Karman lattice vectors in the Wigner-Seitz
+    supercell.
+
+    Returns:
+        Ts : (nT,3) array
+            Lattice translations
+        wts : (nT,natm,natm) array
+            The weight of each translation for the atom pairs (A,B). It is the
+            inverse of the degeneracy if B+T is one of the closest images of
+            B to A in the supercell, 0 otherwise.
+    '''
+    a = cell.lattice_vectors()
+    kmesh = numpy.asarray(kmesh)
+    Rs = lib.cartesian_prod([numpy.arange(n) for n in kmesh])
+    images = [(-1, 0, 1) if x < cell.dimension else (0,) for x in range(3)]
+    ms = lib.cartesian_prod(images)
+    Ts = (Rs[:,None,:] + ms * kmesh).reshape(-1,3).dot(a)
+
+    coords = cell.atom_coords()
+    natm = len(coords)
+    rab = coords[None,:,None] - coords[:,None,None] + Ts  # (natm,natm,nT,3)
+    dist = numpy.sqrt(numpy.einsum('abtx,abtx->abt', rab, rab))
+    dist = dist.reshape(natm, natm, len(Rs), len(ms))
+    mask = dist < dist.min(axis=3)[:,:,:,None] + tol
+    wts = mask / mask.sum(axis=3)[:,:,:,None].astype(float)
+    wts = wts.reshape(natm, natm, -1).transpose(2,0,1)
+
+    kept = wts.any(axis=(1,2))
+    return Ts[kept], wts[kept]
+
+def _get_k_from_orbs(mydf, orbs_kpts, dms, kpts, kpts_band, exxdiv=None):
+    '''FFTDF exchange matrices at kpts_band of the density matrices dms of
+    kpts. orbs_kpts are the occupied orbitals (scaled by the square root of
+    the occupancies) of kpts on the FFT mesh, see fft_jk.get_k_kpts.
+    '''
+    cell = mydf.cell
+    mesh = mydf.mesh
+    coords = mydf.grids.coords
+    ngrids = len(coords)
+    nkpts = len(kpts)
+    nao = cell.nao_nr()
+    nband = len(kpts_band)
+    weight = 1./nkpts * (cell.vol/ngrids)
+
+    vk = numpy.zeros((nband,nao,nao), dtype=numpy.complex128)
+    ao1_kpts = [numpy.asarray(ao.T, order='C')
+                for ao in mydf._numint.eval_ao(cell, coords, kpts=kpts_band)]
+    nocc = max(1, max(orbT.shape[0] for orbT in orbs_kpts))
+    max_memory = mydf.max_memory - lib.current_memory()[0]
+    blksize = int(min(nao, max(1, max_memory*1e6/16/4/ngrids/nocc)))
+    vR_dm = numpy.empty((nao,ngrids), dtype=numpy.complex128)
+    for k2, orbT in enumerate(orbs_kpts):
+        if orbT.size == 0:
+            continue
+        for k1, ao1T in enumerate(ao1_kpts):
+            dk = kpts[k2] - kpts_band[k1]
+            if exxdiv == 'ewald' or exxdiv is None:
+                coulG = tools.get_coulG_cached(cell, dk, False, mydf, mesh)
+            else:
+                coulG = tools.get_coulG_cached(cell, dk, exxdiv, mydf, mesh)
+            expmikr = numpy.exp(-1j * numpy.dot(coords, dk))
+            for p0, p1 in lib.prange(0, nao, blksize):
+                rho1 = numpy.einsum('ig,jg->ijg', ao1T[p0:p1].conj()*expmikr, orbT)
+                vG = tools.fft(rho1.reshape(-1,ngrids), mesh)
+                rho1 = None
+                vG *= coulG
+                vR = tools.ifft(vG, mesh).reshape(p1-p0,-1,ngrids)
+                vG = None
+                numpy.einsum('ijg,jg->ig', vR, orbT.conj(), out=vR_dm[p0:p1])
+                vR = None
+            vR_dm *= expmikr.conj()
+            vk[k1] += weight * lib.dot(vR_dm, ao1T.T)
+
+    if exxdiv == 'ewald':
+        _ewald_exxdiv_for_G0(cell, kpts, dms[None], vk[None], kpts_band=kpts_band)
+    if gamma_point(kpts) and gamma_point(kpts_band):
+        vk = vk.real
+    return vk
+
+
+class BandEngine(lib.StreamObject):
+    '''Band energies and orbitals of a converged SCF object at arbitrary
+    k-points.
+
+    Attributes:
+        kpts_per_batch : int
+            Number of band k-points evaluated together. Estimated from
+            max_memory by default.
+    '''
+    def __init__(self, mf):
+        if (isinstance(mf, pbcrohf.ROHF) or
+            not isinstance(mf, (pbchf.RHF, pbcuhf.UHF))):
+            raise NotImplementedError('BandEngine for %s' % mf.__class__)
+        self._scf = mf
+        self.cell = mf.cell
+        self.stdout = mf.stdout
+        self.verbose = mf.verbose
+        self.max_memory = mf.max_memory
+        self.kpts_per_batch = KPTS_PER_BATCH
+        self._keys = set(self.__dict__.keys())
+
+        self._kpts = None
+        self._dms = None
+        self._hyb = None
+        self._vloc = None
+        self._occ_orbs = None
+        self._rsh_df = None
+        self._fock_R = None
+
+    @property
+    def nspin(self):
+        return 1 if isinstance(self._scf, pbchf.RHF) else 2
+
+    def dump_flags(self, verbose=None):
+        log = logger.new_logger(self, verbose)
+        log.info('\n')
+        log.info('******** %s ********', self.__class__)
+        log.info('SCF object = %s', self._scf.__class__)
+        log.info('kpts_per_batch = %s', self.kpts_per_batch)
+        return self
+
+    def build(self):
+        '''Caches the converged density, the local potential on grids and
+        the occupied orbitals of the exchange operator'''
+        mf = self._scf
+        cell = self.cell
+        nao = cell.nao_nr()
+        nspin = self.nspin
+        cput0 = (logger.process_clock(), logger.perf_counter())
+        self.dump_flags()
+
+        if isinstance(mf, khf.KSCF):
+            kpts = numpy.asarray(mf.kpts).reshape(-1,3)
+            mo_coeff, mo_occ = mf.mo_coeff, mf.mo_occ
+        else:
+            kpts = numpy.asarray(mf.kpt).reshape(1,3)
+            mo_coeff = [[c] for c in numpy.reshape(mf.mo_coeff, (nspin,nao,-1))]
+            mo_occ = [[o] for o in numpy.reshape(mf.mo_occ, (nspin,-1))]
+        if nspin == 1:
+            mo_coeff, mo_occ = [mo_coeff], [mo_occ]
+        nkpts = len(kpts)
+        dms = numpy.asarray(mf.make_rdm1()).reshape(nspin,nkpts,nao,nao)
+        self._kpts = kpts
+        self._dms = [lib.tag_array(dms[s], mo_coeff=mo_coeff[s], mo_occ=mo_occ[s])
+                     for s in range(nspin)]
+
+        if hasattr(mf, 'xc'):
+            if getattr(mf, 'nlc', '') != '':
+                raise NotImplementedError('BandEngine for NLC functionals')
+            self._hyb = mf._numint.rsh_and_hybrid_coeff(mf.xc, spin=cell.spin)
+        else:  # HF
+            self._hyb = (0, 0, 1)
+
+        self._vloc = []
+        if hasattr(mf, 'xc'):
+            self._vloc.append(self._cache_vxc(kpts, dms))
+        if isinstance(mf.with_df, fft.FFTDF):
+            self._add_coulomb_potential(kpts, dms.sum(axis=0))
+
+        omega, alpha, hyb = self._hyb
+        self._occ_orbs = self._rsh_df = None
+        if ((abs(hyb) > 1e-10 or abs(alpha) > 1e-10) and
+            isinstance(mf.with_df, fft.FFTDF)):
+            self._occ_orbs = self._cache_occ_orbs(kpts, mo_coeff, mo_occ)
+            if self._occ_orbs is not None and abs(omega) > 1e-10:
+                # A separate cell for the long-range exchange, so that the
+                # batches do not need to change mf.cell.omega temporarily
+                self._rsh_df = copy.copy(mf.with_df)
+                self._rsh_df.cell = mf.with_df.cell.copy()
+                self._rsh_df.cell.omega = omega
+        self._fock_R = None
+        logger.timer(self, 'BandEngine.build', *cput0)
+        return self
+
+    def _cache_vxc(self, kpts, dms):
+        '''XC potential of the converged density on mf.grids'''
+        mf = self._scf
+        cell = self.cell
+        nao = cell.nao_nr()
+        nspin = self.nspin
+        xctype = mf._numint._xc_type(mf.xc)
+        if xctype == 'LDA':
+            ao_deriv, nvar = 0, 1
+        elif xctype == 'GGA':
+            ao_deriv, nvar = 1, 4
+        else:
+            raise NotImplementedError('BandEngine for %s functionals' % xctype)
+
+        grids = mf.grids
+        if grids.non0tab is None:
+            grids.build(with_non0tab=True)
+        ni = numint.KNumInt(kpts)
+        rho = numpy.empty((nspin, nvar, grids.weights.size))
+        p1 = 0
+        for ao_k1, ao_k2, mask, weight, coords \
+                in ni.block_loop(cell, grids, nao, ao_deriv, kpts, None,
+                                 self.max_memory):
+            p0, p1 = p1, p1 + weight.size
+            for s in range(nspin):
+                rho[s,:,p0:p1] = ni.eval_rho(cell, ao_k1, dms[s], mask, xctype,
+                                             hermi=1)
+        if xctype == 'LDA':
+            rho_in = rho[:,0]
+        else:
+            rho_in = rho
+        if nspin == 1:
+            vxc = mf._numint.eval_xc(mf.xc, rho_in[0], spin=0, deriv=1)[1]
+        else:
+            vxc = mf._numint.eval_xc(mf.xc, (rho_in[0], rho_in[1]), spin=1, deriv=1)[1]
+        return [grids, xctype, rho, list(vxc)]
+
+    def _cache_occ_orbs(self, kpts, mo_coeff, mo_occ):
+        '''Occupied orbitals of the SCF k-points on the FFT mesh, scaled by
+        the square root of the occupancies. Returns None if they do not fit
+        in max_memory.
+        '''
+        mydf = self._scf.with_df
+        ngrids = len(mydf.grids.coords)
+        nocc = sum(numpy.count_nonzero(o > 0) for occ in mo_occ for o in occ)
+        mem_avail = self.max_memory - lib.current_memory()[0]
+        if nocc * ngrids * 16e-6 > mem_avail * .5:
+            logger.debug(self, 'Occupied orbitals on the FFT mesh do not fit '
+                         'in max_memory. Exchange is computed by with_df.')
+            return None
+
+        ao_kpts = mydf._numint.eval_ao(self.cell, mydf.grids.coords, kpts=kpts)
+        orbs = []
+        for c_s, occ_s in zip(mo_coeff, mo_occ):
+            orbs.append([lib.dot((c[:,o>0] * numpy.sqrt(o[o>0])).T, ao.T)
+                         for c, o, ao in zip(c_s, occ_s, ao_kpts)])
+        return orbs
+
+    def _get_k(self, s, kpts_band, omega=None):
+        '''Exchange matrices of spin s at the band k-points'''
+        mf = self._scf
+        kpts = self._kpts
+        if self._occ_orbs is None:
+            vk = mf.with_df.get_jk(self._dms[s], 1, kpts, kpts_band,
+                                   with_j=False, omega=omega,
+                                   exxdiv=mf.exxdiv)[1]
+        else:
+            mydf = mf.with_df if omega is None else self._rsh_df
+            vk = _get_k_from_orbs(mydf, self._occ_orbs[s], self._dms[s],
+                                  kpts, kpts_band, mf.exxdiv)
+        return numpy.reshape(vk, (len(kpts_band),) + self._dms[s].shape[1:])
+
+    def _add_coulomb_potential(self, kpts, dm):
+        '''Hartree potential of the converged density on the FFT mesh'''
+        mydf = self._scf.with_df
+        cell = self.cell
+        mesh = mydf.mesh
+        grids = mydf.grids
+        if grids.non0tab is None:
+            grids.build(with_non0tab=True)
+        rhoR = numint.get_rho(numint.KNumInt(kpts), cell, dm, grids, kpts,
+                              self.max_memory)
+        coulG = tools.get_coulG_cached(cell, mesh=mesh)
+        vR = tools.ifft(coulG * tools.fft(rhoR, mesh), mesh).real.ravel()
+
+        # Merge into the XC potential if both are on the same uniform grids
+        if self._vloc:
+            xc_grids, xctype, rho, vxc = self._vloc[0]
+            if (xc_grids.coords.shape == grids.coords.shape and
+                abs(xc_grids.coords - grids.coords).max() < 1e-12 and
+                abs(xc_grids.weights - grids.weights).max() < 1e-12):
+                if self.nspin == 1:
+                    vxc[0] = vxc[0] + vR
+                else:
+                    vxc[0] = vxc[0] + vR[:,None]
+                return self
+        self._vloc.append([grids, 'LDA', None, [vR, None, None, None]])
+        return self
+
+    def _get_batch_size(self, nband, nworkers=1):
+        if self.kpts_per_batch:
+            return int(self.kpts_per_batch)
+        nao = self.cell.nao_nr()
+        mem_avail = max(200, self.max_memory - lib.current_memory()[0])
+        # Fock, hcore, overlap and exchange matrices of each k-point. The
+        # batches of the concurrent workers share the memory.
+        blksize = int(mem_avail*.2e6 / (16 * nao**2 * (self.nspin*2 + 2)) /
+                      nworkers)
+        # Leave at least one batch to each worker
+        blksize = min(blksize, -(-nband // nworkers))
+        return max(1, min(nband, blksize))
+
+    def get_veff(self, kpts_band):
+        '''Potential matrices (nspin,nband,nao,nao) at the band k-points'''
+        if self._vloc is None:
+            self.build()
+        mf = self._scf
+        cell = self.cell
+        nao = cell.nao_nr()
+        nspin = self.nspin
+        kpts = self._kpts
+        kpts_band = numpy.reshape(kpts_band, (-1,3))
+        nband = len(kpts_band)
+        if gamma_point(kpts_band):
+            veff = numpy.zeros((nspin,nband,nao,nao))
+        else:
+            veff = numpy.zeros((nspin,nband,nao,nao), dtype=numpy.complex128)
+
+        ni = numint.KNumInt(kpts_band)
+        for grids, xctype, rho, vxc in self._vloc:
+            ao_deriv = 0 if xctype == 'LDA' else 1
+            p1 = 0
+            for ao_k1, ao_k2, mask, weight, coords \
+                    in ni.block_loop(cell, grids, nao, ao_deriv, kpts_band,
+                                     None, self.max_memory):
+                p0, p1 = p1, p1 + weight.size
+                rho_sub = None if rho is None else rho[:,:,p0:p1]
+                mats = _eval_mats(ni, cell, ao_k1, weight, mask, xctype,
+                                  rho_sub, _slice_vxc(vxc, p0, p1), nspin)
+                for s in range(nspin):
+                    veff[s] += mats[s]
+
+        if not isinstance(mf.with_df, fft.FFTDF):
+            dm = lib.asarray(self._dms).sum(axis=0)
+            vj = mf.with_df.get_jk(dm, 1, kpts, kpts_band, with_k=False)[0]
+            veff += numpy.reshape(vj, (nband,nao,nao))
+
+        omega, alpha, hyb = self._hyb
+        if abs(hyb) > 1e-10 or abs(alpha) > 1e-10:
+            fac = .5 if nspin == 1 else 1
+            for s in range(nspin):
+                vk = self._get_k(s, kpts_band) * hyb
+                if abs(omega) > 1e-10:
+                    vk += self._get_k(s, kpts_band, omega) * (alpha - hyb)
+                veff[s] -= vk * fac
+        return veff
+
+    def get_fock(self, kpts_band):
+        '''Fock and overlap matrices at the band k-points.
+
+        Returns:
+            fock : (nband,nao,nao) array for restricted, (2,nband,nao,nao) array
+            for unrestricted SCF objects.
+            s1e : (nband,nao,nao) array
+        '''
+        if self._vloc is None:
+            self.build()
+        mf = self._scf
+        cell = self.cell
+        nao = cell.nao_nr()
+        kpts_band = numpy.reshape(kpts_band, (-1,3))
+        nband = len(kpts_band)
+        log = logger.new_logger(self)
+        cput0 = (logger.process_clock(), logger.perf_counter())
+
+        def int1e(k0, k1):
+            kpts = kpts_band[k0:k1]
+            h1e = numpy.reshape(mf.get_hcore(cell, kpts), (-1,nao,nao))
+            s1e = numpy.reshape(mf.get_ovlp(cell, kpts), (-1,nao,nao))
+            return h1e, s1e
+
+        nthreads = lib.num_threads()
+        nworkers = max(1, min(nthreads, nband))
+        omega = self._hyb[0]
+        if abs(omega) > 1e-10 and self._rsh_df is None:
+            # with_df.get_jk changes cell.omega temporarily for the long-range
+            # exchange. The batches cannot be evaluated concurrently.
+            nworkers = 1
+        blksize = self._get_batch_size(nband, nworkers)
+        batches = list(lib.prange(0, nband, blksize))
+        nworkers = min(nworkers, len(batches))
+
+        def fock_of_batch(k0, k1):
+            with lib.with_omp_threads(max(1, nthreads // nworkers)):
+                h1, s1 = int1e(k0, k1)
+                f = self.get_veff(kpts_band[k0:k1]) + h1
+            log.debug1('band k-points [%d:%d] done', k0, k1)
+            return f, s1
+
+        if nworkers > 1:
+            with ThreadPoolExecutor(max_workers=nworkers) as ex:
+                fock, s1e = zip(*ex.map(fock_of_batch, *zip(*batches)))
+        else:
+            # The one-electron integrals of the next batch are prefetched
+            fock = []
+            s1e = []
+            for (k0, k1), (h1, s1) in zip(batches,
+                                          lib.map_with_prefetch(int1e, *zip(*batches))):
+                fock.append(self.get_veff(kpts_band[k0:k1]) + h1)
+                s1e.append(s1)
+                log.debug1('band k-points [%d:%d] done', k0, k1)
+        fock = numpy.concatenate(fock, axis=1)
+        s1e = numpy.concatenate(s1e, axis=0)
+        log.timer('Fock matrices of %d band k-points' % nband, *cput0)
+        if self.nspin == 1:
+            fock = fock[0]
+        return fock, s1e
+
+    def interpolate_fock(self, kpts_band):
+        '''Fourier interpolation of the Fock and overlap matrices of the SCF
+        k-point mesh in the Wigner-Seitz supercell. The interpolation is exact
+        at the SCF k-points and converges with the size of the k-point mesh.
+
+        Returns:
+            fock, s1e in the same format as :meth:`get_fock`
+        '''
+        if self._fock_R is None:
+            self._fock_R = self._build_fock_R()
+        Ts, fock_R, s_R = self._fock_R
+        nao = self.cell.nao_nr()
+        kpts_band = numpy.reshape(kpts_band, (-1,3))
+        phase = numpy.exp(1j * kpts_band.dot(Ts.T))
+        fock = [lib.dot(phase, f).reshape(-1,nao,nao) for f in fock_R]
+        s1e = lib.dot(phase, s_R).reshape(-1,nao,nao)
+        if gamma_point(kpts_band):
+            fock = [f.real for f in fock]
+            s1e = s1e.real
+        if self.nspin == 1:
+            fock = fock[0]
+        else:
+            fock = numpy.asarray(fock)
+        return fock, s1e
+
+    def _build_fock_R(self):
+        mf = self._scf
+        cell = self.cell
+        nao = cell.nao_nr()
+        if isinstance(mf, khf.KSCF):
+            kpts = numpy.asarray(mf.kpts).reshape(-1,3)
+        else:
+            kpts = numpy.asarray(mf.kpt).reshape(1,3)
+        nkpts = len(kpts)
+        fock = numpy.reshape(mf.get_fock(), (self.nspin,nkpts,nao*nao))
+        s1e = numpy.reshape(mf.get_ovlp(), (nkpts,nao*nao))
+
+        kmesh = _kmesh_of(cell, kpts)
+        Ts, wts = _ws_translations(cell, kmesh)
+        ao_atom = numpy.repeat(numpy.arange(cell.natm),
+                               [p1-p0 for p0, p1 in cell.aoslice_by_atom()[:,2:]])
+        wts = wts[:,ao_atom[:,None],ao_atom].reshape(len(Ts),-1)
+        phase = numpy.exp(-1j * Ts.dot(kpts.T)) / nkpts
+        fock_R = [lib.dot(phase, f) * wts for f in fock]
+        s_R = lib.dot(phase, s1e) * wts
+        logger.debug(self, 'Fourier interpolation with k-mesh %s, %d translations',
+                     kmesh, len(Ts))
+        return Ts, fock_R, s_R
+
+    def kernel(self, kpts_band, interpolate=False):
+        '''Band energies and orbitals at the band k-points
+
+        Kwargs:
+            interpolate : bool
+                Whether to Fourier interpolate the Fock matrices of the SCF
+                k-point mesh instead of evaluating them at the band k-points.
+
+        Returns:
+            mo_energy, mo_coeff in the same format as mf.get_bands
+        '''
+        if interpolate:
+            fock, s1e = self.interpolate_fock(kpts_band)
+        else:
+            fock, s1e = self.get_fock(kpts_band)
+        eig = self._scf._eigh
+        if self.nspin == 1:
+            mo_energy, mo_coeff = zip(*[eig(f, s) for f, s in zip(fock, s1e)])
+            return list(mo_energy), list(mo_coeff)
+        else:
+            mo_energy = []
+            mo_coeff = []
+            for f_s in fock:
+                e, c = zip(*[eig(f, s) for f, s in zip(f_s, s1e)])
+                mo_energy.append(list(e))
+                mo_coeff.append(list(c))
+            return mo_energy, mo_coeff
+
+    def interpolate_wannier(self, w90, kpts_band):
+        '''Bands interpolated with the maximally localized Wannier functions
+        of a wannierized :class:`pywannier90.W90` object.
+
+        The Hamiltonian in the basis of the Wannier functions is the Fock
+        matrix of the SCF object at the k-points of w90 (rather than the
+        orbital energies stored in w90, which drop the couplings of the
+        disentangled bands). It is interpolated with the Slater-Koster scheme
+        of W90.interpolate_band.
+
+        Returns:
+            mo_energy : list of (num_wann,) arrays
+            mo_coeff : list of (num_wann,num_wann) arrays
+                Band orbitals in the basis of the Wannier functions
+        '''
+        if w90.U_matrix is None:
+            raise RuntimeError('W90 object must be wannierized first')
+        mf = self._scf
+        cell = self.cell
+        nao = cell.nao_nr()
+        kpts = numpy.reshape(mf.kpts, (-1,3))
+        nkpts = len(kpts)
+        if (len(w90.kpt_latt_loc) != nkpts or
+            abs(w90.kpt_latt_loc - cell.get_scaled_kpts(kpts)).max() > 1e-8):
+            raise ValueError('k-points of the W90 object and the SCF object '
+                             'are different')
+
+        fock = numpy.reshape(mf.get_fock(), (self.nspin,nkpts,nao,nao))
+        fock = fock[0 if self.nspin == 1 or w90.spin_up else 1]
+        ham_kpts = []
+        for k in range(nkpts):
+            win = w90.lwindow[k]
+            c = numpy.asarray(w90.mo_coeff_kpts[k])[:,w90.band_included_list]
+            # Wannier functions = c * U_opt^T * U^T
+            c = reduce(lib.dot, (c[:,win], w90.U_matrix_opt[k][:,win].T,
+                                 w90.U_matrix[k].T))
+            ham_kpts.append(reduce(lib.dot, (c.conj().T, fock[k], c)))
+
+        frac_kpts = cell.get_scaled_kpts(numpy.reshape(kpts_band, (-1,3)))
+        mo_energy, mo_coeff = w90.interpolate_band(frac_kpts,
+                                                   numpy.asarray(ham_kpts))
+        return list(mo_energy), list(mo_coeff)
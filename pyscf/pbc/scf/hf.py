@@ -162,6 +162,11 @@ def get_jk(mf, cell, dm, hermi=1, vhfopt=None, kpt=np.zeros(3),
 def get_bands(mf, kpts_band, cell=None, dm=None, kpt=None):
     '''Get energy bands at the given (arbitrary) 'band' k-points.
 
+    The Fock matrices of the band k-points are built with get_veff for the
+    given density matrix. For the bands of a converged SCF object at many
+    k-points, see :class:`pyscf.pbc.scf.bands.BandEngine` which caches the
+    potential and the occupied orbitals of the SCF k-points.
+
     Returns:
         mo_energy : (nmo,) ndarray or a list of (nmo,) ndarray
             Bands energies E_n(k)
@@ -446,6 +446,76 @@ def as_scanner(mf):
     return SCF_Scanner(mf)
 
 
+def kernel_ace(mf, conv_tol=1e-10, conv_tol_grad=None, dm0=None, **kwargs):
+    '''SCF driver with the adaptively compressed exchange (ACE) operator.
+
+    The exchange operator is represented in the low-rank form
+    K = xi xi^\\dagger (see :func:`pyscf.pbc.df.fft_jk.get_k_ace_kpts`) which
+    is exact for the occupied orbitals of a reference density matrix. The ACE
+    operator costs nkpts^2*nocc^2 FFTs while the full exchange matrix costs
+    nkpts^2*nao*nocc FFTs. The SCF iterations reuse the ACE operator until the
+    density matrix deviates from the reference by more than mf.ace_ddm_tol.
+    When the SCF iterations converge, the ACE operator is rebuilt with the
+    converged orbitals. The Fock matrix of the rebuilt operator is exact for
+    the occupied orbitals. The outer loop stops when the orbital gradient of
+    this Fock matrix is smaller than conv_tol_grad.
+
+    The ACE operator is exact for the occupied orbitals only. The returned
+    orbitals and orbital energies are obtained by diagonalizing the Fock
+    matrix built with the exact exchange matrix once at the end so that the
+    virtual orbitals can be used in post-SCF calculations.
+
+    Returns the same values as :func:`pyscf.scf.hf.kernel`.
+    '''
+    log = logger.new_logger(mf)
+    cell = mf.cell
+    if dm0 is None:
+        dm = mf.get_init_guess(cell, mf.init_guess)
+    else:
+        dm = dm0
+    h1e = mf.get_hcore(cell)
+    s1e = mf.get_ovlp(cell)
+    if conv_tol_grad is None:
+        conv_tol_grad = np.sqrt(conv_tol)
+
+    scf_conv = False
+    # hcore and overlap matrices are reused by the SCF iterations of all cycles
+    get_hcore = lambda *args: h1e
+    get_ovlp = lambda *args: s1e
+    try:
+        mf._update_ace(dm)
+        for cycle in range(mf.ace_max_cycle):
+            with lib.temporary_env(mf, get_hcore=get_hcore, get_ovlp=get_ovlp):
+                inner_conv, e_tot, mo_energy, mo_coeff, mo_occ = \
+                        mol_hf.kernel(mf, conv_tol, conv_tol_grad, dm0=dm,
+                                      **kwargs)
+            dm = mf.make_rdm1(mo_coeff, mo_occ)
+            dm = lib.tag_array(dm, mo_coeff=mo_coeff, mo_occ=mo_occ)
+
+            mf._update_ace(dm)
+            vhf = mf.get_veff(cell, dm)
+            e_last = e_tot if cycle == 0 else e_ace
+            e_ace = mf.energy_tot(dm, h1e, vhf)
+            fock = mf.get_fock(h1e, s1e, vhf, dm)
+            norm_gorb = np.linalg.norm(mf.get_grad(mo_coeff, mo_occ, fock))
+            log.info('ACE cycle= %d E= %.15g  delta_E= %4.3g  |g|= %4.3g',
+                     cycle+1, e_ace, e_ace-e_last, norm_gorb)
+            if inner_conv and norm_gorb < conv_tol_grad:
+                scf_conv = True
+                break
+    finally:
+        mf._ace = mf._ace_dm = None
+    e_tot = e_ace
+
+    # Virtual orbitals of the ACE Fock matrix are not the eigenvectors of the
+    # exact Fock matrix
+    vhf = mf.get_veff(cell, dm)
+    fock = mf.get_fock(h1e, s1e, vhf, dm)
+    mo_energy, mo_coeff = mf.eig(fock, s1e)
+    mo_occ = mf.get_occ(mo_energy, mo_coeff)
+    return scf_conv, e_tot, mo_energy, mo_coeff, mo_occ
+
+
 class KSCF(pbchf.SCF):
     '''SCF base class with k-point sampling.
 
@@ -459,6 +529,10 @@ class KSCF(pbchf.SCF):
     '''
     conv_tol_grad = getattr(__config__, 'pbc_scf_KSCF_conv_tol_grad', None)
     direct_scf = getattr(__config__, 'pbc_scf_SCF_direct_scf', True)
+    # Adaptively compressed exchange for FFTDF, see kernel_ace
+    ace = getattr(__config__, 'pbc_scf_KSCF_ace', False)
+    ace_max_cycle = getattr(__config__, 'pbc_scf_KSCF_ace_max_cycle', 20)
+    ace_ddm_tol = getattr(__config__, 'pbc_scf_KSCF_ace_ddm_tol', 1e-3)
 
     def __init__(self, cell, kpts=np.zeros((1,3)),
                  exxdiv=getattr(__config__, 'pbc_scf_SCF_exxdiv', 'ewald')):
@@ -477,7 +551,12 @@ class KSCF(pbchf.SCF):
         self.conv_tol = cell.precision * 10
 
         self.exx_built = False
-        self._keys = self._keys.union(['cell', 'exx_built', 'exxdiv', 'with_df', 'rsjk'])
+        # The ACE operator and its reference density matrix in kernel_ace
+        self._ace = None
+        self._ace_dm = None
+        self._keys = self._keys.union(['cell', 'exx_built', 'exxdiv', 'with_df',
+                                       'rsjk', 'ace', 'ace_max_cycle',
+                                       'ace_ddm_tol'])
 
     @property
     def kpts(self):
@@ -529,6 +608,9 @@ class KSCF(pbchf.SCF):
                         madelung*nelectron * -.5)
         if getattr(self, 'smearing_method', None) is not None:
             logger.info(self, 'Smearing method = %s', self.smearing_method)
+        if self.ace:
+            logger.info(self, 'Adaptively compressed exchange (ACE) = %s',
+                        self._ace_enabled())
         logger.info(self, 'DF object = %s', self.with_df)
         if not getattr(self.with_df, 'build', None):
             # .dump_flags() is called in pbc.df.build function
@@ -636,12 +718,63 @@ class KSCF(pbchf.SCF):
         if self.rsjk:
             vj, vk = self.rsjk.get_jk(dm_kpts, hermi, kpts, kpts_band,
                                       with_j, with_k, omega, self.exxdiv)
+        elif (self._ace is not None and with_k and kpts_band is None and
+              omega is None and np.array_equal(kpts, self.kpts)):
+            if (getattr(dm_kpts, 'mo_coeff', None) is not None and
+                np.linalg.norm(dm_kpts - self._ace_dm) > self.ace_ddm_tol):
+                self._update_ace(dm_kpts)
+            vj = None
+            if with_j:
+                vj = self.with_df.get_jk(dm_kpts, hermi, kpts, kpts_band,
+                                         True, False, omega, self.exxdiv)[0]
+            vk = np.asarray([[lib.dot(xi, xi.conj().T) for xi in xi_kpts]
+                             for xi_kpts in self._ace])
+            vk = vk.reshape(np.shape(dm_kpts))
         else:
             vj, vk = self.with_df.get_jk(dm_kpts, hermi, kpts, kpts_band,
                                          with_j, with_k, omega, self.exxdiv)
         logger.timer(self, 'vj and vk', *cpu0)
         return vj, vk
 
+    def _update_ace(self, dm_kpts):
+        cpu0 = (logger.process_clock(), logger.perf_counter())
+        self._ace_dm = dm_kpts
+        self._ace = self.with_df.get_k_ace(dm_kpts, self.kpts, self.exxdiv)
+        logger.timer(self, 'ACE operator', *cpu0)
+
+    def _ace_enabled(self):
+        # ACE is only available for the FFTDF exchange matrix. The exchange
+        # matrix of ISDF is cheaper than the ACE operator.
+        if not (self.ace and self.rsjk is None and self.max_cycle > 0 and
+                isinstance(self.with_df, df.FFTDF) and
+                not isinstance(self.with_df, df.ISDF)):
+            return False
+        if isinstance(self, pbchf.KohnShamDFT):
+            return self._numint.libxc.is_hybrid_xc(self.xc)
+        return True
+
+    def scf(self, dm0=None, **kwargs):
+        '''SCF main driver. The SCF iterations are carried out with the
+        adaptively compressed exchange (ACE) operator (see :func:`kernel_ace`)
+        if the attribute ace is set and the exchange matrix is computed by
+        FFTDF.
+        '''
+        if not self._ace_enabled():
+            return pbchf.SCF.scf(self, dm0, **kwargs)
+
+        cput0 = (logger.process_clock(), logger.perf_counter())
+        self.dump_flags()
+        self.build(self.mol)
+        self.converged, self.e_tot, \
+                self.mo_energy, self.mo_coeff, self.mo_occ = \
+                kernel_ace(self, self.conv_tol, self.conv_tol_grad,
+                           dm0=dm0, callback=self.callback,
+                           conv_check=self.conv_check, **kwargs)
+        logger.timer(self, 'SCF', *cput0)
+        self._finalize()
+        return self.e_tot
+    kernel = lib.alias(scf, alias_name='kernel')
+
     def get_veff(self, cell=None, dm_kpts=None, dm_last=0, vhf_last=0, hermi=1,
                  kpts=None, kpts_band=None):
         '''Hartree-Fock potential matrix for the given density matrix.
@@ -700,6 +833,11 @@ class KSCF(pbchf.SCF):
     def get_bands(self, kpts_band, cell=None, dm_kpts=None, kpts=None):
         '''Get energy bands at the given (arbitrary) 'band' k-points.
 
+        The Fock matrices of the band k-points are built with get_veff for the
+        given density matrix. For the bands of a converged SCF object at many
+        k-points, see :class:`pyscf.pbc.scf.bands.BandEngine` which caches the
+        potential and the occupied orbitals of the SCF k-points.
+
         Returns:
             mo_energy : (nmo,) ndarray or a list of (nmo,) ndarray
                 Bands energies E_n(k)
@@ -441,7 +441,13 @@ def _make_extended_mole(cell, Ls, bvkmesh_Ls, omega, precision=None, verbose=Non
     supmol._images_loc = images_loc.astype(np.int32)
     supmol._bas_mask = bas_mask
 
+    stats = pbctools.pbc._get_lattice_Ls_cache(cell).stats
+    stats['supmol_shell_images'] += bas_mask.size
+    stats['supmol_shell_images_skipped'] += bas_mask.size - np.count_nonzero(bas_mask)
+
     log = logger.new_logger(cell, verbose)
+    log.debug('sup-mol: %d of %d shell images skipped',
+              bas_mask.size - np.count_nonzero(bas_mask), bas_mask.size)
     log.debug('Steep basis in sup-mol %d', np.count_nonzero(bas_mask[:,:n_steep,:]))
     log.debug('Local basis in sup-mol %d', np.count_nonzero(bas_mask[:,n_steep:n_compact,:]))
     log.debug('Diffused basis in sup-mol %d', np.count_nonzero(bas_mask[:,n_compact:,:]))
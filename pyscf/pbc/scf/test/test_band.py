@@ -20,6 +20,7 @@ from pyscf import lib
 from pyscf.pbc import gto
 from pyscf.pbc import scf
 from pyscf.pbc import dft
+from pyscf.pbc.scf import bands as pbc_bands
 
 def setUpModule():
     global cell, kmf, mycc, eris
@@ -66,6 +67,35 @@ class KnowValues(unittest.TestCase):
         self.assertAlmostEqual(abs(np.array(bands_ref) - np.array(bands)).max(), 0, 9)
         self.assertAlmostEqual(lib.fp(bands), -0.61562245312227049, 8)
 
+    def test_band_engine(self):
+        kpts = cell.make_kpts([2,1,1])
+        np.random.seed(11)
+        kpts_band = np.random.random((4,3))
+        for mf in [scf.KRHF(cell, kpts),
+                   dft.KRKS(cell, kpts).set(xc='pbe'),
+                   dft.KUKS(cell, kpts).set(xc='hse06')]:
+            mf.run()
+            ref = mf.get_bands(kpts_band)[0]
+            engine = pbc_bands.BandEngine(mf).set(kpts_per_batch=3)
+            bands = engine.kernel(kpts_band)[0]
+            self.assertAlmostEqual(abs(np.array(bands) - np.array(ref)).max(), 0, 9)
+
+            # Batches evaluated concurrently
+            with lib.with_omp_threads(2):
+                bands = pbc_bands.BandEngine(mf).kernel(kpts_band)[0]
+            self.assertAlmostEqual(abs(np.array(bands) - np.array(ref)).max(), 0, 9)
+
+        # Exchange from the cached occupied orbitals and from with_df
+        self.assertTrue(engine._occ_orbs is not None)
+        fock = engine.get_fock(kpts_band)[0]
+        engine._occ_orbs = None
+        self.assertAlmostEqual(abs(engine.get_fock(kpts_band)[0] - fock).max(), 0, 9)
+
+        # Fourier interpolation is exact at the SCF k-points
+        fock, s1e = engine.interpolate_fock(kpts)
+        self.assertAlmostEqual(abs(fock - np.array(mf.get_fock())).max(), 0, 9)
+        self.assertAlmostEqual(abs(s1e - np.array(mf.get_ovlp())).max(), 0, 9)
+
 # TODO: test get_bands for hf/uhf with/without DF
 
 if __name__ == '__main__':
@@ -310,6 +310,39 @@ class KnownValues(unittest.TestCase):
             self.assertAlmostEqual(np.linalg.norm(f[k]), np.linalg.norm(f1[0,k]),9)
             self.assertAlmostEqual(np.linalg.norm(f[k]), np.linalg.norm(f1[1,k]),9)
 
+    def test_ace(self):
+        dm = kmf.make_rdm1()
+        vk = kmf.get_k(cell, dm)
+        for ref_dm in (dm, lib.tag_array(dm, mo_coeff=kmf.mo_coeff, mo_occ=kmf.mo_occ)):
+            xi = kmf.with_df.get_k_ace(ref_dm, kpts, kmf.exxdiv)
+            for k in range(len(kpts)):
+                c = kmf.mo_coeff[k][:,kmf.mo_occ[k]>0]
+                vk_ace = xi[0][k].dot(xi[0][k].conj().T)
+                self.assertAlmostEqual(abs(vk_ace.dot(c) - vk[k].dot(c)).max(), 0, 9)
+
+        mf = khf.KRHF(cell, kpts, exxdiv='vcut_sph')
+        mf.ace = True
+        mf.run(conv_tol=1e-9)
+        self.assertTrue(mf.converged)
+        self.assertAlmostEqual(mf.e_tot, kmf.e_tot, 8)
+        self.assertTrue(mf._ace is None)
+        # Virtual orbitals are the eigenvectors of the exact Fock matrix
+        self.assertAlmostEqual(abs(np.asarray(mf.mo_energy) -
+                                   np.asarray(kmf.mo_energy)).max(), 0, 5)
+
+        mf = kuhf.KUHF(cell, kpts, exxdiv='vcut_sph')
+        mf.ace = True
+        mf.run(conv_tol=1e-9)
+        self.assertAlmostEqual(mf.e_tot, kumf.e_tot, 8)
+
+        mf = khf.KRHF(cell, kpts, exxdiv='vcut_sph')
+        mf.ace = True
+        self.assertTrue(mf._ace_enabled())
+        mf.with_df = df.ISDF(cell, kpts)
+        self.assertFalse(mf._ace_enabled())
+        mf.with_df = df.GDF(cell, kpts)
+        self.assertFalse(mf._ace_enabled())
+
 if __name__ == '__main__':
     print("Full Tests for pbc.scf.khf")
     unittest.main()
@@ -25,7 +25,6 @@ See also the original implementation at
 https://github.com/zhcui/local-orbital-and-cdft/blob/master/k2gamma.py
 '''
 
-from functools import reduce
 import numpy as np
 import scipy.linalg
 from pyscf import lib
@@ -105,6 +104,157 @@ def translation_map(nk):
                        dtype=int, buffer=np.append(idx.ravel(), 0))
     return t_map
 
+def _kmesh_index(cell, kpts, kmesh=None):
+    '''Locations of the k-points on the k-point mesh.
+
+    Returns:
+        kmesh, the indices of the k-points in the (C-order) flattened mesh and
+        the shift of the mesh in units of the mesh spacing.
+    '''
+    if kmesh is None:
+        kmesh = kpts_to_kmesh(cell, kpts)
+    kmesh = np.asarray(kmesh)
+    frac = cell.get_scaled_kpts(kpts) * kmesh
+    shift = frac[0] - frac[0].round()
+    mesh_idx = frac - shift
+    if (abs(mesh_idx - mesh_idx.round()).max() > 1e-6 or
+        len(kpts) != np.prod(kmesh)):
+        raise ValueError('k-points are not a regular %s mesh' % kmesh)
+    mesh_idx = mesh_idx.round().astype(int) % kmesh
+    idx = np.ravel_multi_index(mesh_idx.T, kmesh)
+    if len(np.unique(idx)) != len(kpts):
+        raise ValueError('Duplicated k-points')
+    return kmesh, idx, shift
+
+def _twist_phase(kmesh, shift, Ts):
+    '''exp(i k0.T) for the shift k0 of the k-point mesh'''
+    return np.exp(2j*np.pi * np.dot(Ts, shift / kmesh))
+
+def supercell_to_kpts(cell, kpts, x, kmesh=None):
+    r'''Bloch transformation of supercell coefficients
+
+    x^k[u,...] = 1/\sqrt{N} \sum_R e^{-ik\cdot R} x[R*nao+u,...]
+
+    computed with FFT over the translations R of the supercell.
+
+    Args:
+        x : ndarray of shape (NR*nao,...)
+            Coefficients in the supercell basis (e.g. the supercell MOs)
+
+    Returns:
+        ndarray of shape (nkpts,nao,...)
+    '''
+    kmesh, idx, shift = _kmesh_index(cell, kpts, kmesh)
+    NR = len(idx)
+    x = np.asarray(x)
+    tail = x.shape[1:]
+    x = x.reshape(NR, -1)
+    Ts = lib.cartesian_prod([np.arange(n) for n in kmesh])
+    x = x * _twist_phase(kmesh, shift, Ts).conj()[:,None]
+    x_k = np.fft.fftn(x.reshape(tuple(kmesh) + (-1,)), axes=(0,1,2))
+    x_k = x_k.reshape(NR, -1)[idx] / np.sqrt(NR)
+    return x_k.reshape((NR, -1) + tail)
+
+def kpts_to_supercell(cell, kpts, x_k, kmesh=None):
+    r'''The inverse of :func:`supercell_to_kpts`
+
+    x[R*nao+u,...] = 1/\sqrt{N} \sum_k e^{ik\cdot R} x^k[u,...]
+    '''
+    kmesh, idx, shift = _kmesh_index(cell, kpts, kmesh)
+    NR = len(idx)
+    x_k = np.asarray(x_k)
+    nao = x_k.shape[1]
+    tail = x_k.shape[2:]
+    x_mesh = np.empty((NR, x_k[0].size), dtype=np.result_type(x_k, np.complex128))
+    x_mesh[idx] = x_k.reshape(NR, -1)
+    x = np.fft.ifftn(x_mesh.reshape(tuple(kmesh) + (-1,)), axes=(0,1,2))
+    Ts = lib.cartesian_prod([np.arange(n) for n in kmesh])
+    x = x.reshape(NR, -1) * (_twist_phase(kmesh, shift, Ts) * np.sqrt(NR))[:,None]
+    return x.reshape((NR*nao,) + tail)
+
+class BlockCirculant:
+    r'''Supercell representation of a translation invariant operator
+
+    M[R*n+i,S*m+j] = 1/N \sum_k e^{ik\cdot(R-S)} M^k[i,j]
+
+    The supercell matrix is defined by the k-point blocks M^k only. Blocks of
+    the supercell matrix and the products with supercell vectors are
+    evaluated with FFT over the translations of the supercell. The supercell
+    matrix is not stored unless :meth:`todense` is called.
+
+    Args:
+        mat_kpts : ndarray of shape (nkpts,n,m)
+            The matrices at each k-point (e.g. AO integrals or Fock matrices)
+
+    Examples:
+
+    >>> s = BlockCirculant(cell, kpts, cell.pbc_intor('int1e_ovlp', kpts=kpts))
+    >>> s.get_blocks([0], range(s.ncells))  # the first block-row
+    >>> s.dot(c_gamma)  # S C in the supercell basis
+    '''
+    def __init__(self, cell, kpts, mat_kpts, kmesh=None):
+        self.cell = cell
+        self.kpts = kpts
+        self.kmesh, self._idx, self._shift = _kmesh_index(cell, kpts, kmesh)
+        mat_kpts = np.asarray(mat_kpts)
+        # k-point blocks ordered on the mesh
+        self.mat_k = np.empty_like(mat_kpts)
+        self.mat_k[self._idx] = mat_kpts
+        self._mat_R = None
+
+    @property
+    def ncells(self):
+        return len(self._idx)
+
+    @property
+    def shape(self):
+        nk, n, m = self.mat_k.shape
+        return (nk*n, nk*m)
+
+    def translation_blocks(self):
+        r'''The blocks 1/N \sum_k e^{ik\cdot T} M^k of the translation vectors
+        T in the first Born-von Karman cell, without the phase factor of the
+        mesh shift. Shape (N0,N1,N2,n,m).
+        '''
+        if self._mat_R is None:
+            kmesh = tuple(self.kmesh)
+            mat_k = self.mat_k.reshape(kmesh + self.mat_k.shape[1:])
+            self._mat_R = np.fft.ifftn(mat_k, axes=(0,1,2))
+        return self._mat_R
+
+    def get_blocks(self, Rs, Ss):
+        '''Sub-matrix of the supercell matrix between the unit cells Rs and Ss.
+
+        Args:
+            Rs, Ss : list of int
+                Indices of the unit cells in the supercell (in the order of
+                :func:`translation_vectors_for_kmesh`)
+
+        Returns:
+            ndarray of shape (len(Rs)*n,len(Ss)*m)
+        '''
+        mat_R = self.translation_blocks()
+        kmesh = self.kmesh
+        Rs = np.asarray(np.unravel_index(np.asarray(Rs, dtype=int).ravel(), kmesh)).T
+        Ss = np.asarray(np.unravel_index(np.asarray(Ss, dtype=int).ravel(), kmesh)).T
+        Ts = Rs[:,None,:] - Ss[None,:,:]
+        tx, ty, tz = (Ts % kmesh).transpose(2,0,1)
+        blocks = mat_R[tx,ty,tz] * _twist_phase(kmesh, self._shift, Ts)[:,:,None,None]
+        nR, nS, n, m = blocks.shape
+        return blocks.transpose(0,2,1,3).reshape(nR*n, nS*m)
+
+    def todense(self):
+        '''The full supercell matrix'''
+        cells = np.arange(self.ncells)
+        return self.get_blocks(cells, cells)
+
+    def dot(self, x):
+        '''Product of the supercell matrix and the supercell vectors x'''
+        cell, kpts, kmesh = self.cell, self.kpts, self.kmesh
+        x_k = supercell_to_kpts(cell, kpts, x, kmesh)
+        y_k = np.einsum('kij,kj...->ki...', self.mat_k[self._idx], x_k)
+        return kpts_to_supercell(cell, kpts, y_k, kmesh)
+
 def mo_k2gamma(cell, mo_energy, mo_coeff, kpts, kmesh=None):
     scell, phase = get_phase(cell, kpts, kmesh)
 
@@ -120,8 +270,9 @@ def mo_k2gamma(cell, mo_energy, mo_coeff, kpts, kmesh=None):
     E_sort_idx = np.argsort(E_g)
     E_g = E_g[E_sort_idx]
     C_gamma = C_gamma[:,E_sort_idx]
-    s = scell.pbc_intor('int1e_ovlp')
-    assert(abs(reduce(np.dot, (C_gamma.conj().T, s, C_gamma))
+    s_k = cell.pbc_intor('int1e_ovlp', kpts=kpts)
+    s_lazy = BlockCirculant(cell, kpts, s_k, kmesh)
+    assert(abs(C_gamma.conj().T.dot(s_lazy.dot(C_gamma))
                - np.eye(Nmo*Nk)).max() < 1e-5)
 
     # For degenerated MOs, the transformed orbitals in super cell may not be
@@ -130,6 +281,7 @@ def mo_k2gamma(cell, mo_energy, mo_coeff, kpts, kmesh=None):
     E_k_degen = abs(E_g[1:] - E_g[:-1]) < 1e-3
     degen_mask = np.append(False, E_k_degen) | np.append(E_k_degen, False)
     if np.any(E_k_degen):
+        s = s_lazy.todense().real
         if abs(C_gamma[:,~degen_mask].imag).max() < 1e-4:
             shift = min(E_g[degen_mask]) - .1
             f = np.dot(C_gamma[:,degen_mask] * (E_g[degen_mask] - shift),
@@ -144,11 +296,9 @@ def mo_k2gamma(cell, mo_energy, mo_coeff, kpts, kmesh=None):
             assert(abs(f.imag).max() < 1e-4)
             e, C_gamma = scipy.linalg.eigh(f.real, s, type=2)
 
-    s_k = cell.pbc_intor('int1e_ovlp', kpts=kpts)
-    # overlap between k-point unitcell and gamma-point supercell
-    s_k_g = np.einsum('kuv,Rk->kuRv', s_k, phase.conj()).reshape(Nk,Nao,NR*Nao)
     # The unitary transformation from k-adapted orbitals to gamma-point orbitals
-    mo_phase = lib.einsum('kum,kuv,vi->kmi', C_k.conj(), s_k_g, C_gamma)
+    C_gamma_k = supercell_to_kpts(cell, kpts, C_gamma, kmesh)
+    mo_phase = lib.einsum('kum,kuv,kvi->kmi', C_k.conj(), s_k, C_gamma_k)
 
     return scell, E_g, C_gamma, mo_phase
 
@@ -192,11 +342,7 @@ def to_supercell_ao_integrals(cell, kpts, ao_ints):
     '''Transform from the unitcell k-point AO integrals to the supercell
     gamma-point AO integrals.
     '''
-    scell, phase = get_phase(cell, kpts)
-    NR, Nk = phase.shape
-    nao = cell.nao
-    scell_ints = np.einsum('Rk,kij,Sk->RiSj', phase, ao_ints, phase.conj())
-    return scell_ints.reshape(NR*nao,NR*nao).real
+    return BlockCirculant(cell, kpts, ao_ints).todense().real
 
 
 def to_supercell_mo_integrals(kmf, mo_ints):
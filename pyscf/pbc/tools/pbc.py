@@ -15,23 +15,78 @@
 
 import warnings
 import copy
+import collections
+import threading
 import numpy as np
 import scipy.linalg
 from pyscf import lib
 from pyscf.lib import logger
 from pyscf.gto import ATM_SLOTS, BAS_SLOTS, ATOM_OF, PTR_COORD
-from pyscf.pbc.lib.kpts_helper import get_kconserv, get_kconserv3  # noqa
+from pyscf.pbc.lib.kpts_helper import get_kconserv, get_kconserv3, KPT_DIFF_TOL  # noqa
 from pyscf import __config__
 
 FFT_ENGINE = getattr(__config__, 'pbc_tools_pbc_fft_engine', 'BLAS')
+# Max. number of FFT plans (BLAS phase matrices, FFTW plans) kept in memory
+FFT_PLAN_CACHE_SIZE = getattr(__config__, 'pbc_tools_pbc_fft_plan_cache_size', 32)
+# Memory (in MB) for the Coulomb kernels cached by get_coulG_cached, and
+# whether kernels evicted from memory are stored in a temporary file
+COULG_CACHE_MAX_MEMORY = getattr(__config__, 'pbc_tools_pbc_coulG_cache_max_memory', 256)
+COULG_CACHE_SPILL = getattr(__config__, 'pbc_tools_pbc_coulG_cache_spill', False)
+# Number of image lists kept by the per-cell cache of get_lattice_Ls
+LATTICE_LS_CACHE_SIZE = getattr(__config__, 'pbc_tools_pbc_lattice_Ls_cache_size', 32)
+# The shell-pair image screening of screen_lattice_Ls estimates bas_rcut at
+# precision * LATTICE_LS_SCREEN_FACTOR. The lattice sums then agree with the
+# unscreened sums to round-off.
+LATTICE_LS_SCREEN_FACTOR = getattr(__config__, 'pbc_tools_pbc_lattice_Ls_screen_factor', 1e-4)
+
+_fft_plans = collections.OrderedDict()
+_fft_plans_lock = threading.Lock()
+
+def _get_fft_plan(key, builder):
+    '''Plans are reused across the many equal-sized transforms issued by
+    fft_jk, aft and multigrid. The least recently used plan is dropped when
+    the cache is full.'''
+    with _fft_plans_lock:
+        plan = _fft_plans.get(key)
+        if plan is not None:
+            _fft_plans.move_to_end(key)
+            return plan
+    plan = builder()
+    with _fft_plans_lock:
+        _fft_plans[key] = plan
+        while len(_fft_plans) > max(FFT_PLAN_CACHE_SIZE, 1):
+            _fft_plans.popitem(last=False)
+    return plan
+
+def _blas_fft_plan(mesh, inverse=False):
+    '''The DFT matrices of the three directions'''
+    mesh = tuple(int(n) for n in mesh)
+    sign = 2j*np.pi if inverse else -2j*np.pi
+    def build():
+        return [np.exp(np.einsum('x,k->xk', sign*np.arange(n), np.fft.fftfreq(n)))
+                for n in mesh]
+    return _get_fft_plan(('BLAS', mesh, inverse), build)
+
+def _hermitian_expand(half, mesh):
+    '''Recover the full transform of real functions from the half-spectrum
+    (the last dimension truncated to nz//2+1) using g(-G) = g(G)^*'''
+    nx, ny, nz = mesh
+    nzh = nz // 2 + 1
+    half = half.reshape(-1, nx, ny, nzh)
+    out = np.empty((half.shape[0], nx, ny, nz), dtype=np.complex128)
+    out[:,:,:,:nzh] = half
+    if nz > nzh:
+        # G -> -G maps index 0 to 0 and index i to n-i
+        neg = ((slice(0, 1), slice(0, 1)), (slice(1, None), slice(None, 0, -1)))
+        for x, x_neg in neg:
+            for y, y_neg in neg:
+                np.conj(half[:,x_neg,y_neg,nz-nzh:0:-1], out=out[:,x,y,nzh:])
+    return out
 
 def _fftn_blas(f, mesh):
-    Gx = np.fft.fftfreq(mesh[0])
-    Gy = np.fft.fftfreq(mesh[1])
-    Gz = np.fft.fftfreq(mesh[2])
-    expRGx = np.exp(np.einsum('x,k->xk', -2j*np.pi*np.arange(mesh[0]), Gx))
-    expRGy = np.exp(np.einsum('x,k->xk', -2j*np.pi*np.arange(mesh[1]), Gy))
-    expRGz = np.exp(np.einsum('x,k->xk', -2j*np.pi*np.arange(mesh[2]), Gz))
+    if f.dtype == np.double:
+        return _rfftn_blas(f, mesh)
+    expRGx, expRGy, expRGz = _blas_fft_plan(mesh)
     out = np.empty(f.shape, dtype=np.complex128)
     buf = np.empty(mesh, dtype=np.complex128)
     for i, fi in enumerate(f):
@@ -41,13 +96,31 @@ def _fftn_blas(f, mesh):
         g = lib.dot(g.reshape(mesh[2],-1).T, expRGz, c=out[i].reshape(-1,mesh[2]))
     return out.reshape(-1, *mesh)
 
+def _rfftn_blas(f, mesh):
+    '''Real-to-complex transform. Only the nz//2+1 non-redundant columns of
+    the last direction are computed. The first pass is a real matrix product.'''
+    nx, ny, nz = mesh
+    nzh = nz // 2 + 1
+    expRGx, expRGy, expRGz = _blas_fft_plan(mesh)
+    expRGz = np.asarray(expRGz[:,:nzh], order='C')
+    half = np.empty((len(f), nx, ny, nzh), dtype=np.complex128)
+    buf = np.empty((nx*ny*nzh), dtype=np.complex128)
+    for i, fi in enumerate(f):
+        fi = np.asarray(fi.reshape(nx*ny, nz), dtype=np.double, order='C')
+        g = lib.dot(fi, expRGz)
+        g = lib.dot(g.reshape(nx,-1).T, expRGx, c=buf.reshape(-1,nx))
+        g = lib.dot(g.reshape(ny,-1).T, expRGy)
+        half[i] = g.reshape(nzh,nx,ny).transpose(1,2,0)
+    return _hermitian_expand(half, mesh)
+
 def _ifftn_blas(g, mesh):
-    Gx = np.fft.fftfreq(mesh[0])
-    Gy = np.fft.fftfreq(mesh[1])
-    Gz = np.fft.fftfreq(mesh[2])
-    expRGx = np.exp(np.einsum('x,k->xk', 2j*np.pi*np.arange(mesh[0]), Gx))
-    expRGy = np.exp(np.einsum('x,k->xk', 2j*np.pi*np.arange(mesh[1]), Gy))
-    expRGz = np.exp(np.einsum('x,k->xk', 2j*np.pi*np.arange(mesh[2]), Gz))
+    if g.dtype == np.double:
+        # ifft(g) = fft(g)^* / N for real g
+        out = _rfftn_blas(g, mesh)
+        out = np.conj(out, out=out)
+        out *= 1./np.prod(mesh)
+        return out
+    expRGx, expRGy, expRGz = _blas_fft_plan(mesh, inverse=True)
     out = np.empty(g.shape, dtype=np.complex128)
     buf = np.empty(mesh, dtype=np.complex128)
     for i, gi in enumerate(g):
@@ -57,55 +130,104 @@ def _ifftn_blas(g, mesh):
         f = lib.dot(f.reshape(mesh[2],-1).T, expRGz, 1./mesh[2], c=out[i].reshape(-1,mesh[2]))
     return out.reshape(-1, *mesh)
 
-if FFT_ENGINE == 'FFTW':
-    # pyfftw is slower than np.fft in most cases
-    try:
-        import pyfftw
-        pyfftw.interfaces.cache.enable()
-        nproc = lib.num_threads()
-        def _fftn_wrapper(a):
-            return pyfftw.interfaces.numpy_fft.fftn(a, axes=(1,2,3), threads=nproc)
-        def _ifftn_wrapper(a):
-            return pyfftw.interfaces.numpy_fft.ifftn(a, axes=(1,2,3), threads=nproc)
-    except ImportError:
-        def _fftn_wrapper(a):
-            return np.fft.fftn(a, axes=(1,2,3))
-        def _ifftn_wrapper(a):
-            return np.fft.ifftn(a, axes=(1,2,3))
-
-elif FFT_ENGINE == 'NUMPY':
-    def _fftn_wrapper(a):
-        return np.fft.fftn(a, axes=(1,2,3))
-    def _ifftn_wrapper(a):
-        return np.fft.ifftn(a, axes=(1,2,3))
-
-elif FFT_ENGINE == 'NUMPY+BLAS':
-    _EXCLUDE = [17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73, 79,
-                83, 89, 97,101,103,107,109,113,127,131,137,139,149,151,157,163,
-                167,173,179,181,191,193,197,199,211,223,227,229,233,239,241,251,
-                257,263,269,271,277,281,283,293]
-    _EXCLUDE = set(_EXCLUDE + [n*2 for n in _EXCLUDE] + [n*3 for n in _EXCLUDE])
-    def _fftn_wrapper(a):
-        mesh = a.shape[1:]
-        if mesh[0] in _EXCLUDE and mesh[1] in _EXCLUDE and mesh[2] in _EXCLUDE:
-            return _fftn_blas(a, mesh)
+def _fftn_numpy(a):
+    if a.dtype == np.double:
+        return _hermitian_expand(np.fft.rfftn(a, axes=(1,2,3)), a.shape[1:])
+    return np.fft.fftn(a, axes=(1,2,3))
+
+def _ifftn_numpy(a):
+    return np.fft.ifftn(a, axes=(1,2,3))
+
+try:
+    import scipy.fft as _scipy_fft
+except ImportError:  # scipy < 1.4
+    _scipy_fft = None
+
+def _fftn_scipy(a):
+    '''Transforms of the batch are distributed over lib.num_threads() workers'''
+    if _scipy_fft is None:
+        return _fftn_numpy(a)
+    nthreads = lib.num_threads()
+    if a.dtype == np.double:
+        half = _scipy_fft.rfftn(a, axes=(1,2,3), workers=nthreads)
+        return _hermitian_expand(half, a.shape[1:])
+    return _scipy_fft.fftn(a, axes=(1,2,3), workers=nthreads)
+
+def _ifftn_scipy(a):
+    if _scipy_fft is None:
+        return _ifftn_numpy(a)
+    return _scipy_fft.ifftn(a, axes=(1,2,3), workers=lib.num_threads())
+
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
+
+def _fftw_plan(shape, dtype, inverse=False):
+    '''FFTW plans keyed by (mesh, batch, dtype). The FFTW object owns its
+    input/output buffers, so each plan is executed under its own lock.'''
+    dtype = np.dtype(dtype)
+    def build():
+        a = pyfftw.empty_aligned(shape, dtype=dtype)
+        kwargs = {'axes': (1,2,3), 'threads': lib.num_threads()}
+        if inverse:
+            plan = pyfftw.builders.ifftn(a, **kwargs)
+        elif dtype == np.double:
+            plan = pyfftw.builders.rfftn(a, **kwargs)
         else:
-            return np.fft.fftn(a, axes=(1,2,3))
-    def _ifftn_wrapper(a):
-        mesh = a.shape[1:]
-        if mesh[0] in _EXCLUDE and mesh[1] in _EXCLUDE and mesh[2] in _EXCLUDE:
-            return _ifftn_blas(a, mesh)
-        else:
-            return np.fft.ifftn(a, axes=(1,2,3))
-
-#?elif:  # 'FFTW+BLAS'
-else:  # 'BLAS'
-    def _fftn_wrapper(a):
-        mesh = a.shape[1:]
+            plan = pyfftw.builders.fftn(a, **kwargs)
+        return plan, threading.Lock()
+    return _get_fft_plan(('FFTW', tuple(shape), dtype.char, inverse), build)
+
+def _fftn_fftw(a):
+    if pyfftw is None:
+        return _fftn_numpy(a)
+    if a.dtype != np.double:
+        a = np.asarray(a, dtype=np.complex128)
+    plan, lock = _fftw_plan(a.shape, a.dtype)
+    with lock:
+        out = plan(a)
+        if a.dtype == np.double:
+            return _hermitian_expand(out, a.shape[1:])
+        return out.copy()
+
+def _ifftn_fftw(a):
+    if pyfftw is None:
+        return _ifftn_numpy(a)
+    a = np.asarray(a, dtype=np.complex128)
+    plan, lock = _fftw_plan(a.shape, a.dtype, inverse=True)
+    with lock:
+        return plan(a).copy()
+
+_EXCLUDE = [17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73, 79,
+            83, 89, 97,101,103,107,109,113,127,131,137,139,149,151,157,163,
+            167,173,179,181,191,193,197,199,211,223,227,229,233,239,241,251,
+            257,263,269,271,277,281,283,293]
+_EXCLUDE = set(_EXCLUDE + [n*2 for n in _EXCLUDE] + [n*3 for n in _EXCLUDE])
+def _fftn_numpy_blas(a):
+    mesh = a.shape[1:]
+    if mesh[0] in _EXCLUDE and mesh[1] in _EXCLUDE and mesh[2] in _EXCLUDE:
         return _fftn_blas(a, mesh)
-    def _ifftn_wrapper(a):
-        mesh = a.shape[1:]
+    else:
+        return _fftn_numpy(a)
+def _ifftn_numpy_blas(a):
+    mesh = a.shape[1:]
+    if mesh[0] in _EXCLUDE and mesh[1] in _EXCLUDE and mesh[2] in _EXCLUDE:
         return _ifftn_blas(a, mesh)
+    else:
+        return _ifftn_numpy(a)
+
+_FFT_ENGINES = {
+    'BLAS': (lambda a: _fftn_blas(a, a.shape[1:]),
+             lambda a: _ifftn_blas(a, a.shape[1:])),
+    'NUMPY': (_fftn_numpy, _ifftn_numpy),
+    'NUMPY+BLAS': (_fftn_numpy_blas, _ifftn_numpy_blas),
+    # pyfftw is slower than np.fft in most cases
+    'FFTW': (_fftn_fftw, _ifftn_fftw),
+    'SCIPY': (_fftn_scipy, _ifftn_scipy),
+}
+_fftn_wrapper, _ifftn_wrapper = _FFT_ENGINES.get(FFT_ENGINE.upper(),
+                                                 _FFT_ENGINES['BLAS'])
 
 
 def fft(f, mesh):
@@ -216,11 +338,7 @@ def get_coulG(cell, k=np.zeros(3), exx=False, mf=None, mesh=None, Gv=None,
             computed with regular Coulomb interaction (1/r12) while the rest
             coulG is scaled as long-range Coulomb kernel.
     '''
-    exxdiv = exx
-    if isinstance(exx, str):
-        exxdiv = exx
-    elif exx and mf is not None:
-        exxdiv = mf.exxdiv
+    exxdiv = _resolve_exxdiv(exx, mf)
 
     if mesh is None:
         mesh = cell.mesh
@@ -375,6 +493,113 @@ def get_coulG(cell, k=np.zeros(3), exx=False, mf=None, mesh=None, Gv=None,
 
     return coulG
 
+def _resolve_exxdiv(exx, mf):
+    if isinstance(exx, str):
+        return exx
+    elif exx and mf is not None:
+        return mf.exxdiv
+    return exx
+
+class CoulGCache(object):
+    '''LRU cache of the Coulomb kernels of a cell.
+
+    The kernels are indexed by the momentum transfer q = k2 - k1, rounded to
+    KPT_DIFF_TOL as in :func:`kpts_helper.unique`, together with the other
+    parameters (mesh, lattice, exxdiv, omega ...) the kernel depends on.
+    When the kernels held in memory exceed max_memory (MB), the least
+    recently used ones are dropped, or moved to a temporary HDF5 file if
+    spill is enabled.
+
+    The cached kernels are read-only arrays.
+    '''
+    def __init__(self, max_memory=COULG_CACHE_MAX_MEMORY, spill=COULG_CACHE_SPILL):
+        self.max_memory = max_memory
+        self.spill = spill
+        self._data = collections.OrderedDict()
+        self._nbytes = 0
+        self._swap = None
+        self._spilled = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._nbytes = 0
+            self._swap = None
+            self._spilled = {}
+
+    def get(self, key, builder):
+        '''Look up the kernel for key. builder is called on cache miss.'''
+        with self._lock:
+            val = self._data.get(key)
+            if val is not None:
+                self._data.move_to_end(key)
+                return val
+            if key in self._spilled:
+                val = self._swap[self._spilled[key]][()]
+        if val is None:
+            val = builder()
+        val.flags.writeable = False
+
+        with self._lock:
+            if key not in self._data:
+                self._data[key] = val
+                self._nbytes += val.nbytes
+            max_bytes = self.max_memory * 1e6
+            while self._nbytes > max_bytes and len(self._data) > 1:
+                old_key, old_val = self._data.popitem(last=False)
+                self._nbytes -= old_val.nbytes
+                if self.spill and old_key not in self._spilled:
+                    if self._swap is None:
+                        self._swap = lib.H5TmpFile()
+                    name = str(len(self._spilled))
+                    self._swap[name] = old_val
+                    self._spilled[old_key] = name
+        return val
+
+def _get_coulG_cache(cell):
+    cache = getattr(cell, '_coulG_cache', None)
+    if cache is None:
+        cache = cell._coulG_cache = CoulGCache()
+    return cache
+
+def get_coulG_cached(cell, k=np.zeros(3), exx=False, mf=None, mesh=None,
+                     omega=None):
+    '''Coulomb kernel of :func:`get_coulG` on the regular G-vectors of mesh,
+    served from the per-cell :class:`CoulGCache`.
+
+    The kernels only depend on the momentum transfer. The SCF, MP2 and CC
+    k-point codes request the same kernels for many k-point pairs and in
+    every iteration. The returned array is read-only and must not be
+    modified in place.
+    '''
+    exxdiv = _resolve_exxdiv(exx, mf)
+    if exxdiv == 'vcut_ws':
+        # The kernel depends on the precomputed mf._ws_exx
+        return get_coulG(cell, k, exx, mf, mesh, omega=omega)
+
+    if mesh is None:
+        mesh = cell.mesh
+    k = np.asarray(k, dtype=np.double).reshape(3)
+    digits = int(-np.log10(KPT_DIFF_TOL))
+    key = (tuple(int(n) for n in mesh), cell.lattice_vectors().tobytes(),
+           cell.dimension, cell.low_dim_ft_type, cell.omega, omega,
+           str(exxdiv), k.round(digits).tobytes())
+    if exxdiv in ('ewald', 'vcut_sph'):
+        # The G=0 correction depends on the k-point mesh
+        if getattr(mf, 'kpts', None) is not None:
+            kpts = np.asarray(mf.kpts).reshape(-1,3)
+        else:
+            kpts = k.reshape(1,3)
+        key = key + (kpts.round(digits).tobytes(),)
+
+    return _get_coulG_cache(cell).get(
+        key, lambda: get_coulG(cell, k, exx, mf, mesh, omega=omega))
+
+
 def precompute_exx(cell, kpts):
     from pyscf.pbc import gto as pbcgto
     from pyscf.pbc.dft import gen_grid
@@ -470,9 +695,65 @@ def get_monkhorst_pack_size(cell, kpts):
     return Nk
 
 
+class LatticeLsCache(object):
+    '''LRU cache of the lattice translation vectors of a cell.
+
+    The image lists are indexed by the arguments of :func:`get_lattice_Ls`
+    together with the lattice vectors and the atom coordinates. The cache
+    also accumulates the statistics of the shell-pair image screening of
+    :func:`screen_lattice_Ls`.
+    '''
+    def __init__(self, size=LATTICE_LS_CACHE_SIZE):
+        self.size = size
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = collections.Counter()
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.stats.clear()
+
+    def get(self, key, builder):
+        with self._lock:
+            Ls = self._data.get(key)
+            if Ls is not None:
+                self._data.move_to_end(key)
+                self.stats['hits'] += 1
+                return Ls.copy()
+        Ls = builder()
+        with self._lock:
+            self.stats['misses'] += 1
+            self._data[key] = Ls
+            while len(self._data) > max(self.size, 1):
+                self._data.popitem(last=False)
+        return Ls.copy()
+
+def _get_lattice_Ls_cache(cell):
+    cache = getattr(cell, '_lattice_Ls_cache', None)
+    if cache is None:
+        cache = cell._lattice_Ls_cache = LatticeLsCache()
+    return cache
+
 def get_lattice_Ls(cell, nimgs=None, rcut=None, dimension=None, discard=True):
     '''Get the (Cartesian, unitful) lattice translation vectors for nearby images.
-    The translation vectors can be used for the lattice summation.'''
+    The translation vectors can be used for the lattice summation.
+
+    The results are cached on the cell (see :class:`LatticeLsCache`).'''
+    if nimgs is None and rcut is None:
+        rcut = cell.rcut
+    if dimension is None:
+        dimension = cell.dimension
+    key = (None if nimgs is None else tuple(int(n) for n in nimgs),
+           None if rcut is None else float(rcut), dimension, discard,
+           cell.lattice_vectors().tobytes(), cell.atom_coords().tobytes())
+    return _get_lattice_Ls_cache(cell).get(
+        key, lambda: _get_lattice_Ls(cell, nimgs, rcut, dimension, discard))
+
+def _get_lattice_Ls(cell, nimgs=None, rcut=None, dimension=None, discard=True):
     a = cell.lattice_vectors()
     b = cell.reciprocal_vectors(norm_to=1)
     heights_inv = lib.norm(b, axis=1)
@@ -538,6 +819,78 @@ def _discard_edge_images(cell, Ls, rcut):
     Ls_mask[len(Ls)//2] = True
     return Ls[Ls_mask]
 
+def screen_lattice_Ls(cell1, cell2, Ls, shls_slice=None, precision=None,
+                      verbose=None):
+    r'''Remove the images which do not contribute to any shell pair of the
+    lattice sum \sum_L <i|j(r-L)>.
+
+    A shell pair (i,j) is negligible in image L if |r_i - r_j - L| is larger
+    than both bas_rcut of shell i and shell j, the same condition as the
+    rcut screening PBCrcut_screen of the C drivers. bas_rcut is estimated at
+    precision * LATTICE_LS_SCREEN_FACTOR. The numbers of images
+    and shell-pair images being skipped are accumulated in the statistics of
+    the image cache of cell2 (see :func:`lattice_sum_stats`).
+
+    Returns:
+        The images with at least one significant shell pair. Cell 0 is always
+        kept.
+    '''
+    if precision is None:
+        precision = min(cell1.precision, cell2.precision)
+    precision *= LATTICE_LS_SCREEN_FACTOR
+    if shls_slice is None:
+        shls_slice = (0, cell1.nbas, 0, cell2.nbas)
+    i0, i1, j0, j1 = shls_slice[:4]
+    Ls = np.asarray(Ls)
+    nimgs = len(Ls)
+    if i0 == i1 or j0 == j1 or nimgs <= 1:
+        return Ls
+
+    def atom_rcuts(cell, sh0, sh1):
+        rcut = np.array([cell.bas_rcut(ib, precision) for ib in range(sh0, sh1)])
+        atoms = cell._bas[sh0:sh1,ATOM_OF]
+        uniq_atoms, inv = np.unique(atoms, return_inverse=True)
+        # sorted shell rcuts of each atom
+        rcuts = [np.sort(rcut[inv == ia]) for ia in range(len(uniq_atoms))]
+        return cell.atom_coords()[uniq_atoms], rcuts
+
+    coords1, rcuts1 = atom_rcuts(cell1, i0, i1)
+    coords2, rcuts2 = atom_rcuts(cell2, j0, j1)
+    rmax2 = np.array([r[-1] for r in rcuts2])
+    nsh2 = np.array([len(r) for r in rcuts2])
+    mask = np.zeros(nimgs, dtype=bool)
+    pairs_skipped = 0
+    for r1, rc1 in zip(coords1, rcuts1):
+        # distances between shell i and the images of the atoms of shell j
+        d = np.linalg.norm(r1 - coords2[:,None,:] - Ls, axis=2)
+        mask |= (d < np.maximum(rc1[-1], rmax2)[:,None]).any(axis=0)
+        # A shell pair is skipped if d exceeds rcut of both shells
+        nskip1 = np.searchsorted(rc1, d, side='right')
+        nskip2 = np.array([np.searchsorted(rc2, dB, side='right')
+                           for rc2, dB in zip(rcuts2, d)])
+        pairs_skipped += (nskip1 * nskip2).sum()
+    if np.linalg.norm(Ls, axis=1).min() < 1e-9:
+        mask[np.linalg.norm(Ls, axis=1).argmin()] = True
+
+    npairs = sum(len(r) for r in rcuts1) * nsh2.sum() * nimgs
+    stats = _get_lattice_Ls_cache(cell2).stats
+    stats['images'] += nimgs
+    stats['images_skipped'] += nimgs - np.count_nonzero(mask)
+    stats['shell_pair_images'] += npairs
+    stats['shell_pair_images_skipped'] += pairs_skipped
+    if verbose is None:
+        verbose = cell2.verbose
+    if verbose >= logger.DEBUG1:
+        logger.debug1(cell2, 'lattice sum: %d of %d images kept, '
+                      '%d of %d shell-pair images skipped',
+                      np.count_nonzero(mask), nimgs, pairs_skipped, npairs)
+    return np.asarray(Ls[mask], order='C')
+
+def lattice_sum_stats(cell):
+    '''Statistics of the image cache and the image screening of the
+    lattice-summed integral drivers for the cell.'''
+    return dict(_get_lattice_Ls_cache(cell).stats)
+
 
 def super_cell(cell, ncopy):
     '''Create an ncopy[0] x ncopy[1] x ncopy[2] supercell of the input cell
@@ -56,6 +56,28 @@ class KnownValues(unittest.TestCase):
         self.assertAlmostEqual(lib.finger(popa), 0.8007278745, 7)
         self.assertAlmostEqual(lib.finger(popb), 0.8007278745, 7)
 
+    def test_block_circulant(self):
+        kmesh = [3,2,1]
+        kpts = cell.make_kpts(kmesh, scaled_center=[.1,.2,.3])[[3,0,5,1,4,2]]
+        s_k = cell.pbc_intor('int1e_ovlp', kpts=kpts)
+        scell, phase = k2gamma.get_phase(cell, kpts, kmesh)
+        nao = cell.nao
+        ref = np.einsum('Rk,kij,Sk->RiSj', phase, s_k, phase.conj())
+        ref = ref.reshape(6*nao, 6*nao)
+        s = k2gamma.BlockCirculant(cell, kpts, s_k, kmesh)
+        self.assertAlmostEqual(abs(s.todense() - ref).max(), 0, 12)
+        blk = ref.reshape(6,nao,6,nao)[[4,1]][:,:,[0,5,2]].reshape(2*nao,3*nao)
+        self.assertAlmostEqual(abs(s.get_blocks([4,1], [0,5,2]) - blk).max(), 0, 12)
+
+        np.random.seed(1)
+        x = np.random.random((6*nao,3))
+        self.assertAlmostEqual(abs(s.dot(x) - ref.dot(x)).max(), 0, 12)
+        x_k = k2gamma.supercell_to_kpts(cell, kpts, x, kmesh)
+        ref = np.einsum('Rk,Rux->kux', phase.conj(), x.reshape(6,nao,3))
+        self.assertAlmostEqual(abs(x_k - ref).max(), 0, 12)
+        x1 = k2gamma.kpts_to_supercell(cell, kpts, x_k, kmesh)
+        self.assertAlmostEqual(abs(x1 - x).max(), 0, 12)
+
     def test_double_translation_indices(self):
         idx2 = k2gamma.translation_map(2)
         idx3 = k2gamma.translation_map(3)
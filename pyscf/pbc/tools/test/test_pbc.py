@@ -79,6 +79,32 @@ class KnownValues(unittest.TestCase):
         coulG = tools.get_coulG(cell, exx='ewald')
         self.assertAlmostEqual(lib.fp(coulG), 4.888843468914021, 9)
 
+    def test_coulG_cached(self):
+        cell = pbcgto.M(a=numpy.eye(3)*3, atom='He 0 0 0', basis='gth-szv',
+                        pseudo='gth-pade', mesh=[9,9,9])
+        kpts = cell.make_kpts([2,2,1])
+        mf = khf.KRHF(cell, kpts)
+        for exxdiv in (False, 'ewald', 'vcut_sph'):
+            for q in (kpts[0], kpts[3]-kpts[1], -kpts[2]):
+                ref = tools.get_coulG(cell, q, exxdiv, mf)
+                coulG = tools.get_coulG_cached(cell, q, exxdiv, mf)
+                self.assertAlmostEqual(abs(coulG - ref).max(), 0, 12)
+                self.assertTrue(tools.get_coulG_cached(cell, q, exxdiv, mf) is coulG)
+                self.assertFalse(coulG.flags.writeable)
+        # k-point mesh changes the G=0 correction
+        ref = tools.get_coulG(cell, kpts[0], 'ewald')
+        coulG = tools.get_coulG_cached(cell, kpts[0], 'ewald')
+        self.assertAlmostEqual(abs(coulG - ref).max(), 0, 12)
+
+        ngrids = numpy.prod(cell.mesh)
+        cache = tools.CoulGCache(max_memory=ngrids*8*2.5e-6, spill=True)
+        cell._coulG_cache = cache
+        coulG = [tools.get_coulG_cached(cell, q) for q in kpts]
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(len(cache._spilled), 2)
+        self.assertAlmostEqual(abs(tools.get_coulG_cached(cell, kpts[0]) - coulG[0]).max(), 0, 14)
+        cell.dumps()
+
     #def test_coulG_2d(self):
     #    cell = pbcgto.Cell()
     #    cell.a = numpy.eye(3)
@@ -206,6 +232,21 @@ C  15.16687337 15.16687337 15.16687337
         v = tools.ifft(a, [8,n,8]).ravel()
         self.assertAlmostEqual(abs(ref-v).max(), 0, 10)
 
+    def test_fft_engines(self):
+        from pyscf.pbc.tools import pbc
+        for mesh in [(7,6,5), (9,4,1), (8,1,8)]:
+            a = numpy.random.random((3,) + mesh)
+            b = a + numpy.random.random((3,) + mesh) * 1j
+            ref_a = numpy.fft.fftn(a, axes=(1,2,3))
+            ref_b = numpy.fft.fftn(b, axes=(1,2,3))
+            ref_ib = numpy.fft.ifftn(b, axes=(1,2,3))
+            for engine, (fftn, ifftn) in pbc._FFT_ENGINES.items():
+                # Real inputs go through the real-to-complex transforms
+                self.assertAlmostEqual(abs(fftn(a) - ref_a).max(), 0, 10)
+                self.assertAlmostEqual(abs(fftn(b) - ref_b).max(), 0, 10)
+                self.assertAlmostEqual(abs(ifftn(b) - ref_ib).max(), 0, 10)
+        self.assertTrue(len(pbc._fft_plans) <= max(pbc.FFT_PLAN_CACHE_SIZE, 1))
+
 
 if __name__ == '__main__':
     print("Full Tests for pbc.tools")
@@ -303,6 +303,37 @@ def qmmm_grad_for_scf(scf_grad):
             if atmlst is not None:
                 g_mm = g_mm[atmlst]
             return g_qm + g_mm
+
+        def grad_hcore_mm(self, dm, mol=None):
+            r'''Gradients of the interaction between the electron density
+            and the MM charges with respect to the MM atoms
+
+            .. math::
+
+                -q_K \sum_{ij} D_{ij} \frac{d}{dR_K} (i|\frac{1}{|r-R_K|}|j)
+            '''
+            if mol is None: mol = self.mol
+            coords = self.base.mm_mol.atom_coords()
+            charges = self.base.mm_mol.atom_charges()
+            dm = numpy.asarray(dm)
+            if dm.ndim == 3:
+                dm = dm[0] + dm[1]
+            dj = mol.eval_potential(dm, coords, with_field=True)[1]
+            return -charges[:,None] * dj
+
+        def grad_nuc_mm(self, mol=None):
+            '''Gradients of the interaction between the QM nuclei and the MM
+            charges with respect to the MM atoms'''
+            if mol is None: mol = self.mol
+            coords = self.base.mm_mol.atom_coords()
+            charges = self.base.mm_mol.atom_charges()
+            g_mm = numpy.zeros_like(coords)
+            for i in range(mol.natm):
+                q1 = mol.atom_charge(i)
+                r1 = mol.atom_coord(i)
+                r = lib.norm(r1-coords, axis=1)
+                g_mm += q1 * numpy.einsum('i,ix,i->ix', charges, r1-coords, 1/r**3)
+            return g_mm
     return QMMM(scf_grad)
 
 # A tag to label the derived class
@@ -74,6 +74,28 @@ class KnowValues(unittest.TestCase):
         self.assertAlmostEqual(abs(ref-v).max(), 0, 12)
         pyscf.DEBUG = bak
 
+    def test_grad_mm(self):
+        coords = numpy.array([(0.0,0.1,0.0), (1.5,-1.0,2.0)])
+        charges = numpy.array([1.00, -.5])
+        mf = itrf.mm_charge(scf.RHF(mol), coords, charges, unit='Bohr').run()
+        hfg = mf.nuc_grad_method()
+        dm = mf.make_rdm1()
+        g = hfg.grad_hcore_mm(dm) + hfg.grad_nuc_mm()
+
+        ref = hfg.grad_nuc_mm()
+        for i, q in enumerate(charges):
+            with mol.with_rinv_origin(coords[i]):
+                v = mol.intor('int1e_iprinv')
+            ref[i] -= numpy.einsum('ij,xji->x', dm, v) * q * 2
+        self.assertAlmostEqual(abs(g - ref).max(), 0, 9)
+
+        c1 = coords.copy()
+        c1[1,0] += 1e-3
+        e1 = itrf.mm_charge(scf.RHF(mol), c1, charges, unit='Bohr').kernel()
+        c1[1,0] -= 2e-3
+        e2 = itrf.mm_charge(scf.RHF(mol), c1, charges, unit='Bohr').kernel()
+        self.assertAlmostEqual((e1 - e2)/2e-3, g[1,0], 5)
+
     def test_hcore_cart(self):
         coords = [(0.0,0.1,0.0)]
         charges = [1.00]
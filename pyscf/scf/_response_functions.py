@@ -24,6 +24,29 @@ import numpy
 from pyscf import lib
 from pyscf.lib import logger
 from pyscf.scf import hf, rohf, uhf, ghf, dhf
+from pyscf import __config__
+
+CACHE_AO_BLOCKS = getattr(__config__, 'scf_response_cache_ao_blocks', True)
+
+def _cache_ao_blocks(mf, ni):
+    '''AO values on DFT grids are kept in memory if possible, so that the XC
+    kernel of all trial vectors is evaluated without recomputing AO values in
+    every iteration of the response solver (Davidson, CPKS etc.)
+    '''
+    if not CACHE_AO_BLOCKS:
+        return ni
+    xctype = ni._xc_type(mf.xc)
+    if xctype == 'MGGA':
+        ao_deriv = 2
+    elif xctype == 'GGA':
+        ao_deriv = 1
+    else:
+        ao_deriv = 0
+    mem_avail = (mf.max_memory - lib.current_memory()[0]) * .5
+    ni1 = ni.cache_ao_blocks(mf.mol, mf.grids, ao_deriv, mem_avail)
+    if ni1 is not ni:
+        logger.debug(mf, 'AO values on grids are cached for response function')
+    return ni1
 
 def _gen_rhf_response(mf, mo_coeff=None, mo_occ=None,
                       singlet=None, hermi=0, max_memory=None):
@@ -58,6 +81,11 @@ def _gen_rhf_response(mf, mo_coeff=None, mo_occ=None,
             dm0 = mf.make_rdm1(mo_coeff, mo_occ)
             return multigrid._gen_rhf_response(mf, dm0, singlet, hermi)
 
+        if max_memory is None:
+            mem_now = lib.current_memory()[0]
+            max_memory = max(2000, mf.max_memory*.8-mem_now)
+        ni = _cache_ao_blocks(mf, ni)
+
         if singlet is None:
             # for ground state orbital hessian
             rho0, vxc, fxc = ni.cache_xc_kernel(mol, mf.grids, mf.xc,
@@ -67,10 +95,6 @@ def _gen_rhf_response(mf, mo_coeff=None, mo_occ=None,
                                                 [mo_coeff]*2, [mo_occ*.5]*2, spin=1)
         dm0 = None  #mf.make_rdm1(mo_coeff, mo_occ)
 
-        if max_memory is None:
-            mem_now = lib.current_memory()[0]
-            max_memory = max(2000, mf.max_memory*.8-mem_now)
-
         if singlet is None:
             # Without specify singlet, used in ground state orbital hessian
             def vind(dm1):
@@ -170,16 +194,17 @@ def _gen_uhf_response(mf, mo_coeff=None, mo_occ=None,
             dm0 = mf.make_rdm1(mo_coeff, mo_occ)
             return multigrid._gen_uhf_response(mf, dm0, with_j, hermi)
 
+        if max_memory is None:
+            mem_now = lib.current_memory()[0]
+            max_memory = max(2000, mf.max_memory*.8-mem_now)
+        ni = _cache_ao_blocks(mf, ni)
+
         rho0, vxc, fxc = ni.cache_xc_kernel(mol, mf.grids, mf.xc,
                                             mo_coeff, mo_occ, 1)
         #dm0 =(numpy.dot(mo_coeff[0]*mo_occ[0], mo_coeff[0].T.conj()),
         #      numpy.dot(mo_coeff[1]*mo_occ[1], mo_coeff[1].T.conj()))
         dm0 = None
 
-        if max_memory is None:
-            mem_now = lib.current_memory()[0]
-            max_memory = max(2000, mf.max_memory*.8-mem_now)
-
         def vind(dm1):
             if hermi == 2:
                 v1 = numpy.zeros_like(dm1)
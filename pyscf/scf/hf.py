@@ -42,6 +42,13 @@ PRE_ORTH_METHOD = getattr(__config__, 'scf_analyze_pre_orth_method', 'ANO')
 MO_BASE = getattr(__config__, 'MO_BASE', 1)
 TIGHT_GRAD_CONV_TOL = getattr(__config__, 'scf_hf_kernel_tight_grad_conv_tol', True)
 MUTE_CHKFILE = getattr(__config__, 'scf_hf_SCF_mute_chkfile', False)
+# Keep the integrals (_eri, DF tensors, DFT grids) in scanner if the geometry
+# and basis of the molecule are not changed. If only a few atoms are moved,
+# the incore ERIs between the unmoved atoms are kept and the rest is updated.
+SCANNER_REUSE_INTEGRALS = getattr(__config__, 'scf_hf_SCF_Scanner_reuse_integrals', True)
+# Update the incore ERIs only if the basis functions on the moved atoms are
+# less than this fraction of all basis functions
+SCANNER_ERI_UPDATE_RATIO = getattr(__config__, 'scf_hf_SCF_Scanner_eri_update_ratio', .25)
 
 # For code compatibility in python-2 and python-3
 if sys.version_info >= (3,):
@@ -1263,6 +1270,14 @@ def as_scanner(mf):
     Note scanner has side effects.  It may change many underlying objects
     (_scf, with_df, with_x2c, ...) during calculation.
 
+    The integrals of the last calculation are reused if the geometry and the
+    basis are not changed. When only a few atoms are moved, the blocks of the
+    incore ERIs (:attr:`_eri`) and the 3-center integrals of the incore
+    molecular DF tensor which involve the moved atoms are recomputed while
+    the blocks between the unmoved atoms are kept. Other intermediates
+    (direct-SCF screening, DF tensors on disk, DFT grids, ...) are rebuilt
+    for the new geometry.
+
     Examples:
 
     >>> from pyscf import gto, scf
@@ -1280,6 +1295,12 @@ def as_scanner(mf):
     class SCF_Scanner(mf.__class__, lib.SinglePointScanner):
         def __init__(self, mf_obj):
             self.__dict__.update(mf_obj.__dict__)
+            self._atom_keys = None
+            # ncalls: number of calls; reused: calls in which the integrals
+            # of last calculation were reused; moved_atoms: number of atoms
+            # changed in each call
+            self.scanner_stats = {'ncalls': 0, 'reused': 0, 'moved_atoms': []}
+            self._keys = self._keys.union(['scanner_stats'])
 
         def __call__(self, mol_or_geom, **kwargs):
             if isinstance(mol_or_geom, gto.Mole):
@@ -1287,8 +1308,40 @@ def as_scanner(mf):
             else:
                 mol = self.mol.set_geom_(mol_or_geom, inplace=False)
 
-            # Cleanup intermediates associated to the pervious mol object
-            self.reset(mol)
+            last_keys, self._atom_keys = self._atom_keys, gto.mole.atom_hash_keys(mol)
+            stats = self.scanner_stats
+            stats['ncalls'] += 1
+            if last_keys is None or last_keys[0] != self._atom_keys[0]:
+                moved_atoms = list(range(mol.natm))
+            else:
+                moved_atoms = [ia for ia, (k0, k1) in
+                               enumerate(zip(last_keys[1], self._atom_keys[1]))
+                               if k0 != k1]
+            moved = len(moved_atoms)
+            stats['moved_atoms'].append(moved)
+
+            if SCANNER_REUSE_INTEGRALS and last_keys is not None and moved == 0:
+                # Geometry and basis are not changed. The integrals, DF
+                # tensors and DFT grids of last calculation can be reused.
+                stats['reused'] += 1
+                self.mol = mol
+            else:
+                eri, self._eri = self._eri, None
+                with_df = getattr(self, 'with_df', None)
+                df_last = None
+                if isinstance(getattr(with_df, '_cderi', None), numpy.ndarray):
+                    df_last = (with_df.auxmol, with_df._cderi)
+                # Cleanup intermediates associated to the pervious mol object
+                self.reset(mol)
+                if SCANNER_REUSE_INTEGRALS and moved < mol.natm:
+                    if eri is not None:
+                        self._eri = _update_eri_of_moved_atoms(mol, eri, moved_atoms)
+                    if df_last is not None:
+                        _update_cderi_of_moved_atoms(with_df, mol, df_last[0],
+                                                     df_last[1], moved_atoms)
+            logger.debug(self, 'Scanner call %d: %d of %d atoms changed, '
+                         'integrals reused in %d calls', stats['ncalls'],
+                         moved, mol.natm, stats['reused'])
 
             if 'dm0' in kwargs:
                 dm0 = kwargs.pop('dm0')
@@ -1321,6 +1374,107 @@ def as_scanner(mf):
 
     return SCF_Scanner(mf)
 
+def _update_eri_of_moved_atoms(mol, eri, moved_atoms):
+    '''Recompute the 8-fold symmetric ERIs which involve the basis functions of
+    the moved atoms. The ERIs between the unmoved atoms are not changed. The
+    input eri array is overwritten. None is returned if updating the ERIs is
+    not cheaper than computing them from scratch.
+    '''
+    nao = mol.nao
+    npair = nao * (nao+1) // 2
+    if eri.dtype != numpy.double or eri.size != npair*(npair+1)//2:
+        return None
+
+    aoslices = mol.aoslice_by_atom()
+    nao_moved = sum(aoslices[ia,3] - aoslices[ia,2] for ia in moved_atoms)
+    if nao_moved >= nao * SCANNER_ERI_UPDATE_RATIO:
+        return None
+
+    eri = eri.ravel()
+    pair_idx = numpy.arange(nao)
+    pair_idx = pair_idx[:,None] * (pair_idx[:,None]+1) // 2 + pair_idx
+    pair_idx = numpy.tril(pair_idx) + numpy.tril(pair_idx, -1).T
+    ao_loc = mol.ao_loc_nr()
+    kl = numpy.arange(npair)
+    for ia in moved_atoms:
+        for ish in range(aoslices[ia,0], aoslices[ia,1]):
+            # (ij|kl) for i on the moved atom, all j and kl
+            buf = mol.intor('int2e', aosym='s2kl',
+                            shls_slice=(ish, ish+1, 0, mol.nbas,
+                                        0, mol.nbas, 0, mol.nbas))
+            ij = pair_idx[ao_loc[ish]:ao_loc[ish+1]].ravel()
+            row = numpy.maximum(ij[:,None], kl)
+            col = numpy.minimum(ij[:,None], kl)
+            eri[row * (row+1) // 2 + col] = buf.reshape(-1, npair)
+    return eri
+
+def _update_cderi_of_moved_atoms(with_df, mol, auxmol, cderi, moved_atoms):
+    '''Update the incore DF tensor of a molecular DF object for the new
+    geometry. The 3-center integrals (ij|P) are recovered from the Cholesky
+    decomposed DF tensor of the last geometry. Only the integrals which
+    involve the moved atoms are recomputed. The 2-center metric is
+    decomposed again for the new geometry. with_df is not changed if updating
+    the DF tensor is not cheaper than building it from scratch.
+    '''
+    from pyscf.df import df, addons
+    if not isinstance(with_df, df.DF) or isinstance(with_df, df.DF4C):
+        return with_df
+    nao = mol.nao
+    npair = nao * (nao+1) // 2
+    if (auxmol is None or cderi.dtype != numpy.double or
+        cderi.shape != (auxmol.nao, npair)):
+        return with_df
+
+    aoslices = mol.aoslice_by_atom()
+    nao_moved = sum(aoslices[ia,3] - aoslices[ia,2] for ia in moved_atoms)
+    if nao_moved >= nao * SCANNER_ERI_UPDATE_RATIO:
+        return with_df
+    mem_avail = with_df.max_memory - lib.current_memory()[0]
+    if cderi.nbytes * 2e-6 > mem_avail:
+        return with_df
+
+    try:
+        # If the metric of the last geometry can be Cholesky decomposed,
+        # the DF tensor was computed with the Cholesky factor
+        low = scipy.linalg.cholesky(auxmol.intor('int2c2e', hermi=1), lower=True)
+    except scipy.linalg.LinAlgError:
+        return with_df
+    j3c = lib.dot(low, cderi)
+    low = cderi = None
+
+    auxmol = addons.make_auxmol(mol, with_df.auxbasis)
+    try:
+        low = scipy.linalg.cholesky(auxmol.intor('int2c2e', hermi=1), lower=True)
+    except scipy.linalg.LinAlgError:
+        return with_df
+
+    pmol = gto.mole.conc_mol(mol, auxmol)
+    nbas = mol.nbas
+    naux = auxmol.nao
+    pair_idx = numpy.arange(nao)
+    pair_idx = pair_idx[:,None] * (pair_idx[:,None]+1) // 2 + pair_idx
+    pair_idx = numpy.tril(pair_idx) + numpy.tril(pair_idx, -1).T
+    ao_loc = mol.ao_loc_nr()
+    aux_slices = auxmol.aoslice_by_atom()
+    for ia in moved_atoms:
+        # (ij|P) for P on the moved atom, all ij
+        b0, b1, p0, p1 = aux_slices[ia]
+        if b0 < b1:
+            buf = pmol.intor('int3c2e', aosym='s2ij',
+                             shls_slice=(0, nbas, 0, nbas, nbas+b0, nbas+b1))
+            j3c[p0:p1] = buf.T
+        for ish in range(aoslices[ia,0], aoslices[ia,1]):
+            # (ij|P) for i on the moved atom, all j and P
+            buf = pmol.intor('int3c2e', shls_slice=(ish, ish+1, 0, nbas,
+                                                    nbas, nbas+auxmol.nbas))
+            ij = pair_idx[ao_loc[ish]:ao_loc[ish+1]].ravel()
+            j3c[:,ij] = buf.reshape(-1, naux).T
+
+    with_df.auxmol = auxmol
+    with_df._cderi = scipy.linalg.solve_triangular(
+        low, j3c, lower=True, overwrite_b=True, check_finite=False)
+    return with_df
+
 ############
 
 
@@ -23,6 +23,7 @@ import tempfile
 from pyscf import lib
 from pyscf import gto
 from pyscf import scf
+from pyscf import df
 from pyscf.scf import atom_hf
 
 def setUpModule():
@@ -705,6 +706,44 @@ H     0    0.757    0.587'''
         e = mfs(mol1)
         self.assertAlmostEqual(e, -1.1163913004438035, 9)
 
+    def test_scanner_reuse_integrals(self):
+        mf_scanner = scf.RHF(mol).set(conv_tol=1e-10).as_scanner()
+        mf_scanner.chkfile = None
+        mf_scanner(mol)
+        eri0 = mf_scanner._eri
+        self.assertTrue(eri0 is not None)
+        e1 = mf_scanner(mol.copy())
+        self.assertTrue(mf_scanner._eri is eri0)
+        self.assertAlmostEqual(e1, mf.e_tot, 9)
+
+        mol1 = mol.set_geom_('O 0 0 0; H 0 -.757 .587; H 0 .757 .6', inplace=False)
+        e2 = mf_scanner(mol1)
+        # ERIs of the moved H atom are updated
+        eri1 = mol1.intor('int2e', aosym='s8')
+        self.assertAlmostEqual(abs(mf_scanner._eri - eri1).max(), 0, 12)
+        self.assertAlmostEqual(e2, scf.RHF(mol1).kernel(), 8)
+        self.assertEqual(mf_scanner.scanner_stats['ncalls'], 3)
+        self.assertEqual(mf_scanner.scanner_stats['reused'], 1)
+        self.assertEqual(mf_scanner.scanner_stats['moved_atoms'], [3, 0, 1])
+
+    def test_scanner_reuse_df_integrals(self):
+        mf_scanner = scf.RHF(mol).density_fit().set(conv_tol=1e-10).as_scanner()
+        mf_scanner.chkfile = None
+        mf_scanner(mol)
+        mol1 = mol.set_geom_('O 0 0 0; H 0 -.757 .587; H 0 .757 .6', inplace=False)
+        ncall = [0]
+        cholesky_eri = df.incore.cholesky_eri
+        def count_build(*args, **kwargs):
+            ncall[0] += 1
+            return cholesky_eri(*args, **kwargs)
+        with lib.temporary_env(df.incore, cholesky_eri=count_build):
+            e1 = mf_scanner(mol1)
+        # The DF tensor of the moved H atom is updated, not rebuilt
+        self.assertEqual(ncall[0], 0)
+        cderi = df.incore.cholesky_eri(mol1, auxmol=mf_scanner.with_df.auxmol)
+        self.assertAlmostEqual(abs(mf_scanner.with_df._cderi - cderi).max(), 0, 9)
+        self.assertAlmostEqual(e1, scf.RHF(mol1).density_fit().kernel(), 8)
+
     def test_natm_eq_0(self):
         mol = gto.M()
         mol.nelectron = 2
@@ -968,11 +968,11 @@ def _grad_nn(pcmobj, r_vdw, ui, ylm_1sph, cached_pol, L):
             phi1[ia,:,ia] -= tmp  # response of cavity grids
 
     L1 = ddcosmo_grad.make_L1(pcmobj, r_vdw, ylm_1sph, fi0)
-    Xvec0 = numpy.linalg.solve(L.reshape(natm*nlm,-1), phi0.ravel())
+    Xvec0 = ddcosmo.solve_L(L, phi0.ravel())
     Xvec0 = Xvec0.reshape(natm,nlm)
     phi1 -= numpy.einsum('aziljm,jm->azil', L1, Xvec0)
 
-    LS0 = numpy.linalg.solve(L.reshape(natm*nlm,-1).T, psi0.ravel())
+    LS0 = ddcosmo.solve_L(L, psi0.ravel(), trans=True)
     LS0 = LS0.reshape(natm,nlm)
     de += numpy.einsum('il,azil->az', LS0, phi1)
 
@@ -1016,7 +1016,7 @@ def _grad_ne(pcmobj, dm, r_vdw, ui, ylm_1sph, cached_pol, L):
         v_phi[ia] = numpy.einsum('z,zp->p', atom_charges, 1./lib.norm(d_rs,axis=2))
     phi0 = -numpy.einsum('n,xn,jn,jn->jx', weights_1sph, ylm_1sph, ui, v_phi)
 
-    Xvec0 = numpy.linalg.solve(L.reshape(natm*nlm,-1), phi0.ravel())
+    Xvec0 = ddcosmo.solve_L(L, phi0.ravel())
     Xvec0 = Xvec0.reshape(natm,nlm)
 
     v_phi0 = numpy.empty((natm,ngrid_1sph))
@@ -1039,7 +1039,7 @@ def _grad_ne(pcmobj, dm, r_vdw, ui, ylm_1sph, cached_pol, L):
     L1 = ddcosmo_grad.make_L1(pcmobj, r_vdw, ylm_1sph, fi0)
 
     phi1 -= numpy.einsum('aziljm,jm->azil', L1, Xvec0)
-    Xvec1 = numpy.linalg.solve(L.reshape(natm*nlm,-1), phi1.reshape(-1,natm*nlm).T)
+    Xvec1 = ddcosmo.solve_L(L, phi1.reshape(-1,natm*nlm).T)
     Xvec1 = Xvec1.T.reshape(natm,3,natm,nlm)
 
     for ia, (coords, weight, weight1) in enumerate(rks_grad.grids_response_cc(grids)):
@@ -1072,11 +1072,11 @@ def _grad_ne(pcmobj, dm, r_vdw, ui, ylm_1sph, cached_pol, L):
     for ia in range(natm):
         psi0[ia,0] += numpy.sqrt(4*numpy.pi)/r_vdw[ia] * mol.atom_charge(ia)
 
-    LS0 = numpy.linalg.solve(L.reshape(natm*nlm,-1).T, psi0.ravel())
+    LS0 = ddcosmo.solve_L(L, psi0.ravel(), trans=True)
     LS0 = LS0.reshape(natm,nlm)
 
     LS1 = numpy.einsum('il,aziljm->azjm', LS0, L1)
-    LS1 = numpy.linalg.solve(L.reshape(natm*nlm,-1).T, LS1.reshape(-1,natm*nlm).T)
+    LS1 = ddcosmo.solve_L(L, LS1.reshape(-1,natm*nlm).T, trans=True)
     LS1 = LS1.T.reshape(natm,3,natm,nlm)
 
     int3c2e = mol._add_suffix('int3c2e')
@@ -1153,7 +1153,7 @@ def _grad_ee(pcmobj, dm1, dm2, r_vdw, ui, ylm_1sph, cached_pol, L):
         fac_pol = ddcosmo._vstack_factor_fak_pol(fak_pol, lmax)
         i0, i1 = i1, i1 + fac_pol.shape[1]
         psi0_dm1[:,ia] = -numpy.einsum('mg,ng->nm', fac_pol, den[:,i0:i1])
-    LS0 = numpy.linalg.solve(L.reshape(natm*nlm,-1).T, psi0_dm1.reshape(n_dm,-1).T)
+    LS0 = ddcosmo.solve_L(L, psi0_dm1.reshape(n_dm,-1).T, trans=True)
     LS0 = LS0.T.reshape(n_dm,natm,nlm)
 
     phi0_dm1 = numpy.zeros((n_dm,natm,nlm))
@@ -1194,13 +1194,13 @@ def _grad_ee(pcmobj, dm1, dm2, r_vdw, ui, ylm_1sph, cached_pol, L):
             phi1_dm1[:,ja,:,ia] -= phitmp
             phi1_dm1[:,ia,:,ia] += phitmp
 
-    Xvec0 = numpy.linalg.solve(L.reshape(natm*nlm,-1), phi0_dm1.reshape(n_dm,-1).T)
+    Xvec0 = ddcosmo.solve_L(L, phi0_dm1.reshape(n_dm,-1).T)
     Xvec0 = Xvec0.T.reshape(n_dm,natm,nlm)
 
     L1 = ddcosmo_grad.make_L1(pcmobj, r_vdw, ylm_1sph, fi0)
 
     phi1_dm1 -= numpy.einsum('aziljm,njm->nazil', L1, Xvec0)
-    Xvec1 = numpy.linalg.solve(L.reshape(natm*nlm,-1), phi1_dm1.reshape(-1,natm*nlm).T)
+    Xvec1 = ddcosmo.solve_L(L, phi1_dm1.reshape(-1,natm*nlm).T)
     Xvec1 = Xvec1.T.reshape(n_dm,natm,3,natm,nlm)
 
     psi1_dm1 = numpy.zeros((n_dm,natm,3,natm,nlm))
@@ -1243,7 +1243,7 @@ def _grad_ee(pcmobj, dm1, dm2, r_vdw, ui, ylm_1sph, cached_pol, L):
             de[:,ia] -= detmp
 
     psi1_dm1 -= numpy.einsum('nil,aziljm->nazjm', LS0, L1)
-    LS1 = numpy.linalg.solve(L.reshape(natm*nlm,-1).T, psi1_dm1.reshape(-1,natm*nlm).T)
+    LS1 = ddcosmo.solve_L(L, psi1_dm1.reshape(-1,natm*nlm).T, trans=True)
     LS1 = LS1.T.reshape(n_dm,natm,3,natm,nlm)
     de += numpy.einsum('nazjx,njx->naz', LS1, phi0_dm2)
 
@@ -229,8 +229,11 @@ Xylene-mixture                         2.3879
 z-1,2-DiChloroEthene                   9.2
 '''  # noqa: E501
 
+import sys
 import ctypes
 import numpy
+import scipy.sparse
+from scipy.sparse import linalg as sparse_linalg
 from pyscf import lib
 from pyscf.lib import logger
 from pyscf import gto
@@ -240,6 +243,13 @@ from pyscf.data import radii
 from pyscf.symm import sph
 
 from pyscf.solvent import _attach_solvent
+from pyscf import __config__
+
+# For molecules with more than SPARSE_L_NATM atoms, the L matrix is stored in
+# block-sparse format and the linear equations are solved iteratively.
+SPARSE_L_NATM = getattr(__config__, 'solvent_ddcosmo_sparse_L_natm', 200)
+LSOLVER_CONV_TOL = getattr(__config__, 'solvent_ddcosmo_lsolver_conv_tol', 1e-11)
+LSOLVER_MAX_CYCLE = getattr(__config__, 'solvent_ddcosmo_lsolver_max_cycle', 200)
 
 @lib.with_doc(_attach_solvent._for_scf.__doc__)
 def ddcosmo_for_scf(mf, solvent_obj=None, dm=None):
@@ -351,6 +361,15 @@ def make_grids_one_sphere(lebedev_order):
 
 def make_L(pcmobj, r_vdw, ylm_1sph, fi):
     # See JCTC, 9, 3637, Eq (18)
+    natm = pcmobj.mol.natm
+    nlm = (pcmobj.lmax+1)**2
+    Lmat = make_L_sparse(pcmobj, r_vdw, ylm_1sph, fi).toarray()
+    return Lmat.reshape(natm,nlm,natm,nlm)
+
+def make_L_sparse(pcmobj, r_vdw, ylm_1sph, fi):
+    '''The L matrix in scipy BSR format. Only the diagonal blocks and the
+    blocks of overlapping spheres are stored.
+    '''
     mol = pcmobj.mol
     natm = mol.natm
     lmax = pcmobj.lmax
@@ -366,14 +385,13 @@ def make_L(pcmobj, r_vdw, ylm_1sph, fi):
 # L_diag = <lm|(1/|s-s'|)|l'm'>
 # Using Laplace expansion for electrostatic potential 1/r
 # L_diag = 4pi/(2l+1)/|s| <lm|l'm'>
-    L_diag = numpy.zeros((natm,nlm))
-    p1 = 0
-    for l in range(lmax+1):
-        p0, p1 = p1, p1 + (l*2+1)
-        L_diag[:,p0:p1] = 4*numpy.pi/(l*2+1)
-    L_diag *= 1./r_vdw.reshape(-1,1)
-    Lmat = numpy.diag(L_diag.ravel()).reshape(natm,nlm,natm,nlm)
+    ls = numpy.repeat(numpy.arange(lmax+1), numpy.arange(lmax+1)*2+1)
+    fac_l = 4*numpy.pi/(ls*2+1)
+    L_diag = fac_l / r_vdw.reshape(-1,1)
 
+    blocks = []
+    indices = []
+    indptr = [0]
     for ja in range(natm):
         # scale the weight, precontract d_nj and w_n
         # see JCTC 9, 3637, Eq (16) - (18)
@@ -381,19 +399,84 @@ def make_L(pcmobj, r_vdw, ylm_1sph, fi):
         # consistent to Psi in JCP, 141, 184108
         part_weights = weights_1sph.copy()
         part_weights[fi[ja]>1] /= fi[ja,fi[ja]>1]
-        for ka in atoms_with_vdw_overlap(ja, atom_coords, r_vdw):
+
+        kas = atoms_with_vdw_overlap(ja, atom_coords, r_vdw)
+        cols = numpy.sort(numpy.append(kas, ja))
+        for ka in cols:
+            if ka == ja:
+                blocks.append(numpy.diag(L_diag[ja]))
+                continue
             vjk = r_vdw[ja] * coords_1sph + atom_coords[ja] - atom_coords[ka]
             tjk = lib.norm(vjk, axis=1) / r_vdw[ka]
             wjk = pcmobj.regularize_xt(tjk, eta, r_vdw[ka])
             wjk *= part_weights
-            pol = sph.multipoles(vjk, lmax)
-            p1 = 0
-            for l in range(lmax+1):
-                fac = 4*numpy.pi/(l*2+1) / r_vdw[ka]**(l+1)
-                p0, p1 = p1, p1 + (l*2+1)
-                a = numpy.einsum('xn,n,mn->xm', ylm_1sph, wjk, pol[l])
-                Lmat[ja,:,ka,p0:p1] += -fac * a
-    return Lmat
+            pol = numpy.vstack(sph.multipoles(vjk, lmax))
+            fac = fac_l / r_vdw[ka]**(ls+1)
+            a = lib.dot(ylm_1sph * wjk, pol.T)
+            blocks.append(-fac * a)
+        indices.append(cols)
+        indptr.append(indptr[-1] + cols.size)
+
+    blocks = numpy.asarray(blocks).reshape(-1,nlm,nlm)
+    indices = numpy.hstack(indices)
+    return scipy.sparse.bsr_matrix((blocks, indices, numpy.asarray(indptr)),
+                                   shape=(natm*nlm,natm*nlm))
+
+def solve_L(L, rhs, trans=False, x0=None, conv_tol=LSOLVER_CONV_TOL,
+            max_cycle=LSOLVER_MAX_CYCLE, verbose=None):
+    '''Solve the linear equation L x = rhs (or L^T x = rhs if trans is set)
+
+    For dense L, the equation is solved with LAPACK. For sparse L
+    (see make_L_sparse), the equation is solved with GMRES iterations
+    preconditioned by the diagonal of L. The initial guess x0 can be used to
+    warm start the iterations.
+
+    Args:
+        rhs : 1D array or 2D array with each column being a right hand side
+    '''
+    if not scipy.sparse.issparse(L):
+        n = rhs.shape[0]
+        L = L.reshape(n,n)
+        if trans:
+            L = L.T
+        return numpy.linalg.solve(L, rhs)
+
+    if isinstance(verbose, logger.Logger):
+        log = verbose
+    else:
+        log = logger.Logger(sys.stdout, verbose)
+    if trans:
+        L = L.T.tobsr()
+    diag = L.diagonal()
+    precond = sparse_linalg.LinearOperator(L.shape, lambda x: x/diag)
+
+    is_1d = rhs.ndim == 1
+    rhs = rhs.reshape(rhs.shape[0], -1)
+    if x0 is not None:
+        x0 = x0.reshape(rhs.shape)
+    x = numpy.empty_like(rhs)
+    for k in range(rhs.shape[1]):
+        b = rhs[:,k]
+        if x0 is None:
+            xk = b / diag
+        else:
+            xk = x0[:,k]
+        bnorm = numpy.linalg.norm(b)
+        if bnorm == 0:
+            x[:,k] = 0
+            continue
+        try:
+            x[:,k], info = sparse_linalg.gmres(L, b, x0=xk, M=precond, rtol=conv_tol,
+                                               atol=0, maxiter=max_cycle)
+        except TypeError:  # scipy < 1.12
+            x[:,k], info = sparse_linalg.gmres(L, b, x0=xk, M=precond, tol=conv_tol,
+                                               atol=0, maxiter=max_cycle)
+        if info != 0:
+            log.warn('L-equation not converged. |r| = %g',
+                     numpy.linalg.norm(L.dot(x[:,k]) - b) / bnorm)
+    if is_1d:
+        x = x[:,0]
+    return x
 
 def make_fi(pcmobj, r_vdw):
     coords_1sph, weights_1sph = make_grids_one_sphere(pcmobj.lebedev_order)
@@ -404,12 +487,17 @@ def make_fi(pcmobj, r_vdw):
     ngrid_1sph = coords_1sph.shape[0]
     fi = numpy.zeros((natm,ngrid_1sph))
     for ia in range(natm):
-        for ja in atoms_with_vdw_overlap(ia, atom_coords, r_vdw):
-            v = r_vdw[ia]*coords_1sph + atom_coords[ia] - atom_coords[ja]
-            rv = lib.norm(v, axis=1)
-            t = rv / r_vdw[ja]
-            xt = pcmobj.regularize_xt(t, eta, r_vdw[ja])
-            fi[ia] += xt
+        jas = atoms_with_vdw_overlap(ia, atom_coords, r_vdw)
+        if jas.size == 0:
+            continue
+        v = (r_vdw[ia]*coords_1sph + atom_coords[ia]
+             - atom_coords[jas].reshape(-1,1,3))
+        t = lib.norm(v, axis=2) / r_vdw[jas].reshape(-1,1)
+        # The switching function depends on the radius of atom ja. Atoms of
+        # the same radius are evaluated together.
+        for r in numpy.unique(r_vdw[jas]):
+            xt = pcmobj.regularize_xt(t[r_vdw[jas] == r], eta, r)
+            fi[ia] += xt.sum(axis=0)
     fi[fi < 1e-20] = 0
     return fi
 
@@ -432,10 +520,6 @@ def make_phi(pcmobj, dm, r_vdw, ui, ylm_1sph, with_nuc=True):
     nao = dms.shape[-1]
     dms = dms.reshape(-1,nao,nao)
     n_dm = dms.shape[0]
-    diagidx = numpy.arange(nao)
-    diagidx = diagidx*(diagidx+1)//2 + diagidx
-    tril_dm = lib.pack_tril(dms+dms.transpose(0,2,1))
-    tril_dm[:,diagidx] *= .5
 
     atom_coords = mol.atom_coords()
     atom_charges = mol.atom_charges()
@@ -446,24 +530,18 @@ def make_phi(pcmobj, dm, r_vdw, ui, ylm_1sph, with_nuc=True):
 
     v_phi = numpy.zeros((n_dm, natm, ngrid_1sph))
 
-    if with_nuc:
-        for ia in range(natm):
-            # Note (-) sign is not applied to atom_charges, because (-) is explicitly
-            # included in rhs and L matrix
-            d_rs = atom_coords.reshape(-1,1,3) - cav_coords[ia]
-            v_phi[:,ia] = numpy.einsum('z,zp->p', atom_charges, 1./lib.norm(d_rs,axis=2))
-
     max_memory = pcmobj.max_memory - lib.current_memory()[0]
-    blksize = int(max(max_memory*.9e6/8/nao**2, 400))
+    if with_nuc:
+        # Note (-) sign is not applied to atom_charges, because (-) is explicitly
+        # included in rhs and L matrix
+        blksize = int(max(max_memory*.2e6/8/(natm*ngrid_1sph*4), 1))
+        for i0, i1 in lib.prange(0, natm, blksize):
+            d_rs = atom_coords.reshape(-1,1,1,3) - cav_coords[i0:i1]
+            v_phi[:,i0:i1] = numpy.einsum('z,zip->ip', atom_charges,
+                                          1./lib.norm(d_rs,axis=3))
 
     cav_coords = cav_coords[extern_point_idx]
-    v_phi_e = numpy.empty((n_dm, cav_coords.shape[0]))
-    int3c2e = mol._add_suffix('int3c2e')
-    cintopt = gto.moleintor.make_cintopt(mol._atm, mol._bas, mol._env, int3c2e)
-    for i0, i1 in lib.prange(0, cav_coords.shape[0], blksize):
-        fakemol = gto.fakemol_for_charges(cav_coords[i0:i1])
-        v_nj = df.incore.aux_e2(mol, fakemol, intor=int3c2e, aosym='s2ij', cintopt=cintopt)
-        v_phi_e[:,i0:i1] = numpy.einsum('nx,xk->nk', tril_dm, v_nj)
+    v_phi_e = mol.eval_potential(dms, cav_coords)
     v_phi[:,extern_point_idx] -= v_phi_e
 
     phi = -numpy.einsum('n,xn,jn,ijn->ijx', weights_1sph, ylm_1sph, ui, v_phi)
@@ -538,7 +616,8 @@ def make_psi_vmat(pcmobj, dm, r_vdw, ui, ylm_1sph, cached_pol, Xvec, L,
             psi[:,ia,0] += numpy.sqrt(4*numpy.pi)/r_vdw[ia] * mol.atom_charge(ia)
 
     # <Psi, L^{-1}g> -> Psi = SL the adjoint equation to LX = g
-    L_S = numpy.linalg.solve(L.reshape(natm*nlm,-1).T, psi.reshape(n_dm,-1).T)
+    L_S = solve_L(L, psi.reshape(n_dm,-1).T, trans=True,
+                  verbose=logger.new_logger(pcmobj))
     L_S = L_S.reshape(natm,nlm,n_dm).transpose(2,0,1)
     coords_1sph, weights_1sph = make_grids_one_sphere(pcmobj.lebedev_order)
     # JCP, 141, 184108, Eq (39)
@@ -749,8 +828,11 @@ class DDCOSMO(lib.StreamObject):
         logger.debug(self, 'Num points on shell %d', on_shell)
 
         nlm = (lmax+1)**2
-        Lmat = make_L(self, r_vdw, ylm_1sph, fi)
-        Lmat = Lmat.reshape(natm*nlm,-1)
+        if natm > SPARSE_L_NATM:
+            Lmat = make_L_sparse(self, r_vdw, ylm_1sph, fi)
+        else:
+            Lmat = make_L(self, r_vdw, ylm_1sph, fi)
+            Lmat = Lmat.reshape(natm*nlm,-1)
 
         cached_pol = cache_fake_multipoles(self.grids, r_vdw, lmax)
 
@@ -796,7 +878,11 @@ class DDCOSMO(lib.StreamObject):
             dm = dm[0] + dm[1]
 
         phi = make_phi(self, dm, r_vdw, ui, ylm_1sph)
-        Xvec = numpy.linalg.solve(Lmat, phi.ravel()).reshape(mol.natm,-1)
+        # Solution of the last SCF cycle is the initial guess for iterative solver
+        Xvec = solve_L(Lmat, phi.ravel(), x0=self._intermediates.get('Xvec'),
+                       verbose=logger.new_logger(self))
+        self._intermediates['Xvec'] = Xvec
+        Xvec = Xvec.reshape(mol.natm,-1)
         psi, vmat = make_psi_vmat(self, dm, r_vdw, ui, ylm_1sph,
                                   cached_pol, Xvec, Lmat)[:2]
         dielectric = self.eps
@@ -835,7 +921,8 @@ class DDCOSMO(lib.StreamObject):
         dms = dms.reshape(-1,nao,nao)
 
         phi = make_phi(self, dms, r_vdw, ui, ylm_1sph, with_nuc=False)
-        Xvec = numpy.linalg.solve(Lmat, phi.reshape(-1,natm*nlm).T)
+        Xvec = solve_L(Lmat, phi.reshape(-1,natm*nlm).T,
+                       verbose=logger.new_logger(self))
         Xvec = Xvec.reshape(natm,nlm,-1).transpose(2,0,1)
         vmat = make_psi_vmat(self, dms, r_vdw, ui, ylm_1sph,
                              cached_pol, Xvec, Lmat, with_nuc=False)[1]
@@ -114,13 +114,16 @@ def kernel(pcmobj, dm, verbose=None):
     cached_pol = ddcosmo.cache_fake_multipoles(pcmobj.grids, r_vdw, lmax)
 
     nlm = (lmax+1)**2
-    L0 = ddcosmo.make_L(pcmobj, r_vdw, ylm_1sph, fi)
-    L0 = L0.reshape(natm*nlm,-1)
-    L1 = make_L1(pcmobj, r_vdw, ylm_1sph, fi)
+    if natm > ddcosmo.SPARSE_L_NATM:
+        L0 = ddcosmo.make_L_sparse(pcmobj, r_vdw, ylm_1sph, fi)
+    else:
+        L0 = ddcosmo.make_L(pcmobj, r_vdw, ylm_1sph, fi)
+        L0 = L0.reshape(natm*nlm,-1)
 
     phi0 = ddcosmo.make_phi(pcmobj, dm, r_vdw, ui, ylm_1sph)
     phi1 = make_phi1(pcmobj, dm, r_vdw, ui, ylm_1sph)
-    L0_X = numpy.linalg.solve(L0, phi0.ravel()).reshape(natm,-1)
+    L0_X = ddcosmo.solve_L(L0, phi0.ravel(), verbose=logger.new_logger(pcmobj))
+    L0_X = L0_X.reshape(natm,-1)
     psi0, vmat, L0_S = \
             ddcosmo.make_psi_vmat(pcmobj, dm, r_vdw, ui, ylm_1sph,
                                   cached_pol, L0_X, L0)
@@ -133,7 +136,61 @@ def kernel(pcmobj, dm, verbose=None):
         f_epsilon = 1
     de = .5 * f_epsilon * e_psi1
     de+= .5 * f_epsilon * numpy.einsum('jx,azjx->az', L0_S, phi1)
-    de-= .5 * f_epsilon * numpy.einsum('aziljm,il,jm->az', L1, L0_S, L0_X)
+    de-= .5 * f_epsilon * contract_L1(pcmobj, r_vdw, ylm_1sph, fi, L0_S, L0_X)
+    return de
+
+def contract_L1(pcmobj, r_vdw, ylm_1sph, fi, S, X):
+    '''einsum('aziljm,il,jm->az', L1, S, X) without constructing the L1 tensor
+    of make_L1
+    '''
+    mol = pcmobj.mol
+    natm = mol.natm
+    lmax = pcmobj.lmax
+    eta = pcmobj.eta
+    nlm = (lmax+1)**2
+
+    coords_1sph, weights_1sph = ddcosmo.make_grids_one_sphere(pcmobj.lebedev_order)
+    ngrid_1sph = weights_1sph.size
+    atom_coords = mol.atom_coords()
+    ylm_1sph = ylm_1sph.reshape(nlm,ngrid_1sph)
+    ls = numpy.repeat(numpy.arange(lmax+1), numpy.arange(lmax+1)*2+1)
+    fac_l = 4*numpy.pi/(ls*2+1)
+
+    # S projected on the grids of each sphere
+    S_grid = numpy.dot(S.reshape(natm,nlm), ylm_1sph)
+
+    de = numpy.zeros((natm,3))
+    for ja in range(natm):
+        part_weights = weights_1sph.copy()
+        part_weights[fi[ja]>1] /= fi[ja,fi[ja]>1]
+
+        atmlst, fi1 = _make_fi1_block(pcmobj, r_vdw, ja, fi[ja])
+        part_weights1 = numpy.zeros((len(atmlst),3,ngrid_1sph))
+        tmp = part_weights[fi[ja]>1] / fi[ja,fi[ja]>1]
+        part_weights1[:,:,fi[ja]>1] = -tmp * fi1[:,:,fi[ja]>1]
+
+        # Sum over ka of the terms associated to part_weights1
+        w01_sum = numpy.zeros(ngrid_1sph)
+        for ka in ddcosmo.atoms_with_vdw_overlap(ja, atom_coords, r_vdw):
+            vjk = r_vdw[ja] * coords_1sph + atom_coords[ja] - atom_coords[ka]
+            rv = lib.norm(vjk, axis=1)
+            tjk = rv / r_vdw[ka]
+            wjk0 = pcmobj.regularize_xt(tjk, eta, r_vdw[ka])
+            wjk1 = regularize_xt1(tjk, eta*r_vdw[ka])
+            sjk = vjk.T / rv
+            wjk1 = 1./r_vdw[ka] * wjk1 * sjk
+
+            fac_X = -fac_l / r_vdw[ka]**(ls+1) * X[ka]
+            pol0_X = numpy.dot(fac_X, numpy.vstack(sph.multipoles(vjk, lmax)))
+            pol1_X = numpy.einsum('m,zmn->zn', fac_X,
+                                  numpy.concatenate(multipoles1(vjk, lmax), axis=1))
+
+            w01_sum += wjk0 * pol0_X
+            v = numpy.einsum('n,zn->z', S_grid[ja] * part_weights,
+                             wjk1 * pol0_X + wjk0 * pol1_X)
+            de[ja] += v
+            de[ka] -= v
+        de[atmlst] += numpy.einsum('azn,n->az', part_weights1, w01_sum * S_grid[ja])
     return de
 
 def make_L1(pcmobj, r_vdw, ylm_1sph, fi):
@@ -150,15 +207,15 @@ def make_L1(pcmobj, r_vdw, ylm_1sph, fi):
     ylm_1sph = ylm_1sph.reshape(nlm,ngrid_1sph)
 
     Lmat = numpy.zeros((natm,3,natm,nlm,natm,nlm))
-    fi1 = make_fi1(pcmobj, pcmobj.get_atomic_radii())
 
     for ja in range(natm):
         part_weights = weights_1sph.copy()
         part_weights[fi[ja]>1] /= fi[ja,fi[ja]>1]
 
-        part_weights1 = numpy.zeros((natm,3,ngrid_1sph))
+        atmlst, fi1 = _make_fi1_block(pcmobj, r_vdw, ja, fi[ja])
+        part_weights1 = numpy.zeros((len(atmlst),3,ngrid_1sph))
         tmp = part_weights[fi[ja]>1] / fi[ja,fi[ja]>1]
-        part_weights1[:,:,fi[ja]>1] = -tmp * fi1[:,:,ja,fi[ja]>1]
+        part_weights1[:,:,fi[ja]>1] = -tmp * fi1[:,:,fi[ja]>1]
 
         for ka in ddcosmo.atoms_with_vdw_overlap(ja, atom_coords, r_vdw):
             vjk = r_vdw[ja] * coords_1sph + atom_coords[ja] - atom_coords[ka]
@@ -184,7 +241,7 @@ def make_L1(pcmobj, r_vdw, ylm_1sph, fi):
                 Lmat[ja,:,ja,:,ka,p0:p1] += -fac * a
                 Lmat[ka,:,ja,:,ka,p0:p1] -= -fac * a
                 a = numpy.einsum('xn,azn,mn->azxm', ylm_1sph, wjk01, pol0[l])
-                Lmat[:,:,ja,:,ka,p0:p1] += -fac * a
+                Lmat[atmlst,:,ja,:,ka,p0:p1] += -fac * a
     return Lmat
 
 
@@ -232,27 +289,42 @@ def regularize_xt1(t, eta):
 
 def make_fi1(pcmobj, r_vdw):
     coords_1sph, weights_1sph = ddcosmo.make_grids_one_sphere(pcmobj.lebedev_order)
-    mol = pcmobj.mol
-    eta = pcmobj.eta
-    natm = mol.natm
-    atom_coords = mol.atom_coords()
+    natm = pcmobj.mol.natm
     ngrid_1sph = coords_1sph.shape[0]
+    fi = ddcosmo.make_fi(pcmobj, r_vdw)
     fi1 = numpy.zeros((natm,3,natm,ngrid_1sph))
     for ia in range(natm):
-        for ja in ddcosmo.atoms_with_vdw_overlap(ia, atom_coords, r_vdw):
-            v = r_vdw[ia]*coords_1sph + atom_coords[ia] - atom_coords[ja]
-            rv = lib.norm(v, axis=1)
-            t = rv / r_vdw[ja]
-            xt1 = regularize_xt1(t, eta*r_vdw[ja])
-            s_ij = v.T / rv
-            xt1 = 1./r_vdw[ja] * xt1 * s_ij
-            fi1[ia,:,ia] += xt1
-            fi1[ja,:,ia] -= xt1
-
-    fi = ddcosmo.make_fi(pcmobj, r_vdw)
-    fi1[:,:,fi<1e-20] = 0
+        atmlst, fi1_ia = _make_fi1_block(pcmobj, r_vdw, ia, fi[ia])
+        fi1[atmlst,:,ia] = fi1_ia
     return fi1
 
+def _make_fi1_block(pcmobj, r_vdw, ia, fi_ia):
+    '''The nonzero part of fi1[:,:,ia] of make_fi1. Only the atom ia and the
+    atoms whose vdW spheres overlap with atom ia contribute.
+
+    Returns:
+        atmlst : the atom ia and its overlapping atoms
+        fi1 : (len(atmlst),3,ngrid_1sph) array, fi1[:,:,ia] for the atoms in atmlst
+    '''
+    coords_1sph, weights_1sph = ddcosmo.make_grids_one_sphere(pcmobj.lebedev_order)
+    eta = pcmobj.eta
+    atom_coords = pcmobj.mol.atom_coords()
+    ngrid_1sph = coords_1sph.shape[0]
+    nearby = ddcosmo.atoms_with_vdw_overlap(ia, atom_coords, r_vdw)
+    atmlst = numpy.append(ia, nearby)
+    fi1 = numpy.zeros((len(atmlst),3,ngrid_1sph))
+    for i, ja in enumerate(nearby):
+        v = r_vdw[ia]*coords_1sph + atom_coords[ia] - atom_coords[ja]
+        rv = lib.norm(v, axis=1)
+        t = rv / r_vdw[ja]
+        xt1 = regularize_xt1(t, eta*r_vdw[ja])
+        s_ij = v.T / rv
+        xt1 = 1./r_vdw[ja] * xt1 * s_ij
+        fi1[0] += xt1
+        fi1[i+1] -= xt1
+    fi1[:,:,fi_ia<1e-20] = 0
+    return atmlst, fi1
+
 def make_phi1(pcmobj, dm, r_vdw, ui, ylm_1sph):
     mol = pcmobj.mol
     natm = mol.natm
@@ -271,17 +343,9 @@ def make_phi1(pcmobj, dm, r_vdw, ui, ylm_1sph):
     coords_1sph, weights_1sph = ddcosmo.make_grids_one_sphere(pcmobj.lebedev_order)
     #extern_point_idx = ui > 0
 
-    fi1 = make_fi1(pcmobj, pcmobj.get_atomic_radii())
-    fi1[:,:,ui==0] = 0
-    ui1 = -fi1
-
-    ngrid_1sph = weights_1sph.size
-    v_phi0 = numpy.empty((natm,ngrid_1sph))
-    for ia in range(natm):
-        cav_coords = atom_coords[ia] + r_vdw[ia] * coords_1sph
-        d_rs = atom_coords.reshape(-1,1,3) - cav_coords
-        v_phi0[ia] = numpy.einsum('z,zp->p', atom_charges, 1./lib.norm(d_rs,axis=2))
-    phi1 = -numpy.einsum('n,ln,azjn,jn->azjl', weights_1sph, ylm_1sph, ui1, v_phi0)
+    fi = ddcosmo.make_fi(pcmobj, r_vdw)
+    nlm = ylm_1sph.shape[0]
+    phi1 = numpy.zeros((natm,3,natm,nlm))
 
     for ia in range(natm):
         cav_coords = atom_coords[ia] + r_vdw[ia] * coords_1sph
@@ -302,7 +366,15 @@ def make_phi1(pcmobj, dm, r_vdw, ui, ylm_1sph):
         fakemol = gto.fakemol_for_charges(cav_coords)
         v_nj = df.incore.aux_e2(mol, fakemol, intor=int3c2e, aosym='s1')
         v_phi = numpy.einsum('ij,ijk->k', dm, v_nj)
-        phi1[:,:,ia] += numpy.einsum('n,ln,azn,n->azl', weights_1sph, ylm_1sph, ui1[:,:,ia], v_phi)
+        # potential of nuclei on the cavity grids
+        d_rs = atom_coords.reshape(-1,1,3) - cav_coords
+        v_phi -= numpy.einsum('z,zp->p', atom_charges, 1./lib.norm(d_rs,axis=2))
+
+        # ui1[:,:,ia] = -fi1[:,:,ia] of make_fi1, nonzero for the atoms in atmlst
+        atmlst, fi1 = _make_fi1_block(pcmobj, r_vdw, ia, fi[ia])
+        fi1[:,:,ui[ia]==0] = 0
+        ui1 = -fi1
+        phi1[atmlst,:,ia] += numpy.einsum('n,ln,azn,n->azl', weights_1sph, ylm_1sph, ui1, v_phi)
 
         v_e1_nj = df.incore.aux_e2(mol, fakemol, intor=int3c2e_ip1, comp=3, aosym='s1')
         phi1_e2_nj  = numpy.einsum('ij,xijr->xr', dm, v_e1_nj)
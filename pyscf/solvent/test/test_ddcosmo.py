@@ -324,6 +324,33 @@ class KnownValues(unittest.TestCase):
         x = numpy.random.random(n)
         self.assertTrue(abs(Lref.dot(n)-L.dot(n)).max() < 1e-12)
 
+    def test_sparse_L(self):
+        pcm = ddcosmo.DDCOSMO(mol)
+        r_vdw = ddcosmo.get_atomic_radii(pcm)
+        n = mol.natm * (pcm.lmax+1)**2
+        coords_1sph, weights_1sph = ddcosmo.make_grids_one_sphere(pcm.lebedev_order)
+        ylm_1sph = numpy.vstack(sph.real_sph_vec(coords_1sph, pcm.lmax, True))
+        fi = ddcosmo.make_fi(pcm, r_vdw)
+        L = ddcosmo.make_L(pcm, r_vdw, ylm_1sph, fi).reshape(n,n)
+        Lsp = ddcosmo.make_L_sparse(pcm, r_vdw, ylm_1sph, fi)
+        self.assertAlmostEqual(abs(Lsp.toarray() - L).max(), 0, 14)
+
+        numpy.random.seed(1)
+        b = numpy.random.random((n,2))
+        x = ddcosmo.solve_L(Lsp, b)
+        self.assertAlmostEqual(abs(L.dot(x) - b).max(), 0, 9)
+        x = ddcosmo.solve_L(Lsp, b[:,0], trans=True, x0=x[:,0])
+        self.assertAlmostEqual(abs(L.T.dot(x) - b[:,0]).max(), 0, 9)
+
+    def test_ddcosmo_scf_sparse_L(self):
+        natm_bak, ddcosmo.SPARSE_L_NATM = ddcosmo.SPARSE_L_NATM, 0
+        try:
+            mf = ddcosmo.ddcosmo_for_scf(scf.RHF(mol)).run(conv_tol=1e-11)
+        finally:
+            ddcosmo.SPARSE_L_NATM = natm_bak
+        ref = ddcosmo.ddcosmo_for_scf(scf.RHF(mol)).run(conv_tol=1e-11)
+        self.assertAlmostEqual(mf.e_tot, ref.e_tot, 9)
+
     def test_phi(self):
         pcm = ddcosmo.DDCOSMO(mol)
         r_vdw = ddcosmo.get_atomic_radii(pcm)
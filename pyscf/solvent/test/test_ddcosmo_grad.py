@@ -774,6 +774,20 @@ class KnownValues(unittest.TestCase):
         L_2 = ddcosmo.make_L(pcmobj, r_vdw, ylm_1sph, fi)
         self.assertAlmostEqual(abs((L_2-L_1)/dx - L1[0,2]).max(), 0, 7)
 
+    def test_contract_L1(self):
+        pcmobj = ddcosmo.DDCOSMO(mol0)
+        r_vdw = pcmobj.get_atomic_radii()
+        coords_1sph, weights_1sph = ddcosmo.make_grids_one_sphere(pcmobj.lebedev_order)
+        ylm_1sph = numpy.vstack(sph.real_sph_vec(coords_1sph, pcmobj.lmax, True))
+        fi = ddcosmo.make_fi(pcmobj, r_vdw)
+        L1 = ddcosmo_grad.make_L1(pcmobj, r_vdw, ylm_1sph, fi)
+
+        numpy.random.seed(2)
+        S, X = numpy.random.random((2, mol0.natm, (pcmobj.lmax+1)**2))
+        ref = numpy.einsum('aziljm,il,jm->az', L1, S, X)
+        de = ddcosmo_grad.contract_L1(pcmobj, r_vdw, ylm_1sph, fi, S, X)
+        self.assertAlmostEqual(abs(de - ref).max(), 0, 12)
+
     def test_e_cosmo_grad(self):
         pcmobj = ddcosmo.DDCOSMO(mol0)
         de = ddcosmo_grad.kernel(pcmobj, dm)
@@ -38,8 +38,10 @@
 
 import sys
 import re
+import collections
 import numpy
 import scipy.linalg
+import scipy.spatial
 from pyscf.gto import mole
 from pyscf.lib import norm
 from pyscf.lib import logger
@@ -48,6 +50,10 @@ from pyscf.symm.param import OPERATOR_TABLE
 from pyscf import __config__
 
 TOLERANCE = getattr(__config__, 'symm_geom_tol', 1e-5)
+# Number of geometries whose detect_symm results are kept in memory
+CACHE_SIZE = getattr(__config__, 'symm_geom_cache_size', 32)
+# Number of nearest neighbours in the distance fingerprints of atoms
+NNEIGHBOURS = getattr(__config__, 'symm_geom_nneighbours', 8)
 
 # For code compatiblity in python-2 and python-3
 if sys.version_info >= (3,):
@@ -123,12 +129,36 @@ def detect_symm(atoms, basis=None, verbose=logger.WARN):
     '''Detect the point group symmetry for given molecule.
 
     Return group name, charge center, and nex_axis (three rows for x,y,z)
+
+    The results are cached for the last CACHE_SIZE geometries.
     '''
     if isinstance(verbose, logger.Logger):
         log = verbose
     else:
         log = logger.Logger(sys.stdout, verbose)
 
+    key = _geometry_key(atoms, basis)
+    if key in _detect_symm_cache:
+        log.debug('Point group symmetry of the geometry found in cache')
+        _detect_symm_cache.move_to_end(key)
+    else:
+        _detect_symm_cache[key] = _detect_symm(atoms, basis, log)
+        if len(_detect_symm_cache) > CACHE_SIZE:
+            _detect_symm_cache.popitem(last=False)
+    gpname, charge_center, axes = _detect_symm_cache[key]
+    return gpname, charge_center.copy(), axes.copy()
+
+_detect_symm_cache = collections.OrderedDict()
+
+def _geometry_key(atoms, basis):
+    '''Hashable key of the geometry. Atoms of different basis are
+    distinguished as SymmSys does'''
+    atomtypes = mole.atom_types(atoms, basis)
+    atomtypes = tuple(sorted((k, tuple(v)) for k, v in atomtypes.items()))
+    coords = numpy.asarray([a[1] for a in atoms], dtype=float)
+    return TOLERANCE, atomtypes, coords.tobytes()
+
+def _detect_symm(atoms, basis, log):
     tol = TOLERANCE / numpy.sqrt(1+len(atoms))
     decimals = int(-numpy.log10(tol))
     log.debug('geometry tol = %g', tol)
@@ -537,7 +567,22 @@ class SymmSys(object):
         idx = numpy.argsort(numpy.hstack(idx))
         self.atoms = numpy.hstack((fake_chgs.reshape(-1,1), coords))[idx]
 
+        # Distances to the nearest neighbours are invariant under the
+        # symmetry operations. They are used to split the atoms of the same
+        # distance to the center into smaller groups.
+        coords = self.atoms[:,1:]
+        natm = len(coords)
+        if natm > 1:
+            k = min(NNEIGHBOURS, natm-1) + 1
+            fingerprints = scipy.spatial.cKDTree(coords).query(coords, k)[0][:,1:]
+        else:
+            fingerprints = numpy.zeros((natm,0))
+
         self.group_atoms_by_distance = []
+        # Comparison tolerance of each group in symmetric_for. It is
+        # determined by the size of the equal-distance group before the
+        # fingerprint splitting, as the criterion of _vec_in_vecs.
+        self._group_tols = []
         decimals = int(-numpy.log10(TOLERANCE)) - 1
         for index in self.atomtypes.values():
             index = numpy.asarray(index)
@@ -545,7 +590,12 @@ class SymmSys(object):
             dists = numpy.around(norm(c, axis=1), decimals)
             u, idx = numpy.unique(dists, return_inverse=True)
             for i, s in enumerate(u):
-                self.group_atoms_by_distance.append(index[idx == i])
+                groups = _split_by_fingerprints(index[idx == i], fingerprints,
+                                                10**-decimals)
+                self.group_atoms_by_distance.extend(groups)
+                tol = TOLERANCE * numpy.sqrt(numpy.count_nonzero(idx == i))
+                self._group_tols.extend([tol] * len(groups))
+        self._lookup_trees = {}
 
     def cartesian_tensor(self, n):
         z = self.atoms[:,0]
@@ -559,11 +609,17 @@ class SymmSys(object):
         return e[-ncart:], c[:,-ncart:]
 
     def symmetric_for(self, op):
-        for lst in self.group_atoms_by_distance:
+        for k, lst in enumerate(self.group_atoms_by_distance):
             r0 = self.atoms[lst,1:]
             r1 = numpy.dot(r0, op)
 # FIXME: compare whehter two sets of coordinates are identical
-            yield all((_vec_in_vecs(x, r0) for x in r1))
+            # Same criterion as _vec_in_vecs, using the tree of the group
+            # to find the closest atoms
+            if k not in self._lookup_trees:
+                self._lookup_trees[k] = scipy.spatial.cKDTree(r0)
+            tol = self._group_tols[k]
+            dist = self._lookup_trees[k].query(r1, p=1, distance_upper_bound=tol)[0]
+            yield numpy.all(dist < tol)
 
     def has_icenter(self):
         return all(self.symmetric_for(-1))
@@ -587,24 +643,24 @@ class SymmSys(object):
             if natm > 1:
                 coords = self.atoms[lst,1:]
 # possible C2 axis
-                for i in range(1, natm):
-                    if abs(coords[0]+coords[i]).sum() > TOLERANCE:
-                        maybe_cn.append((coords[0]+coords[i], 2))
-                    else: # abs(coords[0]-coords[i]).sum() > TOLERANCE:
-                        maybe_cn.append((coords[0]-coords[i], 2))
+                c2 = coords[0] + coords[1:]
+                inverted = abs(c2).sum(axis=1) <= TOLERANCE
+                c2[inverted] = coords[0] - coords[1:][inverted]
+                maybe_cn.extend((v, 2) for v in c2)
 
 # atoms of equal distances may be associated with rotation axis > C2.
                 r0 = coords - coords[0]
                 distance = norm(r0, axis=1)
                 eq_distance = abs(distance[:,None] - distance) < TOLERANCE
-                for i in range(2, natm):
-                    for j in numpy.where(eq_distance[i,:i])[0]:
-                        cos = numpy.dot(r0[i],r0[j]) / (distance[i]*distance[j])
-                        ang = numpy.arccos(cos)
-                        nfrac = numpy.pi*2 / (numpy.pi-ang)
-                        n = int(numpy.around(nfrac))
-                        if abs(nfrac-n) < TOLERANCE:
-                            maybe_cn.append((numpy.cross(r0[i],r0[j]),n))
+                eq_distance[:2] = False
+                i, j = numpy.nonzero(numpy.tril(eq_distance, -1))
+                cos = numpy.einsum('ix,ix->i', r0[i], r0[j]) / (distance[i]*distance[j])
+                ang = numpy.arccos(cos.clip(-1, 1))
+                nfrac = numpy.pi*2 / (numpy.pi-ang)
+                n = numpy.around(nfrac).astype(int)
+                mask = abs(nfrac-n) < TOLERANCE
+                i, j, n = i[mask], j[mask], n[mask]
+                maybe_cn.extend(zip(numpy.cross(r0[i],r0[j]), n))
 
         # remove zero-vectors and duplicated vectors
         vecs = numpy.vstack([x[0] for x in maybe_cn])
@@ -618,21 +674,23 @@ class SymmSys(object):
             vecs = vecs[(abs(cos-1) < TOLERANCE) | (abs(cos+1) < TOLERANCE)]
             ns = ns[(abs(cos-1) < TOLERANCE) | (abs(cos+1) < TOLERANCE)]
 
+        # Parallel vectors are found by hashing the rounded axes. Vectors of
+        # the same axis may be rounded to different keys. It only leads to
+        # duplicated candidates.
+        decimals = int(-numpy.log10(TOLERANCE)) - 1
+        pvecs = _pseudo_vectors(vecs)
+        sign = numpy.sign(numpy.einsum('ix,ix->i', pvecs, vecs))
+        keys = numpy.around(pvecs, decimals) + 0.
+        groups = {}
+        for k, key in enumerate(map(bytes, keys)):
+            groups.setdefault(key, []).append(k)
+
         possible_cn = []
-        seen = numpy.zeros(len(vecs), dtype=bool)
-        for k, v in enumerate(vecs):
-            if not seen[k]:
-                where1 = numpy.einsum('ix->i', abs(vecs[k:] - v)) < TOLERANCE
-                where1 = numpy.where(where1)[0] + k
-                where2 = numpy.einsum('ix->i', abs(vecs[k:] + v)) < TOLERANCE
-                where2 = numpy.where(where2)[0] + k
-                seen[where1] = True
-                seen[where2] = True
-
-                vk = _normalize((numpy.einsum('ix->x', vecs[where1]) -
-                                 numpy.einsum('ix->x', vecs[where2])))
-                for n in (set(ns[where1]) | set(ns[where2])):
-                    possible_cn.append((vk,n))
+        for idx in groups.values():
+            # in the direction of the first vector, as the pairwise search did
+            vk = _normalize(numpy.einsum('ix,i->x', vecs[idx], sign[idx]*sign[idx[0]]))
+            for n in set(ns[idx]):
+                possible_cn.append((vk,n))
         return possible_cn
 
     def search_c2x(self, zaxis, n):
@@ -711,6 +769,23 @@ def _normalize(vecs):
     else:
         return vecs / (norm(vecs, axis=1).reshape(-1,1) + 1e-200)
 
+def _split_by_fingerprints(index, fingerprints, tol):
+    '''Split the atoms into groups of identical fingerprints. Values closer
+    than tol are chained into the same group.'''
+    groups = [index]
+    for x in fingerprints.T:
+        new_groups = []
+        for idx in groups:
+            if len(idx) > 1:
+                order = numpy.argsort(x[idx], kind='stable')
+                gaps = numpy.where(numpy.diff(x[idx][order]) > tol)[0] + 1
+                new_groups.extend(numpy.sort(sub) for sub in
+                                  numpy.split(idx[order], gaps))
+            else:
+                new_groups.append(idx)
+        groups = new_groups
+    return groups
+
 def _vec_in_vecs(vec, vecs):
     norm = numpy.sqrt(len(vecs))
     return min(numpy.einsum('ix->i', abs(vecs-vec))/norm) < TOLERANCE
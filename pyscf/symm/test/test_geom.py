@@ -860,6 +860,50 @@ H   2.041481  -0.080642  -0.024174''')
         self.assertEqual(l, 'C2v')
         self.assertAlmostEqual(axes[2,0]*axes[2,1], -.5)
 
+    def test_large_cluster(self):
+        r = numpy.arange(-5, 6)
+        coords = numpy.array(numpy.meshgrid(r, r, r, indexing='ij')).reshape(3,-1).T
+        coords = coords[(coords.sum(axis=1) % 2 == 0) &
+                        (numpy.linalg.norm(coords, axis=1) < 5.01)] * 2.
+        atoms = [['Au', c] for c in numpy.dot(coords, u)]
+        gpname, orig, axes = geom.detect_symm(atoms)
+        self.assertEqual(gpname, 'Oh')
+
+        coords[:,2] *= 1.02
+        atoms = [['Au', c] for c in numpy.dot(coords, u)]
+        gpname, orig, axes = geom.detect_symm(atoms)
+        self.assertEqual(gpname, 'D4h')
+        self.assertAlmostEqual(abs(abs(axes[2]) - abs(u[2])).max(), 0, 9)
+
+    def test_split_by_fingerprints(self):
+        # The two atoms (1, 2, 0) and (0, 0, sqrt(5)) have the same distance
+        # to the center but different environments
+        atoms = [['H', (1, 0, 0)], ['H', (-1, 0, 0)],
+                 ['C', (1, 2, 0)], ['C', (-1, -2, 0)],
+                 ['C', (0, 0, 5**.5)], ['C', (0, 0, -5**.5)]]
+        rawsys = geom.SymmSys(atoms)
+        groups = [list(x) for x in rawsys.group_atoms_by_distance]
+        self.assertEqual(groups, [[0, 1], [2, 3], [4, 5]])
+        # Tolerance is determined by the equal-distance group of 4 C atoms
+        self.assertAlmostEqual(rawsys._group_tols[1], geom.TOLERANCE*2, 12)
+        self.assertAlmostEqual(rawsys._group_tols[2], geom.TOLERANCE*2, 12)
+        self.assertEqual(geom.detect_symm(atoms)[0], 'C2h')
+
+    def test_detect_symm_cache(self):
+        atoms = [['C', c] for c in numpy.dot(make60(1.5, 1), u)]
+        gpname, orig, axes = geom.detect_symm(atoms)
+        axes[:] = 0
+        gpname1, orig1, axes1 = geom.detect_symm(atoms)
+        self.assertEqual(gpname1, 'Ih')
+        self.assertAlmostEqual(abs(numpy.dot(axes1, axes1.T) - numpy.eye(3)).max(), 0, 9)
+
+        # Different basis sets break the symmetry
+        gpname = geom.detect_symm(atoms, {'C': 'sto3g', 'C1': 'ccpvdz'})[0]
+        self.assertEqual(gpname, 'Ih')
+        atoms[0][0] = 'C1'
+        gpname = geom.detect_symm(atoms, {'C': 'sto3g', 'C1': 'ccpvdz'})[0]
+        self.assertEqual(gpname, 'Cs')
+
     def test_sort_coords(self):
         c = numpy.random.random((5,3))
         c0 = symm.sort_coords(c)
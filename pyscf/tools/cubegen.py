@@ -43,7 +43,6 @@ import numpy
 import pyscf
 from pyscf import lib
 from pyscf import gto
-from pyscf import df
 from pyscf.dft import numint
 from pyscf import __config__
 
@@ -197,11 +196,7 @@ def mep(mol, outfile, dm, nx=80, ny=80, nz=80, resolution=RESOLUTION,
         Vnuc += Z / numpy.einsum('xi,xi->x', rp, rp)**.5
 
     # Potential of electron density
-    Vele = numpy.empty_like(Vnuc)
-    for p0, p1 in lib.prange(0, Vele.size, 600):
-        fakemol = gto.fakemol_for_charges(coords[p0:p1])
-        ints = df.incore.aux_e2(mol, fakemol)
-        Vele[p0:p1] = numpy.einsum('ijp,ij->p', ints, dm)
+    Vele = mol.eval_potential(dm, coords)
 
     MEP = Vnuc - Vele     # MEP at each point
     MEP = MEP.reshape(cc.nx,cc.ny,cc.nz)
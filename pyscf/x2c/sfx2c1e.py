@@ -17,6 +17,7 @@
 1-electron Spin-free X2C approximation
 '''
 
+import copy
 from functools import reduce
 import numpy
 import scipy.linalg
@@ -178,20 +179,11 @@ class SpinFreeX2CHelper(x2c.X2CHelperMixin):
             x = self.get_xmat(xmol)
             h1 = x2c._get_hcore_fw(t, v, w, s, x, c)
 
+        elif 'LOCAL' in self.approx.upper():
+            h1 = x2c._get_hcore_fw_local(t, v, w, self._get_atom_xr(xmol), c)
+
         elif 'ATOM' in self.approx.upper():
-            atom_slices = xmol.offset_nr_by_atom()
-            nao = xmol.nao_nr()
-            x = numpy.zeros((nao,nao))
-            for ia in range(xmol.natm):
-                ish0, ish1, p0, p1 = atom_slices[ia]
-                shls_slice = (ish0, ish1, ish0, ish1)
-                t1 = xmol.intor('int1e_kin', shls_slice=shls_slice)
-                s1 = xmol.intor('int1e_ovlp', shls_slice=shls_slice)
-                with xmol.with_rinv_at_nucleus(ia):
-                    z = -xmol.atom_charge(ia)
-                    v1 = z * xmol.intor('int1e_rinv', shls_slice=shls_slice)
-                    w1 = z * xmol.intor('int1e_prinvp', shls_slice=shls_slice)
-                x[p0:p1,p0:p1] = x2c._x2c1e_xmatrix(t1, v1, w1, s1, c)
+            x = x2c._block_diag_by_atom(self._get_atom_xr(xmol), 0)
             h1 = x2c._get_hcore_fw(t, v, w, s, x, c)
 
         else:
@@ -206,6 +198,19 @@ class SpinFreeX2CHelper(x2c.X2CHelperMixin):
             h1 = reduce(numpy.dot, (contr_coeff.T, h1, contr_coeff))
         return h1
 
+    def _atom_ao_indices(self, xmol):
+        return [((ish0, ish1), numpy.arange(p0, p1))
+                for ish0, ish1, p0, p1 in xmol.offset_nr_by_atom()]
+
+    def _get_atom_1e(self, xmol, ia, shls_slice):
+        t1 = xmol.intor('int1e_kin', shls_slice=shls_slice)
+        s1 = xmol.intor('int1e_ovlp', shls_slice=shls_slice)
+        with xmol.with_rinv_at_nucleus(ia):
+            z = -xmol.atom_charge(ia)
+            v1 = z * xmol.intor('int1e_rinv', shls_slice=shls_slice)
+            w1 = z * xmol.intor('int1e_prinvp', shls_slice=shls_slice)
+        return t1, v1, w1, s1
+
     def picture_change(self, even_operator=(None, None), odd_operator=None):
         '''Picture change for even_operator + odd_operator
 
@@ -247,20 +252,8 @@ class SpinFreeX2CHelper(x2c.X2CHelperMixin):
         c = lib.param.LIGHT_SPEED
         assert('1E' in self.approx.upper())
 
-        if 'ATOM' in self.approx.upper():
-            atom_slices = xmol.offset_nr_by_atom()
-            nao = xmol.nao_nr()
-            x = numpy.zeros((nao,nao))
-            for ia in range(xmol.natm):
-                ish0, ish1, p0, p1 = atom_slices[ia]
-                shls_slice = (ish0, ish1, ish0, ish1)
-                t1 = xmol.intor('int1e_kin', shls_slice=shls_slice)
-                s1 = xmol.intor('int1e_ovlp', shls_slice=shls_slice)
-                with xmol.with_rinv_at_nucleus(ia):
-                    z = -xmol.atom_charge(ia)
-                    v1 = z * xmol.intor('int1e_rinv', shls_slice=shls_slice)
-                    w1 = z * xmol.intor('int1e_prinvp', shls_slice=shls_slice)
-                x[p0:p1,p0:p1] = x2c._x2c1e_xmatrix(t1, v1, w1, s1, c)
+        if 'ATOM' in self.approx.upper() or 'LOCAL' in self.approx.upper():
+            x = x2c._block_diag_by_atom(self._get_atom_xr(xmol), 0)
         else:
             t = xmol.intor_symmetric('int1e_kin')
             v = xmol.intor_symmetric('int1e_nuc')
@@ -272,6 +265,8 @@ class SpinFreeX2CHelper(x2c.X2CHelperMixin):
     def _get_rmat(self, x=None):
         '''The matrix (in AO basis) that changes metric from NESC metric to NR metric'''
         xmol = self.get_xmol()[0]
+        if 'LOCAL' in self.approx.upper():
+            return x2c._block_diag_by_atom(self._get_atom_xr(xmol), 1)
         if x is None:
             x = self.get_xmat(xmol)
         c = lib.param.LIGHT_SPEED
@@ -283,10 +278,17 @@ class SpinFreeX2CHelper(x2c.X2CHelperMixin):
     def hcore_deriv_generator(self, mol=None, deriv=1):
         from pyscf.x2c import sfx2c1e_grad
         from pyscf.x2c import sfx2c1e_hess
+        x2cobj = self
+        if 'LOCAL' in self.approx.upper():
+            logger.warn(self, 'Derivatives of local X2C Hamiltonian are not '
+                        'available. Derivatives of the full X2C Hamiltonian '
+                        'are used instead.')
+            x2cobj = copy.copy(self)
+            x2cobj.approx = '1e'
         if deriv == 1:
-            return sfx2c1e_grad.hcore_grad_generator(self, mol)
+            return sfx2c1e_grad.hcore_grad_generator(x2cobj, mol)
         elif deriv == 2:
-            return sfx2c1e_hess.hcore_hess_generator(self, mol)
+            return sfx2c1e_hess.hcore_hess_generator(x2cobj, mol)
         else:
             raise NotImplementedError
 
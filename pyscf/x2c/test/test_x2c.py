@@ -211,6 +211,55 @@ C     F
         self.assertTrue(mf.converged)
         self.assertAlmostEqual(mf.e_tot, ref.e_tot, 10)
 
+    def test_ghf_atom1e(self):
+        # For a single atom, the atomic X2C approximation is exact. The atom
+        # blocks must cover both the alpha and the beta spin-orbitals.
+        mol1 = gto.M(atom='C', basis='ccpvdz')
+        with_x2c = mol1.GHF().x2c1e().with_x2c
+        x_ref = with_x2c.get_xmat()
+        h_ref = with_x2c.get_hcore()
+        with_x2c.approx = 'atom1e'
+        self.assertAlmostEqual(abs(with_x2c.get_xmat() - x_ref).max(), 0, 9)
+        self.assertAlmostEqual(abs(with_x2c.get_hcore() - h_ref).max(), 0, 9)
+
+    def test_local_x2c(self):
+        mf = scf.RHF(mol).sfx2c1e()
+        e_ref = mf.kernel()
+        mf.with_x2c.approx = 'local1e'
+        e = mf.kernel()
+        self.assertAlmostEqual(e, e_ref, 4)
+        # O and H blocks, the two H atoms share their X and R
+        self.assertEqual(len(mf.with_x2c._atom_xr_cache), 2)
+
+        mf = scf.X2C(mol)
+        mf.with_x2c.approx = 'atom1e'
+        e_atom = mf.kernel()
+        mf.with_x2c.approx = 'local1e'
+        e_local = mf.kernel()
+        self.assertAlmostEqual(e_local, e_ref, 4)
+
+        mf = scf.GHF(mol).x2c1e()
+        mf.with_x2c.approx = 'atom1e'
+        self.assertAlmostEqual(mf.kernel(), e_atom, 8)
+        mf.with_x2c.approx = 'local1e'
+        self.assertAlmostEqual(mf.kernel(), e_local, 8)
+
+        # Compare to the FW Hamiltonian with the dense X and R matrices
+        with_x2c = x2c.X2C(mol).set(approx='local1e')
+        xmol = with_x2c.get_xmol()[0]
+        c = lib.param.LIGHT_SPEED
+        t = xmol.intor_symmetric('int1e_spsp_spinor') * .5
+        v = xmol.intor_symmetric('int1e_nuc_spinor')
+        w = xmol.intor_symmetric('int1e_spnucsp_spinor')
+        h1 = x2c._get_hcore_fw_local(t, v, w, with_x2c._get_atom_xr(xmol), c)
+        x = with_x2c.get_xmat()
+        r = with_x2c._get_rmat()
+        xh = x.conj().T
+        ref = (v + t.dot(x) + xh.dot(t) - xh.dot(t).dot(x) +
+               xh.dot(w).dot(x) * (.25/c**2))
+        ref = r.conj().T.dot(ref).dot(r)
+        self.assertAlmostEqual(abs(h1 - ref).max(), 0, 9)
+
 
 if __name__ == "__main__":
     print("Full Tests for x2c")
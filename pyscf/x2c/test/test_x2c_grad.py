@@ -268,6 +268,15 @@ class KnownValues(unittest.TestCase):
             fh = x2cobj.hcore_deriv_generator(deriv=1)
             self.assertAlmostEqual(abs(fh(0)[2] - fh_ref).max(), 0, 7)
 
+    def test_hfw_local1e(self):
+        # local1e falls back to the derivatives of the full X2C Hamiltonian
+        x2cobj = sfx2c1e.SpinFreeX2C(mol)
+        fh_ref = x2cobj.hcore_deriv_generator(deriv=1)(0)
+        x2cobj.approx = 'LOCAL1E'
+        fh = x2cobj.hcore_deriv_generator(deriv=1)
+        self.assertEqual(x2cobj.approx, 'LOCAL1E')
+        self.assertAlmostEqual(abs(fh(0) - fh_ref).max(), 0, 12)
+
 if __name__ == "__main__":
     print("Full Tests for sfx2c1e gradients")
     unittest.main()
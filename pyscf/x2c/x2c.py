@@ -15,6 +15,7 @@
 
 
 from functools import reduce
+from concurrent.futures import ThreadPoolExecutor
 import copy
 import numpy
 import scipy.linalg
@@ -32,13 +33,15 @@ class X2CHelperMixin(lib.StreamObject):
     '''2-component X2c (including spin-free and spin-dependent terms) in
     the j-adapted spinor basis.
     '''
-    approx = getattr(__config__, 'x2c_X2C_approx', '1e')  # 'atom1e'
+    approx = getattr(__config__, 'x2c_X2C_approx', '1e')  # 'atom1e', 'local1e'
     xuncontract = getattr(__config__, 'x2c_X2C_xuncontract', True)
     basis = getattr(__config__, 'x2c_X2C_basis', None)
     def __init__(self, mol):
         self.mol = mol
         self.stdout = mol.stdout
         self.verbose = mol.verbose
+        # X and R matrices of atoms, indexed by element and basis
+        self._atom_xr_cache = {}
 
     def dump_flags(self, verbose=None):
         log = logger.new_logger(self, verbose)
@@ -85,20 +88,11 @@ class X2CHelperMixin(lib.StreamObject):
             x = self.get_xmat(xmol)
             h1 = _get_hcore_fw(t, v, w, s, x, c)
 
+        elif 'LOCAL' in self.approx.upper():
+            h1 = _get_hcore_fw_local(t, v, w, self._get_atom_xr(xmol), c)
+
         elif 'ATOM' in self.approx.upper():
-            atom_slices = xmol.offset_2c_by_atom()
-            n2c = xmol.nao_2c()
-            x = numpy.zeros((n2c,n2c), dtype=numpy.complex128)
-            for ia in range(xmol.natm):
-                ish0, ish1, p0, p1 = atom_slices[ia]
-                shls_slice = (ish0, ish1, ish0, ish1)
-                s1 = xmol.intor('int1e_ovlp_spinor', shls_slice=shls_slice)
-                t1 = xmol.intor('int1e_spsp_spinor', shls_slice=shls_slice) * .5
-                with xmol.with_rinv_at_nucleus(ia):
-                    z = -xmol.atom_charge(ia)
-                    v1 = z*xmol.intor('int1e_rinv_spinor', shls_slice=shls_slice)
-                    w1 = z*xmol.intor('int1e_sprinvsp_spinor', shls_slice=shls_slice)
-                x[p0:p1,p0:p1] = _x2c1e_xmatrix(t1, v1, w1, s1, c)
+            x = _block_diag_by_atom(self._get_atom_xr(xmol), 0)
             h1 = _get_hcore_fw(t, v, w, s, x, c)
 
         else:
@@ -229,20 +223,8 @@ class X2CHelperMixin(lib.StreamObject):
         c = lib.param.LIGHT_SPEED
         assert('1E' in self.approx.upper())
 
-        if 'ATOM' in self.approx.upper():
-            atom_slices = xmol.offset_2c_by_atom()
-            n2c = xmol.nao_2c()
-            x = numpy.zeros((n2c,n2c), dtype=numpy.complex128)
-            for ia in range(xmol.natm):
-                ish0, ish1, p0, p1 = atom_slices[ia]
-                shls_slice = (ish0, ish1, ish0, ish1)
-                s1 = xmol.intor('int1e_ovlp_spinor', shls_slice=shls_slice)
-                t1 = xmol.intor('int1e_spsp_spinor', shls_slice=shls_slice) * .5
-                with xmol.with_rinv_at_nucleus(ia):
-                    z = -xmol.atom_charge(ia)
-                    v1 = z*xmol.intor('int1e_rinv_spinor', shls_slice=shls_slice)
-                    w1 = z*xmol.intor('int1e_sprinvsp_spinor', shls_slice=shls_slice)
-                x[p0:p1,p0:p1] = _x2c1e_xmatrix(t1, v1, w1, s1, c)
+        if 'ATOM' in self.approx.upper() or 'LOCAL' in self.approx.upper():
+            x = _block_diag_by_atom(self._get_atom_xr(xmol), 0)
         else:
             s = xmol.intor_symmetric('int1e_ovlp_spinor')
             t = xmol.intor_symmetric('int1e_spsp_spinor') * .5
@@ -254,6 +236,8 @@ class X2CHelperMixin(lib.StreamObject):
     def _get_rmat(self, x=None):
         '''The matrix (in AO basis) that changes metric from NESC metric to NR metric'''
         xmol = self.get_xmol()[0]
+        if 'LOCAL' in self.approx.upper():
+            return _block_diag_by_atom(self._get_atom_xr(xmol), 1)
         if x is None:
             x = self.get_xmat(xmol)
         c = lib.param.LIGHT_SPEED
@@ -262,6 +246,54 @@ class X2CHelperMixin(lib.StreamObject):
         s1 = s + reduce(numpy.dot, (x.conj().T, t, x)) * (.5/c**2)
         return _get_r(s, s1)
 
+    def _atom_ao_indices(self, xmol):
+        '''Shell ranges and AO indices of each atom'''
+        return [((ish0, ish1), numpy.arange(p0, p1))
+                for ish0, ish1, p0, p1 in xmol.offset_2c_by_atom()]
+
+    def _get_atom_1e(self, xmol, ia, shls_slice):
+        '''One-center t, v, w, s integrals of atom ia'''
+        s1 = xmol.intor('int1e_ovlp_spinor', shls_slice=shls_slice)
+        t1 = xmol.intor('int1e_spsp_spinor', shls_slice=shls_slice) * .5
+        with xmol.with_rinv_at_nucleus(ia):
+            z = -xmol.atom_charge(ia)
+            v1 = z*xmol.intor('int1e_rinv_spinor', shls_slice=shls_slice)
+            w1 = z*xmol.intor('int1e_sprinvsp_spinor', shls_slice=shls_slice)
+        return t1, v1, w1, s1
+
+    def _get_atom_xr(self, xmol):
+        '''X and R matrices of each atom, obtained from the one-center Dirac
+        equation of the atom. The blocks are computed once for each
+        (element, basis) and solved in parallel for different elements.
+
+        Returns:
+            A list of (idx, x, r) for each atom, idx being the AO indices of
+            the atom
+        '''
+        c = lib.param.LIGHT_SPEED
+        atom_indices = self._atom_ao_indices(xmol)
+        keys = [(c,) + key for key in _atom_keys(xmol)]
+        cache = self._atom_xr_cache
+        ints = {}
+        for ia, key in enumerate(keys):
+            if key not in cache and key not in ints:
+                ish0, ish1 = atom_indices[ia][0]
+                ints[key] = self._get_atom_1e(xmol, ia, (ish0, ish1, ish0, ish1))
+
+        def solve(key):
+            t1, v1, w1, s1 = ints.pop(key)
+            x = _x2c1e_xmatrix(t1, v1, w1, s1, c)
+            s1nesc = s1 + reduce(numpy.dot, (x.conj().T, t1, x)) * (.5/c**2)
+            return x, _get_r(s1, s1nesc)
+
+        if ints:
+            todo = list(ints)
+            with ThreadPoolExecutor(max_workers=min(len(todo), lib.num_threads())) as ex:
+                cache.update(zip(todo, ex.map(solve, todo)))
+            logger.debug(self, 'X2C atomic X, R: %d atoms, %d blocks computed',
+                         xmol.natm, len(todo))
+        return [(idx,) + cache[key] for key, (_, idx) in zip(keys, atom_indices)]
+
     def reset(self, mol):
         '''Reset mol and clean up relevant attributes for scanner mode'''
         self.mol = mol
@@ -298,22 +330,11 @@ class SpinOrbitalX2CHelper(X2CHelperMixin):
             x = self.get_xmat(xmol)
             h1 = _get_hcore_fw(t, v, w, s, x, c)
 
+        elif 'LOCAL' in self.approx.upper():
+            h1 = _get_hcore_fw_local(t, v, w, self._get_atom_xr(xmol), c)
+
         elif 'ATOM' in self.approx.upper():
-            atom_slices = xmol.offset_nr_by_atom()
-            # spin-orbital basis is twice the size of NR basis
-            atom_slices[:,2:] *= 2
-            nao = xmol.nao_nr() * 2
-            x = numpy.zeros((nao,nao))
-            for ia in range(xmol.natm):
-                ish0, ish1, p0, p1 = atom_slices[ia]
-                shls_slice = (ish0, ish1, ish0, ish1)
-                t1 = _block_diag(xmol.intor('int1e_kin', shls_slice=shls_slice))
-                s1 = _block_diag(xmol.intor('int1e_ovlp', shls_slice=shls_slice))
-                with xmol.with_rinv_at_nucleus(ia):
-                    z = -xmol.atom_charge(ia)
-                    v1 = _block_diag(z * xmol.intor('int1e_rinv', shls_slice=shls_slice))
-                    w1 = _sigma_dot(z * xmol.intor('int1e_sprinvsp', shls_slice=shls_slice))
-                x[p0:p1,p0:p1] = _x2c1e_xmatrix(t1, v1, w1, s1, c)
+            x = _block_diag_by_atom(self._get_atom_xr(xmol), 0)
             h1 = _get_hcore_fw(t, v, w, s, x, c)
 
         else:
@@ -329,6 +350,23 @@ class SpinOrbitalX2CHelper(X2CHelperMixin):
             h1 = reduce(lib.dot, (contr_coeff.T, h1, contr_coeff))
         return h1
 
+    def _atom_ao_indices(self, xmol):
+        # alpha and beta AOs of an atom are in the two halves of the
+        # spin-orbital basis
+        nao = xmol.nao_nr()
+        return [((ish0, ish1), numpy.append(numpy.arange(p0, p1),
+                                            numpy.arange(nao+p0, nao+p1)))
+                for ish0, ish1, p0, p1 in xmol.offset_nr_by_atom()]
+
+    def _get_atom_1e(self, xmol, ia, shls_slice):
+        t1 = _block_diag(xmol.intor('int1e_kin', shls_slice=shls_slice))
+        s1 = _block_diag(xmol.intor('int1e_ovlp', shls_slice=shls_slice))
+        with xmol.with_rinv_at_nucleus(ia):
+            z = -xmol.atom_charge(ia)
+            v1 = _block_diag(z * xmol.intor('int1e_rinv', shls_slice=shls_slice))
+            w1 = _sigma_dot(z * xmol.intor('int1e_sprinvsp', shls_slice=shls_slice))
+        return t1, v1, w1, s1
+
     @lib.with_doc(X2CHelperMixin.picture_change.__doc__)
     def picture_change(self, even_operator=(None, None), odd_operator=None):
         mol = self.mol
@@ -360,22 +398,8 @@ class SpinOrbitalX2CHelper(X2CHelperMixin):
         c = lib.param.LIGHT_SPEED
         assert('1E' in self.approx.upper())
 
-        if 'ATOM' in self.approx.upper():
-            atom_slices = xmol.offset_nr_by_atom()
-            # spin-orbital basis is twice the size of NR basis
-            atom_slices[:,2:] *= 2
-            nao = xmol.nao_nr() * 2
-            x = numpy.zeros((nao,nao))
-            for ia in range(xmol.natm):
-                ish0, ish1, p0, p1 = atom_slices[ia]
-                shls_slice = (ish0, ish1, ish0, ish1)
-                t1 = _block_diag(xmol.intor('int1e_kin', shls_slice=shls_slice))
-                s1 = _block_diag(xmol.intor('int1e_ovlp', shls_slice=shls_slice))
-                with xmol.with_rinv_at_nucleus(ia):
-                    z = -xmol.atom_charge(ia)
-                    v1 = _block_diag(z * xmol.intor('int1e_rinv', shls_slice=shls_slice))
-                    w1 = _sigma_dot(z * xmol.intor('int1e_sprinvsp', shls_slice=shls_slice))
-                x[p0:p1,p0:p1] = _x2c1e_xmatrix(t1, v1, w1, s1, c)
+        if 'ATOM' in self.approx.upper() or 'LOCAL' in self.approx.upper():
+            x = _block_diag_by_atom(self._get_atom_xr(xmol), 0)
         else:
             t = _block_diag(xmol.intor_symmetric('int1e_kin'))
             v = _block_diag(xmol.intor_symmetric('int1e_nuc'))
@@ -387,6 +411,8 @@ class SpinOrbitalX2CHelper(X2CHelperMixin):
     def _get_rmat(self, x=None):
         '''The matrix (in AO basis) that changes metric from NESC metric to NR metric'''
         xmol = self.get_xmol()[0]
+        if 'LOCAL' in self.approx.upper():
+            return _block_diag_by_atom(self._get_atom_xr(xmol), 1)
         if x is None:
             x = self.get_xmat(xmol)
         c = lib.param.LIGHT_SPEED
@@ -861,6 +887,48 @@ def _get_hcore_fw(t, v, w, s, x, c):
     h1 = reduce(numpy.dot, (r.T.conj(), h1, r))
     return h1
 
+def _get_hcore_fw_local(t, v, w, atom_xr, c):
+    '''FW Hamiltonian with the atom-block diagonal X and R matrices
+    (the diagonal local approximation to the decoupling transformation)'''
+    tx = _dot_atom_xr_blocks(t, atom_xr, 0)
+    h1 = v + tx + tx.T.conj()
+    h1 -= _dot_atom_xr_blocks(tx.T.conj(), atom_xr, 0)
+    wx = _dot_atom_xr_blocks(w, atom_xr, 0)
+    h1 += _dot_atom_xr_blocks(wx.T.conj(), atom_xr, 0) * (.25/c**2)
+    # R^dag h R
+    h1 = _dot_atom_xr_blocks(h1, atom_xr, 1)
+    h1 = _dot_atom_xr_blocks(h1.T.conj(), atom_xr, 1).T.conj()
+    return h1
+
+def _dot_atom_xr_blocks(a, atom_xr, k):
+    '''a.dot(M) for M the block diagonal matrix assembled from the k-th
+    matrices (0 for X, 1 for R) of atom_xr'''
+    dtype = numpy.result_type(a, *[blk[1+k] for blk in atom_xr])
+    out = numpy.empty(a.shape, dtype=dtype)
+    for blk in atom_xr:
+        idx = blk[0]
+        out[:,idx] = numpy.dot(a[:,idx], blk[1+k])
+    return out
+
+def _block_diag_by_atom(atom_xr, k):
+    '''Assembles the block diagonal matrix of the k-th matrices of atom_xr'''
+    n = sum([len(blk[0]) for blk in atom_xr])
+    dtype = numpy.result_type(*[blk[1+k] for blk in atom_xr])
+    mat = numpy.zeros((n,n), dtype=dtype)
+    for blk in atom_xr:
+        idx = blk[0]
+        mat[idx[:,None],idx] = blk[1+k]
+    return mat
+
+def _atom_keys(mol):
+    '''Keys to identify the atoms which have the same one-center integrals'''
+    keys = []
+    for key, atm in zip(mole.atom_hash_keys(mol)[1], mol._atm):
+        # Drop the coordinates. Keep the radius of finite nuclear model
+        zeta = mol._env[atm[mole.PTR_ZETA]]
+        keys.append(key[:3] + key[4:] + (zeta,))
+    return keys
+
 def _get_r(s, snesc):
     # R^dag \tilde{S} R = S
     # R = S^{-1/2} [S^{-1/2}\tilde{S}S^{-1/2}]^{-1/2} S^{1/2}